@@ -5,6 +5,8 @@ Ce module définit un AdminSite personnalisé qui peut être utilisé
 comme package réutilisable dans d'autres projets Django.
 Supporte deux interfaces : Classique (AdminLTE) et Moderne (Design 1).
 """
+import threading
+
 from django.contrib import admin
 from django.contrib.admin import actions as admin_actions
 from django.contrib.auth import logout as auth_logout
@@ -14,19 +16,18 @@ from django.shortcuts import render, redirect
 from . import admin_views as custom_views
 from . import auth_views
 from . import modern_views
-from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_MODERN
+from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_CLASSIC, INTERFACE_MODERN
+from .modern_model_admin import (
+    INTERFACE_TEMPLATES, apply_template, get_admin_template, resolve_admin_templates,
+)
 
 
 def _delete_selected_modern_aware(modeladmin, request, queryset):
     """delete_selected qui utilise le template moderne si l'interface est en mode moderne."""
-    from .modern_model_admin import _use_modern_templates
-    orig = getattr(modeladmin, 'delete_selected_confirmation_template', None)
-    if _use_modern_templates(request) and hasattr(modeladmin, 'modern_delete_selected_confirmation_template'):
-        modeladmin.delete_selected_confirmation_template = modeladmin.modern_delete_selected_confirmation_template
-    try:
-        return admin_actions.delete_selected(modeladmin, request, queryset)
-    finally:
-        modeladmin.delete_selected_confirmation_template = orig
+    response = admin_actions.delete_selected(modeladmin, request, queryset)
+    return apply_template(
+        response, get_admin_template(modeladmin, request, 'delete_selected_confirmation'), request
+    )
 
 
 class CustomAdminSite(admin.AdminSite):
@@ -42,8 +43,44 @@ class CustomAdminSite(admin.AdminSite):
     index_title = "Tableau de bord"
 
     def __init__(self, *args, **kwargs):
+        self._pending_discovery = None
+        self._discovering = False
+        self._discovery_lock = threading.RLock()
         super().__init__(*args, **kwargs)
         self._actions = {**self._actions, "delete_selected": _delete_selected_modern_aware}
+
+    # ——— Découverte paresseuse du registre ———
+
+    @property
+    def _registry(self):
+        """
+        Registre {modèle: ModelAdmin}. La découverte différée (defer_discovery) est exécutée au
+        premier accès : URLconf de l'admin, checks Django, register / unregister…
+        """
+        if self._pending_discovery is not None:
+            # Les autres threads attendent la fin de la découverte ; le thread qui découvre
+            # (register / unregister) lit le registre en cours de construction
+            with self._discovery_lock:
+                if self._pending_discovery is not None and not self._discovering:
+                    self._discovering = True
+                    try:
+                        self._pending_discovery(self)
+                    finally:
+                        self._discovering = False
+                        self._pending_discovery = None
+        return self._registry_store
+
+    @_registry.setter
+    def _registry(self, value):
+        self._registry_store = value
+
+    def defer_discovery(self, discovery):
+        """Enregistre discovery(site), exécutée une seule fois au premier accès au registre."""
+        self._pending_discovery = discovery
+
+    @property
+    def discovered(self):
+        return self._pending_discovery is None
     
     # Templates personnalisés - Utiliser nos templates namespacés
     index_template = 'admin_custom/index.html'
@@ -55,59 +92,19 @@ class CustomAdminSite(admin.AdminSite):
     password_change_template = 'admin/password_change_form.html'
     password_change_done_template = 'admin/password_change_done.html'
     
-    def _force_custom_templates(self, request=None):
+    def resolve_templates(self):
         """
-        Force l'utilisation des templates personnalisés pour tous les ModelAdmin enregistrés.
-        
-        Cette méthode centralise la logique de forçage des templates et garantit
-        que tous les ModelAdmin utilisent les bons templates selon l'interface active.
-        
-        Args:
-            request: Objet HttpRequest optionnel pour détecter l'interface active.
-                    Si None, utilise l'interface classique par défaut.
+        Résout une fois (au démarrage) les templates des deux interfaces pour chaque ModelAdmin enregistré.
+        Le choix par requête se fait ensuite par simple lecture (get_admin_template), sans mutation.
         """
-        # Détecter l'interface active si request est fourni
-        if request:
-            use_modern = request.session.get(SESSION_INTERFACE_KEY) == INTERFACE_MODERN
-        else:
-            use_modern = False
-        
-        # Déterminer les templates à utiliser
-        if use_modern:
-            change_list_template = 'admin_custom/modern/change_list.html'
-            change_form_template = 'admin_custom/modern/change_form.html'
-        else:
-            change_list_template = 'admin_custom/change_list.html'
-            change_form_template = 'admin_custom/change_form.html'
-        
-        # Forcer sur toutes les instances et classes ModelAdmin enregistrées
-        for model, admin_instance in self._registry.items():
-            # Forcer sur l'instance
-            admin_instance.change_list_template = change_list_template
-            admin_instance.change_form_template = change_form_template
-            
-            # Forcer sur la classe
-            admin_class = admin_instance.__class__
-            admin_class.change_list_template = change_list_template
-            admin_class.change_form_template = change_form_template
-            
-            # Forcer sur toutes les classes parentes dans le MRO
-            for cls in admin_class.__mro__:
-                if (issubclass(cls, admin.ModelAdmin) and 
-                    cls != admin.ModelAdmin and 
-                    hasattr(cls, 'change_list_template')):
-                    cls.change_list_template = change_list_template
-                    cls.change_form_template = change_form_template
-    
+        for admin_instance in self._registry.values():
+            admin_instance._interface_templates = resolve_admin_templates(admin_instance)
+
     def each_context(self, request):
         """
         Ajoute le contexte pour tous les templates.
         En mode moderne : admin_interface et app_list pour la sidebar.
-        Force également les templates personnalisés pour tous les ModelAdmin.
         """
-        # Forcer les templates personnalisés avant de générer le contexte
-        self._force_custom_templates(request)
-        
         context = super().each_context(request)
         admin_interface = request.session.get(SESSION_INTERFACE_KEY, 'classic')
         context['admin_interface'] = admin_interface
@@ -115,9 +112,9 @@ class CustomAdminSite(admin.AdminSite):
             context['app_list'] = self.get_app_list(request)
             context['user_display'] = request.user.get_short_name() or request.user.get_username() if request.user.is_authenticated else ''
             context['user_initial'] = (context['user_display'][0] if context['user_display'] else 'A').upper()
-            context['admin_base_template'] = 'admin_custom/modern/admin_base.html'
+            context['admin_base_template'] = INTERFACE_TEMPLATES[INTERFACE_MODERN]['admin_base']
         else:
-            context['admin_base_template'] = 'admin_custom/base.html'
+            context['admin_base_template'] = INTERFACE_TEMPLATES[INTERFACE_CLASSIC]['admin_base']
         return context
     
     def logout(self, request, extra_context=None):
@@ -2,11 +2,10 @@ from django.contrib import admin
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render
 from django.urls import reverse
-from django.db.models import Sum
-from django.apps import apps
 
 from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_CLASSIC, INTERFACE_MODERN
 from .autodiscover import get_all_models_for_charts, get_all_models_for_grids
+from .stats import get_stats
 
 
 def get_custom_admin_site():
@@ -48,43 +47,14 @@ def grids_view(request):
 
 
 def dashboard_view(request):
-    """Vue dashboard principal - utilise l'auto-découverte"""
-    from django.db.models import Sum, Count
-    
-    # Détecter automatiquement les modèles avec des montants
+    """Vue dashboard principal - statistiques lues dans la table ModelStat (une requête)"""
+    data = get_stats()
     stats = {}
-    total_revenue = 0
-    
-    # Parcourir tous les modèles pour trouver ceux avec total_amount ou amount
-    for app_config in apps.get_app_configs():
-        # Ignorer les apps Django internes
-        if app_config.name.startswith('django.contrib'):
-            continue
-        
-        for model in app_config.get_models():
-            if model._meta.abstract or model._meta.proxy:
-                continue
-            
-            model_name = model.__name__.lower()
-            
-            # Chercher des champs de montant
-            if hasattr(model, 'total_amount'):
-                count = model.objects.count()
-                revenue = float(model.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0)
-                stats[f'total_{model_name}'] = count
-                total_revenue += revenue
-            elif hasattr(model, 'amount'):
-                count = model.objects.count()
-                revenue = float(model.objects.aggregate(Sum('amount'))['amount__sum'] or 0)
-                stats[f'total_{model_name}'] = count
-                total_revenue += revenue
-            else:
-                # Compter simplement le nombre d'objets
-                count = model.objects.count()
-                if count > 0:  # Ne garder que les modèles avec des données
-                    stats[f'total_{model_name}'] = count
-    
-    stats['total_revenue'] = total_revenue
+    for label, count in data['counts'].items():
+        # Modèles avec montant : toujours affichés ; autres : seulement s'ils ont des données
+        if label in data['revenue_models'] or count > 0:
+            stats[f"total_{label.replace('.', '_')}"] = count
+    stats['total_revenue'] = data['revenue']
     
     custom_admin_site = get_custom_admin_site()
     context = custom_admin_site.each_context(request)
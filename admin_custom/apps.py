@@ -2,50 +2,170 @@ from django.apps import AppConfig
 from django.contrib import admin
 
 
-def _reregister_inline_admins(custom_admin_site):
+def _with_modern_mixin(admin_class):
     """
-    Ré-enregistre chaque modèle dont le ModelAdmin définit des inlines,
-    pour garantir que les inlines (ex. OrderItem, Invoice sous Order) s'affichent.
+    Classe ModelAdmin héritant de ModernTemplateMixin (basculement d'interface) :
+    la classe elle-même si elle en hérite déjà, sinon une sous-classe avec le mixin en premier (MRO).
     """
-    for model, admin_instance in list(custom_admin_site._registry.items()):
-        if not getattr(admin_instance, 'inlines', None):
-            continue
-        admin_cls = admin_instance.__class__
+    from .modern_model_admin import ModernTemplateMixin
+
+    if issubclass(admin_class, ModernTemplateMixin):
+        return admin_class
+    # Préserver les attributs de classe importants
+    admin_attrs = {'__module__': admin_class.__module__}
+    for attr_name in ['list_display', 'list_filter', 'search_fields', 'inlines',
+                      'readonly_fields', 'prepopulated_fields', 'list_editable',
+                      'list_per_page', 'list_max_show_all', 'date_hierarchy',
+                      'ordering', 'save_as', 'save_on_top']:
+        if hasattr(admin_class, attr_name):
+            admin_attrs[attr_name] = getattr(admin_class, attr_name)
+    return type(f"{admin_class.__name__}WithModernMixin", (ModernTemplateMixin, admin_class), admin_attrs)
+
+
+def _project_overrides(admin_classes):
+    """Classes d'admin imposées par admin_custom (apps catalog / sales, auth, modèles admin_custom)."""
+    from django.apps import apps as django_apps
+    from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin, GroupAdmin
+    from django.contrib.auth.models import User, Group, Permission
+
+    from .admin import DashboardGridAdmin, DashboardChartAdmin, UserDashboardConfigAdmin
+    from .models import DashboardGrid, DashboardChart, UserDashboardConfig
+    from .modern_model_admin import ModernTemplateMixin
+    from .user_admin import CustomUserAdmin
+
+    # Catalog / Sales : classes ModelAdmin explicites (list_display complet)
+    if django_apps.is_installed('catalog'):
         try:
-            custom_admin_site.unregister(model)
-            custom_admin_site.register(model, admin_cls)
+            from catalog.models import Category, Product
+            from catalog.admin import CategoryAdmin, ProductAdmin
+            admin_classes.update({Category: CategoryAdmin, Product: ProductAdmin})
+        except ImportError:
+            pass
+    if django_apps.is_installed('sales'):
+        try:
+            from sales.models import Order, OrderItem, Invoice, Payment
+            from sales.admin import OrderAdmin, OrderItemAdmin, InvoiceAdmin, PaymentAdmin
+            admin_classes.update({
+                Order: OrderAdmin, OrderItem: OrderItemAdmin, Invoice: InvoiceAdmin, Payment: PaymentAdmin,
+            })
+        except ImportError:
+            pass
+
+    # User : ne remplacer que si l'admin actuel est exactement celui de Django (conserver l'admin métier du projet)
+    if admin_classes.get(User) is DjangoUserAdmin:
+        admin_classes[User] = CustomUserAdmin
+    admin_classes[Group] = GroupAdmin
+    admin_classes[Permission] = type(
+        'PermissionAdmin', (ModernTemplateMixin, admin.ModelAdmin), {
+            'list_display': ['name', 'content_type', 'codename'],
+            'list_filter': ['content_type'],
+            'search_fields': ['name', 'codename'],
+        }
+    )
+    # Modèles admin_custom (grilles, graphiques, config dashboard)
+    admin_classes.update({
+        DashboardGrid: DashboardGridAdmin,
+        DashboardChart: DashboardChartAdmin,
+        UserDashboardConfig: UserDashboardConfigAdmin,
+    })
+
+
+def populate_admin_registry(custom_admin_site):
+    """
+    Construit le registre de custom_admin_site en une passe : classe d'admin de chaque modèle
+    (découverte, surcharges, ModernTemplateMixin), un seul register() par modèle, puis résolution
+    des templates. Exécutée au premier accès au registre (CustomAdminSite.defer_discovery).
+    """
+    import logging
+    import django.contrib.admin
+    from django.contrib.admin import sites
+
+    from .autodiscover import discover_admin_classes
+
+    logger = logging.getLogger(__name__)
+    # Les admin.py importés ici utilisent admin.site (ex. admin.site.unregister(User)) :
+    # le site Django d'origine le temps de la découverte
+    replaced_site = django.contrib.admin.site
+    django.contrib.admin.site = sites.site
+    try:
+        admin_classes = discover_admin_classes(exclude_apps=['admin_custom'])
+    except Exception as e:
+        logger.warning("admin_custom: erreur autodiscover_models: %s", e)
+        admin_classes = {}
+    finally:
+        django.contrib.admin.site = replaced_site
+
+    _project_overrides(admin_classes)
+    for model, admin_class in admin_classes.items():
+        try:
+            admin_class = _with_modern_mixin(admin_class)
         except Exception:
+            # En cas d'erreur, garder la classe d'origine pour ne pas bloquer l'admin
             pass
+        if model in custom_admin_site._registry:
+            custom_admin_site.unregister(model)
+        custom_admin_site.register(model, admin_class)
+
+    # Résoudre une fois les templates (classique et moderne) de chaque ModelAdmin
+    custom_admin_site.resolve_templates()
 
 
 class AdminCustomConfig(AppConfig):
     """
     Configuration de l'application admin_custom.
-    
+
     Au chargement, remplace le site admin Django par défaut (admin.site)
     par notre CustomAdminSite. Ainsi, tout projet qui utilise
     path('admin/', admin.site.urls) affiche automatiquement le panel personnalisé
     sur toutes les pages (dashboard, listes, formulaires, grilles).
+
+    La découverte des modèles est paresseuse : elle a lieu au premier accès au registre
+    (chargement de l'URLconf de l'admin, checks), pas au démarrage du processus. Avec
+    'django.contrib.admin.apps.SimpleAdminConfig' dans INSTALLED_APPS, les admin.py ne sont
+    importés qu'à ce moment ; avec 'django.contrib.admin', l'autodiscover de Django la déclenche.
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_custom'
     verbose_name = 'Django Admin Custom'
-    
+
     def ready(self):
         self._install_custom_admin_site()
-    
+        self._connect_signals()
+
+        # Métadonnées de champs (champs numériques) calculées une fois au démarrage
+        from .metrics import warm_field_metadata
+        warm_field_metadata()
+
+    def _connect_signals(self):
+        """
+        À chaque écriture (post_save / post_delete) : invalide le cache des graphiques du modèle
+        et ajuste les statistiques du tableau de bord par delta.
+        Receivers connectés modèle par modèle (sender=model) : un receiver post_delete sans sender
+        désactive la suppression rapide (Collector.can_fast_delete) de tous les modèles du projet.
+        """
+        from django.db.models.signals import post_save, post_delete
+        from .charts import bump_model_generation, get_charted_models
+        from .stats import apply_delta, get_tracked_models
+
+        for model in get_charted_models():
+            label = model._meta.label_lower
+            post_save.connect(bump_model_generation, sender=model, dispatch_uid=f'admin_custom_chart_post_save:{label}')
+            post_delete.connect(bump_model_generation, sender=model, dispatch_uid=f'admin_custom_chart_post_delete:{label}')
+        for model in get_tracked_models():
+            label = model._meta.label_lower
+            post_save.connect(apply_delta, sender=model, dispatch_uid=f'admin_custom_stats_post_save:{label}')
+            post_delete.connect(apply_delta, sender=model, dispatch_uid=f'admin_custom_stats_post_delete:{label}')
+
     def _install_custom_admin_site(self):
         """
-        Remplace admin.site par notre CustomAdminSite et enregistre tous les
-        modèles du projet dessus. À appeler une seule fois au démarrage.
+        Remplace admin.site par notre CustomAdminSite ; l'enregistrement des modèles est différé
+        (populate_admin_registry). À appeler une seule fois au démarrage.
         """
         import django.contrib.admin
-        from django.conf import settings
-        
+
         from .admin_site import custom_admin_site
-        
-        # ÉTAPE 0 : Appliquer le monkey-patch global TRÈS TÔT
-        # Cela garantit que même les ModelAdmin de packages tiers utilisent les templates personnalisés
+
+        # Monkey-patch global TRÈS TÔT : même les ModelAdmin de packages tiers utilisent les templates personnalisés
         try:
             from .modeladmin_patch import patch_modeladmin
             patch_modeladmin()
@@ -54,137 +174,7 @@ class AdminCustomConfig(AppConfig):
             logging.getLogger(__name__).warning(
                 "admin_custom: erreur patch_modeladmin: %s", e
             )
-        
-        # 1) Charger tous les admin.py AVANT de remplacer admin.site
-        #    Cela permet à autodiscover_models de récupérer les classes ModelAdmin originales
-        #    depuis un site admin temporaire, puis de les enregistrer correctement sur custom_admin_site
-        try:
-            from .autodiscover import autodiscover_models
-            autodiscover_models(custom_admin_site, exclude_apps=['admin_custom'])
-        except Exception as e:
-            import logging
-            logging.getLogger(__name__).warning(
-                "admin_custom: erreur autodiscover_models: %s", e
-            )
-        
-        # 2) Remplacer le site admin par défaut APRÈS l'auto-découverte
-        #    Tout code qui utilise admin.site (y compris path('admin/', admin.site.urls)) utilisera
-        #    notre panel personnalisé. Les modèles sont déjà enregistrés sur custom_admin_site.
+
+        custom_admin_site.defer_discovery(populate_admin_registry)
+        # Tout code qui utilise admin.site (y compris path('admin/', admin.site.urls)) utilise notre panel
         django.contrib.admin.site = custom_admin_site
-        
-        # 2b) Ré-enregistrer les ModelAdmin qui ont des inlines pour garantir l'affichage
-        _reregister_inline_admins(custom_admin_site)
-        
-        # 2c) Forcer l'enregistrement explicite des ModelAdmin pour garantir que list_display est correct
-        # Cela garantit que tous les modèles utilisent leurs vraies classes ModelAdmin avec tous les attributs
-        try:
-            from django.apps import apps as django_apps
-            
-            # Catalog app
-            if django_apps.is_installed('catalog'):
-                try:
-                    from catalog.models import Category, Product
-                    from catalog.admin import CategoryAdmin, ProductAdmin
-                    for model, admin_cls in [(Category, CategoryAdmin), (Product, ProductAdmin)]:
-                        if model in custom_admin_site._registry:
-                            custom_admin_site.unregister(model)
-                        custom_admin_site.register(model, admin_cls)
-                except ImportError:
-                    pass
-            
-            # Sales app
-            if django_apps.is_installed('sales'):
-                try:
-                    from sales.models import Order, OrderItem, Invoice, Payment
-                    from sales.admin import OrderAdmin, OrderItemAdmin, InvoiceAdmin, PaymentAdmin
-                    for model, admin_cls in [
-                        (Order, OrderAdmin), 
-                        (OrderItem, OrderItemAdmin), 
-                        (Invoice, InvoiceAdmin),
-                        (Payment, PaymentAdmin)
-                    ]:
-                        if model in custom_admin_site._registry:
-                            custom_admin_site.unregister(model)
-                        custom_admin_site.register(model, admin_cls)
-                except ImportError:
-                    pass
-        except Exception:
-            pass
-        
-        # 3) Remplacer User, Group, Permission par nos classes d'admin
-        from django.contrib.auth.models import User, Group, Permission
-        from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin, GroupAdmin
-        from .user_admin import CustomUserAdmin
-        from .modern_model_admin import ModernTemplateMixin
-        
-        # User : ne remplacer que si l'admin actuel est exactement celui de Django (conserver l'admin métier du projet)
-        if User in custom_admin_site._registry:
-            current_user_admin_instance = custom_admin_site._registry[User]
-            if type(current_user_admin_instance) is DjangoUserAdmin:
-                custom_admin_site.unregister(User)
-                custom_admin_site.register(User, CustomUserAdmin)
-        
-        for model in (Group, Permission):
-            if model in custom_admin_site._registry:
-                custom_admin_site.unregister(model)
-        
-        custom_admin_site.register(Group, GroupAdmin)
-        custom_admin_site.register(Permission, type(
-            'PermissionAdmin', (ModernTemplateMixin, admin.ModelAdmin), {
-                'list_display': ['name', 'content_type', 'codename'],
-                'list_filter': ['content_type'],
-                'search_fields': ['name', 'codename'],
-            }
-        ))
-        
-        # 4) Enregistrer les modèles admin_custom (grilles, graphiques, config dashboard)
-        from .models import DashboardGrid, DashboardChart, UserDashboardConfig
-        from .admin import DashboardGridAdmin, DashboardChartAdmin, UserDashboardConfigAdmin
-        
-        for model, admin_class in (
-            (DashboardGrid, DashboardGridAdmin),
-            (DashboardChart, DashboardChartAdmin),
-            (UserDashboardConfig, UserDashboardConfigAdmin),
-        ):
-            if model in custom_admin_site._registry:
-                custom_admin_site.unregister(model)
-            custom_admin_site.register(model, admin_class)
-        
-        # 5) S'assurer que TOUS les ModelAdmin héritent de ModernTemplateMixin
-        # Cela garantit que le basculement entre interfaces fonctionne pour tous les modèles
-        from .modern_model_admin import ModernTemplateMixin
-        
-        for model, admin_instance in list(custom_admin_site._registry.items()):
-            admin_class = admin_instance.__class__
-            
-            # Si le ModelAdmin n'hérite pas déjà du mixin, le créer avec le mixin
-            if not issubclass(admin_class, ModernTemplateMixin):
-                try:
-                    # Créer une nouvelle classe avec le mixin en premier (MRO important)
-                    class_name = f"{admin_class.__name__}WithModernMixin"
-                    
-                    # Préserver tous les attributs existants
-                    admin_attrs = {
-                        '__module__': admin_class.__module__,
-                    }
-                    
-                    # Copier les attributs de classe importants
-                    for attr_name in ['list_display', 'list_filter', 'search_fields', 'inlines', 
-                                     'readonly_fields', 'prepopulated_fields', 'list_editable',
-                                     'list_per_page', 'list_max_show_all', 'date_hierarchy',
-                                     'ordering', 'save_as', 'save_on_top']:
-                        if hasattr(admin_class, attr_name):
-                            admin_attrs[attr_name] = getattr(admin_class, attr_name)
-                    
-                    # Créer la nouvelle classe avec le mixin en premier (MRO)
-                    new_admin_class = type(class_name, (ModernTemplateMixin, admin_class), admin_attrs)
-                    
-                    # Ré-enregistrer avec la nouvelle classe
-                    custom_admin_site.unregister(model)
-                    custom_admin_site.register(model, new_admin_class)
-                except Exception:
-                    # En cas d'erreur, ignorer silencieusement pour ne pas bloquer le démarrage
-                    pass
-        
-        # 6) Forcer les templates personnalisés au démarrage
-        custom_admin_site._force_custom_templates()
@@ -5,71 +5,181 @@ Ce module permet de détecter automatiquement tous les modèles Django
 d'un projet et de les enregistrer avec le CustomAdminSite, en détectant
 automatiquement les classes ModelAdmin définies dans les fichiers admin.py.
 """
+import hashlib
+import importlib
+import json
+import logging
+import os
+from pathlib import Path
+
 from django.apps import apps
 from django.contrib import admin
+from django.contrib.admin import sites
 from django.conf import settings
-from django.utils.module_loading import autodiscover_modules
+from django.utils.module_loading import autodiscover_modules, import_string
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
 
+# Apps Django internes à exclure par défaut
+DEFAULT_EXCLUDE_APPS = [
+    'django.contrib.admin',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+]
 
-def _find_model_admin_classes(app_label):
+
+def _find_model_admin_classes(app_config):
     """
-    Trouve toutes les classes ModelAdmin dans le module admin.py d'une app.
-    Retourne un dictionnaire {model: admin_class}.
+    Trouve les classes ModelAdmin du module admin.py d'une app, associées au modèle de même nom
+    (ex. CategoryAdmin -> Category). Retourne un dictionnaire {model: admin_class}.
+    Un seul parcours de l'espace de noms du module (vars), sans getattr attribut par attribut.
     """
-    import importlib
     model_admin_map = {}
     try:
-        admin_module = importlib.import_module(f"{app_label}.admin")
-        # Chercher toutes les classes ModelAdmin dans le module
-        for attr_name in dir(admin_module):
-            attr = getattr(admin_module, attr_name)
-            if (isinstance(attr, type) and 
-                issubclass(attr, admin.ModelAdmin) and 
-                attr != admin.ModelAdmin and
-                attr_name.endswith('Admin')):
-                # Vérifier si cette classe a un attribut 'model' (défini par @admin.register)
-                # ou si on peut le déduire du nom de la classe
-                try:
-                    # Les classes ModelAdmin ont souvent un attribut '__wrapped__' ou '__model__'
-                    # défini par le décorateur @admin.register
-                    if hasattr(attr, '__wrapped__'):
-                        # Le décorateur @admin.register stocke le modèle dans __wrapped__
-                        model = getattr(attr, '__wrapped__', None)
-                        if model:
-                            model_admin_map[model] = attr
-                    else:
-                        # Essayer de deviner le modèle depuis le nom de la classe
-                        # Ex: CategoryAdmin -> Category
-                        model_name = attr_name.replace('Admin', '')
-                        try:
-                            app_config = apps.get_app_config(app_label)
-                            model = app_config.get_model(model_name)
-                            if model:
-                                model_admin_map[model] = attr
-                        except:
-                            pass
-                except:
-                    pass
-    except (ImportError, AttributeError):
-        pass
+        admin_module = importlib.import_module(f"{app_config.name}.admin")
+    except ImportError:
+        return model_admin_map
+    for attr_name, attr in vars(admin_module).items():
+        if not (attr_name.endswith('Admin') and isinstance(attr, type)
+                and issubclass(attr, admin.ModelAdmin) and attr is not admin.ModelAdmin):
+            continue
+        try:
+            model_admin_map[app_config.get_model(attr_name[:-len('Admin')])] = attr
+        except LookupError:
+            pass
     return model_admin_map
 
 
+# ——— Manifeste (résultat de la découverte, clé = empreinte du code) ———
+
+def get_manifest_path():
+    """Chemin du manifeste JSON (ADMIN_CUSTOM_MANIFEST_PATH) ; vide = pas de manifeste."""
+    return getattr(settings, 'ADMIN_CUSTOM_MANIFEST_PATH', '') or ''
+
+
+def _file_signature(path):
+    """Date de modification (ns) et taille du fichier ('' s'il n'existe pas) : un stat, sans lecture."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return ''
+    return f'{st.st_mtime_ns}:{st.st_size}'
+
+
+def code_hash(app_configs, config):
+    """
+    Empreinte de ce qui détermine la découverte : fichiers admin.py (date de modification et taille),
+    modèles de chaque app, configuration ADMIN_CUSTOM, code de la découverte (ce module) et version
+    du manifeste. Calculée sans importer ni lire les modules admin.
+    """
+    digest = hashlib.sha1(f'{MANIFEST_VERSION}|{json.dumps(config, sort_keys=True, default=str)}'.encode())
+    digest.update(_file_signature(__file__).encode())
+    for app_config in app_configs:
+        digest.update(app_config.name.encode())
+        digest.update(','.join(sorted(m._meta.label_lower for m in app_config.get_models())).encode())
+        for candidate in ('admin.py', os.path.join('admin', '__init__.py')):
+            digest.update(f'|{_file_signature(os.path.join(app_config.path, candidate))}'.encode())
+    return digest.hexdigest()
+
+
+def load_manifest(key):
+    """{label de modèle: chemin de la classe ModelAdmin} si le manifeste correspond à l'empreinte."""
+    path = get_manifest_path()
+    if not path:
+        return None
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if data.get('hash') != key:
+        return None
+    try:
+        return {apps.get_model(label): import_string(dotted) for label, dotted in data['admins'].items()}
+    except (ImportError, LookupError, KeyError) as e:
+        logger.info('admin_custom: manifeste ignoré (%s)', e)
+        return None
+
+
+def save_manifest(key, admin_classes):
+    """Écriture atomique du manifeste (classes importables uniquement)."""
+    path = get_manifest_path()
+    if not path:
+        return
+    admins = {}
+    for model, admin_class in admin_classes.items():
+        dotted = f'{admin_class.__module__}.{admin_class.__qualname__}'
+        try:
+            importable = import_string(dotted) is admin_class
+        except ImportError:
+            importable = False
+        if not importable:
+            return  # classe générée ou locale : pas de manifeste
+        admins[model._meta.label_lower] = dotted
+    try:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(f'{path}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps({'hash': key, 'admins': admins}, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.info('admin_custom: manifeste non écrit (%s)', e)
+
+
+# ——— Découverte ———
+
+def discover_admin_classes(exclude_apps=None, exclude_models=None):
+    """
+    Classe ModelAdmin de chaque modèle à enregistrer, en une passe : {model: admin_class}.
+
+    Le manifeste est consulté en premier : tant que l'empreinte du code est inchangée, seuls les
+    modules qu'il nomme sont importés. Sinon, charge les admin.py (admin.site est peuplé par
+    @admin.register), puis retient pour chaque modèle la classe de même nom trouvée dans admin.py,
+    sinon celle du registre Django, sinon ModelAdmin.
+    """
+    admin_custom_config = getattr(settings, 'ADMIN_CUSTOM', {})
+    exclude_apps = list(exclude_apps or admin_custom_config.get('EXCLUDE_APPS', [])) + DEFAULT_EXCLUDE_APPS
+    exclude_models = exclude_models or admin_custom_config.get('EXCLUDE_MODELS', [])
+    include_proxy = admin_custom_config.get('INCLUDE_PROXY', False)
+
+    app_configs = [c for c in apps.get_app_configs() if c.name not in exclude_apps and c.name != 'admin_custom']
+    key = code_hash(app_configs, {'exclude_apps': exclude_apps, 'exclude_models': exclude_models,
+                                  'include_proxy': include_proxy})
+    cached = load_manifest(key)
+    if cached is not None:
+        return cached
+
+    # Charger les admin.py pour peupler le site Django d'origine (l'import peut aussi désenregistrer, ex. User) ;
+    # admin.site peut déjà désigner le CustomAdminSite, dont le registre contient des classes générées
+    autodiscover_modules('admin', register_to=sites.site)
+    registry = {model: type(instance) for model, instance in sites.site._registry.items()}
+    admin_classes = {}
+    for app_config in app_configs:
+        # Classes retrouvées par leur nom : apps du projet seulement (une app tierce, au nom pointé,
+        # peut définir sans l'enregistrer une classe d'admin volontairement désactivée)
+        named = _find_model_admin_classes(app_config) if '.' not in app_config.name else {}
+        for model in app_config.get_models():
+            if model._meta.label_lower in exclude_models or model.__name__ in exclude_models:
+                continue
+            if model._meta.abstract or (model._meta.proxy and not include_proxy):
+                continue
+            admin_classes[model] = named.get(model) or registry.get(model) or admin.ModelAdmin
+    save_manifest(key, admin_classes)
+    return admin_classes
+
+
 def autodiscover_models(custom_admin_site=None, exclude_apps=None, exclude_models=None):
     """
     Découvre automatiquement tous les modèles Django du projet
-    et les enregistre avec le CustomAdminSite.
-    
-    Cette fonction fonctionne en deux étapes :
-    1. Elle charge tous les fichiers admin.py des apps installées
-    2. Elle détecte les modèles enregistrés avec @admin.register() dans admin.site
-    3. Elle les ré-enregistre automatiquement dans custom_admin_site
-    
+    et les enregistre avec le CustomAdminSite (un enregistrement par modèle).
+
     Args:
         custom_admin_site: Instance de CustomAdminSite (optionnel)
         exclude_apps: Liste d'apps à exclure (optionnel)
         exclude_models: Liste de modèles à exclure (optionnel)
-    
+
     Returns:
         Tuple (custom_admin_site, registered_count)
     """
@@ -77,129 +187,13 @@ def autodiscover_models(custom_admin_site=None, exclude_apps=None, exclude_model
         # Import lazy pour éviter les imports circulaires
         from .admin_site import CustomAdminSite
         custom_admin_site = CustomAdminSite()
-    
-    # Configuration depuis settings (pour package futur)
-    admin_custom_config = getattr(settings, 'ADMIN_CUSTOM', {})
-    exclude_apps = exclude_apps or admin_custom_config.get('EXCLUDE_APPS', [])
-    exclude_models = exclude_models or admin_custom_config.get('EXCLUDE_MODELS', [])
-    
-    # Apps Django internes à exclure par défaut
-    default_exclude_apps = [
-        'django.contrib.admin',
-        'django.contrib.contenttypes',
-        'django.contrib.sessions',
-        'django.contrib.messages',
-        'django.contrib.staticfiles',
-    ]
-    exclude_apps = list(exclude_apps) if exclude_apps else []
-    exclude_apps.extend(default_exclude_apps)
-    
-    # ÉTAPE 1 : Parcourir directement les apps et leurs modules admin.py pour trouver les classes ModelAdmin
-    # Cette approche évite les problèmes d'ordre d'importation et garantit qu'on récupère les vraies classes
+
     registered_count = 0
-    model_admin_map = {}  # {model: admin_class}
-    
-    # Parcourir toutes les apps installées
-    for app_config in apps.get_app_configs():
-        app_label = app_config.name
-        if app_label in exclude_apps or app_label == 'admin_custom':
-            continue
-        if app_label.startswith('django.contrib'):
-            continue
-        
-        # Chercher les classes ModelAdmin dans le module admin.py de l'app
-        admin_classes = _find_model_admin_classes(app_label)
-        model_admin_map.update(admin_classes)
-    
-    # ÉTAPE 2 : Enregistrer les modèles sur custom_admin_site avec leurs classes ModelAdmin
-    # Si une classe ModelAdmin a été trouvée dans admin.py, l'utiliser
-    # Sinon, utiliser l'enregistrement depuis admin.site (fallback)
-    
-    # D'abord, charger les admin.py pour que admin.site soit peuplé (fallback)
-    autodiscover_modules('admin', register_to=admin.site)
-    
-    # Ensuite, enregistrer sur custom_admin_site en utilisant les classes trouvées
-    registry_items = list(admin.site._registry.items())
-    for model, admin_instance in registry_items:
-        app_label = model._meta.app_label
-        if app_label in exclude_apps or app_label == 'admin_custom':
-            continue
-        model_name = f"{app_label}.{model._meta.model_name}"
-        if model_name in exclude_models or model.__name__ in exclude_models:
-            continue
-        if model._meta.abstract:
-            continue
-        if model._meta.proxy and not admin_custom_config.get('INCLUDE_PROXY', False):
-            continue
-        try:
-            # Utiliser la classe ModelAdmin trouvée dans admin.py si disponible
-            # Sinon, utiliser celle du registre admin.site
-            if model in model_admin_map:
-                admin_class = model_admin_map[model]
-            else:
-                admin_class = admin_instance.__class__
-            
-            # Si le modèle est déjà enregistré, le désenregistrer d'abord
-            if model in custom_admin_site._registry:
-                custom_admin_site.unregister(model)
-            # Ré-enregistrer avec la classe ModelAdmin originale (tous les attributs seront préservés)
-            custom_admin_site.register(model, admin_class)
-            registered_count += 1
-        except admin.sites.AlreadyRegistered:
-            pass
-        except Exception as e:
-            # En cas d'erreur, essayer d'enregistrer avec un ModelAdmin par défaut
-            try:
-                if model in custom_admin_site._registry:
-                    custom_admin_site.unregister(model)
-                custom_admin_site.register(model)
-                registered_count += 1
-            except Exception:
-                pass
-    
-    # ÉTAPE 3 : Enregistrer les modèles non encore enregistrés
-    # (ceux qui n'ont pas de fichier admin.py)
-    for app_config in apps.get_app_configs():
-        app_name = app_config.name
-        
-        # Ignorer les apps exclues
-        if app_name in exclude_apps:
-            continue
-        
-        # Ignorer admin_custom lui-même
-        if app_name == 'admin_custom':
-            continue
-        
-        # Récupérer tous les modèles de l'app
-        for model in app_config.get_models():
-            # Ignorer si déjà enregistré
-            if model in custom_admin_site._registry:
-                continue
-            
-            # Ignorer les modèles exclus
-            model_name = f"{model._meta.app_label}.{model._meta.model_name}"
-            if model_name in exclude_models or model.__name__ in exclude_models:
-                continue
-            
-            # Ignorer les modèles abstraits
-            if model._meta.abstract:
-                continue
-            
-            # Ignorer les modèles proxy (sauf si explicitement demandé)
-            if model._meta.proxy and not admin_custom_config.get('INCLUDE_PROXY', False):
-                continue
-            
-            # Enregistrer avec un ModelAdmin par défaut
-            try:
-                custom_admin_site.register(model)
-                registered_count += 1
-            except admin.sites.AlreadyRegistered:
-                # Déjà enregistré, ignorer
-                pass
-            except Exception:
-                # Ignorer les erreurs silencieusement
-                pass
-    
+    for model, admin_class in discover_admin_classes(exclude_apps, exclude_models).items():
+        if model in custom_admin_site._registry:
+            custom_admin_site.unregister(model)
+        custom_admin_site.register(model, admin_class)
+        registered_count += 1
     return custom_admin_site, registered_count
 
 
@@ -0,0 +1,259 @@
+"""
+Moteur de graphiques admin_custom.
+
+Une seule requête group-by (Trunc{Day,Week,Month,Quarter,Year} sur created_at) couvre toute la
+fenêtre affichée ; les périodes vides sont complétées en Python. Les résultats sont mis en cache
+par (modèle, champ, opération, fréquence) et invalidés :
+- par une génération propre à chaque modèle, renouvelée sur post_save / post_delete au COMMIT de
+  l'écriture (receivers connectés modèle par modèle, pour les seuls modèles datés :
+  get_charted_models). Une génération est remplacée par une valeur jamais émise, et non
+  incrémentée : ni bump perdu entre workers (incr non atomique du cache fichier), ni retour à une
+  ancienne valeur après éviction de la clé ;
+- par un TTL (ADMIN_CUSTOM_CHART_CACHE_TIMEOUT, 300 s par défaut) pour faire glisser la fenêtre.
+
+Les graphiques DashboardChart peuvent être précalculés par la commande refresh_dashboard_charts.
+"""
+import logging
+import secrets
+from datetime import date, datetime, time, timedelta
+from functools import partial
+from time import time_ns
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import Avg, Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .metrics import get_numeric_fields
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELD = 'created_at'
+
+# Nombre de périodes affichées par fréquence
+PERIODS = {
+    'day': 30,
+    'week': 12,
+    'month': 12,
+    'quarter': 8,
+    'year': 5,
+}
+
+TRUNC_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+OPERATIONS = {
+    'sum': Sum,
+    'avg': Avg,
+    'count': Count,
+}
+
+CACHE_PREFIX = 'admin_custom:chart'
+GENERATION_PREFIX = 'admin_custom:gen'
+DEFAULT_CACHE_TIMEOUT = 300
+
+
+class ChartError(ValueError):
+    """Paramètres de graphique invalides (modèle, champ ou fréquence)."""
+
+    def __init__(self, message, available_fields=None):
+        super().__init__(message)
+        self.available_fields = list(available_fields or [])
+
+
+def get_cache_timeout():
+    return int(getattr(settings, 'ADMIN_CUSTOM_CHART_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+
+
+def has_date_field(model_class):
+    try:
+        model_class._meta.get_field(DATE_FIELD)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def get_charted_models():
+    """Modèles pouvant être représentés en graphique (champ de date DATE_FIELD)."""
+    return [model for model in apps.get_models() if has_date_field(model)]
+
+
+# ——— Génération par modèle (invalidation par signaux) ———
+
+def _generation_key(model_class):
+    return f'{GENERATION_PREFIX}:{model_class._meta.label_lower}'
+
+
+def _new_generation():
+    """Génération jamais émise : horodatage (ns) et aléa, sans lecture de la valeur précédente."""
+    return f'{time_ns():x}-{secrets.token_hex(4)}'
+
+
+def get_model_generation(model_class):
+    """Génération du modèle (valeur opaque, change à chaque écriture validée)."""
+    return cache.get_or_set(_generation_key(model_class), _new_generation, None)
+
+
+def _renew_generation(model_class):
+    cache.set(_generation_key(model_class), _new_generation(), None)
+
+
+def bump_model_generation(sender, raw=False, using=None, **kwargs):
+    """
+    Receiver post_save / post_delete (connecté par modèle daté) : invalide ses graphiques au COMMIT
+    (immédiatement hors transaction) ; une lecture concurrente ne met pas en cache des données
+    non validées sous la nouvelle génération.
+    """
+    if raw:
+        return
+    transaction.on_commit(partial(_renew_generation, sender), using=using)
+
+
+# ——— Périodes ———
+
+def _shift_month(d, months):
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def bucket_starts(frequency, today):
+    """Dates de début des périodes affichées (de la plus ancienne à la période courante)."""
+    periods = PERIODS[frequency]
+    if frequency == 'day':
+        return [today - timedelta(days=i) for i in range(periods - 1, -1, -1)]
+    if frequency == 'week':
+        monday = today - timedelta(days=today.weekday())
+        return [monday - timedelta(weeks=i) for i in range(periods - 1, -1, -1)]
+    if frequency == 'month':
+        first = today.replace(day=1)
+        return [_shift_month(first, -i) for i in range(periods - 1, -1, -1)]
+    if frequency == 'quarter':
+        first = date(today.year, ((today.month - 1) // 3) * 3 + 1, 1)
+        return [_shift_month(first, -3 * i) for i in range(periods - 1, -1, -1)]
+    return [date(today.year - i, 1, 1) for i in range(periods - 1, -1, -1)]
+
+
+def bucket_label(frequency, start):
+    if frequency == 'day':
+        return start.strftime('%d/%m')
+    if frequency == 'week':
+        return f"Sem {start.isocalendar()[1]}"
+    if frequency == 'month':
+        return start.strftime('%m/%Y')
+    if frequency == 'quarter':
+        return f"T{(start.month - 1) // 3 + 1} {start.year}"
+    return str(start.year)
+
+
+def _bucket_date(value):
+    """Normalise la valeur retournée par Trunc (datetime aware ou date) en date locale."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+    return value
+
+
+# ——— Calcul ———
+
+def validate_chart(model_class, field_name, operation, frequency):
+    """Lève ChartError si la combinaison (modèle, champ, opération, fréquence) n'est pas calculable."""
+    if frequency not in PERIODS:
+        raise ChartError(f'Fréquence inconnue : {frequency}')
+    if not has_date_field(model_class):
+        raise ChartError(f"Le modèle {model_class.__name__} n'a pas de champ {DATE_FIELD}")
+    if operation == 'count':
+        return
+    numeric_fields = get_numeric_fields(model_class)
+    if field_name not in numeric_fields:
+        raise ChartError(
+            f'Le champ "{field_name}" n\'existe pas sur le modèle {model_class.__name__}',
+            available_fields=numeric_fields,
+        )
+
+
+def compute_chart_data(model_class, field_name, operation='sum', frequency='month', now=None):
+    """
+    Calcule les séries du graphique en une requête group-by sur la fenêtre complète.
+    Retourne {'labels': [...], 'data': [...]}.
+    """
+    if operation not in OPERATIONS:
+        operation = 'count'
+    validate_chart(model_class, field_name, operation, frequency)
+    now = now or timezone.now()
+    today = timezone.localtime(now).date() if timezone.is_aware(now) else now.date()
+    starts = bucket_starts(frequency, today)
+
+    window_start = datetime.combine(starts[0], time.min)
+    if settings.USE_TZ:
+        window_start = timezone.make_aware(window_start)
+    trunc = TRUNC_FUNCTIONS[frequency](DATE_FIELD)
+    aggregate = Count('pk') if operation == 'count' else OPERATIONS[operation](field_name)
+
+    rows = (
+        model_class.objects.filter(**{f'{DATE_FIELD}__gte': window_start})
+        .annotate(bucket=trunc)
+        .values('bucket')
+        .annotate(value=aggregate)
+        .order_by()
+    )
+    values = {_bucket_date(row['bucket']): row['value'] for row in rows}
+
+    data = []
+    for start in starts:
+        value = values.get(start) or 0
+        value = float(value)
+        if operation == 'avg':
+            value = round(value, 2)
+        data.append(value)
+    return {
+        'labels': [bucket_label(frequency, start) for start in starts],
+        'data': data,
+    }
+
+
+def _cache_key(model_class, field_name, operation, frequency):
+    generation = get_model_generation(model_class)
+    return f'{CACHE_PREFIX}:{model_class._meta.label_lower}:{field_name}:{operation}:{frequency}:{generation}'
+
+
+def get_chart_data(model_class, field_name, operation='sum', frequency='month', refresh=False):
+    """Données du graphique depuis le cache (calculées et mises en cache si absentes ou si refresh=True)."""
+    key = _cache_key(model_class, field_name, operation, frequency)
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    result = compute_chart_data(model_class, field_name, operation, frequency)
+    cache.set(key, result, get_cache_timeout())
+    return result
+
+
+def refresh_saved_charts(charts, resolve_model):
+    """
+    Précalcule les graphiques sauvegardés (DashboardChart) ; chaque combinaison distincte n'est calculée qu'une fois.
+    resolve_model : fonction nom de modèle → classe (ou None). Retourne le nombre de combinaisons calculées.
+    """
+    done = set()
+    for chart in charts:
+        key = (chart.model_name, chart.field_name, chart.operation or 'sum', chart.frequency)
+        if key in done:
+            continue
+        done.add(key)
+        model_class = resolve_model(chart.model_name)
+        if model_class is None:
+            continue
+        try:
+            get_chart_data(model_class, chart.field_name, key[2], chart.frequency, refresh=True)
+        except ChartError as e:
+            logger.warning('Graphique %s ignoré : %s', chart.name, e)
+    return len(done)
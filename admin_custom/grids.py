@@ -0,0 +1,209 @@
+"""
+Backend des grilles de données admin_custom.
+
+- Projection : seules les colonnes demandées sont lues (.values() si aucune clé étrangère,
+  sinon .only() + select_related automatique des FK demandées et de leurs FK directes,
+  pour que str(fk) ne déclenche aucune requête supplémentaire).
+- Filtres : compilés depuis le JSON DashboardGrid.filters ({"champ__lookup": valeur}),
+  champs et lookups validés ; les filtres venus de la requête (relations=False) sont limités
+  aux champs concrets propres du modèle (pas de parcours de relation vers User, etc.).
+- Tri côté serveur (?sort=champ ou ?sort=-champ) avec la clé primaire comme départage.
+- Pagination par curseur (keyset) : pas d'OFFSET, coût constant quelle que soit la page.
+- Nombre total optionnel (?include_total=1), seul COUNT de la requête.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+ALLOWED_LOOKUPS = {
+    'exact', 'iexact', 'contains', 'icontains', 'startswith', 'istartswith',
+    'endswith', 'iendswith', 'gt', 'gte', 'lt', 'lte', 'in', 'range', 'isnull',
+    'date', 'year', 'month', 'day',
+}
+
+
+class GridError(ValueError):
+    """Paramètres de grille invalides (colonne, filtre, tri ou curseur)."""
+
+
+def get_grid_columns(model_class):
+    """Tous les champs concrets du modèle (colonnes par défaut)."""
+    return [f.name for f in model_class._meta.concrete_fields]
+
+
+def resolve_columns(model_class, requested):
+    """Colonnes demandées existantes (ordre conservé) ; toutes les colonnes si aucune n'est valide."""
+    available = get_grid_columns(model_class)
+    columns = [c for c in dict.fromkeys(requested or []) if c in available]
+    return columns or available or ['pk']
+
+
+def _fk_columns(model_class, columns):
+    fk_columns = []
+    for name in columns:
+        try:
+            field = model_class._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.is_relation and (field.many_to_one or field.one_to_one):
+            fk_columns.append(name)
+    return fk_columns
+
+
+def _select_related_paths(model_class, fk_columns):
+    """FK demandées + leurs FK directes (souvent utilisées par __str__ du modèle lié)."""
+    paths = []
+    for name in fk_columns:
+        paths.append(name)
+        related = model_class._meta.get_field(name).related_model
+        for sub in related._meta.concrete_fields:
+            if sub.is_relation and (sub.many_to_one or sub.one_to_one):
+                paths.append(f'{name}__{sub.name}')
+    return paths
+
+
+def compile_filters(model_class, filters, relations=True):
+    """
+    Compile un dict de filtres JSON en Q. Chaque clé est « champ[__champ_lié][__lookup] » ;
+    les champs doivent exister et le lookup final faire partie de ALLOWED_LOOKUPS.
+    relations=False : seuls les champs concrets non relationnels du modèle sont acceptés.
+    """
+    if not filters:
+        return Q()
+    if not isinstance(filters, dict):
+        raise GridError('Les filtres doivent être un objet JSON')
+    q = Q()
+    for key, value in filters.items():
+        parts = str(key).split('__')
+        lookup = 'exact'
+        if len(parts) > 1 and parts[-1] in ALLOWED_LOOKUPS:
+            lookup = parts.pop()
+        model = model_class
+        for i, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                raise GridError(f'Champ de filtre inconnu : {key}')
+            if not relations and (field.is_relation or not field.concrete):
+                raise GridError(f'Filtre non autorisé : {key}')
+            if field.is_relation and i < len(parts) - 1:
+                model = field.related_model
+            elif i < len(parts) - 1:
+                raise GridError(f'Filtre invalide : {key}')
+        if lookup in ('in', 'range') and not isinstance(value, list):
+            raise GridError(f'Le filtre {key} attend une liste')
+        q &= Q(**{'__'.join(parts + [lookup]): value})
+    return q
+
+
+# ——— Curseur (keyset) ———
+
+def _encode_cursor(value, pk):
+    if value is not None and not isinstance(value, (int, float, str, bool)):
+        value = str(value)
+    raw = json.dumps([value, pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        raise GridError('Curseur invalide')
+    return value, pk
+
+
+def _after_cursor(sort_field, descending, value, pk):
+    """Condition « après la dernière ligne » pour un tri (sort_field, pk), NULL en premier (asc) / en dernier (desc)."""
+    if sort_field == 'pk':
+        return Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+    if descending:
+        if value is None:
+            return Q(**{f'{sort_field}__isnull': True, 'pk__lt': pk})
+        return (
+            Q(**{f'{sort_field}__lt': value})
+            | Q(**{sort_field: value, 'pk__lt': pk})
+            | Q(**{f'{sort_field}__isnull': True})
+        )
+    if value is None:
+        return Q(**{f'{sort_field}__isnull': True, 'pk__gt': pk}) | Q(**{f'{sort_field}__isnull': False})
+    return Q(**{f'{sort_field}__gt': value}) | Q(**{sort_field: value, 'pk__gt': pk})
+
+
+def _serialize(value):
+    # Convertir les objets en string (FK, dates, décimaux, etc.)
+    if isinstance(value, (int, float, bool, type(None), str)):
+        return value
+    return str(value)
+
+
+def fetch_grid(model_class, columns=None, filters=None, sort=None, cursor=None,
+               page_size=DEFAULT_PAGE_SIZE, include_total=False):
+    """
+    Exécute la requête de grille. Retourne
+    {'columns', 'data', 'next_cursor', 'has_more'} (+ 'total' si include_total).
+    """
+    columns = resolve_columns(model_class, columns)
+    page_size = max(1, min(int(page_size or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+    descending = bool(sort) and sort.startswith('-')
+    sort_field = (sort or 'pk').lstrip('-')
+    if sort_field != 'pk' and sort_field not in get_grid_columns(model_class):
+        raise GridError(f'Tri impossible sur : {sort_field}')
+    if sort_field == model_class._meta.pk.name:
+        sort_field = 'pk'
+    sort_attname = sort_field
+    if sort_field != 'pk':
+        sort_attname = model_class._meta.get_field(sort_field).attname
+
+    queryset = model_class._default_manager.filter(compile_filters(model_class, filters))
+    total = queryset.count() if include_total else None
+
+    if sort_field == 'pk':
+        ordering = ['-pk' if descending else 'pk']
+    elif descending:
+        ordering = [F(sort_attname).desc(nulls_last=True), '-pk']
+    else:
+        ordering = [F(sort_attname).asc(nulls_first=True), 'pk']
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        value, pk = _decode_cursor(cursor)
+        queryset = queryset.filter(_after_cursor(sort_attname, descending, value, pk))
+
+    fk_columns = _fk_columns(model_class, columns)
+    pk_name = model_class._meta.pk.attname
+    if fk_columns:
+        # Instances partielles + FK jointes : str(fk) sans requête par ligne
+        queryset = queryset.select_related(*_select_related_paths(model_class, fk_columns))
+        only_fields = {c for c in columns if c != 'pk'} | ({sort_field} if sort_field != 'pk' else set())
+        queryset = queryset.only(*only_fields)
+        objects = list(queryset[:page_size + 1])
+        has_more = len(objects) > page_size
+        objects = objects[:page_size]
+        data = [{col: _serialize(getattr(obj, col, None)) for col in columns} for obj in objects]
+        last = objects[-1] if objects else None
+        last_key = (getattr(last, sort_attname), last.pk) if last is not None else None
+    else:
+        value_fields = list(dict.fromkeys(columns + [pk_name] + ([sort_attname] if sort_field != 'pk' else [])))
+        value_fields = [f for f in value_fields if f != 'pk']
+        rows = list(queryset.values(*value_fields)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        data = [{col: _serialize(row.get(col)) for col in columns} for row in rows]
+        last = rows[-1] if rows else None
+        last_key = (last.get(sort_attname) if sort_field != 'pk' else None, last[pk_name]) if last else None
+
+    result = {
+        'columns': columns,
+        'data': data,
+        'has_more': has_more,
+        'next_cursor': _encode_cursor(*last_key) if has_more and last_key else None,
+    }
+    if include_total:
+        result['total'] = total
+    return result
@@ -0,0 +1,16 @@
+"""Commande : python manage.py refresh_admin_stats — recalcule les statistiques du tableau de bord admin."""
+from django.core.management.base import BaseCommand
+
+from admin_custom.stats import refresh_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule la table ModelStat (nombre de lignes et chiffre d'affaires par modèle). "
+        "Les créations / suppressions sont suivies en continu ; ce recalcul (à planifier) corrige "
+        "les modifications de montants et les opérations en masse."
+    )
+
+    def handle(self, *args, **options):
+        count = refresh_stats()
+        self.stdout.write(self.style.SUCCESS(f'Statistiques recalculées pour {count} modèle(s).'))
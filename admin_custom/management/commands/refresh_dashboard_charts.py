@@ -0,0 +1,40 @@
+"""Commande : python manage.py refresh_dashboard_charts [--loop --interval N] — précalcule les graphiques du dashboard."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_custom.charts import get_cache_timeout, refresh_saved_charts
+from admin_custom.models import DashboardChart
+from admin_custom.views import get_model_class
+
+
+class Command(BaseCommand):
+    help = (
+        "Précalcule et met en cache les données de tous les graphiques sauvegardés (DashboardChart), "
+        "pour que le dashboard moderne les charge directement depuis le cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (rafraîchissement périodique en arrière-plan).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=None,
+            help='Intervalle en secondes entre deux rafraîchissements avec --loop (défaut : TTL du cache).',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or max(30, get_cache_timeout() - 30)
+        while True:
+            charts = DashboardChart.objects.only(
+                'name', 'model_name', 'field_name', 'operation', 'frequency'
+            )
+            count = refresh_saved_charts(charts, get_model_class)
+            self.stdout.write(self.style.SUCCESS(f'{count} graphique(s) précalculé(s).'))
+            if not options['loop']:
+                break
+            time.sleep(interval)
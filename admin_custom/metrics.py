@@ -0,0 +1,140 @@
+"""
+Planificateur des indicateurs du tableau de bord admin_custom (dashboard_metrics).
+
+Les éléments de configuration ({app, model, type, field, label}) sont regroupés par modèle :
+tous les indicateurs d'un même modèle sont calculés par un seul aggregate(). Un tableau de bord
+de 20 tuiles coûte donc une requête par modèle distinct.
+
+- Les métadonnées de champs (champs numériques, URL admin) sont calculées une fois par modèle
+  (préchargées au démarrage par warm_field_metadata).
+- Les résultats sont mémorisés par empreinte de configuration pendant
+  ADMIN_CUSTOM_METRICS_CACHE_TIMEOUT secondes (30 par défaut).
+"""
+import hashlib
+import json
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Sum
+from django.urls import NoReverseMatch, reverse
+
+NUMERIC_FIELD_TYPES = (
+    'DecimalField', 'FloatField', 'IntegerField', 'PositiveIntegerField',
+    'BigIntegerField', 'SmallIntegerField', 'PositiveSmallIntegerField', 'PositiveBigIntegerField',
+)
+
+CACHE_PREFIX = 'admin_custom:metrics'
+DEFAULT_CACHE_TIMEOUT = 30
+
+# Métadonnées par modèle : {model: tuple des champs numériques}
+_numeric_fields_cache = {}
+
+
+def get_cache_timeout():
+    return int(getattr(settings, 'ADMIN_CUSTOM_METRICS_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+
+
+def get_numeric_fields(model):
+    """Champs numériques concrets du modèle (calculés une fois par modèle)."""
+    fields = _numeric_fields_cache.get(model)
+    if fields is None:
+        fields = tuple(
+            f.name for f in model._meta.concrete_fields
+            if f.get_internal_type() in NUMERIC_FIELD_TYPES
+        )
+        _numeric_fields_cache[model] = fields
+    return fields
+
+
+def warm_field_metadata():
+    """Précharge les métadonnées de champs de tous les modèles (appelé au démarrage)."""
+    for model in apps.get_models():
+        get_numeric_fields(model)
+
+
+def _admin_url(model):
+    try:
+        return reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+    except NoReverseMatch:
+        return ''
+
+
+def _config_key(config):
+    raw = json.dumps(config, sort_keys=True, separators=(',', ':'), default=str)
+    return f'{CACHE_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def plan_metrics(config):
+    """
+    Regroupe les éléments valides par modèle.
+    Retourne (items, plan) : items = [(item, model, alias)] dans l'ordre de la config,
+    plan = {model: {alias: expression d'agrégat}} (une expression par (type, champ) distinct).
+    """
+    items = []
+    plan = {}
+    aliases = {}
+    for item in config:
+        if not isinstance(item, dict):
+            continue
+        app_label = item.get('app')
+        model_name = item.get('model')
+        metric_type = item.get('type', 'count')
+        field = item.get('field')
+        if not app_label or not model_name:
+            continue
+        try:
+            model = apps.get_model(app_label, model_name)
+        except (LookupError, ValueError):
+            continue
+
+        if metric_type == 'count':
+            signature, expression = ('count', None), Count('pk')
+        elif metric_type in ('sum', 'avg') and field and field in get_numeric_fields(model):
+            signature = (metric_type, field)
+            expression = Sum(field) if metric_type == 'sum' else Avg(field)
+        else:
+            continue
+
+        model_aggregates = plan.setdefault(model, {})
+        alias = aliases.get((model, signature))
+        if alias is None:
+            alias = f'm{len(model_aggregates)}'
+            aliases[(model, signature)] = alias
+            model_aggregates[alias] = expression
+        items.append((item, model, alias))
+    return items, plan
+
+
+def _format_value(metric_type, value):
+    if metric_type == 'avg':
+        return round(float(value or 0), 2)
+    value = value or 0
+    if metric_type == 'sum' and hasattr(value, '__float__'):
+        return float(value)
+    return value
+
+
+def evaluate_metrics(config):
+    """Calcule les indicateurs (une requête aggregate() par modèle), avec mémorisation par configuration."""
+    key = _config_key(config)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    items, plan = plan_metrics(config)
+    values = {model: model._default_manager.aggregate(**aggregates) for model, aggregates in plan.items()}
+
+    results = []
+    admin_urls = {}
+    for item, model, alias in items:
+        metric_type = item.get('type', 'count')
+        if model not in admin_urls:
+            admin_urls[model] = _admin_url(model)
+        results.append({
+            'label': item.get('label', '') or f"{model._meta.verbose_name} ({metric_type})",
+            'value': _format_value(metric_type, values[model][alias]),
+            'admin_url': admin_urls[model],
+        })
+    cache.set(key, results, get_cache_timeout())
+    return results
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.10 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_custom', '0003_dashboardchart_user_alter_dashboardchart_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModelStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_label', models.CharField(max_length=100)),
+                ('model_name', models.CharField(max_length=100)),
+                ('row_count', models.BigIntegerField(default=0)),
+                ('revenue_field', models.CharField(blank=True, max_length=100)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('is_estimate', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Statistique modèle',
+                'verbose_name_plural': 'Statistiques modèles',
+                'unique_together': {('app_label', 'model_name')},
+            },
+        ),
+    ]
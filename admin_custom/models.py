@@ -78,3 +78,25 @@ class DashboardChart(models.Model):
         verbose_name = "Graphique"
         verbose_name_plural = "Graphiques"
         unique_together = [['name', 'user']]  # Un nom unique par utilisateur
+
+
+class ModelStat(models.Model):
+    """
+    Statistiques par modèle (nombre de lignes, somme des montants) pour le tableau de bord.
+    Mises à jour par deltas (signaux) et recalculées périodiquement (refresh_admin_stats).
+    """
+    app_label = models.CharField(max_length=100)
+    model_name = models.CharField(max_length=100)  # Nom du modèle en minuscules
+    row_count = models.BigIntegerField(default=0)
+    revenue_field = models.CharField(max_length=100, blank=True)  # total_amount / amount si présent
+    revenue = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    is_estimate = models.BooleanField(default=False)  # Nombre estimé (très grandes tables)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.app_label}.{self.model_name} ({self.row_count})"
+
+    class Meta:
+        verbose_name = "Statistique modèle"
+        verbose_name_plural = "Statistiques modèles"
+        unique_together = [['app_label', 'model_name']]
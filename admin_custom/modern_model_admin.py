@@ -1,14 +1,119 @@
 """
 Mixin pour utiliser les templates Design 1 (moderne) lorsque l'interface moderne est active.
+
+Les templates des deux interfaces sont résolus une seule fois par ModelAdmin (au démarrage,
+voir resolve_admin_templates) ; à chaque requête, on ne fait qu'une lecture de dictionnaire
+et on ajuste la TemplateResponse retournée — aucun attribut d'instance ou de classe n'est modifié.
 """
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
 from django.urls import reverse
 
-from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_MODERN
+from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_CLASSIC, INTERFACE_MODERN
+
+
+# Templates par défaut de chaque interface (None = liste de templates Django par défaut)
+INTERFACE_TEMPLATES = {
+    INTERFACE_CLASSIC: {
+        'admin_base': 'admin_custom/base.html',
+        'change_list': 'admin_custom/change_list.html',
+        'change_form': 'admin_custom/change_form.html',
+        'object_history': 'admin_custom/object_history.html',
+        'delete_confirmation': None,
+        'delete_selected_confirmation': None,
+    },
+    INTERFACE_MODERN: {
+        'admin_base': 'admin_custom/modern/admin_base.html',
+        'change_list': 'admin_custom/modern/change_list.html',
+        'change_form': 'admin_custom/modern/change_form.html',
+        'object_history': 'admin_custom/modern/object_history.html',
+        'delete_confirmation': 'admin_custom/modern/delete_confirmation.html',
+        'delete_selected_confirmation': 'admin_custom/modern/delete_selected_confirmation.html',
+    },
+}
+
+
+def get_interface(request):
+    """Interface active pour la requête (classique par défaut)."""
+    session = getattr(request, 'session', None)
+    if session is not None and session.get(SESSION_INTERFACE_KEY) == INTERFACE_MODERN:
+        return INTERFACE_MODERN
+    return INTERFACE_CLASSIC
 
 
 def _use_modern_templates(request):
-    return request.session.get(SESSION_INTERFACE_KEY) == INTERFACE_MODERN
+    return get_interface(request) == INTERFACE_MODERN
+
+
+def get_admin_base_template(request):
+    """Template de base (layout) de l'interface active."""
+    return INTERFACE_TEMPLATES[get_interface(request)]['admin_base']
+
+
+def apply_template(response, template_name, request):
+    """
+    Remplace le template d'une TemplateResponse non encore rendue et ajoute admin_base_template.
+    Sans effet sur les redirections ou réponses déjà rendues.
+    """
+    if not isinstance(response, TemplateResponse) or response.is_rendered:
+        return response
+    if template_name:
+        response.template_name = template_name
+    if response.context_data is not None:
+        response.context_data.setdefault('admin_base_template', get_admin_base_template(request))
+    return response
+
+
+def resolve_admin_templates(admin_instance):
+    """
+    Calcule les templates des deux interfaces pour un ModelAdmin (une seule fois).
+    Les attributs modern_* du mixin sont pris en compte s'ils existent.
+    """
+    classic = INTERFACE_TEMPLATES[INTERFACE_CLASSIC]
+    modern = INTERFACE_TEMPLATES[INTERFACE_MODERN]
+    change_form = admin_instance.change_form_template or classic['change_form']
+    modern_change_form = getattr(admin_instance, 'modern_change_form_template', None) or modern['change_form']
+    return {
+        INTERFACE_CLASSIC: {
+            'change_list': admin_instance.change_list_template or classic['change_list'],
+            'change_form': change_form,
+            'add_form': admin_instance.add_form_template or change_form,
+            'object_history': admin_instance.object_history_template or classic['object_history'],
+            'delete_confirmation': admin_instance.delete_confirmation_template or classic['delete_confirmation'],
+            'delete_selected_confirmation': (
+                admin_instance.delete_selected_confirmation_template
+                or classic['delete_selected_confirmation']
+            ),
+        },
+        INTERFACE_MODERN: {
+            'change_list': getattr(admin_instance, 'modern_change_list_template', None) or modern['change_list'],
+            'change_form': modern_change_form,
+            'add_form': getattr(admin_instance, 'modern_add_form_template', None) or modern_change_form,
+            'object_history': (
+                getattr(admin_instance, 'modern_object_history_template', None) or modern['object_history']
+            ),
+            'delete_confirmation': (
+                getattr(admin_instance, 'modern_delete_confirmation_template', None)
+                or modern['delete_confirmation']
+            ),
+            'delete_selected_confirmation': (
+                getattr(admin_instance, 'modern_delete_selected_confirmation_template', None)
+                or modern['delete_selected_confirmation']
+            ),
+        },
+    }
+
+
+def get_admin_template(admin_instance, request, kind):
+    """
+    Template `kind` (change_list, change_form, add_form…) de l'interface active pour ce ModelAdmin.
+    La table est mise en cache sur l'instance au premier appel si elle n'a pas été résolue au démarrage.
+    """
+    templates = getattr(admin_instance, '_interface_templates', None)
+    if templates is None:
+        templates = resolve_admin_templates(admin_instance)
+        admin_instance._interface_templates = templates
+    return templates[get_interface(request)][kind]
 
 
 class ModernTemplateMixin:
@@ -77,66 +182,35 @@ class ModernTemplateMixin:
     def _use_modern_templates(self, request):
         return _use_modern_templates(request)
 
+    # ——— Sélection des templates (lecture seule, par requête) ———
+
+    def get_changelist_template(self, request):
+        return get_admin_template(self, request, 'change_list')
+
+    def get_change_form_template(self, request, add=False):
+        return get_admin_template(self, request, 'add_form' if add else 'change_form')
+
+    def get_object_history_template(self, request):
+        return get_admin_template(self, request, 'object_history')
+
+    def get_delete_confirmation_template(self, request):
+        return get_admin_template(self, request, 'delete_confirmation')
+
+    def get_delete_selected_confirmation_template(self, request):
+        return get_admin_template(self, request, 'delete_selected_confirmation')
+
     def changelist_view(self, request, extra_context=None):
-        use_modern = self._use_modern_templates(request)
-        orig = self.change_list_template
-        
-        if use_modern:
-            self.change_list_template = self.modern_change_list_template
-            admin_base_template = 'admin_custom/modern/admin_base.html'
-        else:
-            self.change_list_template = 'admin_custom/change_list.html'
-            admin_base_template = 'admin_custom/base.html'
-        
-        # Ajouter admin_base_template au contexte
-        if extra_context is None:
-            extra_context = {}
-        extra_context['admin_base_template'] = admin_base_template
-        
-        try:
-            return super().changelist_view(request, extra_context)
-        finally:
-            self.change_list_template = orig
-
-    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
-        use_modern = self._use_modern_templates(request)
-        orig_form = self.change_form_template
-        orig_add = self.add_form_template
-        
-        if use_modern:
-            self.change_form_template = self.modern_change_form_template
-            admin_base_template = 'admin_custom/modern/admin_base.html'
-            if object_id is None and getattr(self, 'modern_add_form_template', None):
-                self.add_form_template = self.modern_add_form_template
-        else:
-            self.change_form_template = 'admin_custom/change_form.html'
-            admin_base_template = 'admin_custom/base.html'
-        
-        # Ajouter admin_base_template au contexte
-        if extra_context is None:
-            extra_context = {}
-        extra_context['admin_base_template'] = admin_base_template
-        
-        try:
-            return super().changeform_view(request, object_id, form_url, extra_context)
-        finally:
-            self.change_form_template = orig_form
-            self.add_form_template = orig_add
+        response = super().changelist_view(request, extra_context)
+        return apply_template(response, self.get_changelist_template(request), request)
+
+    def render_change_form(self, request, context, add=False, change=False, form_url='', obj=None):
+        response = super().render_change_form(request, context, add, change, form_url, obj)
+        return apply_template(response, self.get_change_form_template(request, add), request)
 
     def history_view(self, request, object_id, extra_context=None):
-        orig = self.object_history_template
-        if self._use_modern_templates(request):
-            self.object_history_template = self.modern_object_history_template
-        try:
-            return super().history_view(request, object_id, extra_context)
-        finally:
-            self.object_history_template = orig
+        response = super().history_view(request, object_id, extra_context)
+        return apply_template(response, self.get_object_history_template(request), request)
 
     def delete_view(self, request, object_id, extra_context=None):
-        orig = self.delete_confirmation_template
-        if self._use_modern_templates(request):
-            self.delete_confirmation_template = self.modern_delete_confirmation_template
-        try:
-            return super().delete_view(request, object_id, extra_context)
-        finally:
-            self.delete_confirmation_template = orig
+        response = super().delete_view(request, object_id, extra_context)
+        return apply_template(response, self.get_delete_confirmation_template(request), request)
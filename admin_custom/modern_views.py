@@ -3,11 +3,10 @@ Vues pour l'interface Moderne (Design 1)
 """
 from django.shortcuts import render, redirect
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Sum
-from django.apps import apps
 
 from .auth_views import SESSION_INTERFACE_KEY, INTERFACE_MODERN, INTERFACE_CLASSIC
 from .autodiscover import get_all_models_for_charts, get_all_models_for_grids
+from .stats import get_stats
 
 
 def get_custom_admin_site():
@@ -41,34 +40,17 @@ def modern_dashboard(request):
     if redirect_check:
         return redirect_check
 
-    # Stats - même logique que l'API stats
-    from .views import get_model_class
-    order_model = get_model_class('Order')
-    invoice_model = get_model_class('Invoice')
-    payment_model = get_model_class('Payment')
-    product_model = get_model_class('Product')
-
+    # Stats - même source que l'API stats (table ModelStat, une requête)
+    data = get_stats()
+    counts = data['counts']
     stats = {
-        'orders': order_model.objects.count() if order_model else 0,
-        'invoices': invoice_model.objects.count() if invoice_model else 0,
-        'payments': payment_model.objects.count() if payment_model else 0,
-        'products': product_model.objects.count() if product_model else 0,
-        'revenue': 0,
+        'orders': counts.get('sales.order', 0),
+        'invoices': counts.get('sales.invoice', 0),
+        'payments': counts.get('sales.payment', 0),
+        'products': counts.get('catalog.product', 0),
+        'revenue': data['revenue'],
     }
 
-    total_revenue = 0
-    for app_config in apps.get_app_configs():
-        if app_config.name.startswith('django.contrib'):
-            continue
-        for model in app_config.get_models():
-            if model._meta.abstract or model._meta.proxy:
-                continue
-            if hasattr(model, 'total_amount'):
-                total_revenue += float(model.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0)
-            elif hasattr(model, 'amount'):
-                total_revenue += float(model.objects.aggregate(Sum('amount'))['amount__sum'] or 0)
-    stats['revenue'] = total_revenue
-
     context = _get_modern_context(request, {
         'title': 'Tableau de bord',
         'page': 'dashboard',
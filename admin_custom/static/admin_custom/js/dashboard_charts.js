@@ -81,7 +81,8 @@
 
     // Charger les graphiques sauvegardés
     function loadCharts() {
-        return fetch('/admin_custom/api/dashboard-charts/')
+        // Définitions + données (cache serveur) en une seule requête
+        return fetch('/admin_custom/api/dashboard-charts/?include_data=1')
             .then(r => r.json())
             .then(data => {
                 if (!chartsRow) return;
@@ -128,8 +129,9 @@
         if (!canvas) return;
         const ctx = canvas.getContext('2d');
         const url = `/admin_custom/api/chart-data/?model=${encodeURIComponent(chart.model_name)}&field=${encodeURIComponent(chart.field_name)}&type=${chart.chart_type}&frequency=${chart.frequency}&operation=${chart.operation}`;
-        fetch(url)
-            .then(r => r.json())
+        // Données déjà fournies par dashboard-charts/?include_data=1 : pas de requête supplémentaire
+        const dataPromise = chart.data ? Promise.resolve(chart.data) : fetch(url).then(r => r.json());
+        dataPromise
             .then(data => {
                 if (data.labels && data.data) {
                     const chartConfig = {
@@ -0,0 +1,196 @@
+"""
+Service de statistiques admin_custom (nombre de lignes et chiffre d'affaires par modèle).
+
+Les valeurs sont stockées dans la table ModelStat :
+- mises à jour par deltas à chaque création / suppression (signaux post_save / post_delete,
+  connectés modèle par modèle pour les seuls modèles suivis) ;
+- recalculées périodiquement par la commande refresh_admin_stats (modifications de montants,
+  bulk_create / update qui n'émettent pas de signaux) ;
+- au-delà de ADMIN_CUSTOM_STATS_EXACT_COUNT_LIMIT lignes, le recalcul utilise une estimation
+  fournie par la base (statistiques du planificateur) au lieu d'un COUNT(*) complet.
+
+Le tableau de bord lit toutes les statistiques en une seule requête (get_stats) ; tant que la
+table est vide, il n'affiche rien (aucun recalcul pendant une requête HTTP).
+Les modèles de journalisation (ADMIN_CUSTOM_STATS_EXCLUDE, ex. journal d'audit) ne sont pas suivis :
+pas d'UPDATE supplémentaire sur ModelStat à chacune de leurs écritures.
+"""
+import logging
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import F, Sum
+
+logger = logging.getLogger(__name__)
+
+# Champs de montant reconnus pour le chiffre d'affaires (par ordre de priorité)
+REVENUE_FIELDS = ('total_amount', 'amount')
+
+DEFAULT_EXACT_COUNT_LIMIT = 100000
+
+
+def get_exact_count_limit():
+    return int(getattr(settings, 'ADMIN_CUSTOM_STATS_EXACT_COUNT_LIMIT', DEFAULT_EXACT_COUNT_LIMIT))
+
+
+def get_excluded_labels():
+    """Modèles exclus des statistiques ('app_label.model_name', en minuscules)."""
+    return {label.lower() for label in getattr(settings, 'ADMIN_CUSTOM_STATS_EXCLUDE', ())}
+
+
+def _is_tracked(model):
+    """
+    Modèles suivis : apps du projet (hors django.contrib), ni abstraits ni proxy, hors ModelStat
+    et ADMIN_CUSTOM_STATS_EXCLUDE.
+    """
+    opts = model._meta
+    # Modèles historiques (migrations) : registre différent, table ModelStat pas forcément créée
+    if opts.apps is not apps or opts.abstract or opts.proxy or opts.app_config is None:
+        return False
+    if opts.app_config.name.startswith('django.contrib'):
+        return False
+    if opts.label_lower in get_excluded_labels():
+        return False
+    return not (opts.app_label == 'admin_custom' and opts.model_name == 'modelstat')
+
+
+def get_tracked_models():
+    return [model for model in apps.get_models() if _is_tracked(model)]
+
+
+def get_revenue_field(model):
+    """Nom du champ de montant du modèle ('' si aucun)."""
+    field_names = {f.name for f in model._meta.concrete_fields}
+    for name in REVENUE_FIELDS:
+        if name in field_names:
+            return name
+    return ''
+
+
+def estimate_count(model):
+    """
+    Nombre de lignes estimé sans parcourir la table (None si non disponible) :
+    - PostgreSQL : pg_class.reltuples (mis à jour par ANALYZE / autovacuum) ;
+    - MySQL : information_schema.TABLES.TABLE_ROWS ;
+    - SQLite : MAX(clé primaire entière), borne haute qui ignore les suppressions.
+    """
+    alias = router.db_for_read(model)
+    connection = connections[alias]
+    table = model._meta.db_table
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+            )
+        elif vendor == 'sqlite' and model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            cursor.execute(
+                'SELECT MAX(%s) FROM %s' % (
+                    connection.ops.quote_name(model._meta.pk.column), connection.ops.quote_name(table)
+                )
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def compute_model_stat(model, previous_count=None):
+    """Calcule (row_count, revenue, revenue_field, is_estimate) pour un modèle."""
+    revenue_field = get_revenue_field(model)
+    row_count, is_estimate = None, False
+    if previous_count is not None and previous_count > get_exact_count_limit():
+        row_count = estimate_count(model)
+        is_estimate = row_count is not None
+    if row_count is None:
+        row_count = model._default_manager.count()
+    revenue = Decimal('0')
+    if revenue_field:
+        revenue = model._default_manager.aggregate(v=Sum(revenue_field))['v'] or Decimal('0')
+    return row_count, revenue, revenue_field, is_estimate
+
+
+def refresh_stats(models=None):
+    """Recalcule et enregistre les statistiques (tous les modèles suivis par défaut)."""
+    from .models import ModelStat
+
+    models = models or get_tracked_models()
+    existing = {
+        (s.app_label, s.model_name): s.row_count
+        for s in ModelStat.objects.only('app_label', 'model_name', 'row_count')
+    }
+    for model in models:
+        opts = model._meta
+        try:
+            row_count, revenue, revenue_field, is_estimate = compute_model_stat(
+                model, existing.get((opts.app_label, opts.model_name))
+            )
+        except Exception as e:
+            # Table absente (migrations non appliquées) : ignorer ce modèle
+            logger.warning('Statistiques %s ignorées : %s', opts.label, e)
+            continue
+        ModelStat.objects.update_or_create(
+            app_label=opts.app_label,
+            model_name=opts.model_name,
+            defaults={
+                'row_count': row_count,
+                'revenue': revenue,
+                'revenue_field': revenue_field,
+                'is_estimate': is_estimate,
+            },
+        )
+    return len(models)
+
+
+def apply_delta(sender, instance, created=None, **kwargs):
+    """
+    Receiver post_save / post_delete (connecté par modèle suivi) : ajuste row_count et revenue par
+    delta (un UPDATE, sans COUNT). Les modifications d'un montant existant sont prises en compte au
+    prochain recalcul périodique.
+    """
+    from .models import ModelStat
+
+    is_delete = created is None
+    if kwargs.get('raw') or (not is_delete and not created):
+        return
+    sign = -1 if is_delete else 1
+    updates = {'row_count': F('row_count') + sign}
+    revenue_field = get_revenue_field(sender)
+    if revenue_field:
+        amount = getattr(instance, revenue_field, None) or 0
+        updates['revenue'] = F('revenue') + Decimal(str(amount)) * sign
+    ModelStat.objects.filter(
+        app_label=sender._meta.app_label, model_name=sender._meta.model_name
+    ).update(**updates)
+
+
+def get_stats():
+    """
+    Statistiques de tous les modèles en une requête.
+    Retourne {'counts': {'app_label.model_name': row_count}, 'revenue': float, 'revenue_models': set}.
+    Table vide (premier démarrage, base vidée) : résultat vide, la table est remplie par
+    refresh_admin_stats (tâche planifiée) et non pendant la requête.
+    """
+    from .models import ModelStat
+
+    rows = ModelStat.objects.values_list('app_label', 'model_name', 'row_count', 'revenue', 'revenue_field')
+    counts = {}
+    revenue_models = set()
+    total_revenue = Decimal('0')
+    for app_label, model_name, row_count, revenue, revenue_field in rows:
+        label = f'{app_label}.{model_name}'
+        counts[label] = max(row_count, 0)
+        if revenue_field:
+            revenue_models.add(label)
+            total_revenue += revenue or 0
+    return {
+        'counts': counts,
+        'revenue': float(total_revenue),
+        'revenue_models': revenue_models,
+    }
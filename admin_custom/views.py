@@ -1,15 +1,15 @@
 from django.http import JsonResponse
-from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.admin.views.decorators import staff_member_required
-from django.utils import timezone
-from django.db.models import Sum, Avg, Count
+from django.core.exceptions import ValidationError
 from django.apps import apps
-from datetime import timedelta, datetime
 from decimal import Decimal
 import json
 
+from . import charts, grids, metrics
+from .stats import get_stats
+
 
 def get_model_class(model_name):
     """
@@ -40,7 +40,7 @@ def get_model_class(model_name):
 
 @require_http_methods(["GET"])
 def chart_data(request):
-    """API pour récupérer les données de graphique"""
+    """API pour récupérer les données de graphique (une requête group-by, résultat mis en cache)."""
     model_name = request.GET.get('model')
     field_name = request.GET.get('field')
     chart_type = request.GET.get('type', 'line')
@@ -54,130 +54,53 @@ def chart_data(request):
     if not model_class:
         return JsonResponse({'error': 'Invalid model'}, status=400)
     
-    # Vérifier que le champ existe
+    if frequency not in charts.PERIODS:
+        frequency = 'month'
     try:
-        # Créer une instance pour vérifier les champs
-        instance = model_class()
-        if not hasattr(instance, field_name):
-            # Liste des champs disponibles
-            available_fields = [f.name for f in model_class._meta.get_fields() if hasattr(f, 'name')]
-            numeric_fields = []
-            for field in model_class._meta.get_fields():
-                if hasattr(field, 'name'):
-                    field_obj = model_class._meta.get_field(field.name)
-                    if hasattr(field_obj, 'get_internal_type'):
-                        field_type = field_obj.get_internal_type()
-                        if field_type in ['DecimalField', 'FloatField', 'IntegerField', 'PositiveIntegerField', 'BigIntegerField']:
-                            numeric_fields.append(field.name)
-            
-            return JsonResponse({
-                'error': f'Le champ "{field_name}" n\'existe pas sur le modèle {model_name}',
-                'available_fields': numeric_fields,
-                'suggestion': numeric_fields[0] if numeric_fields else None
-            }, status=400)
-    except Exception as e:
-        return JsonResponse({'error': f'Erreur lors de la vérification du champ: {str(e)}'}, status=400)
-    
-    # Calculer la période selon la fréquence
-    now = timezone.now()
-    periods_map = {
-        'day': 30,
-        'week': 12,
-        'month': 12,
-        'quarter': 8,
-        'year': 5,
-    }
-    periods = periods_map.get(frequency, 12)
-    
-    # Récupérer les données
-    data = []
-    labels = []
-    
-    for i in range(periods - 1, -1, -1):
-        if frequency == 'day':
-            start = now - timedelta(days=i+1)
-            end = now - timedelta(days=i)
-            label = start.strftime('%d/%m')
-        elif frequency == 'week':
-            start = now - timedelta(weeks=i+1)
-            end = now - timedelta(weeks=i)
-            label = f"Sem {start.isocalendar()[1]}"
-        elif frequency == 'month':
-            # Calculer le début du mois
-            month_start = now.month - i - 1
-            year = now.year
-            while month_start < 1:
-                month_start += 12
-                year -= 1
-            start = timezone.make_aware(datetime(year, month_start, 1))
-            month_end = now.month - i
-            year_end = now.year
-            while month_end < 1:
-                month_end += 12
-                year_end -= 1
-            end = timezone.make_aware(datetime(year_end, month_end, 1))
-            label = start.strftime('%m/%Y')
-        elif frequency == 'quarter':
-            quarter = ((now.month - 1) // 3) - i
-            year = now.year
-            while quarter < 0:
-                quarter += 4
-                year -= 1
-            month_start = (quarter * 3) + 1
-            start = timezone.make_aware(datetime(year, month_start, 1))
-            label = f"T{quarter + 1} {year}"
-            end = start + timedelta(days=90)
-        else:  # year
-            year = now.year - i
-            start = timezone.make_aware(datetime(year, 1, 1))
-            end = timezone.make_aware(datetime(year + 1, 1, 1))
-            label = str(year)
-        
-        # Filtrer les données pour cette période
-        queryset = model_class.objects.filter(created_at__gte=start, created_at__lt=end)
-        
-        # Appliquer l'opération
-        if operation == 'sum':
-            try:
-                from django.db.models import Sum
-                result = queryset.aggregate(sum=Sum(field_name))
-                value = float(result['sum'] or 0)
-            except:
-                value = 0
-        elif operation == 'avg':
-            try:
-                from django.db.models import Avg
-                result = queryset.aggregate(avg=Avg(field_name))
-                value = float(result['avg'] or 0)
-            except:
-                value = 0
-        elif operation == 'count':
-            value = queryset.count()
-        else:
-            value = queryset.count()
-        
-        data.append(value)
-        labels.append(label)
+        result = charts.get_chart_data(model_class, field_name, operation, frequency)
+    except charts.ChartError as e:
+        return JsonResponse({
+            'error': str(e),
+            'available_fields': e.available_fields,
+            'suggestion': e.available_fields[0] if e.available_fields else None
+        }, status=400)
     
     return JsonResponse({
-        'labels': labels,
-        'data': data,
+        'labels': result['labels'],
+        'data': result['data'],
         'chart_type': chart_type
     })
 
 
 def _get_grid_columns_for_model(model_class):
-    """Retourne tous les champs concrets du modèle (id, nom, slug, description, catégorie, prix, stock, etc.).
-    Utilise concrete_fields directement comme pour Order/Invoice qui fonctionnent bien."""
-    return [f.name for f in model_class._meta.concrete_fields]
+    """Retourne tous les champs concrets du modèle (id, nom, slug, description, catégorie, prix, stock, etc.)."""
+    return grids.get_grid_columns(model_class)
 
 
+@staff_member_required
 @require_http_methods(["GET"])
 def grid_data(request):
-    """API pour récupérer les données de grille. Utilise toujours tous les champs concrets du modèle pour garantir l'affichage complet."""
+    """
+    API pour récupérer les données de grille (projection, tri, filtres et pagination côté serveur).
+    Paramètres : model, columns (multiple), grid_id (colonnes et filtres de la DashboardGrid),
+    filters (JSON, limité aux champs propres du modèle), sort (champ ou -champ), cursor,
+    page_size, include_total=1.
+    """
+    from .models import DashboardGrid
+
     grid_id = request.GET.get('grid_id')
     model_name = request.GET.get('model')
     requested_columns = request.GET.getlist('columns')
+    filters = {}
+    
+    if grid_id:
+        try:
+            grid = DashboardGrid.objects.get(pk=grid_id)
+        except (DashboardGrid.DoesNotExist, ValueError):
+            return JsonResponse({'error': 'Grille non trouvée'}, status=404)
+        model_name = model_name or grid.model_name
+        requested_columns = requested_columns or list(grid.columns or [])
+        filters = dict(grid.filters or {})
     
     if not model_name:
         return JsonResponse({'error': 'Model is required'}, status=400)
@@ -186,91 +109,56 @@ def grid_data(request):
     if not model_class:
         return JsonResponse({'error': 'Invalid model'}, status=400)
     
-    # TOUJOURS utiliser tous les champs concrets du modèle pour garantir l'affichage complet
-    # (comme Order/Invoice qui fonctionnent bien)
-    columns = _get_grid_columns_for_model(model_class)
-    if not columns:
-        columns = ['pk']
+    filters_raw = request.GET.get('filters')
+    if filters_raw:
+        try:
+            extra_filters = json.loads(filters_raw)
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'JSON invalide'}, status=400)
+        if not isinstance(extra_filters, dict):
+            return JsonResponse({'error': 'Les filtres doivent être un objet JSON'}, status=400)
+        try:
+            # Pas de parcours de relation depuis la requête (ex. user__password__startswith)
+            grids.compile_filters(model_class, extra_filters, relations=False)
+        except grids.GridError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        filters.update(extra_filters)
     
-    # Récupérer les données
-    queryset = model_class.objects.all()
+    try:
+        page_size = int(request.GET.get('page_size') or grids.DEFAULT_PAGE_SIZE)
+    except ValueError:
+        page_size = grids.DEFAULT_PAGE_SIZE
     
-    # Construire les données
-    data = []
-    for obj in queryset[:100]:  # Limiter à 100 résultats
-        row = {}
-        for col in columns:
-            if hasattr(obj, col):
-                value = getattr(obj, col)
-                # Convertir les objets en string (FK, dates, etc.)
-                if hasattr(value, '__str__') and not isinstance(value, (int, float, type(None), bool)):
-                    row[col] = str(value)
-                else:
-                    row[col] = value
-            else:
-                row[col] = '-'
-        data.append(row)
+    try:
+        result = grids.fetch_grid(
+            model_class,
+            columns=requested_columns,
+            filters=filters,
+            sort=request.GET.get('sort') or None,
+            cursor=request.GET.get('cursor') or None,
+            page_size=page_size,
+            include_total=request.GET.get('include_total') == '1',
+        )
+    except (grids.GridError, ValueError, ValidationError) as e:
+        # GridError : paramètres invalides ; ValueError / ValidationError : valeur de filtre incompatible
+        return JsonResponse({'error': str(e)}, status=400)
     
-    return JsonResponse({
-        'data': data,
-        'columns': columns
-    })
+    return JsonResponse(result)
 
 
 @require_http_methods(["GET"])
 def stats_data(request):
-    """API pour récupérer les statistiques rapides - utilise l'auto-découverte"""
-    from django.db.models import Sum
-    from django.apps import apps
-    
-    stats = {}
-    total_revenue = 0
-    
-    # Parcourir tous les modèles pour détecter automatiquement ceux avec des données
-    for app_config in apps.get_app_configs():
-        # Ignorer les apps Django internes
-        if app_config.name.startswith('django.contrib'):
-            continue
-        
-        for model in app_config.get_models():
-            if model._meta.abstract or model._meta.proxy:
-                continue
-            
-            model_name = model.__name__.lower()
-            
-            # Chercher des champs de montant pour calculer les revenus
-            if hasattr(model, 'total_amount'):
-                count = model.objects.count()
-                revenue = float(model.objects.aggregate(Sum('total_amount'))['total_amount__sum'] or 0)
-                stats[model_name] = count
-                total_revenue += revenue
-            elif hasattr(model, 'amount'):
-                count = model.objects.count()
-                revenue = float(model.objects.aggregate(Sum('amount'))['amount__sum'] or 0)
-                stats[model_name] = count
-                total_revenue += revenue
-            else:
-                # Compter simplement le nombre d'objets
-                count = model.objects.count()
-                if count > 0:
-                    stats[model_name] = count
-    
-    # Ajouter le revenu total
-    stats['revenue'] = total_revenue
+    """API pour récupérer les statistiques rapides (table ModelStat, une requête)."""
+    stats = get_stats()
+    counts = stats['counts']
     
     # Garder la compatibilité avec l'ancien format pour l'index.html
-    # On essaie de trouver les modèles courants
-    order_model = get_model_class('Order')
-    invoice_model = get_model_class('Invoice')
-    payment_model = get_model_class('Payment')
-    product_model = get_model_class('Product')
-    
     result = {
-        'orders': order_model.objects.count() if order_model else 0,
-        'invoices': invoice_model.objects.count() if invoice_model else 0,
-        'payments': payment_model.objects.count() if payment_model else 0,
-        'products': product_model.objects.count() if product_model else 0,
-        'revenue': total_revenue,
+        'orders': counts.get('sales.order', 0),
+        'invoices': counts.get('sales.invoice', 0),
+        'payments': counts.get('sales.payment', 0),
+        'products': counts.get('catalog.product', 0),
+        'revenue': stats['revenue'],
     }
     
     return JsonResponse(result)
@@ -288,19 +176,8 @@ def model_fields(request):
     if not model_class:
         return JsonResponse({'error': f'Model "{model_name}" not found'}, status=404)
     
-    # Détecter les champs numériques
-    numeric_fields = []
-    for field in model_class._meta.get_fields():
-        if hasattr(field, 'name'):
-            try:
-                field_obj = model_class._meta.get_field(field.name)
-                if hasattr(field_obj, 'get_internal_type'):
-                    field_type = field_obj.get_internal_type()
-                    if field_type in ['DecimalField', 'FloatField', 'IntegerField', 
-                                     'PositiveIntegerField', 'BigIntegerField', 'SmallIntegerField']:
-                        numeric_fields.append(field.name)
-            except Exception:
-                continue
+    # Champs numériques (métadonnées en cache par modèle)
+    numeric_fields = list(metrics.get_numeric_fields(model_class))
     
     return JsonResponse({
         'model': model_name,
@@ -324,20 +201,8 @@ def grid_model_fields(request):
 
 
 def _get_numeric_fields_for_dashboard(model):
-    """Retourne les champs numériques d'un modèle (pour dashboard)."""
-    result = []
-    for field in model._meta.get_fields():
-        if hasattr(field, 'name'):
-            try:
-                field_obj = model._meta.get_field(field.name)
-                if hasattr(field_obj, 'get_internal_type'):
-                    ft = field_obj.get_internal_type()
-                    if ft in ('DecimalField', 'IntegerField', 'FloatField', 'BigIntegerField',
-                              'PositiveIntegerField', 'SmallIntegerField'):
-                        result.append(field.name)
-            except Exception:
-                pass
-    return result
+    """Retourne les champs numériques d'un modèle (pour dashboard), métadonnées en cache."""
+    return list(metrics.get_numeric_fields(model))
 
 
 @staff_member_required
@@ -364,7 +229,7 @@ def dashboard_models(request):
 @staff_member_required
 @require_http_methods(["GET", "POST"])
 def dashboard_metrics(request):
-    """Calcule les métriques (count, sum, avg) à partir d'une config JSON."""
+    """Calcule les métriques (count, sum, avg) à partir d'une config JSON (regroupées par modèle)."""
     if request.method == 'GET':
         config_raw = request.GET.get('config', '[]')
         try:
@@ -381,52 +246,8 @@ def dashboard_metrics(request):
     if not isinstance(config, list):
         return JsonResponse({'error': 'config doit être une liste'}, status=400)
 
-    results = []
-    for item in config:
-        if not isinstance(item, dict):
-            continue
-        app = item.get('app')
-        model_name = item.get('model')
-        metric_type = item.get('type', 'count')
-        field = item.get('field')
-        label = item.get('label', '')
-
-        if not app or not model_name:
-            continue
-
-        try:
-            model = apps.get_model(app, model_name)
-        except LookupError:
-            continue
-
-        numeric_fields = _get_numeric_fields_for_dashboard(model)
-
-        if metric_type == 'count':
-            value = model.objects.count()
-        elif metric_type == 'sum' and field and field in numeric_fields:
-            agg = model.objects.aggregate(v=Sum(field))
-            value = agg['v'] or 0
-            if hasattr(value, '__float__'):
-                value = float(value)
-        elif metric_type == 'avg' and field and field in numeric_fields:
-            agg = model.objects.aggregate(v=Avg(field))
-            value = round(float(agg['v'] or 0), 2)
-        else:
-            continue
-
-        admin_url = ''
-        try:
-            admin_url = reverse(
-                f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist'
-            )
-        except Exception:
-            pass
-
-        results.append({
-            'label': label or f"{model._meta.verbose_name} ({metric_type})",
-            'value': value,
-            'admin_url': admin_url,
-        })
+    # Une requête aggregate() par modèle distinct, résultat mémorisé par configuration
+    results = metrics.evaluate_metrics(config)
 
     return JsonResponse({'metrics': results})
 
@@ -474,12 +295,16 @@ def dashboard_config_save(request):
 @staff_member_required
 @require_http_methods(["GET"])
 def dashboard_charts_get(request):
-    """Retourne tous les graphiques sauvegardés pour l'utilisateur connecté."""
+    """
+    Retourne tous les graphiques sauvegardés pour l'utilisateur connecté.
+    ?include_data=1 : ajoute les séries de chaque graphique (cache), en une seule réponse.
+    """
     from .models import DashboardChart
-    charts = DashboardChart.objects.filter(user=request.user).order_by('-created_at')
+    saved_charts = DashboardChart.objects.filter(user=request.user).order_by('-created_at')
+    include_data = request.GET.get('include_data') == '1'
     charts_data = []
-    for chart in charts:
-        charts_data.append({
+    for chart in saved_charts:
+        item = {
             'id': chart.id,
             'name': chart.name,
             'chart_type': chart.chart_type,
@@ -487,7 +312,17 @@ def dashboard_charts_get(request):
             'field_name': chart.field_name,
             'frequency': chart.frequency,
             'operation': chart.operation,
-        })
+        }
+        # Données lues depuis le cache (précalculées par refresh_dashboard_charts)
+        if include_data:
+            model_class = get_model_class(chart.model_name)
+            try:
+                item['data'] = charts.get_chart_data(
+                    model_class, chart.field_name, chart.operation or 'sum', chart.frequency
+                ) if model_class else None
+            except charts.ChartError:
+                item['data'] = None
+        charts_data.append(item)
     return JsonResponse({'charts': charts_data})
 
 
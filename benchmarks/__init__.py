@@ -0,0 +1 @@
+"""Benchmarks FLOTTE — latence, requêtes SQL et mémoire des pages et API sur jeux de données générés."""
@@ -0,0 +1,219 @@
+"""
+Benchmarks FLOTTE : python -m benchmarks.run [--sizes 1000 10000 100000] [--compare base.json]
+
+Pour chaque taille, une base SQLite dédiée (benchmarks/data/) est générée une fois par
+generate_fleet (graine et date fixes), puis chaque scénario (benchmarks.scenarios) est mesuré :
+latence (médiane, p95, min sur --repeat appels, cache vidé avant chaque appel), nombre de
+requêtes SQL et pic mémoire Python (tracemalloc). Les résultats sont écrits en JSON ; avec
+--compare, les régressions par rapport à une exécution précédente sont signalées (code retour 1).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+DATA_DIR = BENCH_DIR / 'data'
+RESULTS_DIR = BENCH_DIR / 'results'
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+REFERENCE_DATE = '2025-06-30'
+
+
+def setup_django():
+    sys.path.insert(0, str(ROOT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flotte_project.settings')
+    # Pas d'échantillonnage de profilage pendant les mesures
+    os.environ['FLOTTE_PROFILING_SAMPLE_RATE'] = '0'
+    os.environ.setdefault('EMAIL_BACKEND', 'django.core.mail.backends.locmem.EmailBackend')
+    import django
+    from django.conf import settings
+    settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+    django.setup()
+
+
+def use_database(path):
+    """Pointe l'alias default sur la base SQLite du jeu de données."""
+    from django.conf import settings
+    from django.db import connections
+    connections['default'].close()
+    settings.DATABASES['default']['NAME'] = str(path)
+    connections['default'].settings_dict['NAME'] = str(path)
+
+
+def prepare_dataset(size, seed, workers):
+    """Crée (si absente) la base du jeu de données de `size` véhicules ; retourne son chemin."""
+    from django.core.management import call_command
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = DATA_DIR / f'fleet_{size}_seed{seed}.sqlite3'
+    exists = path.exists()
+    use_database(path)
+    if not exists:
+        print(f'Génération du jeu de données {size} véhicules → {path.name}')
+        try:
+            call_command('migrate', verbosity=0)
+            call_command('generate_fleet', vehicles=size, seed=seed, date=REFERENCE_DATE, workers=workers)
+        except BaseException:
+            use_database(':memory:')
+            path.unlink(missing_ok=True)
+            raise
+    else:
+        call_command('migrate', verbosity=0)
+    return path
+
+
+def build_context():
+    from django.contrib.auth import get_user_model
+    from django.test import Client, RequestFactory
+    from flotte.models import Vehicule
+
+    User = get_user_model()
+    user = User.objects.filter(username='bench').first()
+    if user is None:
+        user = User.objects.create_superuser('bench', 'bench@flotte.local', 'bench')
+    client = Client()
+    client.force_login(user)
+    return {
+        'client': client,
+        'factory': RequestFactory(),
+        'user': user,
+        'vehicule_pk': Vehicule.objects.order_by('pk').values_list('pk', flat=True).first(),
+    }
+
+
+def measure(run, ctx, repeat):
+    """Mesure un scénario : latences, requêtes SQL et pic mémoire (appel séparé sous tracemalloc)."""
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies = []
+    queries = None
+    status = None
+    for _ in range(repeat):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = run(ctx)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries = len(captured)
+        status = response.status_code
+
+    cache.clear()
+    tracemalloc.start()
+    run(ctx)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'status': status,
+        'median_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 2),
+        'min_ms': round(latencies[0], 2),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_size(size, args):
+    from benchmarks.scenarios import SCENARIOS
+
+    prepare_dataset(size, args.seed, args.workers)
+    ctx = build_context()
+    results = {}
+    for name, run in SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(run, ctx, args.repeat)
+        r = results[name]
+        print(f"  [{size:>6}] {name:<24} {r['median_ms']:>9.1f} ms  p95 {r['p95_ms']:>9.1f} ms  "
+              f"{r['queries']:>5} SQL  {r['peak_kb']:>9.1f} Ko  (HTTP {r['status']})")
+    return results
+
+
+# ——— Comparaison avec une exécution précédente ———
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """
+    Liste des régressions (taille, scénario, métrique, avant, après) :
+    latence médiane et pic mémoire au-delà de la tolérance relative, toute hausse du nombre de requêtes.
+    """
+    regressions = []
+    for size, scenarios in current['sizes'].items():
+        for name, now in scenarios.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            if (now['median_ms'] > before['median_ms'] * (1 + tolerance)
+                    and now['median_ms'] - before['median_ms'] > min_delta_ms):
+                regressions.append((size, name, 'median_ms', before['median_ms'], now['median_ms']))
+            if now['queries'] > before['queries']:
+                regressions.append((size, name, 'queries', before['queries'], now['queries']))
+            if now['peak_kb'] > before['peak_kb'] * (1 + tolerance):
+                regressions.append((size, name, 'peak_kb', before['peak_kb'], now['peak_kb']))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks FLOTTE (latence, requêtes SQL, mémoire).')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Tailles de parc (nombre de véhicules).')
+    parser.add_argument('--seed', type=int, default=1, help='Graine du jeu de données.')
+    parser.add_argument('--repeat', type=int, default=5, help='Appels mesurés par scénario.')
+    parser.add_argument('--only', nargs='*', help='Limiter à certains scénarios (noms).')
+    parser.add_argument('--workers', type=int, default=1, help='Processus pour generate_fleet.')
+    parser.add_argument('--output', help='Fichier JSON de résultats (défaut : benchmarks/results/<horodatage>.json).')
+    parser.add_argument('--compare', help='Fichier JSON de référence pour détecter les régressions.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Tolérance relative latence / mémoire (défaut : 0.2 = +20 %%).')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Écart absolu minimal (ms) pour signaler une régression de latence.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_django()
+    import django
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        report['sizes'][str(size)] = run_size(size, args)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f'Résultats : {output}')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f'{len(regressions)} régression(s) :')
+            for size, name, metric, before, after in regressions:
+                print(f'  [{size}] {name} {metric} : {before} → {after}')
+            return 1
+        print('Aucune régression par rapport à la référence.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Scénarios mesurés par benchmarks.run : pages HTML, API JSON, exports CSV, API DRF et
+API admin_custom (appelées directement : admin_custom.urls n'est pas inclus dans le projet).
+
+Chaque scénario est (nom, fonction(contexte) → réponse). Le contexte fournit le client connecté
+(superutilisateur), une RequestFactory et quelques identifiants du jeu de données.
+"""
+from django.urls import reverse
+
+from admin_custom import views as admin_custom_views
+
+
+def _get(url_name, *args, **params):
+    def run(ctx):
+        return ctx['client'].get(reverse(url_name, args=[ctx[a] for a in args]), params)
+    return run
+
+
+def _admin_custom(view, **params):
+    def run(ctx):
+        request = ctx['factory'].get('/admin_custom/api/', params)
+        request.user = ctx['user']
+        return view(request)
+    return run
+
+
+SCENARIOS = [
+    ('dashboard', _get('flotte:dashboard')),
+    ('echeances', _get('flotte:echeances')),
+    ('parc_list', _get('flotte:parc')),
+    ('vehicule_detail', _get('flotte:vehicule_detail', 'vehicule_pk')),
+    ('tco', _get('flotte:tco')),
+    ('occupation', _get('flotte:occupation', annee='2025')),
+    ('ca', _get('flotte:ca')),
+    ('recherche_api', _get('flotte:recherche_api', q='GEN')),
+    ('disponibilites', _get('flotte:api_disponibilites', debut='2025-07-01', fin='2025-07-31')),
+    ('occupation_api', _get('flotte:api_occupation', debut='2025-01-01', fin='2025-06-30', granularite='jour')),
+    ('export_reglementaire', _get('flotte:export_reglementaire')),
+    ('export_charges_import', _get('flotte:export_charges_import')),
+    ('export_locations', _get('flotte:export_locations')),
+    ('drf_vehicules', _get('flotte:api-vehicule-list', format='json')),
+    ('drf_ventes', _get('flotte:api-vente-list', format='json')),
+    ('drf_locations', _get('flotte:api-location-list', format='json')),
+    ('drf_conducteurs', _get('flotte:api-conducteur-list', format='json')),
+    ('drf_marques', _get('flotte:api-marque-list', format='json')),
+    ('drf_modeles', _get('flotte:api-modele-list', format='json')),
+    ('admin_chart_data', _admin_custom(
+        admin_custom_views.chart_data, model='Vente', field='prix_vente', operation='sum', frequency='month',
+    )),
+    ('admin_grid_data', _admin_custom(
+        admin_custom_views.grid_data, model='Vehicule', sort='-date_entree_parc', include_total='1',
+    )),
+]
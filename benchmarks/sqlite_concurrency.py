@@ -0,0 +1,177 @@
+"""
+Concurrence SQLite : python -m benchmarks.sqlite_concurrency [--workers 4] [--seconds 5] [--output x.json]
+
+Compare le débit d'écriture de plusieurs processus sur une même base SQLite, avant (réglages
+SQLite / Django par défaut : journal rollback, transactions DEFERRED) et après (FLOTTE_SQLITE_PRAGMAS
+et transaction_mode des settings). Chaque worker est un interpréteur neuf (--child) qui enchaîne,
+jusqu'à l'échéance, la charge typique d'une requête : lecture hors transaction, puis transaction
+« lecture de session → mise à jour de session → ligne d'audit ». Sont mesurés : transactions
+validées par seconde, latence p95, erreurs « database is locked ».
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / 'results'
+
+MODES = ('avant', 'apres')
+SCHEMA = (
+    'CREATE TABLE bench_session (session_key TEXT PRIMARY KEY, data TEXT NOT NULL, expire REAL NOT NULL)',
+    'CREATE TABLE bench_audit (id INTEGER PRIMARY KEY, worker INTEGER NOT NULL, action TEXT NOT NULL, '
+    'at REAL NOT NULL)',
+    'CREATE INDEX bench_audit_worker ON bench_audit (worker)',
+)
+
+
+# ——— Worker (sous-processus) ———
+
+def run_worker(mode, path, worker, start_at, seconds):
+    """Charge d'un worker ; retourne ses compteurs (écrit en JSON sur stdout par --child)."""
+    sys.path.insert(0, str(ROOT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flotte_project.settings')
+    os.environ['FLOTTE_PROFILING_SAMPLE_RATE'] = '0'
+    import django
+    from django.conf import settings
+    django.setup()
+    from django.db import OperationalError, connections, transaction
+
+    database = settings.DATABASES['default']
+    database['NAME'] = str(path)
+    if mode == 'avant':
+        settings.FLOTTE_SQLITE_PRAGMAS = {}
+        database['OPTIONS'] = {k: v for k, v in database.get('OPTIONS', {}).items() if k != 'transaction_mode'}
+    connections['default'].close()
+    connections['default'].settings_dict.update(database)
+    connection = connections['default']
+
+    session_key = f'session-{worker}'
+    commits, locked, reads, latencies = 0, 0, 0, []
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM bench_audit WHERE worker = %s', [worker])
+            cursor.fetchone()
+        reads += 1
+        t = time.perf_counter()
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SELECT data FROM bench_session WHERE session_key = %s', [session_key])
+                row = cursor.fetchone()
+                data = str(int(row[0]) + 1) if row else '1'
+                cursor.execute(
+                    'INSERT INTO bench_session (session_key, data, expire) VALUES (%s, %s, %s) '
+                    'ON CONFLICT (session_key) DO UPDATE SET data = excluded.data, expire = excluded.expire',
+                    [session_key, data, time.time() + 3600])
+                cursor.execute('INSERT INTO bench_audit (worker, action, at) VALUES (%s, %s, %s)',
+                               [worker, 'vue', time.time()])
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+        else:
+            commits += 1
+            latencies.append((time.perf_counter() - t) * 1000)
+    connection.close()
+    return {'commits': commits, 'locked': locked, 'reads': reads, 'latencies_ms': latencies}
+
+
+# ——— Orchestration ———
+
+def create_database(path):
+    connection = sqlite3.connect(path)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.commit()
+    connection.close()
+
+
+def run_mode(mode, workers, seconds, directory):
+    """Lance `workers` processus simultanés sur une base neuve ; retourne le résumé du mode."""
+    path = Path(directory) / f'concurrence_{mode}.sqlite3'
+    create_database(path)
+    start_at = time.time() + 3.0  # laisse à chaque interpréteur le temps de charger Django
+    processes = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.sqlite_concurrency', '--child', mode, str(path),
+             str(worker), str(start_at), str(seconds)],
+            cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for worker in range(workers)
+    ]
+    results = []
+    for process in processes:
+        stdout, stderr = process.communicate()
+        if process.returncode:
+            raise RuntimeError(f'Worker en échec :\n{stderr}')
+        results.append(json.loads(stdout.strip().splitlines()[-1]))
+
+    latencies = sorted(ms for r in results for ms in r['latencies_ms'])
+    commits = sum(r['commits'] for r in results)
+    return {
+        'commits': commits,
+        'commits_per_s': round(commits / seconds, 1),
+        'locked_errors': sum(r['locked'] for r in results),
+        'reads': sum(r['reads'] for r in results),
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None,
+    }
+
+
+def print_report(report):
+    print(f"{'mode':<8} {'commits/s':>10} {'erreurs verrou':>15} {'p50 ms':>8} {'p95 ms':>8} {'lectures':>9}")
+    for mode in MODES:
+        r = report['modes'][mode]
+        print(f"{mode:<8} {r['commits_per_s']:>10.1f} {r['locked_errors']:>15} {r['p50_ms'] or 0:>8.2f} "
+              f"{r['p95_ms'] or 0:>8.2f} {r['reads']:>9}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Débit d'écriture SQLite concurrent, avant / après réglages.")
+    parser.add_argument('--workers', type=int, default=4, help='Processus écrivains simultanés (défaut : 4).')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Durée de chaque mesure (défaut : 5 s).')
+    parser.add_argument('--output', help='Fichier JSON (défaut : benchmarks/results/sqlite-<horodatage>.json).')
+    parser.add_argument('--child', nargs=5, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        mode, path, worker, start_at, seconds = args.child
+        json.dump(run_worker(mode, path, int(worker), float(start_at), float(seconds)), sys.stdout)
+        return 0
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'workers': args.workers,
+        'seconds': args.seconds,
+        'modes': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in MODES:
+            report['modes'][mode] = run_mode(mode, max(1, args.workers), args.seconds, directory)
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"sqlite-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f'Résultats : {output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
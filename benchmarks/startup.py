@@ -0,0 +1,181 @@
+"""
+Temps de démarrage FLOTTE : python -m benchmarks.startup [--repeat 5] [--output x.json] [--compare base.json]
+
+Chaque mesure est faite dans un interpréteur neuf (sous-processus, --child) qui instrumente
+django.setup() : par application, import du module (AppConfig.create), import des modèles et
+ready(). Sont mesurés ensuite les étapes différées au premier usage : découverte de l'admin
+(premier accès au registre de admin.site) et chargement de l'URLconf. Le rapport donne la
+médiane sur --repeat démarrages ; avec --compare, les régressions sont signalées (code retour 1).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / 'results'
+
+PHASES = ('import', 'models', 'ready')
+
+
+# ——— Mesure dans le sous-processus ———
+
+def measure_child():
+    """Instrumente django.setup() puis mesure admin et URLconf ; écrit le JSON sur stdout."""
+    start = time.perf_counter()
+    sys.path.insert(0, str(ROOT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flotte_project.settings')
+    import django
+    from django.apps import AppConfig
+    baseline = time.perf_counter() - start
+
+    apps_timing = {}
+    create = AppConfig.create.__func__
+    import_models = AppConfig.import_models
+
+    def timed(label, phase, func, *args):
+        t = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            entry = apps_timing.setdefault(label, dict.fromkeys(PHASES, 0.0))
+            entry[phase] += (time.perf_counter() - t) * 1000
+
+    def timed_create(cls, entry):
+        t = time.perf_counter()
+        app_config = create(cls, entry)
+        apps_timing.setdefault(app_config.name, dict.fromkeys(PHASES, 0.0))['import'] += \
+            (time.perf_counter() - t) * 1000
+        ready = app_config.ready
+        app_config.ready = lambda: timed(app_config.name, 'ready', ready)
+        return app_config
+
+    AppConfig.create = classmethod(timed_create)
+    AppConfig.import_models = lambda self: timed(self.name, 'models', import_models, self)
+
+    t = time.perf_counter()
+    django.setup()
+    setup_ms = (time.perf_counter() - t) * 1000
+
+    from django.contrib import admin
+    from django.urls import get_resolver
+    t = time.perf_counter()
+    registered = len(admin.site._registry)
+    admin_ms = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    get_resolver().url_patterns
+    urls_ms = (time.perf_counter() - t) * 1000
+
+    json.dump({
+        'python_start_ms': baseline * 1000,
+        'setup_ms': setup_ms,
+        'admin_discovery_ms': admin_ms,
+        'admin_models': registered,
+        'urlconf_ms': urls_ms,
+        'apps': apps_timing,
+    }, sys.stdout)
+
+
+# ——— Agrégation ———
+
+def run_child():
+    process = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child'],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=False,
+        env={**os.environ, 'FLOTTE_PROFILING_SAMPLE_RATE': '0', 'FLOTTE_WARMUP': '0'},
+    )
+    if process.returncode:
+        raise RuntimeError(f'Sous-processus en échec :\n{process.stderr}')
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def aggregate(runs):
+    """Médianes : totaux et, par application, import / modèles / ready."""
+    def median(values):
+        return round(statistics.median(values), 2)
+
+    report = {key: median([r[key] for r in runs])
+              for key in ('setup_ms', 'admin_discovery_ms', 'urlconf_ms')}
+    report['admin_models'] = runs[-1]['admin_models']
+    report['apps'] = {
+        app: {phase: median([r['apps'].get(app, {}).get(phase, 0.0) for r in runs]) for phase in PHASES}
+        for app in runs[-1]['apps']
+    }
+    return report
+
+
+def compare(current, baseline, tolerance, min_delta_ms):
+    """Régressions (mesure, avant, après) : totaux et coût total par application."""
+    pairs = [(key, baseline.get(key), current[key]) for key in ('setup_ms', 'admin_discovery_ms', 'urlconf_ms')]
+    for app, phases in current['apps'].items():
+        before = baseline.get('apps', {}).get(app)
+        if before:
+            pairs.append((app, sum(before.values()), sum(phases.values())))
+    return [(name, before, after) for name, before, after in pairs
+            if before is not None and after > before * (1 + tolerance) and after - before > min_delta_ms]
+
+
+def print_report(report):
+    print(f"{'application':<40} {'import':>9} {'modèles':>9} {'ready':>9} {'total':>9}  (ms)")
+    for app, phases in sorted(report['apps'].items(), key=lambda item: -sum(item[1].values())):
+        print(f"{app:<40} {phases['import']:>9.1f} {phases['models']:>9.1f} {phases['ready']:>9.1f} "
+              f"{sum(phases.values()):>9.1f}")
+    print(f"django.setup()      {report['setup_ms']:>9.1f} ms")
+    print(f"découverte admin    {report['admin_discovery_ms']:>9.1f} ms  ({report['admin_models']} modèles, premier accès)")
+    print(f"URLconf             {report['urlconf_ms']:>9.1f} ms  (premier accès)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Temps de démarrage FLOTTE (import et ready() par application).')
+    parser.add_argument('--repeat', type=int, default=5, help='Démarrages mesurés (interpréteurs neufs).')
+    parser.add_argument('--output', help='Fichier JSON de résultats (défaut : benchmarks/results/startup-<horodatage>.json).')
+    parser.add_argument('--compare', help='Fichier JSON de référence pour détecter les régressions.')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Tolérance relative (défaut : 0.2 = +20 %%).')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                        help='Écart absolu minimal (ms) pour signaler une régression.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        measure_child()
+        return 0
+
+    runs = [run_child() for _ in range(max(1, args.repeat))]
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'repeat': len(runs),
+        **aggregate(runs),
+    }
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"startup-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f'Résultats : {output}')
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f'{len(regressions)} régression(s) :')
+            for name, before, after in regressions:
+                print(f'  {name} : {before:.1f} → {after:.1f} ms')
+            return 1
+        print('Aucune régression par rapport à la référence.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,13 +2,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.utils.html import format_html, format_html_join
 from .models import (
     Marque, Modele, TypeCarburant, TypeTransmission, TypeVehicule,
     Vehicule, ImportDemarche, Depense, DocumentVehicule, Reparation,
     Location, Vente, ProfilUtilisateur, Facture,
     RapportJournalier, Maintenance, ReleveCarburant, Conducteur,
     ChargeImport, PartieImportee, Contravention, TypeDocument, AuditLog,
-    PhotoVehicule, PenaliteFacture,
+    PhotoVehicule, PenaliteFacture, ProfilVue, EmailOutbox, NotificationEcheance,
+    TachePlanifiee, ExecutionTache,
 )
 
 User = get_user_model()
@@ -66,6 +68,7 @@ class ReparationInline(admin.TabularInline):
 class FactureInline(admin.TabularInline):
     model = Facture
     extra = 0
+    raw_id_fields = ('location',)
 
 
 class PhotoVehiculeInline(admin.TabularInline):
@@ -98,6 +101,7 @@ class PhotoVehiculeAdmin(admin.ModelAdmin):
 class ContraventionInline(admin.TabularInline):
     model = Contravention
     extra = 0
+    raw_id_fields = ('facture',)
 
 
 @admin.register(Location)
@@ -126,8 +130,9 @@ class PartieImporteeAdmin(admin.ModelAdmin):
 
 @admin.register(Contravention)
 class ContraventionAdmin(admin.ModelAdmin):
-    list_display = ('location', 'date_contravention', 'motif', 'reference', 'montant', 'lieu')
+    list_display = ('location', 'date_contravention', 'motif', 'reference', 'montant', 'lieu', 'facture')
     list_filter = ('location',)
+    raw_id_fields = ('location', 'facture')
     search_fields = ('reference', 'motif', 'location__locataire', 'location__vehicule__numero_chassis')
 
 
@@ -139,9 +144,10 @@ class PenaliteFactureInline(admin.TabularInline):
 
 @admin.register(Facture)
 class FactureAdmin(admin.ModelAdmin):
-    list_display = ('numero', 'vehicule', 'fournisseur', 'date_facture', 'montant', 'type_facture')
-    list_filter = ('type_facture',)
-    search_fields = ('numero', 'fournisseur', 'vehicule__numero_chassis')
+    list_display = ('numero', 'vehicule', 'fournisseur', 'date_facture', 'montant', 'type_facture', 'periode')
+    list_filter = ('type_facture', 'periode')
+    search_fields = ('numero', 'fournisseur', 'vehicule__numero_chassis', 'location__locataire')
+    raw_id_fields = ('location',)
     inlines = [PenaliteFactureInline]
 
 
@@ -213,6 +219,151 @@ class AuditLogAdmin(admin.ModelAdmin):
     date_hierarchy = 'timestamp'
 
 
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """File d'emails (flotte.outbox) : suivi des envois, relance des échecs."""
+    list_display = ('cree_le', 'sujet', 'destinataires_affiches', 'statut', 'tentatives', 'prochain_essai', 'envoye_le')
+    list_filter = ('statut',)
+    search_fields = ('sujet',)
+    readonly_fields = (
+        'sujet', 'destinataires', 'expediteur', 'corps_texte', 'corps_html', 'statut', 'tentatives',
+        'prochain_essai', 'jeton', 'derniere_erreur', 'cree_le', 'envoye_le',
+    )
+    date_hierarchy = 'cree_le'
+    actions = ['renvoyer']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Destinataires')
+    def destinataires_affiches(self, obj):
+        return ', '.join(obj.destinataires)
+
+    @admin.action(description='Renvoyer les emails sélectionnés')
+    def renvoyer(self, request, queryset):
+        from .outbox import requeue
+        self.message_user(request, f'{requeue(queryset)} email(s) remis en file.')
+
+
+@admin.register(NotificationEcheance)
+class NotificationEcheanceAdmin(admin.ModelAdmin):
+    """Alertes d'échéance déjà notifiées (flotte.notifications) ; supprimer une ligne la renvoie au prochain récapitulatif."""
+    list_display = ('notifie_le', 'cle', 'destinataire')
+    search_fields = ('cle', 'destinataire')
+    readonly_fields = ('cle', 'destinataire', 'notifie_le')
+    date_hierarchy = 'notifie_le'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TachePlanifiee)
+class TachePlanifieeAdmin(admin.ModelAdmin):
+    """Tâches du planificateur (flotte.scheduler) : expression cron, prochaine et dernière exécutions, verrou."""
+    list_display = (
+        'nom', 'expression_cron', 'prochaine_execution', 'derniere_execution', 'dernier_creneau', 'detenteur',
+    )
+    readonly_fields = ('nom', 'dernier_creneau', 'detenteur', 'verrouille_jusqua')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        from django.db.models import OuterRef, Subquery
+        dernieres = ExecutionTache.objects.filter(tache=OuterRef('nom')).order_by('-debut')
+        return super().get_queryset(request).annotate(
+            derniere_statut=Subquery(dernieres.values('statut')[:1]),
+            derniere_duree=Subquery(dernieres.values('duree_ms')[:1]),
+        )
+
+    def _job(self, obj):
+        from .scheduler import get_jobs
+        return get_jobs().get(obj.nom)
+
+    @admin.display(description='Cron')
+    def expression_cron(self, obj):
+        job = self._job(obj)
+        return str(job.schedule) if job else 'retirée de FLOTTE_SCHEDULER_JOBS'
+
+    @admin.display(description='Prochaine exécution')
+    def prochaine_execution(self, obj):
+        from django.utils import timezone
+        job = self._job(obj)
+        return job.schedule.next_after(timezone.localtime()) if job else None
+
+    @admin.display(description='Dernière exécution')
+    def derniere_execution(self, obj):
+        if not obj.derniere_statut:
+            return '—'
+        libelle = dict(ExecutionTache.STATUT_CHOICES)[obj.derniere_statut]
+        return f'{libelle} ({obj.derniere_duree or 0:.0f} ms)'
+
+
+@admin.register(ExecutionTache)
+class ExecutionTacheAdmin(admin.ModelAdmin):
+    """Historique des exécutions des tâches planifiées (durée, résultat, trace d'erreur)."""
+    list_display = ('debut', 'tache', 'statut', 'duree_ms', 'hote')
+    list_filter = ('statut', 'tache')
+    readonly_fields = ('tache', 'creneau', 'debut', 'fin', 'duree_ms', 'statut', 'resultat', 'hote')
+    date_hierarchy = 'debut'
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ProfilVue)
+class ProfilVueAdmin(admin.ModelAdmin):
+    """Profils de performance par vue (flotte.profiling), triés par p95 ou temps total."""
+    list_display = (
+        'vue', 'nb_echantillons', 'p95_ms', 'temps_moyen', 'temps_max_ms',
+        'temps_total_ms', 'part_db', 'sql_par_requete_affiche', 'nb_detections',
+    )
+    search_fields = ('vue',)
+    ordering = ('-p95_ms',)
+    readonly_fields = (
+        'vue', 'nb_echantillons', 'p95_ms', 'temps_total_ms', 'temps_db_ms', 'temps_max_ms',
+        'nb_sql', 'nb_detections', 'detections_affichees', 'echantillons_recents', 'updated_at',
+    )
+    exclude = ('histogramme', 'dernieres_detections')
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='Moyenne (ms)')
+    def temps_moyen(self, obj):
+        return round(obj.temps_moyen_ms, 1)
+
+    @admin.display(description='Part base', ordering='temps_db_ms')
+    def part_db(self, obj):
+        if not obj.temps_total_ms:
+            return '—'
+        return f'{obj.temps_db_ms * 100 / obj.temps_total_ms:.0f} %'
+
+    @admin.display(description='SQL / requête')
+    def sql_par_requete_affiche(self, obj):
+        return round(obj.sql_par_requete, 1)
+
+    @admin.display(description='Dernières détections')
+    def detections_affichees(self, obj):
+        if not obj.dernieres_detections:
+            return '—'
+        return format_html('<ul>{}</ul>', format_html_join(
+            '', '<li><strong>{}</strong> ×{} — {}<br><code>{}</code></li>',
+            ((d.get('type'), d.get('count'), d.get('callsite') or '?', d.get('sql')) for d in obj.dernieres_detections),
+        ))
+
+    @admin.display(description='Échantillons récents (ce processus)')
+    def echantillons_recents(self, obj):
+        from .profiling import recent_profiles
+        profiles = recent_profiles(obj.vue)[:20]
+        if not profiles:
+            return '—'
+        return format_html('<ul>{}</ul>', format_html_join(
+            '', '<li>{} {} → {} : {} ms (base {} ms, {} SQL)</li>',
+            ((p['methode'], p['chemin'], p['statut'], p['duree_ms'], p['db_ms'], p['nb_sql']) for p in profiles),
+        ))
+
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 admin.site.register(ProfilUtilisateur)
@@ -1,21 +1,30 @@
 """
 API JSON FLOTTE — endpoints pour parc, ventes, CA, dashboard, paramétrage.
 Tous les endpoints nécessitent une authentification (session).
+
+Les endpoints de lecture sont des vues async (ORM async : aiterator, acount, aaggregate) : servis
+par un worker ASGI (flotte_project.asgi), les appels répétés du tableau de bord et de la recherche
+n'occupent pas un thread chacun. Sous WSGI, Django les exécute de façon synchrone.
 """
+from datetime import date
+
 from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import aget_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.urls import reverse
-from django.db.models import Case, Count, IntegerField, Q, Sum, Avg, Value, When
+from django.utils import timezone
+from django.db.models import Case, Count, IntegerField, Q, Value, When
 
-from .models import (
-    Marque, Modele, Vehicule, Vente, Conducteur,
-    Location, ReleveCarburant, Maintenance,
-)
+from .availability import available_vehicles
+from .models import Marque, Vehicule, Vente, Conducteur, Location, OccupationRollup, VenteRollup
+from .http_cache import conditional_json
 from .mixins import manager_or_admin_required
+from .occupation import aoccupation_par_type, avec_taux, occupation_par_marque, occupation_par_periode
+from .query_budget import query_budget
+from .rollups import asynthese_ca
 
 
 @login_required
+@query_budget(7)
 def api_index(request):
     """GET /api/ — En navigateur : redirection vers api/v1/ (browsable API DRF). En JSON : index des endpoints."""
     # Navigateur (Accept: text/html) → rediriger vers l'interface REST Framework
@@ -37,6 +46,8 @@ def api_index(request):
                 'dashboard_kpis': f'{base}/api/dashboard/kpis/',
                 'conducteurs': f'{base}/api/conducteurs/',
                 'locations': f'{base}/api/locations/',
+                'disponibilites': f'{base}/api/disponibilites/?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ',
+                'occupation': f'{base}/api/occupation/?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ&granularite=mois',
             },
             'api_rest_framework_v1': f'{base}/api/v1/',
             'ca_evolution': f'{base}/ca/api/evolution/?granularite=mois&annee=2025',
@@ -62,14 +73,18 @@ def _serialize_vehicule(v):
 
 
 @login_required
-def api_marques_list(request):
+@conditional_json(Marque)
+@query_budget(8)
+async def api_marques_list(request):
     """GET /api/marques/ — Liste des marques (id, nom) pour formulaires."""
-    marques = list(Marque.objects.filter(archive=False).order_by('nom').values('id', 'nom'))
+    qs = Marque.objects.filter(archive=False).order_by('nom').values('id', 'nom')
+    marques = [m async for m in qs.aiterator()]
     return JsonResponse({'marques': marques})
 
 
 @login_required
-def api_vehicules_list(request):
+@query_budget(8)
+async def api_vehicules_list(request):
     """GET /api/vehicules/ — Liste des véhicules (résumé). Query: statut, q, limit."""
     qs = Vehicule.objects.select_related('marque', 'modele').order_by('-date_entree_parc', '-id')
     statut = request.GET.get('statut', '').strip()
@@ -87,15 +102,15 @@ def api_vehicules_list(request):
         limit = min(int(request.GET.get('limit', 50)), 200)
     except (TypeError, ValueError):
         limit = 50
-    qs = qs[:limit]
-    data = [_serialize_vehicule(v) for v in qs]
+    data = [_serialize_vehicule(v) async for v in qs[:limit].aiterator()]
     return JsonResponse({'vehicules': data, 'count': len(data)})
 
 
 @login_required
-def api_vehicule_detail(request, pk):
+@query_budget(11)
+async def api_vehicule_detail(request, pk):
     """GET /api/vehicules/<id>/ — Détail d'un véhicule."""
-    v = get_object_or_404(Vehicule.objects.select_related(
+    v = await aget_object_or_404(Vehicule.objects.select_related(
         'marque', 'modele', 'type_vehicule', 'type_carburant', 'type_transmission'
     ), pk=pk)
     data = _serialize_vehicule(v)
@@ -106,22 +121,22 @@ def api_vehicule_detail(request, pk):
         'origine_pays': v.origine_pays or '',
         'etat_entree': v.etat_entree or '',
         'date_premiere_immat': v.date_premiere_immat.isoformat() if v.date_premiere_immat else None,
-        'nb_documents': v.documents.count(),
-        'nb_reparations': v.reparations.count(),
-        'nb_ventes': v.ventes.count(),
+        'nb_documents': await v.documents.acount(),
+        'nb_reparations': await v.reparations.acount(),
+        'nb_ventes': await v.ventes.acount(),
     })
     return JsonResponse(data)
 
 
 @manager_or_admin_required
-def api_ventes_list(request):
+@query_budget(8)
+async def api_ventes_list(request):
     """GET /api/ventes/ — Liste des ventes (manager/admin). Query: limit."""
-    qs = Vente.objects.select_related('vehicule').order_by('-date_vente')
+    qs = Vente.objects.select_related('vehicule__marque', 'vehicule__modele').order_by('-date_vente')
     try:
         limit = min(int(request.GET.get('limit', 50)), 200)
     except (TypeError, ValueError):
         limit = 50
-    qs = qs[:limit]
     data = [
         {
             'id': v.id,
@@ -132,44 +147,46 @@ def api_ventes_list(request):
             'prix_vente': float(v.prix_vente) if v.prix_vente else None,
             'km_vente': v.km_vente,
         }
-        for v in qs
+        async for v in qs[:limit].aiterator()
     ]
     return JsonResponse({'ventes': data, 'count': len(data)})
 
 
 @manager_or_admin_required
-def api_ca_synthese(request):
+@conditional_json(VenteRollup)
+@query_budget(8)
+async def api_ca_synthese(request):
     """GET /api/ca/synthese/ — Synthèse CA : total, nb_ventes, moyenne."""
-    agg = Vente.objects.aggregate(
-        total_ca=Sum('prix_vente'),
-        nb_ventes=Count('id'),
-        moyenne_vente=Avg('prix_vente'),
-    )
+    agg = await asynthese_ca()
     return JsonResponse({
         'total_ca': float(agg['total_ca'] or 0),
-        'nb_ventes': agg['nb_ventes'] or 0,
-        'moyenne_vente': float(agg['moyenne_vente'] or 0),
+        'nb_ventes': agg['nb_ventes_total'],
+        'moyenne_vente': float(agg['moyenne_prix']),
     })
 
 
 @login_required
-def api_dashboard_kpis(request):
-    """GET /api/dashboard/kpis/ — KPIs tableau de bord (parc, import, vendus, total)."""
-    qs = Vehicule.objects.all()
-    parc = qs.filter(statut='parc').count()
-    import_ = qs.filter(statut='import').count()
-    vendus = qs.filter(statut='vendu').count()
-    total = qs.count()
+@conditional_json(Vehicule)
+@query_budget(11)
+async def api_dashboard_kpis(request):
+    """GET /api/dashboard/kpis/ — KPIs tableau de bord (parc, import, vendus, total), en une requête."""
+    kpis = await Vehicule.objects.aaggregate(
+        parc=Count('pk', filter=Q(statut='parc')),
+        import_=Count('pk', filter=Q(statut='import')),
+        vendus=Count('pk', filter=Q(statut='vendu')),
+        total=Count('pk'),
+    )
     return JsonResponse({
-        'parc': parc,
-        'import': import_,
-        'vendus': vendus,
-        'total': total,
+        'parc': kpis['parc'],
+        'import': kpis['import_'],
+        'vendus': kpis['vendus'],
+        'total': kpis['total'],
     })
 
 
 @login_required
-def api_conducteurs_list(request):
+@query_budget(8)
+async def api_conducteurs_list(request):
     """GET /api/conducteurs/ — Liste des conducteurs (id, nom, prenom, email, actif)."""
     qs = Conducteur.objects.all().order_by('nom', 'prenom')
     data = [
@@ -181,15 +198,16 @@ def api_conducteurs_list(request):
             'telephone': c.telephone or '',
             'actif': c.actif,
         }
-        for c in qs
+        async for c in qs.aiterator()
     ]
     return JsonResponse({'conducteurs': data, 'count': len(data)})
 
 
 @login_required
-def api_locations_list(request):
+@query_budget(8)
+async def api_locations_list(request):
     """GET /api/locations/ — Liste des locations (résumé). En cours / à venir en haut, terminées en bas."""
-    qs = Location.objects.select_related('vehicule').annotate(
+    qs = Location.objects.select_related('vehicule__marque', 'vehicule__modele').annotate(
         statut_order=Case(
             When(statut='en_cours', then=Value(0)),
             When(statut='a_venir', then=Value(1)),
@@ -205,7 +223,6 @@ def api_locations_list(request):
         limit = min(int(request.GET.get('limit', 50)), 200)
     except (TypeError, ValueError):
         limit = 50
-    qs = qs[:limit]
     data = [
         {
             'id': loc.id,
@@ -218,6 +235,84 @@ def api_locations_list(request):
             'statut': loc.statut,
             'loyer_mensuel': float(loc.loyer_mensuel) if loc.loyer_mensuel else None,
         }
-        for loc in qs
+        async for loc in qs[:limit].aiterator()
     ]
     return JsonResponse({'locations': data, 'count': len(data)})
+
+
+def _int_param(request, name):
+    value = request.GET.get(name, '').strip()
+    return int(value) if value.isdigit() else None
+
+
+@manager_or_admin_required
+@conditional_json(Location, Vehicule)
+@query_budget(13)
+def api_disponibilites(request):
+    """
+    GET /api/disponibilites/?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ — Véhicules au parc libres sur la période
+    (bornes incluses). Query: type_vehicule, type_carburant, type_transmission (id), limit.
+    Vue synchrone : l'index de disponibilité (flotte.availability) est en mémoire du processus.
+    """
+    try:
+        debut = date.fromisoformat(request.GET.get('debut', '').strip())
+        fin = date.fromisoformat(request.GET.get('fin', '').strip() or debut.isoformat())
+    except ValueError:
+        return JsonResponse({'message': 'Paramètres debut / fin attendus au format AAAA-MM-JJ.'}, status=400)
+    if fin < debut:
+        return JsonResponse({'message': 'La date de fin doit être postérieure à la date de début.'}, status=400)
+    try:
+        limit = min(int(request.GET.get('limit', 50)), 200)
+    except (TypeError, ValueError):
+        limit = 50
+    ids = available_vehicles(
+        debut, fin,
+        type_vehicule=_int_param(request, 'type_vehicule'),
+        type_carburant=_int_param(request, 'type_carburant'),
+        type_transmission=_int_param(request, 'type_transmission'),
+    )
+    vehicules = Vehicule.objects.select_related('marque', 'modele').in_bulk(ids[:limit])
+    data = [_serialize_vehicule(vehicules[pk]) for pk in ids[:limit] if pk in vehicules]
+    return JsonResponse({
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'nb': len(ids),
+        'vehicules': data,
+        'count': len(data),
+    })
+
+
+@manager_or_admin_required
+@conditional_json(OccupationRollup)
+@query_budget(11)
+async def api_occupation(request):
+    """
+    GET /api/occupation/ — Taux d'occupation (OccupationRollup) : série par jour ou par mois, par marque,
+    par type de location. Query: debut, fin (AAAA-MM-JJ, défaut : année en cours), granularite (jour | mois).
+    """
+    today = timezone.localdate()
+    try:
+        debut = date.fromisoformat(request.GET.get('debut', '').strip() or f'{today.year}-01-01')
+        fin = date.fromisoformat(request.GET.get('fin', '').strip() or today.isoformat())
+    except ValueError:
+        return JsonResponse({'message': 'Paramètres debut / fin attendus au format AAAA-MM-JJ.'}, status=400)
+    granularite = 'jour' if request.GET.get('granularite') == 'jour' else 'mois'
+    serie = [
+        {**avec_taux(row), 'periode': row['periode'].isoformat()}
+        async for row in occupation_par_periode(debut, fin, granularite)
+    ]
+    par_marque = [
+        avec_taux({
+            'marque_id': row['marque_id'], 'marque': row['marque__nom'],
+            'jours_parc': row['jours_parc'], 'jours_loues': row['jours_loues'],
+        })
+        async for row in occupation_par_marque(debut, fin)
+    ]
+    return JsonResponse({
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'granularite': granularite,
+        'serie': serie,
+        'par_marque': par_marque,
+        'par_type': await aoccupation_par_type(debut, fin),
+    })
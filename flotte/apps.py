@@ -8,4 +8,12 @@ class FlotteConfig(AppConfig):
     verbose_name = 'FLOTTE — Gestion parc véhicules'
 
     def ready(self):
+        from django.db.backends.signals import connection_created
+
         from . import signals  # noqa: F401
+        from .query_budget import install_query_dispatcher
+        from .sqlite import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='flotte_sqlite_pragmas')
+        # Instrumentation SQL par contexte (budgets, métriques, profilage ; sync et async)
+        connection_created.connect(install_query_dispatcher, dispatch_uid='flotte_query_dispatcher')
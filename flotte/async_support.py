@@ -0,0 +1,24 @@
+"""
+Support ASGI FLOTTE — middlewares utilisables en mode synchrone (WSGI) et asynchrone (ASGI).
+
+Sous ASGI, Django exécute chaque middleware uniquement synchrone dans un thread (sync_to_async),
+ce qui impose un thread par requête à toute la pile. Les middlewares FLOTTE héritent de
+HybridMiddleware : en bout de chaîne asynchrone, __call__ renvoie la coroutine __acall__ et la
+requête reste sur la boucle d'événements jusqu'à la vue.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+class HybridMiddleware:
+    """
+    Base des middlewares sync / async : self.async_mode indique si get_response est une coroutine.
+    Les sous-classes commencent __call__ par `if self.async_mode: return self.__acall__(request)`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
@@ -0,0 +1,156 @@
+"""
+Disponibilité des véhicules FLOTTE — index d'intervalles en mémoire.
+
+Question : quels véhicules sont libres du jour D1 au jour D2 (bornes incluses), selon le type,
+le carburant, la transmission ? Une location bloque son véhicule sur [date_debut, date_fin] tant
+que son statut est « à venir » ou « en cours » (une location terminée libère le véhicule). Une
+location « en cours » dont la date de fin est passée (véhicule non rendu) bloque jusqu'à aujourd'hui :
+l'index est donc aussi reconstruit chaque jour.
+
+L'index est construit en deux requêtes (véhicules, locations bloquantes) et gardé en mémoire par
+processus. Par véhicule : intervalles triés par début et maximum cumulé des fins, d'où un test
+de chevauchement par bisection (O(log n)). L'index suit les générations de données de
+flotte.http_cache (Location, Vehicule), renouvelées par les signaux post_save / post_delete et
+après les écritures en masse : une modification dans n'importe quel worker l'invalide.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_right
+
+from django.utils import timezone
+
+from .http_cache import get_data_version
+from .models import Location, Vehicule
+
+logger = logging.getLogger(__name__)
+
+BLOCKING_STATUTS = ('a_venir', 'en_cours')
+
+
+class _VehicleIntervals:
+    """Réservations d'un véhicule : débuts triés, fins, maximum cumulé des fins, identifiants."""
+    __slots__ = ('starts', 'ends', 'max_ends', 'pks')
+
+    def __init__(self, rows):
+        rows.sort()
+        self.starts = [r[0] for r in rows]
+        self.ends = [r[1] for r in rows]
+        self.pks = [r[2] for r in rows]
+        self.max_ends = []
+        current = None
+        for end in self.ends:
+            current = end if current is None or end > current else current
+            self.max_ends.append(current)
+
+    def overlaps(self, debut, fin):
+        """True si une réservation chevauche [debut, fin]."""
+        # Réservations commençant au plus tard à `fin` : [0, i) ; l'une d'elles finit-elle après `debut` ?
+        i = bisect_right(self.starts, fin)
+        return i > 0 and self.max_ends[i - 1] >= debut
+
+    def conflicts(self, debut, fin, exclude=None):
+        """Identifiants des réservations qui chevauchent [debut, fin] (hors `exclude`)."""
+        found = []
+        i = bisect_right(self.starts, fin) - 1
+        while i >= 0 and self.max_ends[i] >= debut:
+            if self.ends[i] >= debut and self.pks[i] != exclude:
+                found.append(self.pks[i])
+            i -= 1
+        return sorted(found)
+
+
+class AvailabilityIndex:
+    """Index des véhicules et de leurs réservations (voir build_index)."""
+
+    def __init__(self, vehicles, bookings, version=None):
+        # vehicles : pk -> (statut, type_vehicule_id, type_carburant_id, type_transmission_id, proprietaire_id)
+        self.vehicles = vehicles
+        self.bookings = bookings
+        self.version = version
+
+    def conflicts(self, vehicule_id, debut, fin, exclude_location=None):
+        intervals = self.bookings.get(vehicule_id)
+        return intervals.conflicts(debut, fin, exclude_location) if intervals else []
+
+    def is_available(self, vehicule_id, debut, fin, exclude_location=None):
+        if exclude_location is not None:
+            return not self.conflicts(vehicule_id, debut, fin, exclude_location)
+        intervals = self.bookings.get(vehicule_id)
+        return intervals is None or not intervals.overlaps(debut, fin)
+
+    def available(self, debut, fin, type_vehicule=None, type_carburant=None, type_transmission=None,
+                  statuts=('parc',), proprietaire=None):
+        """Identifiants (triés) des véhicules libres sur [debut, fin] correspondant aux critères."""
+        result = []
+        for pk, (statut, type_v, carburant, transmission, owner) in self.vehicles.items():
+            if statut not in statuts:
+                continue
+            if type_vehicule is not None and type_v != type_vehicule:
+                continue
+            if type_carburant is not None and carburant != type_carburant:
+                continue
+            if type_transmission is not None and transmission != type_transmission:
+                continue
+            if proprietaire is not None and owner != proprietaire:
+                continue
+            intervals = self.bookings.get(pk)
+            if intervals is None or not intervals.overlaps(debut, fin):
+                result.append(pk)
+        result.sort()
+        return result
+
+
+def build_index(version=None):
+    """Construit l'index depuis la base (deux requêtes)."""
+    start = time.perf_counter()
+    vehicles = {
+        row[0]: row[1:] for row in Vehicule.objects.values_list(
+            'pk', 'statut', 'type_vehicule_id', 'type_carburant_id', 'type_transmission_id', 'proprietaire_id',
+        ).iterator(chunk_size=5000)
+    }
+    rows = {}
+    today = timezone.localdate()
+    for vehicule_id, debut, fin, statut, pk in Location.objects.filter(statut__in=BLOCKING_STATUTS).values_list(
+        'vehicule_id', 'date_debut', 'date_fin', 'statut', 'pk',
+    ).iterator(chunk_size=5000):
+        if statut == 'en_cours' and fin < today:
+            fin = today  # retour en retard : le véhicule reste indisponible
+        rows.setdefault(vehicule_id, []).append((debut, max(debut, fin), pk))
+    bookings = {vehicule_id: _VehicleIntervals(r) for vehicule_id, r in rows.items()}
+    logger.debug('Index de disponibilité : %s véhicules, %s locations en %.1f ms', len(vehicles),
+                 sum(len(r) for r in rows.values()), (time.perf_counter() - start) * 1000)
+    return AvailabilityIndex(vehicles, bookings, version)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Index courant du processus, reconstruit si les générations Location / Vehicule ou la date ont changé."""
+    global _index
+    version = (*get_data_version(Location, Vehicule), timezone.localdate())
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = build_index(version)
+        return _index
+
+
+def invalidate():
+    """Oublie l'index du processus (tests, écritures hors signaux sans renouvellement de génération)."""
+    global _index
+    _index = None
+
+
+# ——— Raccourcis ———
+
+def available_vehicles(debut, fin, **criteres):
+    return get_index().available(debut, fin, **criteres)
+
+
+def booking_conflicts(vehicule_id, debut, fin, exclude_location=None):
+    return get_index().conflicts(vehicule_id, debut, fin, exclude_location)
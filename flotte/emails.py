@@ -1,4 +1,8 @@
-"""Envoi d'emails FLOTTE — bienvenue, notifications (templates HTML)."""
+"""
+Envoi d'emails FLOTTE — bienvenue, notifications (templates HTML).
+Les emails déclenchés par une modification passent par la file flotte.outbox (queue_mail_html) ;
+send_mail_html envoie immédiatement (email de test).
+"""
 import logging
 import sys
 from django.conf import settings
@@ -6,6 +10,8 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.contrib.sites.models import Site
 
+from .outbox import queue_mail_html
+
 logger = logging.getLogger(__name__)
 
 
@@ -48,9 +54,10 @@ def send_mail_html(subject, body_html, to_emails, body_text=None, from_email=Non
 
 def send_welcome_email(user):
     """
-    Envoie l'email de bienvenue à un nouvel utilisateur (compte créé).
+    Met en file l'email de bienvenue d'un nouvel utilisateur (compte créé), dans la transaction
+    de création : envoyé ensuite par `python manage.py send_outbox`.
     Appelé par le signal post_save User (created=True).
-    Les erreurs d'envoi sont loguées mais n'empêchent pas la création du compte.
+    Les erreurs de rendu sont loguées mais n'empêchent pas la création du compte.
     """
     if not getattr(user, 'email', None) or not str(user.email).strip():
         return
@@ -68,8 +75,8 @@ def send_welcome_email(user):
         subject = render_to_string('flotte/emails/welcome_subject.txt', context).strip()
         body_html = render_to_string('flotte/emails/welcome_email.html', context)
         body_text = render_to_string('flotte/emails/welcome_email.txt', context)
-        send_mail_html(subject, body_html, [user.email], body_text=body_text)
+        queue_mail_html(subject, body_html, [user.email], body_text=body_text)
     except Exception as e:
-        logger.warning('Email de bienvenue non envoyé pour %s: %s', user.username, e)
+        logger.warning('Email de bienvenue non mis en file pour %s: %s', user.username, e)
         if getattr(settings, 'DEBUG', False):
-            print('[FLOTTE] Email de bienvenue non envoyé:', e, file=sys.stderr)
+            print('[FLOTTE] Email de bienvenue non mis en file:', e, file=sys.stderr)
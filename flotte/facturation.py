@@ -0,0 +1,251 @@
+"""
+Facturation mensuelle des locations FLOTTE (commande `python manage.py run_billing AAAA-MM`).
+
+Pour chaque location active sur le mois (dates du contrat chevauchant le mois, quel que soit son
+statut), une Facture est créée :
+- loyer au prorata des jours loués dans le mois (loyer_mensuel × jours / jours du mois) ;
+- kilomètres supplémentaires : km parcourus sur la période (relevés de carburant datés :
+  dernier relevé au plus tard le premier jour, dernier relevé au plus tard le dernier jour)
+  au-delà des km inclus au prorata, × prix_km_supplementaire ;
+- contraventions de la location pas encore refacturées, datées au plus tard de la fin du mois.
+Les frais annexes (coût global du contrat) restent hors facturation mensuelle.
+
+Les locations sont traitées par lots (FLOTTE_FACTURATION_BATCH_SIZE), chacun dans sa transaction :
+numéros réservés en bloc (SequenceNumero), factures en bulk_create, contraventions rattachées en
+bulk_update. Une facture par (location, mois) (contrainte unique) : une facturation interrompue
+se relance et ne traite que les locations restantes. bulk_create n'émettant pas de signaux, le
+journal d'audit n'enregistre pas ces factures ; les générations de cache sont incrémentées.
+"""
+import calendar
+import logging
+from bisect import bisect_right
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+
+from .http_cache import bump_data_version
+from .models import Contravention, Facture, Location, ReleveCarburant, SequenceNumero
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+TYPE_FACTURE = 'Location'
+# Relevé kilométrique de départ cherché jusqu'à 3 mois avant le début du mois
+RECUL_RELEVES_JOURS = 92
+
+
+def get_batch_size():
+    return int(getattr(settings, 'FLOTTE_FACTURATION_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+
+def bornes_mois(mois):
+    """Premier et dernier jour du mois de `mois` (date quelconque du mois)."""
+    debut = mois.replace(day=1)
+    return debut, debut.replace(day=calendar.monthrange(debut.year, debut.month)[1])
+
+
+def _arrondi(valeur):
+    return Decimal(valeur).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+
+
+# ——— Numérotation ———
+
+def prefixe_facture(jour):
+    return f'FAC-{jour.year}-'
+
+
+def _dernier_numero(prefixe, sequence=0):
+    """Plus grand numéro attribué : compteur de séquence ou plus grand numéro existant pour le préfixe."""
+    plus_grand = Facture.objects.filter(numero__startswith=prefixe).aggregate(n=Max('numero'))['n']
+    suffixe = (plus_grand or '')[len(prefixe):]
+    return max(sequence, int(suffixe) if suffixe.isdigit() else 0)
+
+
+def prochain_numero(prefixe):
+    """Numéro suggéré (sans réservation) pour une facture saisie à la main."""
+    sequence = SequenceNumero.objects.filter(prefixe=prefixe).values_list('dernier', flat=True).first() or 0
+    return f'{prefixe}{_dernier_numero(prefixe, sequence) + 1:05d}'
+
+
+def allouer_numeros(prefixe, nombre):
+    """
+    Réserve `nombre` numéros consécutifs pour `prefixe` ; retourne le premier. Le compteur reprend
+    au-delà du plus grand numéro existant (factures saisies à la main).
+    À appeler dans une transaction : la ligne de séquence reste verrouillée jusqu'au COMMIT.
+    """
+    SequenceNumero.objects.get_or_create(prefixe=prefixe)
+    sequence = SequenceNumero.objects.select_for_update().get(prefixe=prefixe)
+    premier = _dernier_numero(prefixe, sequence.dernier) + 1
+    sequence.dernier = premier + nombre - 1
+    sequence.save(update_fields=['dernier'])
+    return premier
+
+
+# ——— Calcul ———
+
+def _releves_par_vehicule(vehicule_ids, depuis, jusqua):
+    """{vehicule_id: ([dates triées], [km])} : relevés datés du `depuis` au `jusqua`."""
+    releves = {}
+    rows = (
+        ReleveCarburant.objects.filter(vehicule_id__in=vehicule_ids, date_releve__range=(depuis, jusqua))
+        .order_by('vehicule_id', 'date_releve', 'id')
+        .values_list('vehicule_id', 'date_releve', 'kilometrage')
+    )
+    for vehicule_id, jour, km in rows:
+        dates, kms = releves.setdefault(vehicule_id, ([], []))
+        dates.append(jour)
+        kms.append(km)
+    return releves
+
+
+def km_parcourus(releves, debut, fin):
+    """Km parcourus du `debut` au `fin` d'après les relevés (0 sans deux relevés exploitables)."""
+    if not releves:
+        return 0
+    dates, kms = releves
+    i_fin = bisect_right(dates, fin) - 1
+    if i_fin < 0:
+        return 0
+    # Relevé de départ : le dernier au plus tard le premier jour, sinon le premier de la période
+    i_debut = max(bisect_right(dates, debut) - 1, 0)
+    return max(kms[i_fin] - kms[i_debut], 0)
+
+
+def calculer_ligne(location, mois, releves=None, contraventions=()):
+    """
+    Montants de la facture d'une location pour le mois (dict), ou None si la location n'est pas
+    active sur le mois. location : objet ou dict (champs de Location) ; contraventions : objets à refacturer.
+    """
+    champ = location.get if isinstance(location, dict) else partial(getattr, location)
+    mois_debut, mois_fin = bornes_mois(mois)
+    debut, fin = max(champ('date_debut'), mois_debut), min(champ('date_fin'), mois_fin)
+    if debut > fin:
+        return None
+    jours, jours_mois = (fin - debut).days + 1, (mois_fin - mois_debut).days + 1
+    loyer = _arrondi((champ('loyer_mensuel') or 0) * Decimal(jours) / jours_mois)
+
+    km = km_parcourus(releves, debut, fin)
+    km_inclus = round((champ('km_inclus_mois') or 0) * jours / jours_mois)
+    km_sup = max(km - km_inclus, 0) if champ('km_inclus_mois') is not None else 0
+    montant_km = _arrondi(km_sup * (champ('prix_km_supplementaire') or 0))
+
+    montant_contraventions = sum((c.montant or Decimal(0)) for c in contraventions)
+    return {
+        'periode_debut': debut.isoformat(),
+        'periode_fin': fin.isoformat(),
+        'jours': jours,
+        'jours_mois': jours_mois,
+        'loyer': str(loyer),
+        'km_parcourus': km,
+        'km_inclus': km_inclus,
+        'km_supplementaires': km_sup,
+        'montant_km': str(montant_km),
+        'contraventions': [c.pk for c in contraventions],
+        'montant_contraventions': str(montant_contraventions),
+        'total': str(loyer + montant_km + montant_contraventions),
+    }
+
+
+# ——— Facturation par lots ———
+
+CHAMPS_LOCATION = (
+    'pk', 'vehicule_id', 'locataire', 'date_debut', 'date_fin',
+    'loyer_mensuel', 'km_inclus_mois', 'prix_km_supplementaire',
+)
+
+
+def locations_a_facturer(mois):
+    """Locations actives sur le mois et pas encore facturées pour ce mois, par pk croissant."""
+    mois_debut, mois_fin = bornes_mois(mois)
+    return (
+        Location.objects.filter(date_debut__lte=mois_fin, date_fin__gte=mois_debut)
+        .exclude(factures__periode=mois_debut)
+        .order_by('pk')
+    )
+
+
+def _calculer_lot(locations, mois):
+    """Lignes (location, contraventions, détail) d'un lot de locations (dicts), en deux requêtes."""
+    mois_debut, mois_fin = bornes_mois(mois)
+    releves = _releves_par_vehicule(
+        {loc['vehicule_id'] for loc in locations}, mois_debut - timedelta(days=RECUL_RELEVES_JOURS), mois_fin,
+    )
+    contraventions = {}
+    for c in Contravention.objects.filter(
+        location_id__in=[loc['pk'] for loc in locations], facture__isnull=True,
+    ).filter(Q(date_contravention__isnull=True) | Q(date_contravention__lte=mois_fin)).order_by('pk'):
+        contraventions.setdefault(c.location_id, []).append(c)
+    lignes = []
+    for loc in locations:
+        a_refacturer = contraventions.get(loc['pk'], [])
+        detail = calculer_ligne(loc, mois, releves.get(loc['vehicule_id']), a_refacturer)
+        if detail and Decimal(detail['total']) > 0:
+            lignes.append((loc, a_refacturer, detail))
+    return lignes
+
+
+def _enregistrer_lot(lignes, mois):
+    """Crée les factures d'un lot (numéros réservés en bloc) et y rattache les contraventions."""
+    mois_debut, mois_fin = bornes_mois(mois)
+    prefixe = prefixe_facture(mois_fin)
+    with transaction.atomic():
+        premier = allouer_numeros(prefixe, len(lignes))
+        factures = Facture.objects.bulk_create([
+            Facture(
+                vehicule_id=loc['vehicule_id'],
+                location_id=loc['pk'],
+                periode=mois_debut,
+                numero=f'{prefixe}{premier + i:05d}',
+                date_facture=mois_fin,
+                montant=Decimal(detail['total']),
+                type_facture=TYPE_FACTURE,
+                remarque=f"Location {loc['locataire']} — {mois_debut:%m/%Y}",
+                detail=detail,
+            )
+            for i, (loc, _, detail) in enumerate(lignes)
+        ])
+        rattachees = []
+        for facture, (_, contraventions, _) in zip(factures, lignes):
+            for c in contraventions:
+                c.facture_id = facture.pk
+                rattachees.append(c)
+        Contravention.objects.bulk_update(rattachees, ['facture'], batch_size=get_batch_size())
+    return factures
+
+
+def facturer_mois(mois, apercu=False, batch_size=None):
+    """
+    Facture les locations du mois par lots. apercu=True : calcule sans rien écrire.
+    Retourne {'locations', 'factures', 'total', 'lignes' (aperçu : détail par location)}.
+    """
+    batch_size = batch_size or get_batch_size()
+    mois_debut, _ = bornes_mois(mois)
+    stats = {'locations': 0, 'factures': 0, 'total': Decimal(0), 'lignes': []}
+    dernier_pk = 0
+    qs = locations_a_facturer(mois_debut).values(*CHAMPS_LOCATION)
+    while True:
+        # Pagination par pk (et non par décalage) : les locations facturées sortent de la requête
+        lot = list(qs.filter(pk__gt=dernier_pk)[:batch_size])
+        if not lot:
+            break
+        dernier_pk = lot[-1]['pk']
+        lignes = _calculer_lot(lot, mois_debut)
+        stats['locations'] += len(lot)
+        stats['total'] += sum((Decimal(detail['total']) for _, _, detail in lignes), Decimal(0))
+        if apercu:
+            stats['lignes'] += [{'location_id': loc['pk'], 'locataire': loc['locataire'], **detail}
+                                for loc, _, detail in lignes]
+            stats['factures'] += len(lignes)
+            continue
+        if lignes:
+            stats['factures'] += len(_enregistrer_lot(lignes, mois_debut))
+            logger.info('Facturation %s : lot jusqu\'à la location %s, %s facture(s)',
+                        f'{mois_debut:%Y-%m}', dernier_pk, len(lignes))
+    if stats['factures'] and not apercu:
+        bump_data_version(Facture)
+        bump_data_version(Contravention)
+    return stats
@@ -7,6 +7,7 @@ from django.db import DatabaseError
 from django.utils.html import escape, format_html
 from django.utils.safestring import mark_safe
 from django_countries import countries
+from .availability import BLOCKING_STATUTS, booking_conflicts
 from .models import (
     Marque, Modele, TypeCarburant, TypeTransmission, TypeVehicule,
     Vehicule, Location, ImportDemarche, Depense, DocumentVehicule,
@@ -41,7 +42,7 @@ TYPES_REPARATION = [
     'Carrosserie', 'Mécanique', 'Freinage', 'Distribution', 'Climatisation',
     'Électricité', 'Pneumatiques', 'Vidange', 'Amortisseurs', 'Autre',
 ]
-TYPES_FACTURE = ['Achat', 'Réparation', 'Assurance', 'Entretien', 'Pièces', 'Carburant', 'Autre']
+TYPES_FACTURE = ['Achat', 'Réparation', 'Assurance', 'Entretien', 'Pièces', 'Carburant', 'Location', 'Autre']
 MOTIFS_CONTRAVENTION = [
     'Excès de vitesse', 'Stationnement interdit', 'Non-respect de la signalisation',
     'Défaut de ceinture', 'Téléphone au volant', 'Défaut d\'assurance',
@@ -445,9 +446,11 @@ class LocationForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Véhicules éligibles : au parc (nouvelle location) ou véhicule courant (modification)
         from django.db.models import Q
-        qs = Vehicule.objects.filter(statut='parc').order_by('marque__nom', 'modele__nom')
+        qs = Vehicule.objects.select_related('marque', 'modele').filter(statut='parc').order_by('marque__nom', 'modele__nom')
         if self.instance and self.instance.pk and self.instance.vehicule_id:
-            qs = Vehicule.objects.filter(Q(statut='parc') | Q(pk=self.instance.vehicule_id)).distinct().order_by('marque__nom', 'modele__nom')
+            qs = Vehicule.objects.select_related('marque', 'modele').filter(
+                Q(statut='parc') | Q(pk=self.instance.vehicule_id)
+            ).distinct().order_by('marque__nom', 'modele__nom')
         self.fields['vehicule'].queryset = qs
         self.fields['conducteur'].queryset = Conducteur.objects.filter(actif=True).order_by('nom', 'prenom')
         self.fields['conducteur'].required = False
@@ -470,6 +473,24 @@ class LocationForm(forms.ModelForm):
         except (DatabaseError, Exception):
             self.fields['locataire'].widget = DatalistWidget(choices=[], attrs={'class': 'form-input'})
 
+    def clean(self):
+        cleaned = super().clean()
+        vehicule = cleaned.get('vehicule')
+        debut, fin = cleaned.get('date_debut'), cleaned.get('date_fin')
+        if debut and fin and fin < debut:
+            self.add_error('date_fin', 'La date de fin doit être postérieure à la date de début.')
+            return cleaned
+        # Chevauchement avec une autre location à venir / en cours du même véhicule
+        if vehicule and debut and fin and cleaned.get('statut') in BLOCKING_STATUTS:
+            conflits = booking_conflicts(vehicule.pk, debut, fin, exclude_location=self.instance.pk)
+            if conflits:
+                periodes = ', '.join(
+                    f"{loc.locataire or 'location'} du {loc.date_debut:%d/%m/%Y} au {loc.date_fin:%d/%m/%Y}"
+                    for loc in Location.objects.filter(pk__in=conflits).order_by('date_debut')[:5]
+                )
+                self.add_error('vehicule', f'Véhicule déjà réservé sur cette période : {periodes}.')
+        return cleaned
+
 
 class ImportDemarcheForm(forms.ModelForm):
     class Meta:
@@ -732,7 +753,9 @@ class MaintenanceForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['vehicule'].queryset = Vehicule.objects.all().order_by('marque__nom', 'modele__nom')
+        self.fields['vehicule'].queryset = Vehicule.objects.select_related('marque', 'modele').order_by(
+            'marque__nom', 'modele__nom'
+        )
         try:
             m = list(Maintenance.objects.exclude(prestataire='').values_list('prestataire', flat=True))
             r = list(Reparation.objects.exclude(prestataire='').values_list('prestataire', flat=True))
@@ -763,7 +786,9 @@ class ReleveCarburantForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['vehicule'].queryset = Vehicule.objects.all().order_by('marque__nom', 'modele__nom')
+        self.fields['vehicule'].queryset = Vehicule.objects.select_related('marque', 'modele').order_by(
+            'marque__nom', 'modele__nom'
+        )
         try:
             lieux = sorted(
                 ReleveCarburant.objects.exclude(lieu='')
@@ -825,7 +850,7 @@ class PartieImporteeForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.vehicule_filtre = kwargs.pop('vehicule_filtre', None)
         super().__init__(*args, **kwargs)
-        qs = Vehicule.objects.all().order_by('marque__nom', 'modele__nom')
+        qs = Vehicule.objects.select_related('marque', 'modele').order_by('marque__nom', 'modele__nom')
         if self.vehicule_filtre:
             self.fields['vehicule'].initial = self.vehicule_filtre
         self.fields['vehicule'].queryset = qs
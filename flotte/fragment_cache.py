@@ -0,0 +1,79 @@
+"""
+Cache de fragments de gabarits FLOTTE ({% load flotte_fragments %} … {% fragment_cache %}).
+
+Chaque type de fragment déclare les modèles qu'il affiche : sa version combine les générations
+de ces modèles (flotte.http_cache, renouvelées par post_save / post_delete et après les écritures
+en masse), de sorte qu'une modification invalide exactement les fragments concernés. La clé
+ajoute le périmètre de données de l'utilisateur (rôle, ou utilisateur pour le rôle 'user' dont
+les listes sont filtrées sur ses véhicules), les valeurs « vary on » du gabarit et, pour les
+fragments datés (alertes à 30 jours, véhicules disponibles du jour), la date du jour.
+
+Les vues passent des valeurs paresseuses (SimpleLazyObject) pour que les requêtes SQL d'un
+fragment servi depuis le cache ne soient pas exécutées.
+
+FLOTTE_FRAGMENT_CACHE_TIMEOUT : durée de vie (secondes) des fragments ; 0 désactive le cache.
+FLOTTE_FRAGMENT_CACHE_ROWS : False désactive les fragments par ligne (ROW_FRAGMENTS), une entrée
+de cache par véhicule étant trop coûteuse pour le cache fichier.
+"""
+import hashlib
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from .http_cache import get_data_version
+from .mixins import is_admin, is_manager_or_admin
+
+KEY_PREFIX = 'flotte:fragment'
+DEFAULT_TIMEOUT = 3600
+
+# Type de fragment -> modèles affichés
+FRAGMENT_MODELS = {
+    'sidebar': (),
+    'tuiles': ('Vehicule', 'Location', 'Marque'),
+    'alertes': (
+        'Location', 'Vehicule', 'Marque', 'Modele', 'Conducteur', 'DocumentVehicule', 'TypeDocument',
+    ),
+    'vehicule_ligne': (
+        'Vehicule', 'Marque', 'Modele', 'TypeVehicule', 'TypeCarburant', 'TypeTransmission',
+    ),
+}
+# Fragments dont le contenu dépend de la date du jour (fenêtres d'échéance, disponibilités du jour)
+DAILY_FRAGMENTS = {'alertes', 'tuiles'}
+# Fragments mis en cache ligne par ligne (une entrée par objet)
+ROW_FRAGMENTS = {'vehicule_ligne'}
+
+
+def get_timeout(fragment=None):
+    """Durée de vie des fragments (0 = pas de cache), nulle pour les fragments par ligne désactivés."""
+    if fragment in ROW_FRAGMENTS and not getattr(settings, 'FLOTTE_FRAGMENT_CACHE_ROWS', True):
+        return 0
+    return int(getattr(settings, 'FLOTTE_FRAGMENT_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+
+def fragment_scope(request):
+    """Périmètre des données affichées : 'admin', 'manager' ou 'user-<pk>' (données filtrées)."""
+    if is_admin(request):
+        return 'admin'
+    if is_manager_or_admin(request):
+        return 'manager'
+    return f'user-{getattr(request.user, "pk", None)}'
+
+
+def fragment_version(fragment):
+    """Version courante d'un type de fragment (générations de ses modèles)."""
+    if fragment not in FRAGMENT_MODELS:
+        raise KeyError(f'Type de fragment inconnu : {fragment!r}')
+    models = [apps.get_model('flotte', name) for name in FRAGMENT_MODELS[fragment]]
+    version = '.'.join(str(v) for v in get_data_version(*models))
+    if fragment in DAILY_FRAGMENTS:
+        version = f'{version}@{timezone.localdate():%Y%m%d}'
+    return version
+
+
+def fragment_key(fragment, version, vary_on=()):
+    """Clé de cache : type, version et empreinte des valeurs « vary on »."""
+    digest = hashlib.md5(
+        ':'.join(str(v) for v in vary_on).encode(), usedforsecurity=False
+    ).hexdigest()
+    return f'{KEY_PREFIX}:{fragment}:{version}:{digest}'
@@ -0,0 +1,245 @@
+"""
+Génération de données FLOTTE à grande échelle (commande generate_fleet, benchmarks).
+
+Les données sont produites par lots de véhicules, chaque lot avec son propre générateur
+aléatoire initialisé par (graine, numéro de lot) : le résultat ne dépend ni de l'ordre
+d'exécution ni du nombre de processus. Ce module n'accède pas à la base (fonctions pures,
+exécutables dans un pool de processus) : il retourne des dictionnaires de champs, insérés
+par bulk_create dans la commande.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+STATUTS_VEHICULE = (('parc', 70), ('import', 10), ('vendu', 20))
+COULEURS = ('Blanc', 'Noir', 'Gris', 'Argent', 'Bleu', 'Rouge', 'Beige', 'Vert')
+PAYS = ('Japon', 'Allemagne', 'France', 'Belgique', 'Émirats arabes unis', 'États-Unis', 'Corée du Sud')
+TYPES_LOCATION = ('LLD', 'LOA', 'Location courte')
+VILLES = ('Abidjan', 'Yamoussoukro', 'Bouaké', 'San-Pédro', 'Korhogo', 'Daloa')
+STATIONS = ('Total', 'Shell', 'Petroci', 'Oryx', 'Vivo Energy')
+PRESTATAIRES = ('Garage Central', 'Auto Service Plus', 'Méca Express', 'Garage du Plateau')
+MOTIFS_CONTRAVENTION = ('Excès de vitesse', 'Stationnement interdit', 'Feu rouge', 'Défaut de ceinture')
+TYPES_FACTURE = ('Achat', 'Réparation', 'Assurance', 'Entretien')
+TYPES_DEPENSE = ('entretien', 'reparation', 'carburant', 'assurance', 'autre')
+TYPES_MAINTENANCE = ('vidange', 'courroie', 'pneus', 'filtres', 'plaquettes', 'batterie')
+DOCUMENTS = ('Carte grise', 'Assurance', 'Contrôle technique')
+PRIX_LITRE = 875  # FCFA
+
+
+def prefixe_chassis(seed):
+    """Préfixe des numéros de châssis générés pour une graine donnée."""
+    return f'GEN{seed}-'
+
+
+def _montant(rng, mini, maxi, pas=1000):
+    return Decimal(rng.randrange(mini // pas, maxi // pas + 1) * pas)
+
+
+def _statut(rng):
+    tirage = rng.randrange(100)
+    for statut, poids in STATUTS_VEHICULE:
+        if tirage < poids:
+            return statut
+        tirage -= poids
+    return 'parc'
+
+
+def _statut_location(debut, fin, aujourdhui):
+    if fin < aujourdhui:
+        return 'termine'
+    if debut > aujourdhui:
+        return 'a_venir'
+    return 'en_cours'
+
+
+def generer_lot(seed, lot, debut, taille, refs, aujourdhui, annees):
+    """
+    Génère les véhicules [debut, debut + taille) et leurs données liées.
+
+    refs : identifiants du paramétrage (modeles = [(marque_id, modele_id)], carburants,
+    transmissions, types_vehicule, types_document = [(id, libelle)], conducteurs).
+    Retourne {'vehicules': [champs], 'enfants': {nom_modele: [(position, champs[, sous-objets])]}}.
+    """
+    rng = random.Random(f'{seed}:{lot}')
+    origine = aujourdhui - timedelta(days=365 * annees)
+    duree_fenetre = (aujourdhui - origine).days
+    prefixe = prefixe_chassis(seed)
+    vehicules = []
+    enfants = {nom: [] for nom in (
+        'ReleveCarburant', 'Maintenance', 'Depense', 'Reparation', 'DocumentVehicule',
+        'ChargeImport', 'Vente', 'Facture', 'Location',
+    )}
+
+    for pos in range(taille):
+        index = debut + pos
+        statut = _statut(rng)
+        marque_id, modele_id = rng.choice(refs['modeles']) if refs['modeles'] else (None, None)
+        entree = origine + timedelta(days=rng.randrange(max(1, duree_fenetre - 30)))
+        km_entree = rng.randrange(0, 150000, 100)
+        km_jour = rng.randint(30, 150)
+        prix_achat = _montant(rng, 4000000, 40000000, 50000)
+        fin_activite = aujourdhui
+        vente_date = None
+        if statut == 'vendu':
+            vente_date = entree + timedelta(days=rng.randint(60, max(61, (aujourdhui - entree).days)))
+            vente_date = min(vente_date, aujourdhui)
+            fin_activite = vente_date
+        jours_actifs = max(0, (fin_activite - entree).days)
+
+        # Relevés carburant : progression régulière du compteur (un plein toutes les 2 à 6 semaines)
+        km, jour = km_entree, entree
+        if statut != 'import':
+            while True:
+                jour = jour + timedelta(days=rng.randint(14, 42))
+                if jour > fin_activite:
+                    break
+                km += km_jour * rng.randint(14, 42)
+                litres = Decimal(rng.randint(2000, 7000)) / 100
+                enfants['ReleveCarburant'].append((pos, {
+                    'date_releve': jour, 'kilometrage': km, 'litres': litres,
+                    'prix_litre': Decimal(PRIX_LITRE),
+                    'montant_fcfa': (litres * PRIX_LITRE).quantize(Decimal(1)),
+                    'lieu': rng.choice(STATIONS),
+                }))
+        km_actuel = km if km > km_entree else km_entree + km_jour * jours_actifs
+
+        vehicules.append({
+            'numero_chassis': f'{prefixe}{index:07d}',
+            'marque_id': marque_id,
+            'modele_id': modele_id,
+            'annee': entree.year - rng.randint(0, 8),
+            'type_vehicule_id': rng.choice(refs['types_vehicule']) if refs['types_vehicule'] else None,
+            'type_carburant_id': rng.choice(refs['carburants']) if refs['carburants'] else None,
+            'type_transmission_id': rng.choice(refs['transmissions']) if refs['transmissions'] else None,
+            'couleur_exterieure': rng.choice(COULEURS),
+            'date_entree_parc': entree,
+            'km_entree': km_entree,
+            'kilometrage_actuel': km_actuel,
+            'prix_achat': prix_achat,
+            'origine_pays': rng.choice(PAYS),
+            'statut': statut,
+            'numero_immatriculation': '' if statut == 'import' else f'{rng.randint(1000, 9999)} G{index % 26 + 1:02d}',
+            'km_prochaine_vidange': (km_actuel // 10000 + 1) * 10000,
+            'date_expiration_ct': aujourdhui + timedelta(days=rng.randint(-60, 365)),
+            'date_expiration_assurance': aujourdhui + timedelta(days=rng.randint(-60, 365)),
+        })
+
+        if statut == 'import':
+            fret, douane, transit = (_montant(rng, 500000, 3000000), _montant(rng, 800000, 5000000),
+                                     _montant(rng, 100000, 600000))
+            enfants['ChargeImport'].append((pos, {
+                'fret': fret, 'frais_dedouanement': douane, 'frais_transitaire': transit,
+                'cout_total': fret + douane + transit,
+            }))
+
+        for libelle in DOCUMENTS:
+            type_id = next((i for i, lib in refs['types_document'] if lib == libelle), None)
+            emission = entree + timedelta(days=rng.randint(0, 30))
+            enfants['DocumentVehicule'].append((pos, {
+                'type_document_fk_id': type_id,
+                'type_document': '' if type_id else libelle,
+                'numero': f'{libelle[:2].upper()}-{index:07d}',
+                'date_emission': emission,
+                'date_echeance': emission + timedelta(days=365 * rng.randint(1, 3)),
+                'disponible': rng.random() < 0.9,
+            }))
+
+        annees_actives = max(1, jours_actifs // 365)
+        for _ in range(2 * annees_actives):
+            prevue = entree + timedelta(days=rng.randrange(max(1, jours_actifs + 60)))
+            effectuee = prevue <= aujourdhui and rng.random() < 0.8
+            km_prevu = km_entree + km_jour * max(0, (prevue - entree).days)
+            enfants['Maintenance'].append((pos, {
+                'type_maintenance': rng.choice(TYPES_MAINTENANCE),
+                'date_prevue': prevue,
+                'kilometrage_prevu': km_prevu,
+                'date_effectuee': prevue if effectuee else None,
+                'kilometrage_effectue': km_prevu if effectuee else None,
+                'cout': _montant(rng, 20000, 400000) if effectuee else None,
+                'prestataire': rng.choice(PRESTATAIRES),
+                'statut': 'effectue' if effectuee else 'a_faire',
+            }))
+            enfants['Depense'].append((pos, {
+                'type_depense': rng.choice(TYPES_DEPENSE),
+                'libelle': 'Dépense générée',
+                'montant': _montant(rng, 10000, 800000),
+                'date_depense': entree + timedelta(days=rng.randrange(max(1, jours_actifs))),
+            }))
+        if rng.random() < 0.5:
+            date_rep = entree + timedelta(days=rng.randrange(max(1, jours_actifs)))
+            enfants['Reparation'].append((pos, {
+                'date_reparation': date_rep,
+                'kilometrage': km_entree + km_jour * (date_rep - entree).days,
+                'type_rep': rng.choice(('Carrosserie', 'Mécanique', 'Électricité')),
+                'description': 'Réparation générée',
+                'cout': _montant(rng, 50000, 1500000),
+                'prestataire': rng.choice(PRESTATAIRES),
+            }))
+
+        for n in range(annees_actives):
+            date_facture = entree + timedelta(days=rng.randrange(max(1, jours_actifs)))
+            penalites = []
+            if rng.random() < 0.1:
+                penalites.append({
+                    'date_penalite': date_facture + timedelta(days=rng.randint(15, 60)),
+                    'montant': _montant(rng, 5000, 100000),
+                    'remarque': 'Retard de paiement',
+                })
+            enfants['Facture'].append((pos, {
+                'numero': f'F-{index:07d}-{n + 1:02d}',
+                'fournisseur': rng.choice(PRESTATAIRES),
+                'date_facture': date_facture,
+                'montant': _montant(rng, 50000, 2000000),
+                'type_facture': rng.choice(TYPES_FACTURE),
+            }, penalites))
+
+        # Locations successives sans chevauchement, au parc uniquement
+        if statut == 'parc':
+            debut_loc = entree + timedelta(days=rng.randint(0, 60))
+            while debut_loc < aujourdhui + timedelta(days=30) and rng.random() < 0.7:
+                fin_loc = debut_loc + timedelta(days=rng.choice((7, 30, 90, 180, 365)))
+                contraventions = [{
+                    'date_contravention': debut_loc + timedelta(days=rng.randrange(max(1, (fin_loc - debut_loc).days))),
+                    'motif': rng.choice(MOTIFS_CONTRAVENTION),
+                    'reference': f'PV-{index:07d}-{k}',
+                    'montant': _montant(rng, 5000, 50000),
+                    'lieu': rng.choice(VILLES),
+                } for k in range(rng.choice((0, 0, 0, 1, 2)))]
+                enfants['Location'].append((pos, {
+                    'conducteur_id': rng.choice(refs['conducteurs']) if refs['conducteurs'] else None,
+                    'locataire': f'Client {rng.randint(1, 5000)}',
+                    'type_location': rng.choice(TYPES_LOCATION),
+                    'date_debut': debut_loc,
+                    'date_fin': fin_loc,
+                    'loyer_mensuel': _montant(rng, 150000, 900000),
+                    'km_inclus_mois': rng.choice((1500, 2000, 3000)),
+                    'prix_km_supplementaire': Decimal(rng.choice((50, 75, 100))),
+                    'date_expiration_ct': fin_loc + timedelta(days=rng.randint(-30, 300)),
+                    'date_expiration_assurance': fin_loc + timedelta(days=rng.randint(-30, 300)),
+                    'km_prochaine_vidange': (km_actuel // 10000 + 1) * 10000,
+                    'statut': _statut_location(debut_loc, fin_loc, aujourdhui),
+                }, contraventions))
+                debut_loc = fin_loc + timedelta(days=rng.randint(1, 45))
+
+        if vente_date:
+            enfants['Vente'].append((pos, {
+                'date_vente': vente_date,
+                'acquereur': f'Acquéreur {rng.randint(1, 5000)}',
+                'prix_vente': (prix_achat * rng.randint(50, 110) / 100000).quantize(Decimal(1)) * 1000,
+                'km_vente': km_actuel,
+            }))
+
+    return {'vehicules': vehicules, 'enfants': enfants}
+
+
+def generer_conducteurs(seed, nombre, aujourdhui):
+    """Conducteurs (champs) déterministes pour la graine donnée."""
+    rng = random.Random(f'{seed}:conducteurs')
+    return [{
+        'nom': f'Conducteur{seed}-{i:05d}',
+        'prenom': rng.choice(('Awa', 'Koffi', 'Moussa', 'Aya', 'Yao', 'Fatou', 'Ibrahim')),
+        'telephone': f'07{rng.randint(10000000, 99999999)}',
+        'permis_numero': f'P{seed}-{i:06d}',
+        'permis_date_expiration': aujourdhui + timedelta(days=rng.randint(-90, 3650)),
+        'actif': rng.random() < 0.95,
+    } for i in range(nombre)]
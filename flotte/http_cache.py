@@ -0,0 +1,187 @@
+"""
+Cache HTTP conditionnel FLOTTE — ETag dérivé d'un numéro de version des données.
+
+Chaque modèle de l'app flotte a une génération (cache Django) renouvelée par post_save /
+post_delete, au COMMIT de la transaction d'écriture : une lecture concurrente ne peut pas associer
+la nouvelle génération à des données pas encore visibles. L'ETag d'une réponse combine l'URL,
+l'utilisateur, le format demandé et les générations des modèles lus : si le client renvoie le même
+ETag (If-None-Match), la vue répond 304 sans exécuter ses requêtes.
+
+- Vues fonctions : décorateur @conditional_json(Modele, ...).
+- ViewSets DRF : ConditionalResponseMixin + attribut etag_models.
+
+Cache-Control : private, max-age=FLOTTE_HTTP_CACHE_MAX_AGE (0 par défaut : le navigateur
+revalide à chaque appel, la revalidation ne coûte qu'une lecture du cache).
+En multi-processus, le cache doit être partagé (fichier, Redis…) pour que tous les workers
+voient la même génération. Une génération n'est pas incrémentée (incr du cache fichier : lecture
+puis écriture, non atomique entre processus) mais remplacée par une valeur jamais émise : deux
+écritures concurrentes ne peuvent pas produire la même valeur et perdre une invalidation.
+"""
+import hashlib
+import secrets
+import time
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import condition
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .metrics import HTTP_CACHE
+
+VERSION_PREFIX = 'flotte:data_version'
+DEFAULT_MAX_AGE = 0
+
+
+def get_max_age():
+    return int(getattr(settings, 'FLOTTE_HTTP_CACHE_MAX_AGE', DEFAULT_MAX_AGE))
+
+
+# ——— Générations par modèle ———
+
+def _version_key(model):
+    return f'{VERSION_PREFIX}:{model._meta.label_lower}'
+
+
+def _nouvelle_generation():
+    """Génération jamais émise : horodatage (ns) et aléa, sans lecture de la valeur précédente."""
+    return f'{time.time_ns():x}-{secrets.token_hex(4)}'
+
+
+def get_data_version(*models):
+    """
+    Générations des modèles donnés (valeurs opaques). Initialisées par une valeur neuve : après une
+    éviction du cache, la nouvelle valeur ne peut pas reprendre un ETag déjà émis.
+    """
+    return tuple(cache.get_or_set(_version_key(m), _nouvelle_generation, None) for m in models)
+
+
+async def aget_data_version(*models):
+    """Version async de get_data_version (cache.aget_or_set) : ne bloque pas la boucle d'événements."""
+    return tuple([await cache.aget_or_set(_version_key(m), _nouvelle_generation, None) for m in models])
+
+
+def _renouveler_data_version(model):
+    cache.set(_version_key(model), _nouvelle_generation(), None)
+
+
+def bump_data_version(sender, raw=False, using=None, **kwargs):
+    """
+    Receiver post_save / post_delete (connecté par modèle flotte), aussi appelé directement après
+    les écritures en masse : invalide les ETag des réponses qui lisent ce modèle. La génération est
+    renouvelée au COMMIT de la transaction en cours (immédiatement hors transaction).
+    """
+    if raw:
+        return
+    transaction.on_commit(partial(_renouveler_data_version, sender), using=using)
+
+
+def _etag(request, user, versions):
+    raw = '|'.join([
+        request.get_full_path(),
+        str(getattr(user, 'pk', None)),
+        request.META.get('HTTP_ACCEPT', ''),
+        ','.join(str(v) for v in versions),
+    ])
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compute_etag(request, models, user=None):
+    """ETag de la requête : URL complète, utilisateur, format (Accept) et générations des modèles."""
+    return _etag(request, user if user is not None else getattr(request, 'user', None), get_data_version(*models))
+
+
+async def acompute_etag(request, models):
+    """compute_etag pour les vues async : utilisateur par request.auser(), générations par le cache async."""
+    return _etag(request, await request.auser(), await aget_data_version(*models))
+
+
+def _compter_revalidation(request, response):
+    """Métrique hit (304) / miss (réponse complète) des lectures à ETag."""
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        match = getattr(request, 'resolver_match', None)
+        HTTP_CACHE.inc(view=match.view_name if match else '',
+                       result='hit' if response.status_code == 304 else 'miss')
+
+
+# ——— Vues fonctions ———
+
+def conditional_json(*models, max_age=None):
+    """
+    Décorateur : ETag + réponse 304 (If-None-Match) avant exécution de la vue,
+    Cache-Control private. À placer sous @login_required / @manager_or_admin_required.
+    Accepte aussi les vues async.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return _async_conditional_view(view_func, models, max_age)
+        conditional_view = condition(etag_func=lambda request, *a, **kw: compute_etag(request, models))(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            _compter_revalidation(request, response)
+            patch_cache_control(response, private=True, max_age=get_max_age() if max_age is None else max_age)
+            return response
+        return _wrapped
+    return decorator
+
+
+def _async_conditional_view(view_func, models, max_age):
+    """conditional_json pour une vue async : l'utilisateur est chargé par request.auser()."""
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        etag = await acompute_etag(request, models)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = await view_func(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD'):
+            response.headers.setdefault('ETag', etag)
+        _compter_revalidation(request, response)
+        patch_cache_control(response, private=True, max_age=get_max_age() if max_age is None else max_age)
+        return response
+    return _wrapped
+
+
+# ——— ViewSets DRF ———
+
+class _NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+class ConditionalResponseMixin:
+    """
+    Mixin ViewSet : l'ETag est vérifié après authentification / permissions (initial),
+    avant l'action ; 304 sans corps si inchangé. etag_models : modèles lus par le ViewSet.
+    """
+    etag_models = ()
+    cache_max_age = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._etag = None
+        if request.method not in ('GET', 'HEAD') or not self.etag_models:
+            return
+        self._etag = compute_etag(request, self.etag_models)
+        if get_conditional_response(request, etag=self._etag) is not None:
+            raise _NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, '_etag', None)
+        if etag and response.status_code in (200, 304):
+            _compter_revalidation(request, response)
+            response['ETag'] = etag
+            max_age = get_max_age() if self.cache_max_age is None else self.cache_max_age
+            patch_cache_control(response, private=True, max_age=max_age)
+        return response
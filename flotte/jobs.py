@@ -0,0 +1,35 @@
+"""
+Tâches planifiées FLOTTE (fonctions référencées par FLOTTE_SCHEDULER_JOBS, voir flotte.scheduler).
+
+Les transitions sont des UPDATE en masse : pas de signaux post_save (journal d'audit), les
+générations de cache (ETag, fragments) sont incrémentées explicitement.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from .http_cache import bump_data_version
+from .models import Location
+
+logger = logging.getLogger(__name__)
+
+
+def update_location_statuts(today=None):
+    """
+    Statut des locations selon leurs dates : à venir -> en cours (début atteint),
+    à venir / en cours -> terminé (fin dépassée). Retourne un résumé des lignes modifiées.
+    """
+    today = today or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        terminees = Location.objects.filter(
+            statut__in=('a_venir', 'en_cours'), date_fin__lt=today,
+        ).update(statut='termine', updated_at=now)
+        demarrees = Location.objects.filter(
+            statut='a_venir', date_debut__lte=today, date_fin__gte=today,
+        ).update(statut='en_cours', updated_at=now)
+    if terminees or demarrees:
+        bump_data_version(Location)
+        logger.info('Locations : %s démarrée(s), %s terminée(s)', demarrees, terminees)
+    return f'{demarrees} location(s) démarrée(s), {terminees} terminée(s)'
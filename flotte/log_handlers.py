@@ -0,0 +1,48 @@
+"""
+Handlers de journalisation FLOTTE (profil production, settings.LOGGING).
+"""
+import gzip
+import os
+import shutil
+from logging.handlers import RotatingFileHandler
+
+
+class CompressedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotation par taille (maxBytes / backupCount) avec archives compressées :
+    flotte.log, flotte.log.1.gz, flotte.log.2.gz…
+
+    Un nom contenant {pid} donne un fichier par processus (flotte.1234.log) : chaque worker ne fait
+    tourner que ses propres archives, sans renommage concurrent du même fichier. Après un fork
+    (gunicorn --preload), le fichier est rouvert sous le pid du worker.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        self.filename_template = os.fspath(filename)
+        self._pid = os.getpid()
+        super().__init__(self._process_filename(), *args, **kwargs)
+
+    def _process_filename(self):
+        return self.filename_template.replace('{pid}', str(self._pid))
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self.acquire()
+            try:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    if self.stream:
+                        self.stream.close()
+                        self.stream = None
+                    self.baseFilename = os.path.abspath(self._process_filename())
+            finally:
+                self.release()
+        super().emit(record)
+
+    def namer(self, default_name):
+        return default_name + '.gz'
+
+    def rotator(self, source, dest):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
@@ -0,0 +1,190 @@
+"""Commande : python manage.py generate_fleet --vehicles N --years N --seed N — jeu de données volumineux et reproductible."""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from flotte.generation import generer_conducteurs, generer_lot, prefixe_chassis
+from flotte.http_cache import bump_data_version
+from flotte.models import (
+    AuditLog, ChargeImport, Conducteur, Contravention, Depense, DocumentVehicule, Facture,
+    ImportDemarche, Location, Maintenance, Marque, Modele, PartieImportee, PenaliteFacture,
+    PhotoVehicule, ReleveCarburant, Reparation,
+    TypeCarburant, TypeDocument, TypeTransmission, TypeVehicule, Vehicule, Vente,
+)
+from flotte.occupation import rafraichir_occupation
+from flotte.rollups import reconstruire_rollup
+
+# Modèles enfants « simples » : (nom dans generer_lot, classe)
+ENFANTS_SIMPLES = (
+    ('ReleveCarburant', ReleveCarburant),
+    ('Maintenance', Maintenance),
+    ('Depense', Depense),
+    ('Reparation', Reparation),
+    ('DocumentVehicule', DocumentVehicule),
+    ('ChargeImport', ChargeImport),
+    ('Vente', Vente),
+)
+
+
+def _generer(lot, seed, refs, aujourdhui, annees):
+    """Génère un lot (numéro, début, taille) — fonction de module pour le pool de processus."""
+    numero, debut, taille = lot
+    return generer_lot(seed, numero, debut, taille, refs, aujourdhui, annees)
+
+
+def _supprimer_sans_signaux(queryset):
+    """DELETE … WHERE pk IN (sous-requête du queryset) exécuté directement : ni lignes chargées, ni signaux."""
+    connection = connections[queryset.db]
+    opts = queryset.model._meta
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM %s WHERE %s IN (%s)' % (
+                connection.ops.quote_name(opts.db_table), connection.ops.quote_name(opts.pk.column), sql,
+            ),
+            params,
+        )
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un parc complet et cohérent (véhicules, relevés, maintenances, dépenses, factures et "
+        "pénalités, locations et contraventions, ventes, journal d'audit) par bulk_create. "
+        "Même graine + mêmes options = mêmes données."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=1000, help='Nombre de véhicules (défaut : 1000).')
+        parser.add_argument('--years', type=int, default=5, help="Profondeur d'historique en années (défaut : 5).")
+        parser.add_argument('--seed', type=int, default=1, help='Graine aléatoire (défaut : 1).')
+        parser.add_argument(
+            '--date', default=None,
+            help="Date de référence AAAA-MM-JJ (défaut : aujourd'hui ; à fixer pour des benchmarks reproductibles).",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Véhicules par lot (défaut : 1000).')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processus de génération en parallèle (défaut : 1 ; les insertions restent séquentielles).',
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Supprimer les véhicules déjà générés avec cette graine avant de générer.',
+        )
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        try:
+            aujourdhui = date.fromisoformat(options['date']) if options['date'] else date.today()
+        except ValueError:
+            raise CommandError('--date doit être au format AAAA-MM-JJ.')
+        nombre = max(0, options['vehicles'])
+        taille_lot = max(1, options['batch_size'])
+        self.insert_batch_size = max(500, taille_lot * 5)
+
+        prefixe = prefixe_chassis(seed)
+        existants = Vehicule.objects.filter(numero_chassis__startswith=prefixe)
+        if existants.exists():
+            if not options['reset']:
+                raise CommandError(f'Des véhicules {prefixe}* existent déjà (utiliser --reset).')
+            self.stdout.write('Suppression des véhicules générés précédemment…')
+            self.supprimer(prefixe, seed)
+
+        refs = self.charger_referentiel(seed, nombre, aujourdhui)
+        lots = [(lot, debut, min(taille_lot, nombre - debut)) for lot, debut in enumerate(range(0, nombre, taille_lot))]
+        generer = partial(_generer, seed=seed, refs=refs, aujourdhui=aujourdhui, annees=options['years'])
+
+        totaux = {}
+        if options['workers'] > 1 and len(lots) > 1:
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                for resultat in pool.map(generer, lots):
+                    self.inserer(resultat, totaux)
+        else:
+            for lot in lots:
+                self.inserer(generer(lot), totaux)
+
+        # bulk_create n'émet pas de signaux : agrégats et versions recalculés en fin de génération
+        reconstruire_rollup()
+        rafraichir_occupation(complet=True)
+        for model in (Vehicule, Location, Vente, Facture, Maintenance, ReleveCarburant, Conducteur):
+            bump_data_version(model)
+        call_command('refresh_admin_stats', stdout=self.stdout)
+
+        detail = ', '.join(f'{nom} : {n}' for nom, n in sorted(totaux.items()))
+        self.stdout.write(self.style.SUCCESS(f'{nombre} véhicule(s) générés ({detail}).'))
+
+    def supprimer(self, prefixe, seed):
+        """
+        Supprime les données générées par requêtes DELETE directes, table par table : un delete()
+        classique chargerait chaque objet et émettrait audit / rollup / signaux ligne par ligne.
+        """
+        filtre = {'vehicule__numero_chassis__startswith': prefixe}
+        with transaction.atomic():
+            _supprimer_sans_signaux(Contravention.objects.filter(location__vehicule__numero_chassis__startswith=prefixe))
+            _supprimer_sans_signaux(PenaliteFacture.objects.filter(facture__vehicule__numero_chassis__startswith=prefixe))
+            PartieImportee.objects.filter(**filtre).update(vehicule=None)
+            for model in (Location, Facture, ImportDemarche, PhotoVehicule) + tuple(m for _, m in ENFANTS_SIMPLES):
+                _supprimer_sans_signaux(model.objects.filter(**filtre))
+            _supprimer_sans_signaux(Vehicule.objects.filter(numero_chassis__startswith=prefixe))
+            _supprimer_sans_signaux(Conducteur.objects.filter(nom__startswith=f'Conducteur{seed}-'))
+
+    def charger_referentiel(self, seed, nombre, aujourdhui):
+        """Paramétrage (chargé si absent) et conducteurs générés ; retourne les identifiants utiles."""
+        if not Marque.objects.exists() or not TypeCarburant.objects.exists():
+            call_command('load_parametrage_initial', stdout=self.stdout)
+        conducteurs = Conducteur.objects.bulk_create(
+            [Conducteur(**champs) for champs in generer_conducteurs(seed, max(1, nombre // 10), aujourdhui)],
+            batch_size=self.insert_batch_size,
+        )
+        return {
+            'modeles': list(Modele.objects.order_by('pk').values_list('marque_id', 'pk')),
+            'carburants': list(TypeCarburant.objects.order_by('pk').values_list('pk', flat=True)),
+            'transmissions': list(TypeTransmission.objects.order_by('pk').values_list('pk', flat=True)),
+            'types_vehicule': list(TypeVehicule.objects.order_by('pk').values_list('pk', flat=True)),
+            'types_document': list(TypeDocument.objects.order_by('pk').values_list('pk', 'libelle')),
+            'conducteurs': [c.pk for c in conducteurs],
+        }
+
+    def _bulk(self, model, objs, totaux):
+        if objs:
+            model.objects.bulk_create(objs, batch_size=self.insert_batch_size)
+            totaux[model.__name__] = totaux.get(model.__name__, 0) + len(objs)
+        return objs
+
+    def inserer(self, resultat, totaux):
+        """Insère un lot (véhicules puis données liées) dans une transaction."""
+        bs = self.insert_batch_size
+        with transaction.atomic():
+            vehicules = self._bulk(Vehicule, [Vehicule(**champs) for champs in resultat['vehicules']], totaux)
+            enfants = resultat['enfants']
+            for nom, model in ENFANTS_SIMPLES:
+                self._bulk(model, [model(vehicule_id=vehicules[pos].pk, **champs) for pos, champs in enfants[nom]], totaux)
+
+            factures = self._bulk(Facture, [
+                Facture(vehicule_id=vehicules[pos].pk, **champs) for pos, champs, _ in enfants['Facture']
+            ], totaux)
+            self._bulk(PenaliteFacture, [
+                PenaliteFacture(facture_id=facture.pk, **penalite)
+                for facture, (_, _, penalites) in zip(factures, enfants['Facture']) for penalite in penalites
+            ], totaux)
+
+            locations = self._bulk(Location, [
+                Location(vehicule_id=vehicules[pos].pk, **champs) for pos, champs, _ in enfants['Location']
+            ], totaux)
+            self._bulk(Contravention, [
+                Contravention(location_id=location.pk, **contravention)
+                for location, (_, _, contraventions) in zip(locations, enfants['Location'])
+                for contravention in contraventions
+            ], totaux)
+
+            audit = [AuditLog(action='create', model_name='flotte.Vehicule', object_id=str(v.pk),
+                              object_repr=v.numero_chassis) for v in vehicules]
+            audit += [AuditLog(action='create', model_name='flotte.Location', object_id=str(loc.pk),
+                               object_repr=f'{loc.locataire} — {loc.date_debut}') for loc in locations]
+            AuditLog.objects.bulk_create(audit, batch_size=bs)
+            totaux['AuditLog'] = totaux.get('AuditLog', 0) + len(audit)
+        self.stdout.write(f'  Lot : {len(vehicules)} véhicule(s) insérés.')
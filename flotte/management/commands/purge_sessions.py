@@ -0,0 +1,24 @@
+"""Commande : python manage.py purge_sessions [--batch-size N] — purge par lots des sessions expirées."""
+from django.core.management.base import BaseCommand
+
+from flotte.sessions import DEFAULT_PURGE_BATCH_SIZE, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les sessions expirées par lots (équivalent de clearsessions, sans long verrou SQLite). "
+        "À planifier (cron, toutes les heures par exemple)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_PURGE_BATCH_SIZE,
+            help=f'Nombre de sessions supprimées par transaction (défaut : {DEFAULT_PURGE_BATCH_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        total = purge_expired_sessions(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'{total} session(s) expirée(s) supprimée(s).'))
@@ -0,0 +1,15 @@
+"""Commande : python manage.py rebuild_vente_rollup — reconstruit les agrégats journaliers de ventes (VenteRollup)."""
+from django.core.management.base import BaseCommand
+
+from flotte.rollups import reconstruire_rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit entièrement la table VenteRollup depuis les ventes. À lancer après un import "
+        "massif (bulk_create, loaddata, update) qui n'émet pas de signaux."
+    )
+
+    def handle(self, *args, **options):
+        total = reconstruire_rollup()
+        self.stdout.write(self.style.SUCCESS(f'{total} ligne(s) VenteRollup reconstruite(s).'))
@@ -0,0 +1,19 @@
+"""Commande : python manage.py refresh_occupation [--full] — met à jour les agrégats d'occupation (OccupationRollup)."""
+from django.core.management.base import BaseCommand
+
+from flotte.occupation import rafraichir_occupation
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour l'occupation journalière de la flotte (OccupationRollup) : jours invalidés par les "
+        "écritures et jours écoulés depuis le dernier calcul. --full recalcule tout l'historique, à lancer "
+        "après un import massif (bulk_create, loaddata, update) qui n'émet pas de signaux."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recalculer tout l'historique.")
+
+    def handle(self, *args, **options):
+        resume = rafraichir_occupation(complet=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'OccupationRollup : {resume}.'))
@@ -0,0 +1,43 @@
+"""Commande : python manage.py refresh_reporting_snapshot [--loop --interval N] — instantané SQLite des rapports."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flotte.reporting_db import get_snapshot_path, get_sticky_seconds, refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Recopie la base SQLite principale vers l'instantané lu par les vues de rapport "
+        "(FLOTTE_REPORTING_SNAPSHOT_PATH), par l'API de sauvegarde en ligne, puis le remplace de façon atomique."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (rafraîchissement périodique en arrière-plan).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=None,
+            help='Intervalle en secondes entre deux instantanés avec --loop '
+                 '(défaut : FLOTTE_REPORTING_STICKY_SECONDS, fenêtre de lecture de ses écritures).',
+        )
+
+    def handle(self, *args, **options):
+        if get_snapshot_path() is None:
+            raise CommandError("FLOTTE_REPORTING_SNAPSHOT_PATH n'est pas défini.")
+        interval = options['interval'] or get_sticky_seconds()
+        while True:
+            try:
+                path, size, duration = refresh_snapshot()
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'Instantané {path} rafraîchi ({size / 1024 / 1024:.1f} Mo, {duration} ms).'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(interval)
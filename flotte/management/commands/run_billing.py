@@ -0,0 +1,48 @@
+"""Commande : python manage.py run_billing [AAAA-MM] [--dry-run] [--batch-size N] — facturation mensuelle des locations."""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from flotte.facturation import facturer_mois
+
+
+class Command(BaseCommand):
+    help = (
+        "Facture les locations actives sur un mois (défaut : mois précédent) : loyer au prorata, "
+        "km supplémentaires d'après les relevés, contraventions non refacturées. Traitement par lots "
+        "transactionnels ; une facturation interrompue se relance sans doublon."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('mois', nargs='?', help='Mois facturé (AAAA-MM). Défaut : mois précédent.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Aperçu : afficher le détail par location sans créer de facture.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Locations par lot / transaction (défaut : FLOTTE_FACTURATION_BATCH_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        if options['mois']:
+            try:
+                mois = date.fromisoformat(f"{options['mois']}-01")
+            except ValueError:
+                raise CommandError(f"Mois invalide : {options['mois']!r} (format AAAA-MM).")
+        else:
+            mois = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        stats = facturer_mois(mois, apercu=options['dry_run'], batch_size=options['batch_size'])
+        for ligne in stats['lignes']:
+            self.stdout.write(
+                f"Location {ligne['location_id']:<6} {ligne['locataire'][:30]:<30} {ligne['jours']:>2} j  "
+                f"loyer {ligne['loyer']:>10}  km sup. {ligne['km_supplementaires']:>6} ({ligne['montant_km']:>9})  "
+                f"contraventions {ligne['montant_contraventions']:>9}  total {ligne['total']:>11}"
+            )
+        verbe = 'à créer' if options['dry_run'] else 'créée(s)'
+        self.stdout.write(self.style.SUCCESS(
+            f"{mois:%m/%Y} : {stats['locations']} location(s) à facturer, {stats['factures']} facture(s) {verbe}, "
+            f"total {stats['total']} FCFA."
+        ))
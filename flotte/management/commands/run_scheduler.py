@@ -0,0 +1,83 @@
+"""Commande : python manage.py run_scheduler [--once | --run TÂCHE… | --list] — planificateur de tâches périodiques."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from flotte.models import ExecutionTache
+from flotte.scheduler import get_holder, get_jobs, run_due_jobs, run_job, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches périodiques de FLOTTE_SCHEDULER_JOBS (expressions cron) : purge des sessions, "
+        "agrégats, file d'emails, récapitulatif des échéances, statuts des locations… "
+        "Plusieurs instances peuvent tourner : un verrou en base attribue chaque créneau à une seule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exécuter les tâches dues pour la minute courante puis quitter (appel par cron chaque minute).',
+        )
+        parser.add_argument(
+            '--run', nargs='+', metavar='TACHE',
+            help='Exécuter immédiatement les tâches nommées (sous verrou), puis quitter.',
+        )
+        parser.add_argument(
+            '--list', action='store_true',
+            help='Lister les tâches, leur prochaine exécution et le dernier résultat.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            jobs = get_jobs()
+        except (TypeError, ValueError) as e:
+            raise CommandError(f'FLOTTE_SCHEDULER_JOBS invalide : {e}')
+
+        if options['list']:
+            self._list(jobs)
+            return
+        if options['run']:
+            unknown = set(options['run']) - set(jobs)
+            if unknown:
+                raise CommandError(f'Tâche(s) inconnue(s) : {", ".join(sorted(unknown))}')
+            for name in options['run']:
+                self._report(name, run_job(jobs[name]))
+            return
+        if options['once']:
+            for execution in run_due_jobs(jobs):
+                self._report(execution.tache, execution)
+            return
+
+        holder = get_holder()
+        self.stdout.write(f'Planificateur démarré ({holder}) : {len(jobs)} tâche(s).')
+        # Dernière minute évaluée : les minutes écoulées pendant une tâche longue sont rattrapées
+        evaluated = timezone.now().replace(second=0, microsecond=0)
+        while True:
+            # Réveil au début de chaque minute
+            time.sleep(60 - time.time() % 60 + 0.5)
+            now = timezone.now().replace(second=0, microsecond=0)
+            for execution in run_pending_jobs(jobs, since=evaluated, now=now, holder=holder):
+                self._report(execution.tache, execution)
+            evaluated = now
+
+    def _report(self, name, execution):
+        if execution is None:
+            self.stdout.write(self.style.WARNING(f'{name} : créneau déjà pris par une autre instance.'))
+        elif execution.statut == ExecutionTache.STATUT_SUCCES:
+            self.stdout.write(self.style.SUCCESS(f'{name} : succès en {execution.duree_ms} ms.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'{name} : erreur en {execution.duree_ms} ms (voir l\'historique).'))
+
+    def _list(self, jobs):
+        now = timezone.localtime()
+        for name, job in jobs.items():
+            execution = ExecutionTache.objects.filter(tache=name).order_by('-debut').first()
+            status = f'{execution.get_statut_display()} le {timezone.localtime(execution.debut):%d/%m %H:%M}' \
+                if execution else 'jamais exécutée'
+            next_run = job.schedule.next_after(now)
+            self.stdout.write(
+                f'{name:<28} {str(job.schedule):<16} prochaine : '
+                f'{next_run:%d/%m %H:%M}  dernière : {status}  — {job.description}'
+            )
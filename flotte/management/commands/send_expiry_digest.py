@@ -0,0 +1,38 @@
+"""Commande : python manage.py send_expiry_digest [--days N --dry-run --send] — récapitulatif des échéances."""
+from django.core.management.base import BaseCommand
+
+from flotte.notifications import send_expiry_digests
+from flotte.outbox import deliver_all, get_batch_size
+
+
+class Command(BaseCommand):
+    help = (
+        "Récapitulatif nocturne des échéances : un email par destinataire (propriétaires, gestionnaires, "
+        "conducteurs) avec les seules alertes pas encore notifiées, mis en file d'emails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Horizon des échéances en jours (défaut : FLOTTE_ECHEANCES_NOTIFY_DAYS).',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Compter les emails sans rien mettre en file ni marquer comme notifié.',
+        )
+        parser.add_argument(
+            '--send', action='store_true',
+            help="Envoyer aussitôt la file d'emails (sinon : worker send_outbox).",
+        )
+
+    def handle(self, *args, **options):
+        stats = send_expiry_digests(days=options['days'], dry_run=options['dry_run'])
+        self.stdout.write(
+            f"{stats['alertes']} alerte(s), {stats['deja_notifiees']} déjà notifiée(s) ; "
+            f"{stats['emails']} récapitulatif(s) {'à envoyer' if options['dry_run'] else 'mis en file'}."
+        )
+        if options['send'] and stats['emails'] and not options['dry_run']:
+            # Un lot couvrant tous les récapitulatifs : une seule connexion SMTP
+            sent = deliver_all(batch_size=max(stats['emails'], get_batch_size()))
+            self.stdout.write(f"Envoi : {sent['envoyes']} envoyé(s), {sent['reportes']} reporté(s).")
+        self.stdout.write(self.style.SUCCESS('Récapitulatif des échéances terminé.'))
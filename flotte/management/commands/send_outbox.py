@@ -0,0 +1,44 @@
+"""Commande : python manage.py send_outbox [--loop --interval N] — envoi des emails en file (EmailOutbox)."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from flotte.outbox import deliver_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les emails en file (bienvenue, notifications) par lots, sur une connexion SMTP par lot ; "
+        "les échecs sont reprogrammés avec un délai croissant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Messages par lot / connexion SMTP (défaut : FLOTTE_OUTBOX_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Tourner en continu (worker d\'envoi).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=10,
+            help='Secondes entre deux passages avec --loop (défaut : 10).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            stats = deliver_all(batch_size=options['batch_size'])
+            if any(stats.values()) or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Emails : {stats['envoyes']} envoyé(s), {stats['reportes']} reporté(s), "
+                    f"{stats['echecs']} en échec définitif."
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
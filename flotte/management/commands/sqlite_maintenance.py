@@ -0,0 +1,66 @@
+"""Commande : python manage.py sqlite_maintenance — checkpoint du WAL, ANALYZE, PRAGMA optimize, vacuum incrémental."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from flotte import sqlite
+
+STEPS = ('checkpoint', 'analyze', 'optimize', 'vacuum')
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintenance de la base SQLite : report du WAL dans la base (checkpoint TRUNCATE), "
+        "statistiques de l'optimiseur (ANALYZE, PRAGMA optimize) et libération des pages libres "
+        "(vacuum incrémental). À planifier (cron, chaque nuit par exemple)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Alias de base de données (défaut : default).',
+        )
+        parser.add_argument(
+            '--only', nargs='+', choices=STEPS,
+            help=f'Étapes à exécuter (défaut : toutes, dans l\'ordre {", ".join(STEPS)}).',
+        )
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help='Pages libérées au plus par le vacuum incrémental (défaut : 0 = toutes).',
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help='Passe la base en auto_vacuum=INCREMENTAL (VACUUM complet, verrou exclusif ; une seule fois).',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"La base « {options['database']} » n'est pas SQLite.")
+
+        if options['enable_incremental_vacuum']:
+            sqlite.enable_incremental_vacuum(connection)
+            self.stdout.write('auto_vacuum=INCREMENTAL activé (VACUUM effectué).')
+
+        steps = options['only'] or STEPS
+        if 'checkpoint' in steps:
+            result = sqlite.checkpoint(connection)
+            if result is None:
+                self.stdout.write('checkpoint  : ignoré, journal non WAL')
+            else:
+                busy, wal_pages, moved = result
+                self.stdout.write(f'checkpoint  : {moved}/{wal_pages} page(s) du WAL reportée(s)'
+                                  + (' (lecteurs actifs, checkpoint partiel)' if busy else ''))
+        if 'analyze' in steps:
+            sqlite.analyze(connection)
+            self.stdout.write('analyze     : statistiques recalculées')
+        if 'optimize' in steps:
+            sqlite.optimize(connection)
+            self.stdout.write('optimize    : PRAGMA optimize exécuté')
+        if 'vacuum' in steps:
+            mode, before, after = sqlite.incremental_vacuum(connection, options['vacuum_pages'])
+            if mode == 2:
+                self.stdout.write(f'vacuum      : {before - after} page(s) libérée(s), {after} restante(s)')
+            else:
+                self.stdout.write(f'vacuum      : ignoré, auto_vacuum non incrémental ({before} page(s) libre(s) ; '
+                                  f'voir --enable-incremental-vacuum)')
+        self.stdout.write(self.style.SUCCESS('Maintenance SQLite terminée.'))
@@ -0,0 +1,26 @@
+"""Commande : python manage.py warmup — préchauffage (gabarits, URL, données de référence) et temps par étape."""
+from django.core.management.base import BaseCommand, CommandError
+
+from flotte.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile les gabarits, construit le résolveur d'URL et charge les données de référence. "
+        "Les workers le font eux-mêmes au démarrage (FLOTTE_WARMUP) ; la commande sert à vérifier "
+        "les gabarits et à initialiser le cache partagé après un déploiement."
+    )
+
+    def handle(self, *args, **options):
+        report = warm_up()
+        failed = []
+        for step, (duration, result, error) in report.items():
+            self.stdout.write(f'{step:<20} {duration:>8.1f} ms  {error or result}')
+            if error:
+                failed.append(step)
+        compiled, errors = report['gabarits'][1] or (0, [])
+        if errors:
+            failed.append(f'gabarits ({", ".join(errors)})')
+        if failed:
+            raise CommandError(f'Préchauffage incomplet : {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(f'Préchauffage terminé ({compiled} gabarits compilés).'))
@@ -0,0 +1,324 @@
+"""
+Métriques FLOTTE au format texte Prometheus (endpoint /metrics).
+
+Registre en mémoire par processus : compteurs et histogrammes (latence par nom d'URL, requêtes
+SQL par requête HTTP, revalidations du cache HTTP, durée des exports, écritures d'audit).
+Déploiement multi-workers : avec FLOTTE_METRICS_DIR, chaque processus écrit son instantané
+(<dossier>/flotte-<pid>.json, au plus toutes les FLOTTE_METRICS_FLUSH_INTERVAL secondes) et
+l'endpoint additionne les fichiers de tous les processus. Les jauges (sessions actives, journal
+d'audit) sont calculées à la lecture.
+
+Accès : administrateurs connectés ou adresses de FLOTTE_METRICS_ALLOWED_NETWORKS (scraper interne ;
+vide par défaut : derrière un proxy local, tous les clients arrivent de 127.0.0.1).
+"""
+import atexit
+import bisect
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+from .async_support import HybridMiddleware
+from .query_budget import QueryCounter, instrument_queries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_ALLOWED_NETWORKS = ''
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+EXPORT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}      # (nom, labels) -> valeur
+_histograms = {}    # (nom, labels) -> [compte par compartiment..., +Inf, somme]
+_registry = {}      # nom -> Metric
+_last_flush = 0.0
+
+
+def get_metrics_dir():
+    return getattr(settings, 'FLOTTE_METRICS_DIR', '') or ''
+
+
+def get_flush_interval():
+    return float(getattr(settings, 'FLOTTE_METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+
+
+def metrics_enabled():
+    return bool(getattr(settings, 'FLOTTE_METRICS_ENABLED', True))
+
+
+# ——— Registre ———
+
+class Metric:
+    """Compteur ou histogramme déclaré au chargement du module (nom, aide, noms d'étiquettes)."""
+
+    def __init__(self, name, documentation, labelnames=(), kind='counter', buckets=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self.buckets = tuple(buckets or ())
+        _registry[name] = self
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels.get(label, '')) for label in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            _counters[key] = _counters.get(key, 0) + amount
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            values = _histograms.get(key)
+            if values is None:
+                values = _histograms[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe la durée (secondes) du bloc."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def counter(name, documentation, labelnames=()):
+    return Metric(name, documentation, labelnames, 'counter')
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return Metric(name, documentation, labelnames, 'histogram', buckets)
+
+
+HTTP_REQUESTS = counter(
+    'flotte_http_requests_total', 'Requêtes HTTP par nom d\'URL, méthode et statut.', ('view', 'method', 'status'))
+HTTP_LATENCY = histogram(
+    'flotte_http_request_duration_seconds', 'Durée des requêtes HTTP par nom d\'URL.', ('view',))
+DB_QUERIES = histogram(
+    'flotte_db_queries_per_request', 'Requêtes SQL par requête HTTP.', ('view',), QUERY_BUCKETS)
+HTTP_CACHE = counter(
+    'flotte_http_cache_requests_total', 'Lectures des API JSON à ETag : hit = 304, miss = réponse complète.',
+    ('view', 'result'))
+EXPORT_DURATION = histogram(
+    'flotte_export_duration_seconds', 'Durée de génération des exports CSV.', ('export',), EXPORT_BUCKETS)
+EXPORT_ROWS = counter('flotte_export_rows_total', 'Lignes écrites par les exports CSV.', ('export',))
+AUDIT_WRITES = counter('flotte_audit_writes_total', 'Écritures du journal d\'audit par action.', ('action',))
+AUDIT_ERRORS = counter('flotte_audit_write_errors_total', 'Écritures du journal d\'audit en échec.')
+
+
+def reset():
+    """Vide les valeurs du processus (tests)."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+# ——— Agrégation multi-processus (dossier partagé) ———
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()],
+        }
+
+
+def flush(force=False):
+    """Écrit l'instantané du processus dans FLOTTE_METRICS_DIR (écriture atomique). Retourne le chemin."""
+    global _last_flush
+    directory = get_metrics_dir()
+    if not directory:
+        return None
+    now = time.monotonic()
+    if not force and now - _last_flush < get_flush_interval():
+        return None
+    _last_flush = now
+    path = Path(directory) / f'flotte-{os.getpid()}.json'
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(snapshot()), encoding='utf-8')
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning('Métriques : écriture de %s impossible (%s)', path, e)
+        return None
+    return path
+
+
+def collect():
+    """Valeurs agrégées : fichiers de tous les processus (mode dossier) ou processus courant."""
+    snapshots = [snapshot()]
+    directory = get_metrics_dir()
+    if directory:
+        flush(force=True)
+        snapshots = []
+        for path in sorted(Path(directory).glob('flotte-*.json')):
+            try:
+                snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+            except (OSError, ValueError) as e:
+                logger.warning('Métriques : instantané %s illisible (%s)', path.name, e)
+    counters, histograms = {}, {}
+    for data in snapshots:
+        for name, labels, value in data.get('counters', []):
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in data.get('histograms', []):
+            key = (name, tuple(labels))
+            merged = histograms.get(key)
+            histograms[key] = list(values) if merged is None else [a + b for a, b in zip(merged, values)]
+    return counters, histograms
+
+
+atexit.register(lambda: flush(force=True))
+
+
+# ——— Format texte Prometheus ———
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def gauges():
+    """Jauges calculées à la lecture : [(nom, aide, valeur)]."""
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+    from .models import AuditLog
+
+    now = timezone.now()
+    return [
+        ('flotte_active_sessions', 'Sessions non expirées.', Session.objects.filter(expire_date__gt=now).count()),
+        ('flotte_audit_log_last_hour', 'Entrées du journal d\'audit sur la dernière heure.',
+         AuditLog.objects.filter(timestamp__gte=now - timedelta(hours=1)).count()),
+    ]
+
+
+def render():
+    """Exposition texte (version 0.0.4) de toutes les métriques."""
+    counters, histograms = collect()
+    lines = []
+    for metric in _registry.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        if metric.kind == 'counter':
+            for (name, labels), value in sorted(counters.items()):
+                if name == metric.name:
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+            continue
+        for (name, labels), values in sorted(histograms.items()):
+            if name != metric.name:
+                continue
+            cumulated = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), values[:-1]):
+                cumulated += count
+                le = ('le', _number(bound) if bound != float('inf') else '+Inf')
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, le)} {cumulated}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_number(values[-1])}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {cumulated}')
+    for name, documentation, value in gauges():
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ——— Middleware ———
+
+class MetricsMiddleware(HybridMiddleware):
+    """Latence, statut et nombre de requêtes SQL par nom d'URL (fichiers statiques exclus)."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._measured(request):
+            return self.get_response(request)
+        start = time.perf_counter()
+        with instrument_queries(QueryCounter()) as queries:
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        if not self._measured(request):
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with instrument_queries(QueryCounter()) as queries:
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def _measured(self, request):
+        return metrics_enabled() and not request.path.startswith((settings.STATIC_URL, settings.MEDIA_URL))
+
+    def _record(self, request, response, duration, queries):
+        match = getattr(request, 'resolver_match', None)
+        # Nom d'URL (jamais le chemin) : cardinalité bornée
+        view = (match.view_name or match._func_path) if match else 'non_resolue'
+        HTTP_REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        HTTP_LATENCY.observe(duration, view=view)
+        DB_QUERIES.observe(queries.count, view=view)
+        flush()
+
+
+# ——— Endpoint ———
+
+def _allowed_networks():
+    raw = getattr(settings, 'FLOTTE_METRICS_ALLOWED_NETWORKS', DEFAULT_ALLOWED_NETWORKS)
+    networks = []
+    for item in raw.split(',') if isinstance(raw, str) else raw:
+        try:
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+        except ValueError:
+            if item.strip():
+                logger.warning('FLOTTE_METRICS_ALLOWED_NETWORKS : réseau invalide %r', item)
+    return networks
+
+
+def acces_autorise(request):
+    """Administrateur connecté, ou adresse cliente (REMOTE_ADDR) dans un réseau autorisé."""
+    from .mixins import is_admin
+
+    if getattr(request, 'user', None) is not None and is_admin(request):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in network for network in _allowed_networks())
+
+
+def metrics_view(request):
+    """GET /metrics — exposition Prometheus (administrateurs ou réseau interne)."""
+    if not acces_autorise(request):
+        raise PermissionDenied('Métriques réservées aux administrateurs et au réseau interne.')
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.10 on 2026-03-02 09:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def remplir_rollup(apps, schema_editor):
+    """Initialise VenteRollup depuis les ventes existantes (une requête group-by)."""
+    Vente = apps.get_model('flotte', 'Vente')
+    VenteRollup = apps.get_model('flotte', 'VenteRollup')
+    filtre_ca = Q(prix_vente__isnull=False) & ~Q(prix_vente=0)
+    rows = (
+        Vente.objects.values('date_vente', 'vehicule__marque_id', 'vehicule__modele_id')
+        .annotate(
+            nb_ventes=Count('id'),
+            nb_ventes_prix=Count('prix_vente'),
+            nb_ventes_ca=Count('id', filter=filtre_ca),
+            total_ca=Sum('prix_vente', filter=filtre_ca),
+            prix_min=Min('prix_vente', filter=filtre_ca),
+            prix_max=Max('prix_vente', filter=filtre_ca),
+        )
+        .order_by()
+    )
+    VenteRollup.objects.bulk_create([
+        VenteRollup(
+            jour=row['date_vente'],
+            marque_id=row['vehicule__marque_id'],
+            modele_id=row['vehicule__modele_id'],
+            nb_ventes=row['nb_ventes'],
+            nb_ventes_prix=row['nb_ventes_prix'],
+            nb_ventes_ca=row['nb_ventes_ca'],
+            total_ca=row['total_ca'] or 0,
+            prix_min=row['prix_min'],
+            prix_max=row['prix_max'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0013_add_vehicule_proprietaire'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField(db_index=True, verbose_name='Jour')),
+                ('nb_ventes', models.PositiveIntegerField(default=0, verbose_name='Nombre de ventes')),
+                ('nb_ventes_prix', models.PositiveIntegerField(default=0, verbose_name='Ventes avec prix renseigné')),
+                ('nb_ventes_ca', models.PositiveIntegerField(default=0, verbose_name='Ventes avec prix > 0')),
+                ('total_ca', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Total (FCFA)')),
+                ('prix_min', models.DecimalField(blank=True, decimal_places=0, max_digits=14, null=True, verbose_name='Prix min (FCFA)')),
+                ('prix_max', models.DecimalField(blank=True, decimal_places=0, max_digits=14, null=True, verbose_name='Prix max (FCFA)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('marque', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='flotte.marque')),
+                ('modele', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='flotte.modele')),
+            ],
+            options={
+                'verbose_name': 'Agrégat ventes (jour)',
+                'verbose_name_plural': 'Agrégats ventes (jour)',
+                'ordering': ['jour'],
+            },
+        ),
+        migrations.RunPython(remplir_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-03-03 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0014_add_vente_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilVue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vue', models.CharField(max_length=200, unique=True, verbose_name='Vue')),
+                ('nb_echantillons', models.PositiveIntegerField(default=0, verbose_name='Requêtes échantillonnées')),
+                ('temps_total_ms', models.FloatField(default=0, verbose_name='Temps total (ms)')),
+                ('temps_db_ms', models.FloatField(default=0, verbose_name='Temps base (ms)')),
+                ('temps_max_ms', models.FloatField(default=0, verbose_name='Temps max (ms)')),
+                ('p95_ms', models.FloatField(db_index=True, default=0, verbose_name='p95 (ms)')),
+                ('nb_sql', models.PositiveBigIntegerField(default=0, verbose_name='Requêtes SQL')),
+                ('nb_detections', models.PositiveIntegerField(default=0, verbose_name='Détections N+1 / doublons')),
+                ('histogramme', models.JSONField(blank=True, default=list, verbose_name='Histogramme des durées')),
+                ('dernieres_detections', models.JSONField(blank=True, default=list, verbose_name='Dernières détections')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Profil de vue',
+                'verbose_name_plural': 'Profils de vues (performances)',
+                'ordering': ['-p95_ms'],
+            },
+        ),
+    ]
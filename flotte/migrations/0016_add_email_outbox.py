@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0015_add_profil_vue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=255, verbose_name='Sujet')),
+                ('destinataires', models.JSONField(default=list, verbose_name='Destinataires')),
+                ('expediteur', models.CharField(blank=True, max_length=254, verbose_name='Expéditeur')),
+                ('corps_texte', models.TextField(blank=True, verbose_name='Corps (texte)')),
+                ('corps_html', models.TextField(blank=True, verbose_name='Corps (HTML)')),
+                ('statut', models.CharField(choices=[('attente', 'En attente'), ('en_cours', "En cours d'envoi"), ('envoye', 'Envoyé'), ('echec', 'Échec définitif')], default='attente', max_length=10, verbose_name='Statut')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochain essai')),
+                ('jeton', models.CharField(blank=True, max_length=32, verbose_name='Jeton du lot')),
+                ('derniere_erreur', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('cree_le', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('envoye_le', models.DateTimeField(blank=True, null=True, verbose_name='Envoyé le')),
+            ],
+            options={
+                'verbose_name': 'Email en file',
+                'verbose_name_plural': "File d'emails",
+                'ordering': ['-cree_le'],
+                'indexes': [models.Index(fields=['statut', 'prochain_essai'], name='flotte_outbox_a_envoyer')],
+            },
+        ),
+    ]
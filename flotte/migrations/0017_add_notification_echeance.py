@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0016_add_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEcheance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=120, verbose_name='Alerte')),
+                ('destinataire', models.EmailField(max_length=254, verbose_name='Destinataire')),
+                ('notifie_le', models.DateTimeField(auto_now_add=True, verbose_name='Notifiée le')),
+            ],
+            options={
+                'verbose_name': 'Échéance notifiée',
+                'verbose_name_plural': 'Échéances notifiées',
+                'ordering': ['-notifie_le'],
+                'constraints': [models.UniqueConstraint(fields=('cle', 'destinataire'), name='flotte_notification_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0017_add_notification_echeance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExecutionTache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tache', models.CharField(db_index=True, max_length=80, verbose_name='Tâche')),
+                ('creneau', models.DateTimeField(verbose_name='Créneau')),
+                ('debut', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Début')),
+                ('fin', models.DateTimeField(blank=True, null=True, verbose_name='Fin')),
+                ('duree_ms', models.FloatField(blank=True, null=True, verbose_name='Durée (ms)')),
+                ('statut', models.CharField(choices=[('en_cours', 'En cours'), ('succes', 'Succès'), ('erreur', 'Erreur')], default='en_cours', max_length=10, verbose_name='Statut')),
+                ('resultat', models.TextField(blank=True, verbose_name='Résultat')),
+                ('hote', models.CharField(blank=True, max_length=120, verbose_name='Hôte')),
+            ],
+            options={
+                'verbose_name': 'Exécution de tâche',
+                'verbose_name_plural': 'Exécutions de tâches',
+                'ordering': ['-debut'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TachePlanifiee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=80, unique=True, verbose_name='Tâche')),
+                ('dernier_creneau', models.DateTimeField(blank=True, null=True, verbose_name='Dernier créneau exécuté')),
+                ('detenteur', models.CharField(blank=True, max_length=120, verbose_name='Détenteur du verrou')),
+                ('verrouille_jusqua', models.DateTimeField(blank=True, null=True, verbose_name="Verrouillée jusqu'à")),
+            ],
+            options={
+                'verbose_name': 'Tâche planifiée',
+                'verbose_name_plural': 'Tâches planifiées',
+                'ordering': ['nom'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0018_add_scheduler'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupationInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depuis', models.DateField(verbose_name='Recalculer depuis')),
+                ('cree_le', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+            ],
+            options={
+                'verbose_name': 'Occupation à recalculer',
+                'verbose_name_plural': 'Occupation à recalculer',
+            },
+        ),
+        migrations.CreateModel(
+            name='OccupationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jour', models.DateField(db_index=True, verbose_name='Jour')),
+                ('type_location', models.CharField(blank=True, max_length=60, verbose_name='Type de location')),
+                ('nb_parc', models.PositiveIntegerField(default=0, verbose_name='Véhicules au parc')),
+                ('nb_loues', models.PositiveIntegerField(default=0, verbose_name='Véhicules loués')),
+                ('marque', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='flotte.marque')),
+            ],
+            options={
+                'verbose_name': 'Agrégat occupation (jour)',
+                'verbose_name_plural': 'Agrégats occupation (jour)',
+                'ordering': ['jour'],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0019_add_occupation_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceNumero',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefixe', models.CharField(max_length=40, unique=True, verbose_name='Préfixe')),
+                ('dernier', models.PositiveIntegerField(default=0, verbose_name='Dernier numéro attribué')),
+            ],
+            options={
+                'verbose_name': 'Séquence de numérotation',
+                'verbose_name_plural': 'Séquences de numérotation',
+            },
+        ),
+        migrations.AddField(
+            model_name='contravention',
+            name='facture',
+            field=models.ForeignKey(blank=True, help_text='Facture de location sur laquelle la contravention a été refacturée', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contraventions', to='flotte.facture'),
+        ),
+        migrations.AddField(
+            model_name='facture',
+            name='detail',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Détail du calcul'),
+        ),
+        migrations.AddField(
+            model_name='facture',
+            name='location',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='factures', to='flotte.location'),
+        ),
+        migrations.AddField(
+            model_name='facture',
+            name='periode',
+            field=models.DateField(blank=True, help_text='Premier jour du mois', null=True, verbose_name='Mois facturé'),
+        ),
+        migrations.AddConstraint(
+            model_name='facture',
+            constraint=models.UniqueConstraint(condition=models.Q(('location__isnull', False)), fields=('location', 'periode'), name='flotte_facture_location_periode'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:57
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce
+
+
+def reconstruire_rollup(apps, schema_editor):
+    """Supprime les doublons éventuels de compartiments en reconstruisant VenteRollup depuis Vente."""
+    Vente = apps.get_model('flotte', 'Vente')
+    VenteRollup = apps.get_model('flotte', 'VenteRollup')
+    filtre_ca = Q(prix_vente__isnull=False) & ~Q(prix_vente=0)
+    rows = (
+        Vente.objects.values('date_vente', 'vehicule__marque_id', 'vehicule__modele_id')
+        .annotate(
+            nb_ventes=Count('id'),
+            nb_ventes_prix=Count('prix_vente'),
+            nb_ventes_ca=Count('id', filter=filtre_ca),
+            total_ca=Sum('prix_vente', filter=filtre_ca),
+            prix_min=Min('prix_vente', filter=filtre_ca),
+            prix_max=Max('prix_vente', filter=filtre_ca),
+        )
+        .order_by()
+    )
+    VenteRollup.objects.all().delete()
+    VenteRollup.objects.bulk_create([
+        VenteRollup(
+            jour=row['date_vente'],
+            marque_id=row['vehicule__marque_id'],
+            modele_id=row['vehicule__modele_id'],
+            nb_ventes=row['nb_ventes'],
+            nb_ventes_prix=row['nb_ventes_prix'],
+            nb_ventes_ca=row['nb_ventes_ca'],
+            total_ca=row['total_ca'] or 0,
+            prix_min=row['prix_min'],
+            prix_max=row['prix_max'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flotte', '0020_add_facturation_locations'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruire_rollup, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='venterollup',
+            constraint=models.UniqueConstraint(models.F('jour'), Coalesce('marque', 0), Coalesce('modele', 0), name='flotte_venterollup_compartiment'),
+        ),
+    ]
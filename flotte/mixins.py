@@ -2,12 +2,19 @@
 Décorateurs et classes pour contrôle d'accès par rôle."""
 import logging
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
 from django.db.models import ObjectDoesNotExist
 
 logger = logging.getLogger(__name__)
 
+MANAGER_OR_ADMIN_DENIED = (
+    'Accès réservé aux gestionnaires ou administrateurs. '
+    'En tant qu\'utilisateur, vous pouvez consulter le tableau de bord, le parc, '
+    'les réparations, documents, maintenance, carburant et conducteurs.'
+)
+
 
 def user_role(request):
     """Retourne le rôle de l'utilisateur (admin, manager, user).
@@ -41,6 +48,28 @@ def is_manager_or_admin(request):
     return request.user.is_authenticated and role in ('admin', 'manager')
 
 
+async def auser_role(request):
+    """Version async de user_role (vues async) ; le rôle est mémorisé sur la requête."""
+    if not hasattr(request, '_flotte_role'):
+        from .models import ProfilUtilisateur
+
+        user = await request.auser()
+        if not user.is_authenticated:
+            role = None
+        elif user.is_superuser:
+            role = 'admin'
+        else:
+            role = await ProfilUtilisateur.objects.filter(user_id=user.pk).values_list(
+                'role', flat=True).afirst() or 'user'
+        request._flotte_role = role
+    return request._flotte_role
+
+
+async def ais_manager_or_admin(request):
+    """Version async de is_manager_or_admin."""
+    return await auser_role(request) in ('admin', 'manager')
+
+
 class AdminRequiredMixin(LoginRequiredMixin):
     """Vue réservée aux utilisateurs avec rôle admin (ou superuser)."""
     def dispatch(self, request, *args, **kwargs):
@@ -65,17 +94,25 @@ def manager_or_admin_required(view_func):
     """
     Décorateur pour vues fonction : login requis + rôle manager ou admin.
     Utilisateur simple (user) → 403. Utilisé pour Import, Ventes, CA, Location (liste/détail).
+    Accepte aussi les vues async.
     """
+    from django.contrib.auth.views import redirect_to_login
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _awrapped(request, *args, **kwargs):
+            if not (await request.auser()).is_authenticated:
+                return redirect_to_login(request.get_full_path())
+            if not await ais_manager_or_admin(request):
+                raise PermissionDenied(MANAGER_OR_ADMIN_DENIED)
+            return await view_func(request, *args, **kwargs)
+        return _awrapped
+
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
         if not request.user.is_authenticated:
-            from django.contrib.auth.views import redirect_to_login
             return redirect_to_login(request.get_full_path())
         if not is_manager_or_admin(request):
-            raise PermissionDenied(
-                'Accès réservé aux gestionnaires ou administrateurs. '
-                'En tant qu\'utilisateur, vous pouvez consulter le tableau de bord, le parc, '
-                'les réparations, documents, maintenance, carburant et conducteurs.'
-            )
+            raise PermissionDenied(MANAGER_OR_ADMIN_DENIED)
         return view_func(request, *args, **kwargs)
     return _wrapped
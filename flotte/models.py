@@ -4,7 +4,9 @@ locations (CT, assurance, km vidange), import, dépenses, documents, réparation
 Tous les montants sont en FCFA.
 """
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 
 
 class Marque(models.Model):
@@ -528,6 +530,10 @@ class Contravention(models.Model):
     )
     lieu = models.CharField('Lieu', max_length=120, blank=True)
     remarque = models.TextField('Remarque', blank=True)
+    facture = models.ForeignKey(
+        'Facture', on_delete=models.SET_NULL, null=True, blank=True, related_name='contraventions',
+        help_text='Facture de location sur laquelle la contravention a été refacturée',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -572,6 +578,81 @@ class Vente(models.Model):
         return f'{self.vehicule} — {self.date_vente}'
 
 
+class VenteRollup(models.Model):
+    """
+    Agrégat journalier des ventes par (jour, marque, modèle), maintenu par signaux (flotte.rollups).
+    Source des KPIs et graphiques de chiffre d'affaires : les vues mois / année en sont dérivées.
+    """
+    jour = models.DateField('Jour', db_index=True)
+    marque = models.ForeignKey(
+        Marque, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    modele = models.ForeignKey(
+        Modele, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    nb_ventes = models.PositiveIntegerField('Nombre de ventes', default=0)
+    nb_ventes_prix = models.PositiveIntegerField('Ventes avec prix renseigné', default=0)
+    nb_ventes_ca = models.PositiveIntegerField('Ventes avec prix > 0', default=0)
+    total_ca = models.DecimalField('Total (FCFA)', max_digits=16, decimal_places=0, default=0)
+    prix_min = models.DecimalField('Prix min (FCFA)', max_digits=14, decimal_places=0, null=True, blank=True)
+    prix_max = models.DecimalField('Prix max (FCFA)', max_digits=14, decimal_places=0, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['jour']
+        verbose_name = 'Agrégat ventes (jour)'
+        verbose_name_plural = 'Agrégats ventes (jour)'
+        constraints = [
+            # Une seule ligne par compartiment, marque / modèle absents compris (NULL ramené à 0)
+            models.UniqueConstraint(
+                'jour', Coalesce('marque', 0), Coalesce('modele', 0), name='flotte_venterollup_compartiment',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.jour} — {self.nb_ventes} vente(s)'
+
+
+class OccupationRollup(models.Model):
+    """
+    Occupation journalière de la flotte par (jour, marque, type de location), calculée par
+    flotte.occupation. nb_parc : véhicules de la marque au parc ce jour ; nb_loues : véhicules
+    loués (tous types si type_location est vide, sinon pour ce type). Les taux mensuels sont
+    dérivés par Trunc sur `jour` (somme des jours-véhicules loués / au parc).
+    """
+    jour = models.DateField('Jour', db_index=True)
+    marque = models.ForeignKey(
+        Marque, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    type_location = models.CharField('Type de location', max_length=60, blank=True)
+    nb_parc = models.PositiveIntegerField('Véhicules au parc', default=0)
+    nb_loues = models.PositiveIntegerField('Véhicules loués', default=0)
+
+    class Meta:
+        ordering = ['jour']
+        verbose_name = 'Agrégat occupation (jour)'
+        verbose_name_plural = 'Agrégats occupation (jour)'
+
+    def __str__(self):
+        return f'{self.jour} — {self.nb_loues}/{self.nb_parc} loué(s)'
+
+
+class OccupationInvalidation(models.Model):
+    """
+    Jour à partir duquel OccupationRollup doit être recalculé (écrit par les signaux de Location,
+    Vehicule et Vente, dans la transaction de l'écriture ; consommé par le rafraîchissement).
+    """
+    depuis = models.DateField('Recalculer depuis')
+    cree_le = models.DateTimeField('Créée le', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Occupation à recalculer'
+        verbose_name_plural = 'Occupation à recalculer'
+
+    def __str__(self):
+        return f'Depuis le {self.depuis}'
+
+
 class Facture(models.Model):
     """Facture liée à un véhicule (achat, réparation, assurance, etc.)."""
     vehicule = models.ForeignKey(
@@ -592,12 +673,24 @@ class Facture(models.Model):
         null=True, blank=True, help_text='Facture scannée (PDF)'
     )
     remarque = models.TextField('Remarque', blank=True)
+    # Facturation mensuelle des locations (flotte.facturation) : contrat, mois facturé, détail du calcul
+    location = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='factures'
+    )
+    periode = models.DateField('Mois facturé', null=True, blank=True, help_text='Premier jour du mois')
+    detail = models.JSONField('Détail du calcul', default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-date_facture', '-id']
         verbose_name = 'Facture'
         verbose_name_plural = 'Factures'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['location', 'periode'], condition=models.Q(location__isnull=False),
+                name='flotte_facture_location_periode',
+            ),
+        ]
 
     def __str__(self):
         return f'{self.vehicule.numero_chassis} — {self.numero}'
@@ -611,6 +704,22 @@ class Facture(models.Model):
         return base + penalites
 
 
+class SequenceNumero(models.Model):
+    """
+    Compteur de numérotation par préfixe (ex. FAC-2026-) : la facturation en masse réserve un bloc
+    de numéros en une écriture, sous verrou de ligne.
+    """
+    prefixe = models.CharField('Préfixe', max_length=40, unique=True)
+    dernier = models.PositiveIntegerField('Dernier numéro attribué', default=0)
+
+    class Meta:
+        verbose_name = 'Séquence de numérotation'
+        verbose_name_plural = 'Séquences de numérotation'
+
+    def __str__(self):
+        return f'{self.prefixe}{self.dernier:05d}'
+
+
 class PenaliteFacture(models.Model):
     """Pénalité (retard, amende, etc.) liée à une facture."""
     facture = models.ForeignKey(
@@ -861,3 +970,148 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f'{self.timestamp} — {self.get_action_display()} — {self.model_name} {self.object_id}'
+
+
+class ProfilVue(models.Model):
+    """
+    Profil de performance agrégé par vue (flotte.profiling) : temps total / base, requêtes SQL,
+    histogramme des durées (p95) et dernières détections N+1 / requêtes dupliquées.
+    """
+    vue = models.CharField('Vue', max_length=200, unique=True)
+    nb_echantillons = models.PositiveIntegerField('Requêtes échantillonnées', default=0)
+    temps_total_ms = models.FloatField('Temps total (ms)', default=0)
+    temps_db_ms = models.FloatField('Temps base (ms)', default=0)
+    temps_max_ms = models.FloatField('Temps max (ms)', default=0)
+    p95_ms = models.FloatField('p95 (ms)', default=0, db_index=True)
+    nb_sql = models.PositiveBigIntegerField('Requêtes SQL', default=0)
+    nb_detections = models.PositiveIntegerField('Détections N+1 / doublons', default=0)
+    histogramme = models.JSONField('Histogramme des durées', default=list, blank=True)
+    dernieres_detections = models.JSONField('Dernières détections', default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-p95_ms']
+        verbose_name = 'Profil de vue'
+        verbose_name_plural = 'Profils de vues (performances)'
+
+    def __str__(self):
+        return self.vue
+
+    @property
+    def temps_moyen_ms(self):
+        return self.temps_total_ms / self.nb_echantillons if self.nb_echantillons else 0
+
+    @property
+    def sql_par_requete(self):
+        return self.nb_sql / self.nb_echantillons if self.nb_echantillons else 0
+
+
+class EmailOutbox(models.Model):
+    """
+    Email transactionnel en file d'attente (flotte.outbox) : écrit dans la même transaction que la
+    modification qui le déclenche, envoyé par `python manage.py send_outbox` (une connexion SMTP par lot,
+    nouvel essai avec délai croissant en cas d'échec).
+    """
+    STATUT_ATTENTE = 'attente'
+    STATUT_EN_COURS = 'en_cours'
+    STATUT_ENVOYE = 'envoye'
+    STATUT_ECHEC = 'echec'
+    STATUT_CHOICES = [
+        (STATUT_ATTENTE, 'En attente'),
+        (STATUT_EN_COURS, "En cours d'envoi"),
+        (STATUT_ENVOYE, 'Envoyé'),
+        (STATUT_ECHEC, 'Échec définitif'),
+    ]
+    sujet = models.CharField('Sujet', max_length=255)
+    destinataires = models.JSONField('Destinataires', default=list)
+    expediteur = models.CharField('Expéditeur', max_length=254, blank=True)
+    corps_texte = models.TextField('Corps (texte)', blank=True)
+    corps_html = models.TextField('Corps (HTML)', blank=True)
+    statut = models.CharField('Statut', max_length=10, choices=STATUT_CHOICES, default=STATUT_ATTENTE)
+    tentatives = models.PositiveSmallIntegerField('Tentatives', default=0)
+    prochain_essai = models.DateTimeField('Prochain essai', default=timezone.now)
+    jeton = models.CharField('Jeton du lot', max_length=32, blank=True)
+    derniere_erreur = models.TextField('Dernière erreur', blank=True)
+    cree_le = models.DateTimeField('Créé le', auto_now_add=True)
+    envoye_le = models.DateTimeField('Envoyé le', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-cree_le']
+        verbose_name = 'Email en file'
+        verbose_name_plural = "File d'emails"
+        indexes = [
+            models.Index(fields=['statut', 'prochain_essai'], name='flotte_outbox_a_envoyer'),
+        ]
+
+    def __str__(self):
+        return f'{self.sujet} → {", ".join(self.destinataires)}'
+
+
+class NotificationEcheance(models.Model):
+    """
+    Alerte d'échéance déjà notifiée à un destinataire (flotte.notifications) : le récapitulatif
+    nocturne n'envoie que les nouvelles alertes. La clé inclut la date (ou le km) de l'échéance :
+    une échéance renouvelée donne une nouvelle alerte.
+    """
+    cle = models.CharField('Alerte', max_length=120)
+    destinataire = models.EmailField('Destinataire')
+    notifie_le = models.DateTimeField('Notifiée le', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-notifie_le']
+        verbose_name = 'Échéance notifiée'
+        verbose_name_plural = 'Échéances notifiées'
+        constraints = [
+            models.UniqueConstraint(fields=['cle', 'destinataire'], name='flotte_notification_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.cle} → {self.destinataire}'
+
+
+class TachePlanifiee(models.Model):
+    """
+    Verrou d'une tâche du planificateur (flotte.scheduler) : une seule instance de `run_scheduler`
+    exécute chaque créneau d'une tâche (dernier_creneau), et une exécution bloquée libère le verrou
+    à verrouille_jusqua.
+    """
+    nom = models.CharField('Tâche', max_length=80, unique=True)
+    dernier_creneau = models.DateTimeField('Dernier créneau exécuté', null=True, blank=True)
+    detenteur = models.CharField('Détenteur du verrou', max_length=120, blank=True)
+    verrouille_jusqua = models.DateTimeField("Verrouillée jusqu'à", null=True, blank=True)
+
+    class Meta:
+        ordering = ['nom']
+        verbose_name = 'Tâche planifiée'
+        verbose_name_plural = 'Tâches planifiées'
+
+    def __str__(self):
+        return self.nom
+
+
+class ExecutionTache(models.Model):
+    """Historique des exécutions des tâches planifiées : créneau, durée, résultat ou erreur."""
+    STATUT_EN_COURS = 'en_cours'
+    STATUT_SUCCES = 'succes'
+    STATUT_ERREUR = 'erreur'
+    STATUT_CHOICES = [
+        (STATUT_EN_COURS, 'En cours'),
+        (STATUT_SUCCES, 'Succès'),
+        (STATUT_ERREUR, 'Erreur'),
+    ]
+    tache = models.CharField('Tâche', max_length=80, db_index=True)
+    creneau = models.DateTimeField('Créneau')
+    debut = models.DateTimeField('Début', default=timezone.now, db_index=True)
+    fin = models.DateTimeField('Fin', null=True, blank=True)
+    duree_ms = models.FloatField('Durée (ms)', null=True, blank=True)
+    statut = models.CharField('Statut', max_length=10, choices=STATUT_CHOICES, default=STATUT_EN_COURS)
+    resultat = models.TextField('Résultat', blank=True)
+    hote = models.CharField('Hôte', max_length=120, blank=True)
+
+    class Meta:
+        ordering = ['-debut']
+        verbose_name = 'Exécution de tâche'
+        verbose_name_plural = 'Exécutions de tâches'
+
+    def __str__(self):
+        return f'{self.tache} — {self.debut:%Y-%m-%d %H:%M} — {self.get_statut_display()}'
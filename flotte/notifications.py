@@ -0,0 +1,229 @@
+"""
+Récapitulatif nocturne des échéances FLOTTE (commande `python manage.py send_expiry_digest`).
+
+Les échéances (CT, assurance, documents, permis, maintenance, vidange) sont calculées une seule
+fois pour tout le parc, puis regroupées par destinataire :
+- propriétaire du véhicule (Vehicule.proprietaire) : ses véhicules ;
+- gestionnaires et administrateurs : tout le parc ;
+- conducteur : l'expiration de son permis (adresse du compte lié, sinon celle de la fiche).
+Chaque destinataire reçoit un seul email (gabarits flotte/emails/echeances_digest.*), mis en file
+dans flotte.outbox. Les alertes déjà notifiées (NotificationEcheance) ne sont pas renvoyées :
+une nouvelle exécution le même jour ne produit aucun email.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .emails import _get_base_url
+from .models import (
+    Conducteur, DocumentVehicule, EmailOutbox, Location, Maintenance, NotificationEcheance, Vehicule,
+)
+from .outbox import build_mail_html
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFY_DAYS = 30
+
+CATEGORIES = {
+    'ct': 'Contrôle technique',
+    'assurance': 'Assurance',
+    'document': 'Document',
+    'permis': 'Permis de conduire',
+    'maintenance': 'Maintenance',
+    'vidange': 'Vidange',
+}
+
+
+def get_notify_days():
+    """Horizon (jours) des échéances signalées par le récapitulatif."""
+    return int(getattr(settings, 'FLOTTE_ECHEANCES_NOTIFY_DAYS', DEFAULT_NOTIFY_DAYS))
+
+
+# ——— Calcul des échéances (tout le parc) ———
+
+def _alerte(cle, categorie, vehicule, detail, echeance=None, url=None, conducteur=None):
+    return {
+        'cle': cle,
+        'categorie': categorie,
+        'categorie_libelle': CATEGORIES[categorie],
+        'libelle': str(vehicule) if vehicule is not None else str(conducteur),
+        'detail': detail,
+        'echeance': echeance,
+        'url': url or (reverse('flotte:vehicule_detail', args=[vehicule.pk]) if vehicule is not None else ''),
+        'proprietaire_id': vehicule.proprietaire_id if vehicule is not None else None,
+        'conducteur': conducteur,
+    }
+
+
+def collect_alerts(today=None, days=None):
+    """Alertes d'échéance de tout le parc (une requête par source), triées par date d'échéance."""
+    today = today or timezone.localdate()
+    horizon = today + timedelta(days=get_notify_days() if days is None else days)
+    alertes = []
+
+    def in_window(value):
+        return value is not None and today <= value <= horizon
+
+    # Locations en cours : CT, assurance, vidange au km
+    for loc in Location.objects.filter(statut='en_cours').filter(
+        Q(date_expiration_ct__range=(today, horizon))
+        | Q(date_expiration_assurance__range=(today, horizon))
+        | Q(km_prochaine_vidange__isnull=False)
+    ).select_related('vehicule__marque', 'vehicule__modele'):
+        v = loc.vehicule
+        if in_window(loc.date_expiration_ct):
+            alertes.append(_alerte(f'ct:location:{loc.pk}:{loc.date_expiration_ct}', 'ct', v,
+                                   f'Location {loc.locataire}', loc.date_expiration_ct))
+        if in_window(loc.date_expiration_assurance):
+            alertes.append(_alerte(f'assurance:location:{loc.pk}:{loc.date_expiration_assurance}', 'assurance', v,
+                                   f'Location {loc.locataire}', loc.date_expiration_assurance))
+        if loc.km_prochaine_vidange and (v.kilometrage_actuel or 0) >= loc.km_prochaine_vidange:
+            alertes.append(_alerte(f'vidange:location:{loc.pk}:{loc.km_prochaine_vidange}', 'vidange', v,
+                                   f'{v.kilometrage_actuel} km / vidange à {loc.km_prochaine_vidange} km'))
+
+    # Véhicules : CT / assurance au parc hors location en cours, vidange au km
+    vehicules = Vehicule.objects.filter(statut__in=['parc', 'import']).filter(
+        Q(statut='parc', date_expiration_ct__range=(today, horizon))
+        | Q(statut='parc', date_expiration_assurance__range=(today, horizon))
+        | Q(km_prochaine_vidange__isnull=False, kilometrage_actuel__gte=F('km_prochaine_vidange'))
+    ).annotate(
+        loue=Exists(Location.objects.filter(vehicule=OuterRef('pk'), statut='en_cours')),
+    ).select_related('marque', 'modele')
+    for v in vehicules:
+        if v.statut == 'parc' and not v.loue:
+            if in_window(v.date_expiration_ct):
+                alertes.append(_alerte(f'ct:vehicule:{v.pk}:{v.date_expiration_ct}', 'ct', v,
+                                       'Véhicule au parc', v.date_expiration_ct))
+            if in_window(v.date_expiration_assurance):
+                alertes.append(_alerte(f'assurance:vehicule:{v.pk}:{v.date_expiration_assurance}', 'assurance', v,
+                                       'Véhicule au parc', v.date_expiration_assurance))
+        if v.km_prochaine_vidange and (v.kilometrage_actuel or 0) >= v.km_prochaine_vidange:
+            alertes.append(_alerte(f'vidange:vehicule:{v.pk}:{v.km_prochaine_vidange}', 'vidange', v,
+                                   f'{v.kilometrage_actuel} km / vidange à {v.km_prochaine_vidange} km'))
+
+    # Documents véhicule
+    for doc in DocumentVehicule.objects.filter(date_echeance__range=(today, horizon)).select_related(
+        'vehicule__marque', 'vehicule__modele', 'type_document_fk',
+    ):
+        alertes.append(_alerte(f'document:{doc.pk}:{doc.date_echeance}', 'document', doc.vehicule,
+                               doc.libelle_type, doc.date_echeance))
+
+    # Maintenance à faire (date prévue dans l'horizon ou sans date)
+    for m in Maintenance.objects.filter(statut='a_faire').filter(
+        Q(date_prevue__isnull=True) | Q(date_prevue__lte=horizon)
+    ).select_related('vehicule__marque', 'vehicule__modele'):
+        alertes.append(_alerte(f'maintenance:{m.pk}:{m.date_prevue or "-"}', 'maintenance', m.vehicule,
+                               m.get_type_maintenance_display(), m.date_prevue))
+
+    # Permis des conducteurs actifs
+    for c in Conducteur.objects.filter(actif=True, permis_date_expiration__range=(today, horizon)).select_related('user'):
+        alertes.append(_alerte(f'permis:{c.pk}:{c.permis_date_expiration}', 'permis', None,
+                               f'Permis {c.permis_numero}'.strip(), c.permis_date_expiration,
+                               url=reverse('flotte:conducteur_update', args=[c.pk]), conducteur=c))
+
+    alertes.sort(key=lambda a: (a['echeance'] is None, a['echeance'] or today, a['categorie']))
+    return alertes
+
+
+# ——— Regroupement par destinataire ———
+
+def _managers():
+    User = get_user_model()
+    return list(
+        User.objects.filter(is_active=True).exclude(email='')
+        .filter(Q(is_superuser=True) | Q(profil_flotte__role__in=('admin', 'manager'))).distinct()
+    )
+
+
+def _conducteur_email(conducteur):
+    user = conducteur.user
+    if user is not None and user.is_active and user.email:
+        return user.email, user.first_name or user.username
+    return conducteur.email, conducteur.prenom or conducteur.nom
+
+
+def group_by_recipient(alertes):
+    """{email: {'nom': …, 'alertes': [...]}} selon les règles propriétaire / gestionnaire / conducteur."""
+    User = get_user_model()
+    destinataires = {}
+
+    def ajouter(email, nom, alerte):
+        if not email:
+            return
+        entry = destinataires.setdefault(email.lower(), {'email': email, 'nom': nom, 'alertes': [], 'cles': set()})
+        if alerte['cle'] not in entry['cles']:
+            entry['cles'].add(alerte['cle'])
+            entry['alertes'].append(alerte)
+
+    owner_ids = {a['proprietaire_id'] for a in alertes if a['proprietaire_id']}
+    owners = {
+        u.pk: u for u in User.objects.filter(pk__in=owner_ids, is_active=True).exclude(email='')
+    } if owner_ids else {}
+    managers = _managers() if alertes else []
+    for alerte in alertes:
+        for manager in managers:
+            ajouter(manager.email, manager.first_name or manager.username, alerte)
+        owner = owners.get(alerte['proprietaire_id'])
+        if owner is not None:
+            ajouter(owner.email, owner.first_name or owner.username, alerte)
+        if alerte['conducteur'] is not None:
+            ajouter(*_conducteur_email(alerte['conducteur']), alerte)
+    return destinataires
+
+
+# ——— Récapitulatif ———
+
+def _render_digest(entry, today, base_url):
+    context = {
+        'nom': entry['nom'],
+        'alertes': entry['alertes'],
+        'date': today,
+        'base_url': base_url,
+        'echeances_url': base_url + reverse('flotte:echeances'),
+    }
+    subject = render_to_string('flotte/emails/echeances_digest_subject.txt', context).strip()
+    body_html = render_to_string('flotte/emails/echeances_digest.html', context)
+    body_text = render_to_string('flotte/emails/echeances_digest.txt', context)
+    return build_mail_html(subject, body_html, [entry['email']], body_text=body_text)
+
+
+def send_expiry_digests(today=None, days=None, dry_run=False):
+    """
+    Met en file un récapitulatif par destinataire ayant de nouvelles alertes et enregistre les
+    alertes notifiées, dans une même transaction. Retourne un dict de statistiques.
+    """
+    today = today or timezone.localdate()
+    alertes = collect_alerts(today=today, days=days)
+    destinataires = group_by_recipient(alertes)
+    deja = set(NotificationEcheance.objects.filter(
+        cle__in={a['cle'] for a in alertes},
+    ).values_list('cle', 'destinataire')) if alertes else set()
+
+    stats = {'alertes': len(alertes), 'destinataires': 0, 'emails': 0, 'deja_notifiees': 0}
+    emails, notifications = [], []
+    base_url = _get_base_url()
+    for entry in destinataires.values():
+        nouvelles = [a for a in entry['alertes'] if (a['cle'], entry['email']) not in deja]
+        stats['deja_notifiees'] += len(entry['alertes']) - len(nouvelles)
+        if not nouvelles:
+            continue
+        stats['destinataires'] += 1
+        entry['alertes'] = nouvelles
+        emails.append(_render_digest(entry, today, base_url))
+        notifications.extend(NotificationEcheance(cle=a['cle'], destinataire=entry['email']) for a in nouvelles)
+
+    stats['emails'] = len(emails)
+    if dry_run or not emails:
+        return stats
+    with transaction.atomic():
+        EmailOutbox.objects.bulk_create(emails)
+        NotificationEcheance.objects.bulk_create(notifications, ignore_conflicts=True, batch_size=500)
+    logger.info('Récapitulatif des échéances : %s email(s) en file, %s alerte(s)', len(emails), len(alertes))
+    return stats
@@ -0,0 +1,246 @@
+"""
+Occupation de la flotte FLOTTE (table OccupationRollup) — taux journaliers et mensuels de véhicules
+loués par rapport aux véhicules au parc, par marque et par type de location.
+
+Un véhicule est au parc de sa date d'entrée (date_entree_parc) à la veille de sa première vente ;
+il est loué chaque jour d'une location, bornes incluses, quel que soit son statut. Le calcul se
+fait en une passe vectorisée (NumPy) : intervalles convertis en indices de jours, chevauchements
+d'un même véhicule fusionnés, puis comptage par tableaux de différences et somme cumulée.
+
+Le rafraîchissement est incrémental : les signaux de Location, Vehicule et Vente enregistrent le
+jour à partir duquel recalculer (OccupationInvalidation) ; seuls ces jours et les jours écoulés
+depuis le dernier calcul sont réécrits. Les écritures sans signaux (bulk_create, update,
+loaddata) nécessitent `python manage.py refresh_occupation --full`.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .http_cache import bump_data_version
+from .models import Location, OccupationInvalidation, OccupationRollup, Vehicule
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+# ——— Calcul vectorisé ———
+
+def _jours(dates, origine, defaut):
+    """Indices de jours (entiers) relatifs à `origine` ; None -> `defaut`."""
+    if not dates:
+        return np.zeros(0, dtype=np.int64)
+    valeurs = np.array([d if d is not None else origine for d in dates], dtype='datetime64[D]')
+    indices = (valeurs - np.datetime64(origine, 'D')).astype(np.int64)
+    manquants = np.array([d is None for d in dates])
+    indices[manquants] = defaut
+    return indices
+
+
+def _fusionner(groupes, debuts, fins, nb_jours):
+    """
+    Intervalles [debut, fin) d'un même groupe fusionnés : chaque jour n'est compté qu'une fois.
+    Tri par (groupe, début), puis maximum cumulé des fins précédentes du groupe (clé groupe × base + fin :
+    les clés d'un groupe dépassent toutes celles des groupes précédents).
+    """
+    ordre = np.lexsort((debuts, groupes))
+    groupes, debuts, fins = groupes[ordre], debuts[ordre], fins[ordre]
+    base = nb_jours + 2
+    cumul = np.maximum.accumulate(groupes * base + fins)
+    precedent = np.concatenate(([-1], cumul[:-1]))
+    fin_precedente = np.where(precedent // base == groupes, precedent % base, 0)
+    debuts = np.maximum(debuts, fin_precedente)
+    garder = debuts < fins
+    return groupes[garder], debuts[garder], fins[garder]
+
+
+def _compter(compartiments, debuts, fins, nb_compartiments, nb_jours):
+    """Nombre d'intervalles actifs par (compartiment, jour) : tableau de différences puis somme cumulée."""
+    diff = np.zeros((nb_compartiments, nb_jours + 1), dtype=np.int64)
+    np.add.at(diff, (compartiments, debuts), 1)
+    np.add.at(diff, (compartiments, fins), -1)
+    return np.cumsum(diff, axis=1)[:, :nb_jours]
+
+
+def calculer_occupation(debut, fin, vehicules, locations):
+    """
+    Occupation du `debut` au `fin` (inclus).
+    vehicules : [(pk, marque_id, date_entree_parc, date_sortie ou None)] ;
+    locations : [(vehicule_id, type_location, date_debut, date_fin)].
+    Retourne les lignes (jour, marque_id, type_location, nb_parc, nb_loues) non vides ;
+    type_location '' : tous types confondus.
+    """
+    nb_jours = (fin - debut).days + 1
+    if nb_jours <= 0 or not vehicules:
+        return []
+    pks, marques, entrees, sorties = zip(*vehicules)
+    pks = np.array(pks, dtype=np.int64)
+    cles_marques, marque_idx = np.unique(np.array([-1 if m is None else m for m in marques]), return_inverse=True)
+    nb_marques = len(cles_marques)
+    parc_debut = np.clip(_jours(entrees, debut, 0), 0, nb_jours)
+    parc_fin = np.clip(_jours(sorties, debut, nb_jours), 0, nb_jours)
+    au_parc = parc_debut < parc_fin
+    nb_parc = _compter(marque_idx[au_parc], parc_debut[au_parc], parc_fin[au_parc], nb_marques, nb_jours)
+
+    nb_loues = np.zeros((nb_marques, nb_jours), dtype=np.int64)
+    types, nb_loues_type = [], np.zeros((0, nb_jours), dtype=np.int64)
+    if locations:
+        loc_vehicules, loc_types, loc_debuts, loc_fins = zip(*locations)
+        loc_vehicules = np.array(loc_vehicules, dtype=np.int64)
+        # Véhicule de chaque location (position dans `pks`) ; locations hors véhicules connus ignorées
+        ordre = np.argsort(pks)
+        pos = np.minimum(np.searchsorted(pks[ordre], loc_vehicules), len(pks) - 1)
+        connu = pks[ordre][pos] == loc_vehicules
+        v = ordre[pos]
+        # Jours loués limités à la présence au parc (un véhicule loué est un véhicule du parc)
+        debuts = np.maximum(_jours(loc_debuts, debut, 0), parc_debut[v])
+        fins = np.minimum(_jours(loc_fins, debut, 0) + 1, parc_fin[v])
+        garder = connu & (debuts < fins)
+        if garder.any():
+            v, debuts, fins = v[garder], debuts[garder], fins[garder]
+            types, type_idx = np.unique(np.array(loc_types, dtype=str)[garder], return_inverse=True)
+            nb_types = len(types)
+
+            g, d, f = _fusionner(v, debuts, fins, nb_jours)
+            nb_loues = _compter(marque_idx[g], d, f, nb_marques, nb_jours)
+            g, d, f = _fusionner(v * nb_types + type_idx, debuts, fins, nb_jours)
+            nb_loues_type = _compter(marque_idx[g // nb_types] * nb_types + g % nb_types, d, f,
+                                     nb_marques * nb_types, nb_jours)
+
+    jours = [debut + timedelta(days=i) for i in range(nb_jours)]
+    marques_id = [None if m == -1 else int(m) for m in cles_marques]
+    lignes = []
+    for m, j in zip(*np.nonzero(nb_parc | nb_loues)):
+        lignes.append((jours[j], marques_id[m], '', int(nb_parc[m, j]), int(nb_loues[m, j])))
+    for c, j in zip(*np.nonzero(nb_loues_type)):
+        m, t = divmod(int(c), len(types))
+        lignes.append((jours[j], marques_id[m], str(types[t]), int(nb_parc[m, j]), int(nb_loues_type[c, j])))
+    return lignes
+
+
+# ——— Maintenance ———
+
+def invalider_depuis(*jours):
+    """Demande le recalcul de l'occupation à partir du plus ancien des jours donnés."""
+    jours = [j for j in jours if j is not None]
+    if jours:
+        OccupationInvalidation.objects.create(depuis=min(jours))
+
+
+def _donnees(debut, fin):
+    vehicules = list(
+        Vehicule.objects.filter(date_entree_parc__isnull=False, date_entree_parc__lte=fin)
+        .annotate(sortie=Min('ventes__date_vente'))
+        .filter(Q(sortie__isnull=True) | Q(sortie__gt=debut))
+        .values_list('pk', 'marque_id', 'date_entree_parc', 'sortie')
+        .order_by()
+    )
+    locations = list(
+        Location.objects.filter(date_fin__gte=debut, date_debut__lte=fin)
+        .values_list('vehicule_id', 'type_location', 'date_debut', 'date_fin')
+        .order_by()
+    )
+    return vehicules, locations
+
+
+def rafraichir_occupation(today=None, complet=False):
+    """
+    Met à jour OccupationRollup jusqu'à aujourd'hui : depuis le plus ancien jour invalidé ou le
+    lendemain du dernier jour calculé (tout l'historique si `complet` ou table vide).
+    Retourne un résumé (jours et lignes réécrits).
+    """
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        attente = OccupationInvalidation.objects.aggregate(dernier=Max('pk'), depuis=Min('depuis'))
+        dernier_jour = None if complet else OccupationRollup.objects.aggregate(jour=Max('jour'))['jour']
+        if dernier_jour is None:
+            debut = Vehicule.objects.aggregate(debut=Min('date_entree_parc'))['debut'] or today
+        else:
+            debut = min(d for d in (attente['depuis'], dernier_jour + timedelta(days=1)) if d is not None)
+        lignes = []
+        if debut <= today:
+            lignes = calculer_occupation(debut, today, *_donnees(debut, today))
+        if complet:
+            OccupationRollup.objects.all().delete()
+        else:
+            OccupationRollup.objects.filter(jour__gte=min(debut, today + timedelta(days=1))).delete()
+        OccupationRollup.objects.bulk_create(
+            [OccupationRollup(jour=j, marque_id=m, type_location=t, nb_parc=p, nb_loues=n)
+             for j, m, t, p, n in lignes],
+            batch_size=BATCH_SIZE,
+        )
+        if attente['dernier'] is not None:
+            OccupationInvalidation.objects.filter(pk__lte=attente['dernier']).delete()
+    # bulk_create n'émet pas de signaux : invalider explicitement les ETag de l'occupation
+    bump_data_version(OccupationRollup)
+    nb_jours = max((today - debut).days + 1, 0)
+    logger.info('OccupationRollup : %s jour(s) recalculé(s) depuis le %s, %s ligne(s)', nb_jours, debut, len(lignes))
+    return f'{nb_jours} jour(s) recalculé(s), {len(lignes)} ligne(s)'
+
+
+# ——— Lecture ———
+
+def _taux(loues, parc):
+    return round(100 * loues / parc, 1) if parc else 0
+
+
+def avec_taux(row):
+    """Ajoute le taux d'occupation (%) à une ligne agrégée (jours_parc, jours_loues)."""
+    row['jours_parc'] = row['jours_parc'] or 0
+    row['jours_loues'] = row['jours_loues'] or 0
+    row['taux'] = _taux(row['jours_loues'], row['jours_parc'])
+    return row
+
+
+def occupation_par_periode(debut, fin, granularite='mois', marque_id=None):
+    """Jours-véhicules au parc / loués et taux par jour ou par mois (toutes marques ou une marque)."""
+    qs = OccupationRollup.objects.filter(jour__gte=debut, jour__lte=fin, type_location='')
+    if marque_id is not None:
+        qs = qs.filter(marque_id=marque_id)
+    periode = F('jour') if granularite == 'jour' else TruncMonth('jour')
+    return (
+        qs.annotate(periode=periode).values('periode')
+        .annotate(jours_parc=Sum('nb_parc'), jours_loues=Sum('nb_loues'))
+        .order_by('periode')
+    )
+
+
+def occupation_par_marque(debut, fin):
+    """Jours-véhicules au parc / loués par marque sur la période."""
+    return (
+        OccupationRollup.objects.filter(jour__gte=debut, jour__lte=fin, type_location='')
+        .values('marque_id', 'marque__nom')
+        .annotate(jours_parc=Sum('nb_parc'), jours_loues=Sum('nb_loues'))
+        .order_by('marque__nom')
+    )
+
+
+def _occupation_par_type(debut, fin):
+    qs = OccupationRollup.objects.filter(jour__gte=debut, jour__lte=fin)
+    lignes = (
+        qs.exclude(type_location='').values('type_location')
+        .annotate(jours_loues=Sum('nb_loues')).order_by('type_location')
+    )
+    return qs.filter(type_location=''), lignes
+
+
+def occupation_par_type(debut, fin):
+    """
+    Jours-véhicules loués par type de location ; jours_parc : total du parc sur la période
+    (le taux d'un type est sa part des jours-véhicules au parc).
+    """
+    parc, lignes = _occupation_par_type(debut, fin)
+    total = parc.aggregate(jours_parc=Sum('nb_parc'))['jours_parc']
+    return [avec_taux({**row, 'jours_parc': total}) for row in lignes]
+
+
+async def aoccupation_par_type(debut, fin):
+    """Version async de occupation_par_type (ORM async : aaggregate, itération async)."""
+    parc, lignes = _occupation_par_type(debut, fin)
+    total = (await parc.aaggregate(jours_parc=Sum('nb_parc')))['jours_parc']
+    return [avec_taux({**row, 'jours_parc': total}) async for row in lignes]
@@ -0,0 +1,185 @@
+"""
+File d'emails transactionnels FLOTTE (table EmailOutbox).
+
+queue_mail_html() écrit le message dans la transaction en cours : une création de compte annulée
+n'envoie rien, et un serveur SMTP lent ne bloque plus la requête qui déclenche l'email.
+deliver_outbox() (commande `python manage.py send_outbox`, en boucle ou planifiée) envoie les
+messages dus par lots, sur une seule connexion SMTP par lot (get_connection + send_messages).
+Un échec reprogramme le message avec un délai croissant (FLOTTE_OUTBOX_BACKOFF_SECONDS × 2^n) ;
+après FLOTTE_OUTBOX_MAX_ATTEMPTS tentatives il passe en échec définitif (relançable depuis l'admin).
+
+Plusieurs workers peuvent tourner : chaque lot est réservé par un jeton ; un lot abandonné
+(worker arrêté) redevient dû après FLOTTE_OUTBOX_LEASE_SECONDS.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 60
+DEFAULT_LEASE_SECONDS = 600
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+
+def get_batch_size():
+    return int(getattr(settings, 'FLOTTE_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+
+
+def get_max_attempts():
+    return int(getattr(settings, 'FLOTTE_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+
+
+def retry_delay(tentatives):
+    """Délai avant le nouvel essai après `tentatives` échecs : base × 2^(n-1), plafonné à 6 h."""
+    base = int(getattr(settings, 'FLOTTE_OUTBOX_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS))
+    return timedelta(seconds=min(base * 2 ** max(tentatives - 1, 0), MAX_BACKOFF_SECONDS))
+
+
+# ——— Mise en file ———
+
+def build_mail_html(subject, body_html, to_emails, body_text=None, from_email=None):
+    """EmailOutbox non enregistré (mise en file groupée par bulk_create), ou None sans destinataire."""
+    if not to_emails:
+        return None
+    if isinstance(to_emails, str):
+        to_emails = [to_emails]
+    return EmailOutbox(
+        sujet=subject[:255],
+        destinataires=list(to_emails),
+        expediteur=from_email or '',
+        corps_texte=body_text or '',
+        corps_html=body_html or '',
+    )
+
+
+def queue_mail_html(subject, body_html, to_emails, body_text=None, from_email=None):
+    """
+    Met un email en file (même signature que emails.send_mail_html). Retourne l'EmailOutbox créé,
+    ou None sans destinataire. L'écriture suit la transaction en cours.
+    """
+    item = build_mail_html(subject, body_html, to_emails, body_text=body_text, from_email=from_email)
+    if item is not None:
+        item.save()
+    return item
+
+
+def _build_message(item, connection):
+    from_email = item.expediteur or getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@flotte.local')
+    msg = EmailMultiAlternatives(
+        item.sujet, item.corps_texte or item.corps_html, from_email, item.destinataires,
+        connection=connection,
+    )
+    if item.corps_html:
+        msg.attach_alternative(item.corps_html, 'text/html')
+    return msg
+
+
+# ——— Envoi ———
+
+def _claim(batch_size, now):
+    """Réserve jusqu'à batch_size messages dus (jeton + bail) et les retourne."""
+    lease = int(getattr(settings, 'FLOTTE_OUTBOX_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    due = EmailOutbox.objects.filter(
+        Q(statut=EmailOutbox.STATUT_ATTENTE) | Q(statut=EmailOutbox.STATUT_EN_COURS),
+        prochain_essai__lte=now,
+    ).order_by('prochain_essai', 'pk').values_list('pk', flat=True)[:batch_size]
+    token = uuid.uuid4().hex
+    # Filtre répété dans l'UPDATE : un message réservé entre-temps par un autre worker est ignoré
+    EmailOutbox.objects.filter(
+        Q(statut=EmailOutbox.STATUT_ATTENTE) | Q(statut=EmailOutbox.STATUT_EN_COURS),
+        pk__in=list(due), prochain_essai__lte=now,
+    ).update(statut=EmailOutbox.STATUT_EN_COURS, jeton=token, prochain_essai=now + timedelta(seconds=lease))
+    return list(EmailOutbox.objects.filter(jeton=token, statut=EmailOutbox.STATUT_EN_COURS).order_by('pk'))
+
+
+def _mark_failed(item, error, now, max_attempts):
+    item.tentatives += 1
+    item.derniere_erreur = f'{type(error).__name__}: {error}'[:2000]
+    if item.tentatives >= max_attempts:
+        item.statut = EmailOutbox.STATUT_ECHEC
+    else:
+        item.statut = EmailOutbox.STATUT_ATTENTE
+        item.prochain_essai = now + retry_delay(item.tentatives)
+
+
+def deliver_outbox(batch_size=None, now=None, connection=None):
+    """
+    Envoie un lot de messages dus sur une seule connexion. Retourne un dict
+    {'envoyes', 'reportes', 'echecs'} (echecs : passés en échec définitif).
+    """
+    now = now or timezone.now()
+    max_attempts = get_max_attempts()
+    items = _claim(batch_size or get_batch_size(), now)
+    stats = {'envoyes': 0, 'reportes': 0, 'echecs': 0}
+    if not items:
+        return stats
+
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.warning("Connexion au serveur d'emails impossible : %s", e)
+        for item in items:
+            _mark_failed(item, e, now, max_attempts)
+    else:
+        try:
+            for item in items:
+                try:
+                    # Un message à la fois sur la connexion ouverte : statut propre à chaque message
+                    connection.send_messages([_build_message(item, connection)])
+                except Exception as e:
+                    logger.warning('Email %s non envoyé (tentative %s) : %s', item.pk, item.tentatives + 1, e)
+                    _mark_failed(item, e, now, max_attempts)
+                    # Connexion possiblement rompue : la rouvrir pour la suite du lot
+                    connection.close()
+                    try:
+                        connection.open()
+                    except Exception:
+                        pass
+                else:
+                    item.statut = EmailOutbox.STATUT_ENVOYE
+                    item.envoye_le = timezone.now()
+                    item.derniere_erreur = ''
+        finally:
+            connection.close()
+
+    for item in items:
+        item.jeton = ''
+        if item.statut == EmailOutbox.STATUT_ENVOYE:
+            stats['envoyes'] += 1
+        elif item.statut == EmailOutbox.STATUT_ECHEC:
+            stats['echecs'] += 1
+        else:
+            stats['reportes'] += 1
+    EmailOutbox.objects.bulk_update(
+        items, ['statut', 'tentatives', 'prochain_essai', 'jeton', 'derniere_erreur', 'envoye_le'],
+    )
+    return stats
+
+
+def deliver_all(batch_size=None, now=None):
+    """Envoie les lots successifs jusqu'à épuisement des messages dus. Retourne les totaux."""
+    totals = {'envoyes': 0, 'reportes': 0, 'echecs': 0}
+    while True:
+        stats = deliver_outbox(batch_size=batch_size, now=now)
+        for key, value in stats.items():
+            totals[key] += value
+        if not any(stats.values()):
+            return totals
+
+
+def requeue(queryset):
+    """Remet en file des messages (action admin « Renvoyer ») : tentatives remises à zéro."""
+    return queryset.exclude(statut=EmailOutbox.STATUT_ENVOYE).update(
+        statut=EmailOutbox.STATUT_ATTENTE, tentatives=0, prochain_essai=timezone.now(), jeton='',
+    )
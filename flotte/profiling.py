@@ -0,0 +1,278 @@
+"""
+Profilage des requêtes FLOTTE (middleware échantillonné).
+
+Pour une fraction FLOTTE_PROFILING_SAMPLE_RATE des requêtes : temps total, temps passé en base,
+nombre de requêtes SQL et empreintes des requêtes (littéraux remplacés par « ? »). Une même
+empreinte exécutée au moins FLOTTE_PROFILING_NPLUSONE_THRESHOLD fois est signalée comme N+1,
+une même requête avec les mêmes paramètres répétée comme doublon ; chaque détection porte le nom
+de la vue et l'emplacement (fichier:ligne) du code du projet qui a émis la requête.
+
+Les profils sont conservés dans un tampon circulaire par processus (FLOTTE_PROFILING_BUFFER_SIZE)
+et agrégés par vue dans la table ProfilVue (au plus une écriture toutes les
+FLOTTE_PROFILING_FLUSH_INTERVAL secondes), consultable dans l'admin, triée par p95.
+"""
+import bisect
+import logging
+import random
+import re
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .async_support import HybridMiddleware
+from .query_budget import instrument_queries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_BUFFER_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 30
+DEFAULT_NPLUSONE_THRESHOLD = 5
+MAX_DETECTIONS = 10
+
+# Bornes supérieures (ms) des compartiments de l'histogramme des durées ; le dernier est ouvert
+HISTOGRAM_BOUNDS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+_SPACES_RE = re.compile(r'\s+')
+
+_PROFILING_DIR = str(Path(__file__).resolve())
+_QUERY_BUDGET_FILE = str(Path(__file__).resolve().with_name('query_budget.py'))
+
+
+def get_sample_rate():
+    return float(getattr(settings, 'FLOTTE_PROFILING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE))
+
+
+def get_nplusone_threshold():
+    return int(getattr(settings, 'FLOTTE_PROFILING_NPLUSONE_THRESHOLD', DEFAULT_NPLUSONE_THRESHOLD))
+
+
+def get_flush_interval():
+    return int(getattr(settings, 'FLOTTE_PROFILING_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL))
+
+
+def fingerprint(sql):
+    """Empreinte d'une requête : littéraux et listes IN normalisés (requêtes « similaires »)."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+def _callsite():
+    """Premier cadre de la pile appartenant au projet (hors Django, site-packages et ce module)."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename in (_PROFILING_DIR, _QUERY_BUDGET_FILE) or 'site-packages' in filename \
+                or not filename.startswith(base_dir):
+            continue
+        return f'{Path(filename).relative_to(base_dir)}:{frame.lineno} ({frame.name})'
+    return ''
+
+
+# ——— Capture d'une requête ———
+
+class QueryRecorder:
+    """execute_wrapper : mesure chaque requête SQL et repère les répétitions."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.exact = Counter()
+        self.callsites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.count += 1
+            fp = fingerprint(sql)
+            self.fingerprints[fp] += 1
+            try:
+                self.exact[(sql, repr(params))] += 1
+            except Exception:
+                pass
+            # Emplacement relevé à la 2e occurrence seulement (coût de la pile limité aux répétitions)
+            if self.fingerprints[fp] == 2:
+                self.callsites[fp] = _callsite()
+
+    def detections(self, vue):
+        threshold = get_nplusone_threshold()
+        found = []
+        for fp, count in self.fingerprints.most_common():
+            if count < threshold:
+                break
+            found.append({'type': 'n+1', 'vue': vue, 'sql': fp[:300], 'count': count,
+                          'callsite': self.callsites.get(fp, '')})
+        for (sql, _params), count in self.exact.most_common():
+            if count < 2:
+                break
+            fp = fingerprint(sql)
+            if self.fingerprints[fp] >= threshold:
+                continue  # déjà signalée comme N+1
+            found.append({'type': 'doublon', 'vue': vue, 'sql': fp[:300], 'count': count,
+                          'callsite': self.callsites.get(fp, '')})
+        return found[:MAX_DETECTIONS]
+
+
+# ——— Tampon circulaire et agrégation ———
+
+_lock = threading.Lock()
+_buffer = deque(maxlen=int(getattr(settings, 'FLOTTE_PROFILING_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)))
+_pending = []
+_last_flush = time.monotonic()
+
+
+def recent_profiles(vue=None):
+    """Profils récents de ce processus (du plus récent au plus ancien), éventuellement filtrés par vue."""
+    with _lock:
+        profiles = list(_buffer)
+    profiles.reverse()
+    if vue:
+        profiles = [p for p in profiles if p['vue'] == vue]
+    return profiles
+
+
+def record_profile(profile):
+    """Ajoute un profil au tampon ; déclenche l'agrégation en base si l'intervalle est écoulé."""
+    global _last_flush
+    with _lock:
+        _buffer.append(profile)
+        _pending.append(profile)
+        due = time.monotonic() - _last_flush >= get_flush_interval()
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush_profiles()
+
+
+def _histogram_index(duration_ms):
+    return bisect.bisect_left(HISTOGRAM_BOUNDS, duration_ms)
+
+
+def percentile_from_histogram(histogram, q=0.95):
+    """Borne supérieure du compartiment contenant le quantile q (dernier compartiment : borne max connue)."""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    target = q * total
+    cumulated = 0
+    for index, count in enumerate(histogram):
+        cumulated += count
+        if cumulated >= target:
+            return float(HISTOGRAM_BOUNDS[index] if index < len(HISTOGRAM_BOUNDS) else HISTOGRAM_BOUNDS[-1] * 2)
+    return float(HISTOGRAM_BOUNDS[-1] * 2)
+
+
+def flush_profiles():
+    """Agrège les profils en attente dans ProfilVue (une ligne par vue). Retourne le nombre de vues mises à jour."""
+    from .models import ProfilVue
+
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+    by_view = {}
+    for profile in pending:
+        by_view.setdefault(profile['vue'], []).append(profile)
+    try:
+        with transaction.atomic():
+            for vue, profiles in by_view.items():
+                row, _ = ProfilVue.objects.select_for_update().get_or_create(vue=vue[:200])
+                histogram = list(row.histogramme or [])
+                histogram += [0] * (len(HISTOGRAM_BOUNDS) + 1 - len(histogram))
+                detections = list(row.dernieres_detections or [])
+                for p in profiles:
+                    histogram[_histogram_index(p['duree_ms'])] += 1
+                    row.nb_echantillons += 1
+                    row.temps_total_ms += p['duree_ms']
+                    row.temps_db_ms += p['db_ms']
+                    row.temps_max_ms = max(row.temps_max_ms, p['duree_ms'])
+                    row.nb_sql += p['nb_sql']
+                    row.nb_detections += len(p['detections'])
+                    detections = p['detections'] + detections
+                row.histogramme = histogram
+                row.p95_ms = percentile_from_histogram(histogram)
+                row.dernieres_detections = detections[:MAX_DETECTIONS]
+                row.save()
+    except DatabaseError as e:
+        # Table absente (migrations non appliquées) ou base verrouillée : le profilage ne doit rien casser
+        logger.warning('Profilage : agrégation ignorée (%s)', e)
+        return 0
+    return len(by_view)
+
+
+def reset():
+    """Vide le tampon et les profils en attente (tests)."""
+    global _last_flush
+    with _lock:
+        _buffer.clear()
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+
+# ——— Middleware ———
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Profile une fraction des requêtes (FLOTTE_PROFILING_SAMPLE_RATE, 0 = désactivé).
+    À placer en tête de MIDDLEWARE pour inclure les requêtes des autres middlewares.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        start = time.perf_counter()
+        with instrument_queries(QueryRecorder()) as recorder:
+            response = self.get_response(request)
+        record_profile(self._profile(request, response, start, recorder))
+        return response
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        start = time.perf_counter()
+        with instrument_queries(QueryRecorder()) as recorder:
+            response = await self.get_response(request)
+        # record_profile peut écrire en base (agrégation ProfilVue)
+        await sync_to_async(record_profile)(self._profile(request, response, start, recorder))
+        return response
+
+    def _sampled(self):
+        rate = get_sample_rate()
+        return rate > 0 and random.random() < rate
+
+    def _profile(self, request, response, start, recorder):
+        duration_ms = (time.perf_counter() - start) * 1000
+        match = getattr(request, 'resolver_match', None)
+        vue = (match.view_name or match._func_path) if match else 'non résolue'
+        profile = {
+            'vue': vue,
+            'chemin': request.path[:200],
+            'methode': request.method,
+            'statut': response.status_code,
+            'duree_ms': round(duration_ms, 2),
+            'db_ms': round(recorder.db_time * 1000, 2),
+            'nb_sql': recorder.count,
+            'detections': recorder.detections(vue),
+            'horodatage': time.time(),
+        }
+        for detection in profile['detections']:
+            logger.info('Profilage %s : %s ×%s (%s)', detection['type'], vue, detection['count'], detection['callsite'])
+        return profile
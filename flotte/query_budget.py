@@ -0,0 +1,134 @@
+"""
+Budgets de requêtes SQL par vue (flotte.query_budget).
+
+@query_budget(n) déclare le nombre maximal de requêtes SQL d'une requête HTTP GET / HEAD complète
+sur la vue (session, utilisateur et profil compris), indépendamment du volume de données : les URL
+du projet servent de registre (get_query_budget(resolver_match.func)). Le budget est vérifié
+dans les tests à plusieurs tailles de jeu de données (flotte/tests/integration/test_query_budgets.py)
+et, en exploitation, par QueryBudgetMiddleware selon FLOTTE_QUERY_BUDGET_MODE :
+'off' (aucun comptage), 'log' (avertissement journalisé) ou 'raise' (QueryBudgetExceeded).
+"""
+import contextvars
+import logging
+from contextlib import contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+
+from .async_support import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODE = 'log'
+MODES = ('off', 'log', 'raise')
+
+
+class QueryBudgetExceeded(Exception):
+    """Nombre de requêtes SQL supérieur au budget déclaré de la vue (mode 'raise')."""
+
+
+def query_budget(n):
+    """
+    Déclare le budget de requêtes d'une vue fonction ou d'une classe de vue (CBV, ViewSet DRF).
+    À placer sous les décorateurs d'accès : functools.wraps recopie l'attribut sur la vue décorée.
+    """
+    def decorator(view):
+        view.query_budget = n
+        return view
+    return decorator
+
+
+def get_query_budget(func):
+    """Budget de la vue résolue (fonction, CBV via view_class, DRF via cls) ou None."""
+    if func is None:
+        return None
+    budget = getattr(func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(func, 'view_class', None) or getattr(func, 'cls', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
+
+
+def get_mode():
+    mode = getattr(settings, 'FLOTTE_QUERY_BUDGET_MODE', DEFAULT_MODE)
+    return mode if mode in MODES else DEFAULT_MODE
+
+
+# ——— Instrumentation des requêtes SQL par contexte ———
+# Les execute_wrapper actifs sont portés par une variable de contexte, pas par la connexion du
+# thread courant : sous ASGI, les requêtes SQL d'une vue async s'exécutent dans un autre thread
+# (sync_to_async) qui hérite du contexte de la requête HTTP.
+
+_query_wrappers = contextvars.ContextVar('flotte_query_wrappers', default=())
+
+
+def _dispatch_query(execute, sql, params, many, context):
+    """execute_wrapper permanent de chaque connexion : applique les wrappers du contexte courant."""
+    for wrapper in reversed(_query_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(sender=None, connection=None, **kwargs):
+    """Récepteur connection_created : installe _dispatch_query (une fois par connexion)."""
+    if _dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch_query)
+
+
+@contextmanager
+def instrument_queries(wrapper):
+    """Applique `wrapper` (signature execute_wrapper) aux requêtes SQL du contexte courant, sync ou async."""
+    for connection in connections.all(initialized_only=True):
+        install_query_dispatcher(connection=connection)
+    token = _query_wrappers.set(_query_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _query_wrappers.reset(token)
+
+
+class QueryCounter:
+    """execute_wrapper minimal : compte les requêtes exécutées."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware(HybridMiddleware):
+    """
+    Compte les requêtes SQL des lectures (GET / HEAD, un incrément par requête SQL) et signale
+    les dépassements du budget de la vue résolue. Mode 'off' : aucune instrumentation.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if get_mode() == 'off' or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        with instrument_queries(QueryCounter()) as counter:
+            response = self.get_response(request)
+        self._check(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        if get_mode() == 'off' or request.method not in ('GET', 'HEAD'):
+            return await self.get_response(request)
+        with instrument_queries(QueryCounter()) as counter:
+            response = await self.get_response(request)
+        self._check(request, counter)
+        return response
+
+    def _check(self, request, counter):
+        match = getattr(request, 'resolver_match', None)
+        budget = get_query_budget(match.func if match else None)
+        if budget is not None and counter.count > budget:
+            message = (f'Budget de requêtes dépassé : {match.view_name or match._func_path} '
+                       f'{counter.count} requêtes SQL (budget {budget}) — {request.method} {request.path}')
+            if get_mode() == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,195 @@
+"""
+Base de lecture des rapports FLOTTE (alias 'reporting') — routeur, décorateur de vue, instantané SQLite.
+
+Les vues analytiques (TCO, CA, échéances, exports CSV, journal d'audit) lisent beaucoup et
+concurrencent les écritures transactionnelles. Décorées par @use_reporting_db, leurs lectures des modèles de FLOTTE_REPORTING_APPS partent vers l'alias 'reporting' :
+- un réplica (PostgreSQL…) configuré par FLOTTE_REPORTING_DB_HOST ;
+- ou, en SQLite, un instantané de la base (FLOTTE_REPORTING_SNAPSHOT_PATH) recopié
+  périodiquement par l'API de sauvegarde en ligne (`python manage.py refresh_reporting_snapshot`).
+
+Lecture de ses propres écritures : après une requête d'écriture réussie (POST, PUT, PATCH, DELETE),
+l'utilisateur lit la base principale pendant FLOTTE_REPORTING_STICKY_SECONDS, le temps que le
+réplica ou l'instantané rattrape ses modifications (ReportingStickinessMiddleware).
+
+Les vues dont le résultat est mis en cache sous une génération de données (graphiques admin_custom,
+fragments, ETag) ne sont pas décorées : une lecture en retard y serait servie sous la génération
+courante jusqu'à expiration.
+
+Sans alias 'reporting' (défaut, tests), le décorateur ne change rien.
+"""
+import contextvars
+import logging
+import os
+import sqlite3
+import time
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .async_support import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+REPORTING_ALIAS = 'reporting'
+DEFAULT_STICKY_SECONDS = 300
+DEFAULT_REPORTING_APPS = ('flotte',)
+STICKY_KEY = 'flotte:reporting:write:{}'
+UNSAFE_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+# Alias de lecture de la requête en cours (None hors vue @use_reporting_db)
+_read_alias = contextvars.ContextVar('flotte_reporting_read_alias', default=None)
+
+
+def get_sticky_seconds():
+    """Durée (secondes) pendant laquelle un utilisateur qui vient d'écrire lit la base principale."""
+    return int(getattr(settings, 'FLOTTE_REPORTING_STICKY_SECONDS', DEFAULT_STICKY_SECONDS))
+
+
+def reporting_configured():
+    return REPORTING_ALIAS in settings.DATABASES
+
+
+def get_snapshot_path():
+    """Chemin de l'instantané SQLite (FLOTTE_REPORTING_SNAPSHOT_PATH) ou None."""
+    path = getattr(settings, 'FLOTTE_REPORTING_SNAPSHOT_PATH', '')
+    return Path(path) if path else None
+
+
+# ——— Routeur ———
+
+class ReportingRouter:
+    """Lectures des applications FLOTTE_REPORTING_APPS vers l'alias actif de @use_reporting_db."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias and model._meta.app_label in getattr(settings, 'FLOTTE_REPORTING_APPS', DEFAULT_REPORTING_APPS):
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur les deux alias : une instance lue sur 'reporting' peut référencer une de 'default'
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPORTING_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if db == REPORTING_ALIAS:
+            return False  # réplica ou instantané : schéma recopié depuis la base principale
+        return None
+
+
+# ——— Lecture de ses propres écritures ———
+
+def mark_recent_write(user):
+    """Note qu'un utilisateur vient d'écrire : ses lectures restent sur la base principale un moment."""
+    if user is not None and user.is_authenticated:
+        cache.set(STICKY_KEY.format(user.pk), time.time(), get_sticky_seconds())
+
+
+def has_recent_write(user):
+    return user is not None and user.is_authenticated and cache.get(STICKY_KEY.format(user.pk)) is not None
+
+
+class ReportingStickinessMiddleware(HybridMiddleware):
+    """Après une requête d'écriture réussie d'un utilisateur connecté, marque sa fenêtre de lecture principale."""
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._is_write(request, response):
+            mark_recent_write(getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._is_write(request, response) and hasattr(request, 'auser'):
+            mark_recent_write(await request.auser())
+        return response
+
+    @staticmethod
+    def _is_write(request, response):
+        return request.method in UNSAFE_METHODS and response.status_code < 400 and reporting_configured()
+
+
+# ——— Décorateur de vue ———
+
+def _refresh_snapshot_connection():
+    """Ferme la connexion 'reporting' si l'instantané a été remplacé depuis son ouverture."""
+    path = get_snapshot_path()
+    if path is None:
+        return True
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False  # pas encore d'instantané : base principale
+    connection = connections[REPORTING_ALIAS]
+    if getattr(connection, 'flotte_snapshot_mtime', None) != mtime:
+        connection.close()
+        connection.flotte_snapshot_mtime = mtime
+    return True
+
+
+def get_read_alias(request):
+    """Alias de lecture d'une vue de rapport pour cette requête."""
+    if not reporting_configured() or has_recent_write(getattr(request, 'user', None)):
+        return DEFAULT_DB_ALIAS
+    if not _refresh_snapshot_connection():
+        return DEFAULT_DB_ALIAS
+    return REPORTING_ALIAS
+
+
+def use_reporting_db(view):
+    """
+    Décorateur de vue : lectures analytiques sur l'alias 'reporting' (sauf écriture récente de
+    l'utilisateur). À placer au-dessus de @query_budget.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _read_alias.set(get_read_alias(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+# ——— Instantané SQLite ———
+
+def refresh_snapshot(path=None, source_alias=DEFAULT_DB_ALIAS, pages=1024):
+    """
+    Recopie la base SQLite `source_alias` vers l'instantané par l'API de sauvegarde en ligne
+    (cohérente, sans bloquer les écrivains plus de `pages` pages à la fois), puis remplace
+    l'instantané de façon atomique. Retourne (chemin, taille en octets, durée en ms).
+    """
+    path = Path(path) if path else get_snapshot_path()
+    if path is None:
+        raise ValueError("FLOTTE_REPORTING_SNAPSHOT_PATH n'est pas défini.")
+    source_settings = settings.DATABASES[source_alias]
+    if source_settings['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ValueError(f"La base « {source_alias} » n'est pas SQLite.")
+
+    start = time.perf_counter()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    source = sqlite3.connect(str(source_settings['NAME']))
+    try:
+        target = sqlite3.connect(str(tmp))
+        try:
+            source.backup(target, pages=pages)
+            # Instantané lu en immutable : pas de WAL à côté du fichier
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+    finally:
+        source.close()
+    os.replace(tmp, path)
+    duration = round((time.perf_counter() - start) * 1000, 1)
+    logger.info('Instantané de rapport %s rafraîchi en %s ms', path, duration)
+    return path, path.stat().st_size, duration
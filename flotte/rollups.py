@@ -0,0 +1,185 @@
+"""
+Agrégats de ventes FLOTTE (table VenteRollup) — source des KPIs et graphiques de chiffre d'affaires.
+
+Une ligne par (jour, marque, modèle), garantie par contrainte unique : nombre de ventes, total,
+prix min / max. Les lignes sont recalculées depuis Vente, sous verrou de ligne, pour les seuls
+compartiments touchés (signaux pre/post_save, post_delete de Vente ; changement de marque / modèle
+d'un véhicule vendu). Les granularités mois / année sont dérivées par Trunc sur `jour`, les pages
+CA ne parcourent donc jamais la table des ventes.
+
+Les écritures sans signaux (bulk_create, update, loaddata) nécessitent
+`python manage.py rebuild_vente_rollup`.
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncYear
+
+from .http_cache import bump_data_version
+from .models import Vehicule, Vente, VenteRollup
+
+logger = logging.getLogger(__name__)
+
+# Même base que les KPIs CA historiques : prix renseigné et différent de 0
+FILTRE_CA = Q(prix_vente__isnull=False) & ~Q(prix_vente=0)
+
+AGREGATS_VENTE = {
+    'nb_ventes': Count('id'),
+    'nb_ventes_prix': Count('prix_vente'),
+    'nb_ventes_ca': Count('id', filter=FILTRE_CA),
+    'total_ca': Sum('prix_vente', filter=FILTRE_CA),
+    'prix_min': Min('prix_vente', filter=FILTRE_CA),
+    'prix_max': Max('prix_vente', filter=FILTRE_CA),
+}
+
+BATCH_SIZE = 1000
+
+
+# ——— Maintenance ———
+
+def _valeurs_rollup(agg):
+    return {
+        'nb_ventes': agg['nb_ventes'] or 0,
+        'nb_ventes_prix': agg['nb_ventes_prix'] or 0,
+        'nb_ventes_ca': agg['nb_ventes_ca'] or 0,
+        'total_ca': agg['total_ca'] or 0,
+        'prix_min': agg['prix_min'],
+        'prix_max': agg['prix_max'],
+    }
+
+
+def cle_vente(vente):
+    """Compartiment (jour, marque_id, modele_id) d'une vente, lu en base (sans charger le véhicule)."""
+    dims = (
+        Vehicule.objects.filter(pk=vente.vehicule_id)
+        .values_list('marque_id', 'modele_id')
+        .first()
+    ) or (None, None)
+    return (vente.date_vente, dims[0], dims[1])
+
+
+def _recalculer_compartiment(jour, marque_id, modele_id):
+    """
+    Recalcule une ligne VenteRollup sous verrou : la ligne existante est verrouillée (select_for_update)
+    avant l'agrégat, deux ventes concurrentes du même compartiment sont donc comptées en série.
+    """
+    lignes = VenteRollup.objects.select_for_update().filter(jour=jour, marque_id=marque_id, modele_id=modele_id)
+    while True:
+        ligne = lignes.first()
+        agg = Vente.objects.filter(
+            date_vente=jour, vehicule__marque_id=marque_id, vehicule__modele_id=modele_id
+        ).aggregate(**AGREGATS_VENTE)
+        if ligne is None:
+            if not agg['nb_ventes']:
+                return
+            try:
+                with transaction.atomic():
+                    VenteRollup.objects.create(
+                        jour=jour, marque_id=marque_id, modele_id=modele_id, **_valeurs_rollup(agg)
+                    )
+                return
+            except IntegrityError:
+                # Compartiment créé entre-temps par une transaction concurrente : verrouiller et recalculer
+                continue
+        if not agg['nb_ventes']:
+            ligne.delete()
+            return
+        for champ, valeur in _valeurs_rollup(agg).items():
+            setattr(ligne, champ, valeur)
+        ligne.save()
+        return
+
+
+def recalculer_compartiments(cles):
+    """Recalcule depuis Vente les lignes VenteRollup des compartiments (jour, marque_id, modele_id)."""
+    cles = {c for c in cles if c and c[0] is not None}
+    with transaction.atomic():
+        # Ordre stable des verrous entre transactions concurrentes
+        for jour, marque_id, modele_id in sorted(cles, key=lambda c: (c[0], c[1] or 0, c[2] or 0)):
+            _recalculer_compartiment(jour, marque_id, modele_id)
+    return len(cles)
+
+
+def reconstruire_rollup():
+    """Reconstruit toute la table VenteRollup en une requête group-by. Retourne le nombre de lignes."""
+    rows = (
+        Vente.objects.values('date_vente', 'vehicule__marque_id', 'vehicule__modele_id')
+        .annotate(**AGREGATS_VENTE)
+        .order_by()
+    )
+    objs = [
+        VenteRollup(
+            jour=row['date_vente'],
+            marque_id=row['vehicule__marque_id'],
+            modele_id=row['vehicule__modele_id'],
+            **_valeurs_rollup(row),
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        VenteRollup.objects.all().delete()
+        VenteRollup.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    # bulk_create n'émet pas de signaux : invalider explicitement les ETag du CA
+    bump_data_version(VenteRollup)
+    logger.info('VenteRollup reconstruit : %s ligne(s)', len(objs))
+    return len(objs)
+
+
+def compartiments_vehicule(vehicule_id, marque_id, modele_id):
+    """Compartiments des ventes d'un véhicule pour une marque / un modèle donnés."""
+    jours = Vente.objects.filter(vehicule_id=vehicule_id).values_list('date_vente', flat=True).distinct()
+    return {(jour, marque_id, modele_id) for jour in jours}
+
+
+# ——— Lecture ———
+
+_SYNTHESE_AGREGATS = {
+    'somme_ca': Sum('total_ca'),
+    'somme_ventes_ca': Sum('nb_ventes_ca'),
+    'somme_ventes': Sum('nb_ventes'),
+    'somme_ventes_prix': Sum('nb_ventes_prix'),
+}
+
+
+def _synthese(agg):
+    total = agg['somme_ca'] or 0
+    nb_ca = agg['somme_ventes_ca'] or 0
+    nb_prix = agg['somme_ventes_prix'] or 0
+    return {
+        'total_ca': total,
+        'nb_ventes': nb_ca,
+        'moyenne_vente': total / nb_ca if nb_ca else 0,
+        'nb_ventes_total': agg['somme_ventes'] or 0,
+        'moyenne_prix': total / nb_prix if nb_prix else 0,
+    }
+
+
+def synthese_ca(**filtres):
+    """
+    Totaux CA depuis VenteRollup (filtres sur les champs du rollup, ex. jour__year=2025).
+    Retourne total_ca, nb_ventes (prix > 0), moyenne_vente, nb_ventes_total (toutes ventes)
+    et moyenne_prix (moyenne des prix renseignés).
+    """
+    return _synthese(VenteRollup.objects.filter(**filtres).aggregate(**_SYNTHESE_AGREGATS))
+
+
+async def asynthese_ca(**filtres):
+    """Version async de synthese_ca (ORM async : aaggregate)."""
+    return _synthese(await VenteRollup.objects.filter(**filtres).aaggregate(**_SYNTHESE_AGREGATS))
+
+
+def evolution_ca(granularite, annee=None, mois=None):
+    """Valeurs (periode, total, nb) par jour / mois / année, dérivées des lignes journalières."""
+    qs = VenteRollup.objects.filter(nb_ventes_ca__gt=0)
+    if annee:
+        qs = qs.filter(jour__year=annee)
+    if mois is not None:
+        qs = qs.filter(jour__month=mois)
+    if granularite == 'jour':
+        qs = qs.annotate(periode=F('jour')).values('periode')
+    elif granularite == 'mois':
+        qs = qs.annotate(periode=TruncMonth('jour')).values('periode')
+    else:  # annee
+        qs = qs.annotate(periode=TruncYear('jour')).values('periode')
+    return qs.annotate(total=Sum('total_ca'), nb=Sum('nb_ventes_ca')).order_by('periode')
@@ -0,0 +1,251 @@
+"""
+Planificateur de tâches périodiques FLOTTE (commande `python manage.py run_scheduler`).
+
+Les tâches sont déclarées dans FLOTTE_SCHEDULER_JOBS : nom -> {'cron': 'min heure jour mois jour_semaine',
+'callable': chemin pointé} ou {'cron': …, 'command': commande de gestion, 'args': [...]},
+avec 'timeout' (secondes de verrou, défaut FLOTTE_SCHEDULER_LOCK_SECONDS) facultatif.
+
+Chaque minute, les tâches dont l'expression cron correspond sont exécutées l'une après l'autre ;
+les minutes écoulées pendant une tâche longue sont rattrapées (un seul créneau, le plus récent,
+par tâche) : une tâche quotidienne n'est pas perdue parce qu'une autre tâche occupait son créneau.
+Plusieurs instances peuvent tourner (haute disponibilité) : le verrou en base (TachePlanifiee)
+n'attribue chaque créneau qu'à une seule instance, et une exécution interrompue le libère à
+expiration. Chaque exécution est historisée (ExecutionTache : durée, statut, résultat ou trace).
+"""
+import calendar
+import io
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ExecutionTache, TachePlanifiee
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_SECONDS = 3600
+DEFAULT_HISTORY_DAYS = 30
+RESULT_MAX_LENGTH = 4000
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+
+
+# ——— Expressions cron ———
+
+class CronSchedule:
+    """Expression cron à 5 champs (*, */n, a-b, a-b/n, listes ; jour de semaine 0 ou 7 = dimanche)."""
+    FIELDS = (('minute', 0, 59), ('heure', 0, 23), ('jour', 1, 31), ('mois', 1, 12), ('jour_semaine', 0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression
+        parts = ALIASES.get(expression.strip(), expression).split()
+        if len(parts) != 5:
+            raise ValueError(f'Expression cron invalide (5 champs attendus) : {expression!r}')
+        values = [self._parse(part, name, low, high) for part, (name, low, high) in zip(parts, self.FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {d % 7 for d in weekdays}
+        # Jour du mois et jour de semaine restreints tous deux : l'un OU l'autre (sémantique cron)
+        self.day_restricted = parts[2] != '*'
+        self.weekday_restricted = parts[4] != '*'
+
+    @staticmethod
+    def _parse(part, name, low, high):
+        values = set()
+        for item in part.split(','):
+            rng, _, step = item.partition('/')
+            try:
+                step = int(step) if step else 1
+                if rng == '*':
+                    start, end = low, high
+                elif '-' in rng:
+                    start, end = (int(x) for x in rng.split('-', 1))
+                else:
+                    start = end = int(rng)
+            except ValueError:
+                raise ValueError(f'Champ cron {name} invalide : {part!r}')
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f'Champ cron {name} hors limites ({low}-{high}) : {part!r}')
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def matches(self, dt):
+        """True si la minute de `dt` (heure locale) correspond à l'expression."""
+        return (dt.minute in self.minutes and dt.hour in self.hours
+                and dt.month in self.months and self._day_matches(dt))
+
+    def next_after(self, dt):
+        """Prochaine minute strictement après `dt` correspondant à l'expression (saut par mois / jour / heure)."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t + timedelta(days=366 * 5)
+        while t < limit:
+            if t.month not in self.months:
+                days_left = calendar.monthrange(t.year, t.month)[1] - t.day + 1
+                t = (t + timedelta(days=days_left)).replace(hour=0, minute=0)
+            elif not self._day_matches(t):
+                t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+            elif t.hour not in self.hours:
+                t = (t + timedelta(hours=1)).replace(minute=0)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        return None
+
+    def __str__(self):
+        return self.expression
+
+
+# ——— Tâches ———
+
+class Job:
+    """Tâche déclarée dans FLOTTE_SCHEDULER_JOBS."""
+
+    def __init__(self, name, cron, callable=None, command=None, args=(), timeout=None, description=''):
+        if bool(callable) == bool(command):
+            raise ValueError(f"Tâche {name} : définir 'callable' ou 'command' (un seul des deux).")
+        self.name = name
+        self.schedule = CronSchedule(cron)
+        self.callable = callable
+        self.command = command
+        self.args = list(args)
+        self.timeout = int(timeout or getattr(settings, 'FLOTTE_SCHEDULER_LOCK_SECONDS', DEFAULT_LOCK_SECONDS))
+        self.description = description or (f'manage.py {command} {" ".join(self.args)}'.strip() if command else callable)
+
+    def run(self):
+        """Exécute la tâche ; retourne un texte de résultat (sortie de la commande ou valeur retournée)."""
+        if self.command:
+            out = io.StringIO()
+            call_command(self.command, *self.args, stdout=out, stderr=out)
+            return out.getvalue().strip()
+        result = import_string(self.callable)(*self.args)
+        return '' if result is None else str(result)
+
+
+def get_jobs():
+    """Tâches configurées (FLOTTE_SCHEDULER_JOBS), par nom. ValueError si une définition est invalide."""
+    return {
+        name: Job(name, **definition)
+        for name, definition in getattr(settings, 'FLOTTE_SCHEDULER_JOBS', {}).items()
+    }
+
+
+def get_holder():
+    """Identifiant de l'instance : hôte et processus."""
+    return f'{socket.gethostname()}:{os.getpid()}'[:120]
+
+
+# ——— Verrou en base ———
+
+def acquire(job, slot, holder, now=None):
+    """Réserve le créneau `slot` de la tâche : True pour une seule instance, si le verrou est libre ou expiré."""
+    now = now or timezone.now()
+    TachePlanifiee.objects.get_or_create(nom=job.name)
+    return TachePlanifiee.objects.filter(nom=job.name).filter(
+        Q(dernier_creneau__isnull=True) | Q(dernier_creneau__lt=slot),
+        Q(verrouille_jusqua__isnull=True) | Q(verrouille_jusqua__lt=now),
+    ).update(
+        dernier_creneau=slot, detenteur=holder, verrouille_jusqua=now + timedelta(seconds=job.timeout),
+    ) == 1
+
+
+def release(job, holder):
+    TachePlanifiee.objects.filter(nom=job.name, detenteur=holder).update(detenteur='', verrouille_jusqua=None)
+
+
+# ——— Exécution ———
+
+def run_job(job, slot=None, holder=None):
+    """
+    Exécute une tâche sous verrou et historise l'exécution. Retourne l'ExecutionTache, ou None si
+    le créneau est déjà pris par une autre instance.
+    """
+    slot = slot or timezone.now()
+    holder = holder or get_holder()
+    if not acquire(job, slot, holder):
+        logger.info('Tâche %s : créneau %s déjà pris', job.name, slot)
+        return None
+    execution = ExecutionTache.objects.create(tache=job.name, creneau=slot, hote=holder)
+    start = time.perf_counter()
+    try:
+        execution.resultat = job.run()
+        execution.statut = ExecutionTache.STATUT_SUCCES
+    except Exception:
+        logger.exception('Tâche planifiée %s en échec', job.name)
+        execution.resultat = traceback.format_exc()
+        execution.statut = ExecutionTache.STATUT_ERREUR
+    finally:
+        execution.duree_ms = round((time.perf_counter() - start) * 1000, 1)
+        execution.fin = timezone.now()
+        execution.resultat = execution.resultat[-RESULT_MAX_LENGTH:]
+        execution.save(update_fields=['resultat', 'statut', 'duree_ms', 'fin'])
+        release(job, holder)
+    logger.info('Tâche %s : %s en %s ms', job.name, execution.statut, execution.duree_ms)
+    return execution
+
+
+def due_jobs(jobs, now):
+    """Tâches dont l'expression correspond à la minute de `now` (heure locale)."""
+    local = timezone.localtime(now)
+    return [job for job in jobs.values() if job.schedule.matches(local)]
+
+
+def pending_jobs(jobs, since, now):
+    """
+    Créneaux dus après `since` (exclu) et jusqu'à `now` (inclus) : [(créneau, tâche)] par ordre
+    chronologique, un seul créneau par tâche (le plus récent : pas de rafale après une longue pause).
+    """
+    since, now = timezone.localtime(since), timezone.localtime(now)
+    pending = []
+    for job in jobs.values():
+        slot, latest = since, None
+        while (slot := job.schedule.next_after(slot)) is not None and slot <= now:
+            latest = slot
+        if latest is not None:
+            pending.append((latest, job))
+    return sorted(pending, key=lambda item: item[0])
+
+
+def run_pending_jobs(jobs, since, now=None, holder=None):
+    """Exécute les créneaux dus depuis `since` (pending_jobs) ; retourne les exécutions effectuées."""
+    now = (now or timezone.now()).replace(second=0, microsecond=0)
+    executions = []
+    for slot, job in pending_jobs(jobs, since, now):
+        close_old_connections()
+        execution = run_job(job, slot=slot, holder=holder)
+        if execution is not None:
+            executions.append(execution)
+    return executions
+
+
+def run_due_jobs(jobs, now=None, holder=None):
+    """Exécute les tâches dues pour la minute courante ; retourne les exécutions effectuées."""
+    now = (now or timezone.now()).replace(second=0, microsecond=0)
+    return run_pending_jobs(jobs, now - timedelta(minutes=1), now, holder=holder)
+
+
+def purge_history(days=None):
+    """Supprime l'historique d'exécution plus ancien que FLOTTE_SCHEDULER_HISTORY_DAYS jours."""
+    days = days or int(getattr(settings, 'FLOTTE_SCHEDULER_HISTORY_DAYS', DEFAULT_HISTORY_DAYS))
+    deleted, _ = ExecutionTache.objects.filter(debut__lt=timezone.now() - timedelta(days=days)).delete()
+    return f'{deleted} exécution(s) supprimée(s)'
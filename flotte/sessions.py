@@ -0,0 +1,113 @@
+"""
+Sessions FLOTTE — expiration glissante à écriture limitée et purge des sessions expirées.
+
+Avec SESSION_SAVE_EVERY_REQUEST, chaque requête (recherche_api, graphiques CA…) réécrit la
+session. Le middleware ci-dessous ne marque la session comme modifiée que lorsque sa durée
+de vie restante passe sous le seuil : au plus une écriture toutes les
+FLOTTE_SESSION_REFRESH_INTERVAL secondes par session.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .async_support import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Clé interne stockée dans la session : horodatage (epoch) du dernier rafraîchissement
+SESSION_REFRESH_KEY = '_flotte_refreshed_at'
+
+DEFAULT_REFRESH_INTERVAL = 15 * 60  # 15 min
+DEFAULT_PURGE_BATCH_SIZE = 1000
+
+
+def get_refresh_interval():
+    """Intervalle minimal (secondes) entre deux écritures de la même session."""
+    return int(getattr(settings, 'FLOTTE_SESSION_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL))
+
+
+def session_needs_refresh(session, now=None):
+    """
+    True si la durée de vie restante de la session est passée sous le seuil
+    (SESSION_COOKIE_AGE - intervalle), c.-à-d. si le dernier rafraîchissement date d'au moins N secondes.
+    """
+    return _refresh_due(session.get(SESSION_REFRESH_KEY), now)
+
+
+def _refresh_due(refreshed_at, now=None):
+    now = now if now is not None else time.time()
+    if not refreshed_at:
+        return True
+    remaining = settings.SESSION_COOKIE_AGE - (now - refreshed_at)
+    threshold = settings.SESSION_COOKIE_AGE - get_refresh_interval()
+    return remaining < threshold
+
+
+class SlidingSessionMiddleware(HybridMiddleware):
+    """
+    Expiration glissante : prolonge la session (cookie + stockage) seulement quand c'est nécessaire.
+    À placer après SessionMiddleware et AuthenticationMiddleware ; SESSION_SAVE_EVERY_REQUEST doit être False.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = self._session(request, response)
+        if session is not None:
+            now = time.time()
+            if session_needs_refresh(session, now):
+                # Modifier la clé marque la session comme modifiée → sauvegarde + nouveau cookie
+                session[SESSION_REFRESH_KEY] = int(now)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = self._session(request, response)
+        if session is not None:
+            now = time.time()
+            # aget / aset : chargement éventuel de la session sans bloquer la boucle d'événements
+            if _refresh_due(await session.aget(SESSION_REFRESH_KEY), now):
+                await session.aset(SESSION_REFRESH_KEY, int(now))
+        return response
+
+    @staticmethod
+    def _session(request, response):
+        """Session à prolonger, ou None (pas de cookie de session, erreur serveur, session vide)."""
+        session = getattr(request, 'session', None)
+        # Pas de cookie de session (visiteur anonyme) : ne rien créer
+        if session is None or not session.session_key:
+            return None
+        if response.status_code >= 500 or session.is_empty():
+            return None
+        return session
+
+
+def purge_expired_sessions(batch_size=DEFAULT_PURGE_BATCH_SIZE):
+    """
+    Supprime les sessions expirées par lots (transactions courtes, verrou SQLite libéré entre deux lots).
+    Retourne le nombre de sessions supprimées. Sans effet pour les backends sans stockage (signed_cookies).
+    """
+    engine = settings.SESSION_ENGINE
+    if engine.endswith('signed_cookies') or engine.endswith('.cache'):
+        return 0
+    from django.contrib.sessions.models import Session
+
+    now = timezone.now()
+    total = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lt=now)
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+        total += deleted
+        if len(keys) < batch_size:
+            break
+    if total:
+        logger.info('Sessions expirées purgées : %s', total)
+    return total
@@ -1,32 +1,47 @@
-"""Signals FLOTTE — profil utilisateur à l'inscription, journal d'audit (traçabilité)."""
-import threading
-from django.db.models.signals import post_save, post_delete
+"""Signals FLOTTE — profil utilisateur à l'inscription, journal d'audit (traçabilité), agrégats de ventes."""
+import contextvars
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
+from .async_support import HybridMiddleware
+from .http_cache import bump_data_version
+from .metrics import AUDIT_ERRORS, AUDIT_WRITES
 from .models import (
     ProfilUtilisateur, AuditLog, Vehicule, Location, DocumentVehicule,
     Vente, Depense, Facture, Conducteur, Marque, Modele,
 )
 
-_thread_locals = threading.local()
+# Requête en cours : variable de contexte (propre à chaque requête sous ASGI, héritée par les appels
+# sync_to_async de la vue ; propre à chaque thread sous WSGI). On conserve la requête et non
+# request.user : l'utilisateur paresseux n'est évalué qu'à l'écriture d'audit, dans un thread
+# synchrone (asgiref compare les valeurs du contexte, ce qui évaluerait l'objet paresseux).
+_current_request = contextvars.ContextVar('flotte_current_request', default=None)
 
 
 def get_current_user():
     """Retourne l'utilisateur courant (défini par le middleware d'audit)."""
-    return getattr(_thread_locals, 'user', None)
+    return getattr(_current_request.get(), 'user', None)
 
 
-class AuditMiddleware:
-    """Enregistre l'utilisateur courant pour le journal d'audit."""
-    def __init__(self, get_response):
-        self.get_response = get_response
+class AuditMiddleware(HybridMiddleware):
+    """Enregistre la requête courante (et donc l'utilisateur) pour le journal d'audit."""
 
     def __call__(self, request):
-        _thread_locals.user = getattr(request, 'user', None) if request else None
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _current_request.set(request)
         try:
             return self.get_response(request)
         finally:
-            _thread_locals.user = None
+            _current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = _current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
 
 
 def _log_audit(instance, action, object_repr_max=200):
@@ -42,8 +57,9 @@ def _log_audit(instance, action, object_repr_max=200):
             object_id=object_id,
             object_repr=object_repr,
         )
+        AUDIT_WRITES.inc(action=action)
     except Exception:
-        pass
+        AUDIT_ERRORS.inc()
 
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
@@ -58,7 +74,7 @@ def create_profil_utilisateur(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def send_welcome_email_on_signup(sender, instance, created, **kwargs):
-    """Envoie l'email de bienvenue à tout nouvel utilisateur ayant une adresse email."""
+    """Met en file l'email de bienvenue de tout nouvel utilisateur ayant une adresse email."""
     if created:
         from .emails import send_welcome_email
         send_welcome_email(instance)
@@ -168,3 +184,142 @@ def audit_modele_save(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=Modele)
 def audit_modele_delete(sender, instance, **kwargs):
     _log_audit(instance, 'delete')
+
+
+# ——— Agrégats de ventes (VenteRollup) ———
+
+@receiver(pre_save, sender=Vente)
+def rollup_vente_pre_save(sender, instance, raw=False, **kwargs):
+    """Mémorise le compartiment d'origine d'une vente modifiée (date ou véhicule peuvent changer)."""
+    instance._rollup_cle_origine = None
+    if raw or not instance.pk:
+        return
+    instance._rollup_cle_origine = (
+        Vente.objects.filter(pk=instance.pk)
+        .values_list('date_vente', 'vehicule__marque_id', 'vehicule__modele_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Vente)
+def rollup_vente_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .rollups import cle_vente, recalculer_compartiments
+    recalculer_compartiments({cle_vente(instance), getattr(instance, '_rollup_cle_origine', None)})
+
+
+@receiver(pre_delete, sender=Vente)
+def rollup_vente_pre_delete(sender, instance, **kwargs):
+    from .rollups import cle_vente
+    instance._rollup_cle_origine = cle_vente(instance)
+
+
+@receiver(post_delete, sender=Vente)
+def rollup_vente_delete(sender, instance, **kwargs):
+    from .rollups import recalculer_compartiments
+    recalculer_compartiments({getattr(instance, '_rollup_cle_origine', None)})
+
+
+@receiver(pre_save, sender=Vehicule)
+def rollup_vehicule_pre_save(sender, instance, raw=False, **kwargs):
+    """Marque / modèle d'un véhicule vendu modifiés : les ventes changent de compartiment."""
+    instance._rollup_dims_origine = None
+    instance._occupation_origine = None
+    if raw or not instance.pk:
+        return
+    origine = Vehicule.objects.filter(pk=instance.pk).values_list('marque_id', 'modele_id', 'date_entree_parc').first()
+    if origine:
+        instance._rollup_dims_origine = origine[:2]
+        instance._occupation_origine = (origine[0], origine[2])
+
+
+@receiver(post_save, sender=Vehicule)
+def rollup_vehicule_save(sender, instance, created, raw=False, **kwargs):
+    origine = getattr(instance, '_rollup_dims_origine', None)
+    if raw or created or not origine or origine == (instance.marque_id, instance.modele_id):
+        return
+    from .rollups import compartiments_vehicule, recalculer_compartiments
+    cles = compartiments_vehicule(instance.pk, *origine)
+    if cles:
+        cles |= compartiments_vehicule(instance.pk, instance.marque_id, instance.modele_id)
+        recalculer_compartiments(cles)
+
+
+# ——— Occupation de la flotte (OccupationRollup) ———
+
+@receiver(pre_save, sender=Location)
+def occupation_location_pre_save(sender, instance, raw=False, **kwargs):
+    """Mémorise le début d'origine d'une location modifiée : ses anciens jours sont à recalculer."""
+    instance._occupation_debut_origine = None
+    if raw or not instance.pk:
+        return
+    instance._occupation_debut_origine = (
+        Location.objects.filter(pk=instance.pk).values_list('date_debut', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Location)
+def occupation_location_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .occupation import invalider_depuis
+    invalider_depuis(instance.date_debut, getattr(instance, '_occupation_debut_origine', None))
+
+
+@receiver(post_delete, sender=Location)
+def occupation_location_delete(sender, instance, **kwargs):
+    from .occupation import invalider_depuis
+    invalider_depuis(instance.date_debut)
+
+
+@receiver(post_save, sender=Vehicule)
+def occupation_vehicule_save(sender, instance, created, raw=False, **kwargs):
+    """Entrée au parc ou marque modifiées : occupation à recalculer depuis l'entrée (ancienne ou nouvelle)."""
+    if raw:
+        return
+    origine = getattr(instance, '_occupation_origine', None)
+    if not created and origine == (instance.marque_id, instance.date_entree_parc):
+        return
+    from .occupation import invalider_depuis
+    invalider_depuis(instance.date_entree_parc, origine[1] if origine else None)
+
+
+@receiver(post_delete, sender=Vehicule)
+def occupation_vehicule_delete(sender, instance, **kwargs):
+    from .occupation import invalider_depuis
+    invalider_depuis(instance.date_entree_parc)
+
+
+@receiver(post_save, sender=Vente)
+def occupation_vente_save(sender, instance, raw=False, **kwargs):
+    """Une vente sort le véhicule du parc (compartiment d'origine mémorisé par rollup_vente_pre_save)."""
+    if raw:
+        return
+    from .occupation import invalider_depuis
+    origine = getattr(instance, '_rollup_cle_origine', None)
+    invalider_depuis(instance.date_vente, origine[0] if origine else None)
+
+
+@receiver(post_delete, sender=Vente)
+def occupation_vente_delete(sender, instance, **kwargs):
+    from .occupation import invalider_depuis
+    invalider_depuis(instance.date_vente)
+
+
+# ——— Versions des données (ETag des API JSON, flotte.http_cache) ———
+
+# Connexion modèle par modèle (sender=model) : un receiver post_delete sans sender désactive la
+# suppression rapide (Collector.can_fast_delete) de tous les modèles, y compris hors flotte.
+# Tables techniques (journaux, file d'emails, planificateur…) : lues par aucun ETag ni fragment,
+# sans receiver pour que leurs purges restent des DELETE directs.
+MODELES_SANS_VERSION = {
+    'auditlog', 'profilvue', 'emailoutbox', 'notificationecheance', 'tacheplanifiee', 'executiontache',
+    'occupationinvalidation', 'sequencenumero',
+}
+for _model in apps.get_app_config('flotte').get_models():
+    if _model._meta.model_name in MODELES_SANS_VERSION:
+        continue
+    _label = _model._meta.label_lower
+    post_save.connect(bump_data_version, sender=_model, dispatch_uid=f'flotte_data_version_save:{_label}')
+    post_delete.connect(bump_data_version, sender=_model, dispatch_uid=f'flotte_data_version_delete:{_label}')
@@ -0,0 +1,109 @@
+"""
+SQLite FLOTTE — pragmas appliqués à chaque connexion et maintenance de la base.
+
+Sans réglage, SQLite fonctionne en journal « rollback » : un écrivain bloque tous les lecteurs
+et plusieurs workers (sessions, journal d'audit, imports) se heurtent à « database is locked ».
+Le récepteur connection_created ci-dessous applique FLOTTE_SQLITE_PRAGMAS à chaque nouvelle
+connexion SQLite :
+- journal_mode=WAL : lecteurs et écrivain ne se bloquent plus (persistant dans le fichier) ;
+- synchronous=NORMAL : fsync au checkpoint seulement (sûr en WAL) ;
+- busy_timeout : attente (ms) du verrou d'écriture au lieu d'une erreur immédiate ;
+- mmap_size, cache_size, temp_store=MEMORY : lectures et tris temporaires en mémoire.
+
+La maintenance (checkpoint du WAL, ANALYZE, PRAGMA optimize, vacuum incrémental) est faite par
+`python manage.py sqlite_maintenance`, à planifier.
+"""
+import re
+
+from django.conf import settings
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # négatif : en Kio (20 Mo par connexion)
+    'temp_store': 'memory',
+}
+
+# Pragmas acceptés dans FLOTTE_SQLITE_PRAGMAS (les valeurs sont interpolées dans le SQL)
+ALLOWED_PRAGMAS = frozenset(DEFAULT_PRAGMAS) | {'foreign_keys', 'wal_autocheckpoint', 'journal_size_limit'}
+_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+def get_pragmas():
+    """Pragmas à appliquer : FLOTTE_SQLITE_PRAGMAS (dict, None = valeur SQLite par défaut)."""
+    pragmas = getattr(settings, 'FLOTTE_SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def pragma_statements(pragmas):
+    """Instructions PRAGMA validées ; ValueError si un nom ou une valeur n'est pas admis."""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ValueError(f'Pragma SQLite non pris en charge : {name}')
+        if not _VALUE_RE.match(str(value)):
+            raise ValueError(f'Valeur invalide pour le pragma {name} : {value!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Récepteur connection_created : pragmas FLOTTE_SQLITE_PRAGMAS sur les connexions SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(get_pragmas()):
+            cursor.execute(statement)
+
+
+# ——— Maintenance ———
+
+def _pragma(cursor, statement):
+    cursor.execute(statement)
+    return cursor.fetchall()
+
+
+def checkpoint(connection, mode='TRUNCATE'):
+    """
+    Reporte le WAL dans la base et le tronque ; retourne (occupé, pages du WAL, pages reportées),
+    ou None si la base n'est pas en journal WAL.
+    """
+    with connection.cursor() as cursor:
+        if _pragma(cursor, 'PRAGMA journal_mode')[0][0] != 'wal':
+            return None
+        return tuple(_pragma(cursor, f'PRAGMA wal_checkpoint({mode})')[0])
+
+
+def analyze(connection):
+    """Statistiques complètes de l'optimiseur (ANALYZE)."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def optimize(connection):
+    """PRAGMA optimize : ANALYZE ciblé des tables dont les statistiques sont périmées."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+
+
+def incremental_vacuum(connection, pages=0):
+    """
+    Libère jusqu'à `pages` pages libres (0 = toutes) si auto_vacuum=INCREMENTAL ; retourne
+    (mode auto_vacuum, pages libres avant, pages libres après).
+    """
+    with connection.cursor() as cursor:
+        mode = _pragma(cursor, 'PRAGMA auto_vacuum')[0][0]
+        before = _pragma(cursor, 'PRAGMA freelist_count')[0][0]
+        if mode == 2:  # INCREMENTAL
+            _pragma(cursor, f'PRAGMA incremental_vacuum({int(pages)})')
+        after = _pragma(cursor, 'PRAGMA freelist_count')[0][0]
+    return mode, before, after
+
+
+def enable_incremental_vacuum(connection):
+    """Passe la base en auto_vacuum=INCREMENTAL (VACUUM complet, une fois : verrou exclusif)."""
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
@@ -0,0 +1,61 @@
+"""
+Balise {% fragment_cache %} : cache de fragments versionné par type (flotte.fragment_cache).
+
+    {% load flotte_fragments %}
+    {% fragment_cache tuiles fragment_scope %} … {% endfragment_cache %}
+    {% fragment_cache vehicule_ligne v.pk is_manager_or_admin %} … {% endfragment_cache %}
+
+Le premier argument est le type de fragment (littéral, clé de FRAGMENT_MODELS), les suivants
+les valeurs dont dépend le contenu. Cache utilisé : alias 'template_fragments' s'il existe,
+sinon 'default' (comme {% cache %}).
+"""
+from django.core.cache import InvalidCacheBackendError, caches
+from django.template import Library, Node, TemplateSyntaxError
+
+from flotte.fragment_cache import FRAGMENT_MODELS, fragment_key, fragment_version, get_timeout
+
+register = Library()
+
+
+def _get_cache():
+    try:
+        return caches['template_fragments']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+class FragmentCacheNode(Node):
+
+    def __init__(self, nodelist, fragment, vary_on):
+        self.nodelist = nodelist
+        self.fragment = fragment
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = get_timeout(self.fragment)
+        if timeout <= 0:
+            return self.nodelist.render(context)
+        # Une lecture des générations par type et par rendu (lignes de liste comprises)
+        versions = context.render_context.setdefault('flotte_fragment_versions', {})
+        if self.fragment not in versions:
+            versions[self.fragment] = fragment_version(self.fragment)
+        key = fragment_key(self.fragment, versions[self.fragment],
+                           [var.resolve(context) for var in self.vary_on])
+        fragment_cache = _get_cache()
+        value = fragment_cache.get(key)
+        if value is None:
+            value = self.nodelist.render(context)
+            fragment_cache.set(key, value, timeout)
+        return value
+
+
+@register.tag('fragment_cache')
+def do_fragment_cache(parser, token):
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 2:
+        raise TemplateSyntaxError(f'{tokens[0]!r} : type de fragment requis.')
+    if tokens[1] not in FRAGMENT_MODELS:
+        raise TemplateSyntaxError(f'{tokens[0]!r} : type de fragment inconnu {tokens[1]!r}.')
+    return FragmentCacheNode(nodelist, tokens[1], [parser.compile_filter(t) for t in tokens[2:]])
@@ -0,0 +1 @@
+# Tests d'intégration FLOTTE
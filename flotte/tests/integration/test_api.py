@@ -229,6 +229,78 @@ class ApiCaSyntheseTests(TestCase):
         self.assertIn('moyenne_vente', data)
 
 
+class ConditionalCachingTests(TestCase):
+    """ETag / If-None-Match sur les API JSON analytiques (304 si données inchangées)."""
+
+    def setUp(self):
+        self.client = Client()
+        self.manager = User.objects.create_user(username='etagmgr', password='testpass123')
+        profil, _ = ProfilUtilisateur.objects.get_or_create(user=self.manager)
+        profil.role = 'manager'
+        profil.save()
+        self.client.login(username='etagmgr', password='testpass123')
+        self.vehicule = Vehicule.objects.create(numero_chassis='ETAG001', statut='vendu')
+
+    def test_api_ca_synthese_304_then_200_after_write(self):
+        url = reverse('flotte:api_ca_synthese')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertIn('private', first['Cache-Control'])
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Vente.objects.create(vehicule=self.vehicule, date_vente=date(2025, 2, 1), prix_vente=Decimal('1000'))
+            # Génération incrémentée au COMMIT seulement : pas d'ETag neuf sur des données non validées
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third['ETag'], etag)
+        self.assertEqual(third.json()['total_ca'], 1000.0)
+
+    def test_generation_renouvelee_sans_lecture(self):
+        from unittest import mock
+        from django.core.cache import cache
+        from flotte.http_cache import bump_data_version, get_data_version
+
+        avant = get_data_version(Vente)
+        # Aucune lecture-écriture (incr) : deux workers concurrents ne peuvent pas écrire la même valeur
+        with mock.patch.object(cache, 'get', side_effect=AssertionError), \
+                mock.patch.object(cache, 'incr', side_effect=AssertionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            bump_data_version(Vente)
+            bump_data_version(Vente)
+        apres = get_data_version(Vente)
+        self.assertNotEqual(apres, avant)
+        self.assertEqual(get_data_version(Vente), apres)
+
+    def test_version_receivers_keep_fast_delete(self):
+        from django.contrib.sessions.models import Session
+        from django.db.models.deletion import Collector
+
+        from flotte.models import AuditLog, ExecutionTache
+
+        # Receivers post_delete connectés par modèle : suppression en masse sans chargement des lignes
+        # (sessions, purges du journal d'audit et de l'historique du planificateur)
+        for model in (Session, AuditLog, ExecutionTache):
+            with self.subTest(model=model.__name__):
+                self.assertTrue(Collector(using='default').can_fast_delete(model.objects.all()))
+
+    def test_ca_api_evolution_etag_depends_on_query(self):
+        url = reverse('flotte:ca_api_evolution')
+        etag = self.client.get(url, {'annee': 2025})['ETag']
+        self.assertEqual(self.client.get(url, {'annee': 2025}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'annee': 2024}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_drf_ca_viewset_304(self):
+        url = reverse('flotte:api-ca-list')
+        first = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(first.status_code, 200)
+        second = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+
 class ApiRootDrfTests(TestCase):
     """Tests pour l'API root DRF /api/v1/."""
 
@@ -0,0 +1,203 @@
+"""
+Tests d'intégration FLOTTE — budgets de requêtes SQL (@query_budget) de toutes les vues.
+
+Chaque route de flotte.urls doit déclarer un budget. Chaque vue est appelée (GET, admin) sur un
+petit parc généré, puis après l'ajout d'un parc plus grand : le nombre de requêtes doit rester
+sous le budget et ne pas croître avec le volume de données (motif N+1 / O(n) requêtes).
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+
+from flotte import urls as flotte_urls
+from flotte.generation import prefixe_chassis
+from flotte.models import (
+    ChargeImport, Contravention, Facture, ImportDemarche, Location, PartieImportee, PenaliteFacture,
+    PhotoVehicule, ProfilUtilisateur, RapportJournalier, Vehicule, Vente,
+)
+from flotte.query_budget import QueryBudgetExceeded, get_query_budget, query_budget
+
+User = get_user_model()
+
+# Routes sans budget : vue racine générée par le routeur DRF
+ROUTES_EXCLUES = {'api-root'}
+
+# Modèle de l'objet désigné par un paramètre d'URL (hors <pk> des CBV, déduit de view_class.model)
+MODELES_PARAMETRES = {'vehicule_pk': Vehicule, 'facture_pk': Facture, 'location_pk': Location}
+MODELES_PK = {
+    'vehicule_detail': Vehicule,
+    'api_vehicule_detail': Vehicule,
+    'location_detail': Location,
+    'rapport_download': RapportJournalier,
+}
+
+
+def _routes(patterns):
+    """(nom, motif) des routes de flotte.urls, includes compris, sans les variantes .<format> de DRF."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _routes(pattern.url_patterns)
+        elif pattern.name and 'format' not in pattern.pattern.regex.groupindex:
+            yield pattern.name, pattern
+
+
+def routes_flotte():
+    routes = {}
+    for name, pattern in _routes(flotte_urls.urlpatterns):
+        routes.setdefault(name, pattern)
+    return routes
+
+
+def _modele_pk(name, callback):
+    if name in MODELES_PK:
+        return MODELES_PK[name]
+    view_class = getattr(callback, 'view_class', None)
+    if getattr(view_class, 'model', None) is not None:
+        return view_class.model
+    queryset = getattr(getattr(callback, 'cls', None), 'queryset', None)
+    return queryset.model if queryset is not None else None
+
+
+def kwargs_route(name, pattern):
+    """Paramètres d'URL : dernier objet du modèle concerné (objet le plus récemment généré)."""
+    kwargs = {}
+    for param in pattern.pattern.regex.groupindex:
+        if param in ('uidb64', 'token'):
+            kwargs[param] = 'x'
+            continue
+        model = MODELES_PARAMETRES.get(param) if param != 'pk' else _modele_pk(name, pattern.callback)
+        if model is None:
+            raise AssertionError(f'Route {name} : modèle inconnu pour le paramètre <{param}>.')
+        kwargs[param] = model.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return kwargs
+
+
+class QueryBudgetDecoratorTests(TestCase):
+    """Déclaration et résolution des budgets."""
+
+    def test_budget_sur_fonction_decoree(self):
+        from flotte import views
+        self.assertIsNotNone(get_query_budget(views.export_reglementaire))
+
+    def test_budget_sur_cbv_et_viewset(self):
+        from flotte import views, views_rest
+        self.assertIsNotNone(get_query_budget(views.ParcListView.as_view()))
+        self.assertIsNotNone(get_query_budget(views_rest.VehiculeViewSet.as_view({'get': 'list'})))
+
+    def test_vue_sans_budget(self):
+        self.assertIsNone(get_query_budget(lambda request: None))
+        self.assertEqual(get_query_budget(query_budget(3)(lambda request: None)), 3)
+
+    def test_toutes_les_routes_ont_un_budget(self):
+        sans_budget = [name for name, pattern in routes_flotte().items()
+                       if name not in ROUTES_EXCLUES and get_query_budget(pattern.callback) is None]
+        self.assertEqual(sans_budget, [], 'Routes sans @query_budget')
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('budget_admin', 'b@flotte.local', 'testpass123')
+        self.client.force_login(self.admin)
+
+    @override_settings(FLOTTE_QUERY_BUDGET_MODE='raise')
+    def test_depassement_leve_en_mode_raise(self):
+        from flotte import views
+        budget = views.dashboard.query_budget
+        try:
+            views.dashboard.query_budget = 0
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('flotte:dashboard'))
+        finally:
+            views.dashboard.query_budget = budget
+
+    @override_settings(FLOTTE_QUERY_BUDGET_MODE='raise')
+    def test_budget_respecte(self):
+        response = self.client.get(reverse('flotte:dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(FLOTTE_QUERY_BUDGET_MODE='log')
+    def test_depassement_journalise_en_mode_log(self):
+        from flotte import views
+        budget = views.dashboard.query_budget
+        try:
+            views.dashboard.query_budget = 0
+            with self.assertLogs('flotte.query_budget', level='WARNING') as logs:
+                response = self.client.get(reverse('flotte:dashboard'))
+        finally:
+            views.dashboard.query_budget = budget
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('flotte:dashboard', logs.output[0])
+
+
+@override_settings(FLOTTE_QUERY_BUDGET_MODE='off')
+class QueryBudgetsVuesTests(TestCase):
+    """Budgets respectés et nombre de requêtes indépendant de la taille du parc."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('budget_admin', 'b@flotte.local', 'testpass123')
+        ProfilUtilisateur.objects.update_or_create(user=cls.admin, defaults={'role': 'admin'})
+        cls.generer(seed=71, vehicules=5)
+
+    @staticmethod
+    def generer(seed, vehicules):
+        call_command('generate_fleet', vehicles=vehicules, seed=seed,
+                     date=date.today().isoformat(), stdout=StringIO())
+        # Un véhicule en import et une chaîne complète sur le dernier véhicule : generate_fleet ne produit
+        # pas tout sur un petit parc, et une vue sans données à afficher masquerait un N+1
+        generes = Vehicule.objects.filter(numero_chassis__startswith=prefixe_chassis(seed)).order_by('pk')
+        Vehicule.objects.filter(pk=generes.first().pk).update(statut='import')
+        vehicule = generes.last()
+        aujourdhui = date.today()
+        location = Location.objects.create(
+            vehicule=vehicule, locataire='Locataire test', type_location='LLD',
+            date_debut=aujourdhui - timedelta(days=30), date_fin=aujourdhui + timedelta(days=300),
+        )
+        Contravention.objects.create(location=location, montant=Decimal('25000'))
+        facture = Facture.objects.create(vehicule=vehicule, numero=f'FT-{seed}', montant=Decimal('90000'))
+        PenaliteFacture.objects.create(facture=facture, libelle='Retard', montant=Decimal('5000'))
+        Vente.objects.create(vehicule=vehicule, date_vente=aujourdhui, prix_vente=Decimal('4000000'))
+        ChargeImport.objects.create(vehicule=vehicule, fret=Decimal('1500000'))
+        ImportDemarche.objects.create(vehicule=vehicule, etape='Dédouanement')
+        PartieImportee.objects.create(vehicule=vehicule, designation='Pare-brise')
+        PhotoVehicule.objects.create(vehicule=vehicule, photo='vehicules/photos/test.jpg')
+        RapportJournalier.objects.create(date_rapport=aujourdhui, titre='Rapport')
+
+    def mesurer(self):
+        """{route: nombre de requêtes SQL} pour toutes les routes dotées d'un budget."""
+        mesures = {}
+        for name, pattern in routes_flotte().items():
+            budget = get_query_budget(pattern.callback)
+            if budget is None:
+                continue
+            url = reverse(f'flotte:{name}', kwargs=kwargs_route(name, pattern))
+            self.client.force_login(self.admin)  # la vue logout déconnecte
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(url)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 500, f'{name} : HTTP {response.status_code}')
+            mesures[name] = (len(captured), budget)
+        return mesures
+
+    def test_budgets_independants_du_volume(self):
+        petit = self.mesurer()
+        self.generer(seed=72, vehicules=20)
+        grand = self.mesurer()
+
+        depassements = [f'{name} : {max(petit[name][0], grand[name][0])} requêtes (budget {budget})'
+                        for name, (_, budget) in grand.items() if max(petit[name][0], grand[name][0]) > budget]
+        croissances = [f'{name} : {petit[name][0]} → {grand[name][0]} requêtes'
+                       for name in grand if grand[name][0] > petit[name][0]]
+        self.assertEqual(depassements, [], 'Budgets de requêtes dépassés')
+        self.assertEqual(croissances, [], 'Nombre de requêtes croissant avec le volume de données')
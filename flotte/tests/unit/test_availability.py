@@ -0,0 +1,159 @@
+"""
+Tests unitaires FLOTTE — disponibilité des véhicules : chevauchements (bornes incluses), filtres,
+invalidation de l'index à l'écriture, validation du formulaire de location, API JSON.
+"""
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from flotte import availability
+from flotte.availability import AvailabilityIndex, _VehicleIntervals, available_vehicles, booking_conflicts
+from flotte.forms import LocationForm
+from flotte.models import Location, Marque, Modele, ProfilUtilisateur, TypeCarburant, Vehicule
+
+User = get_user_model()
+
+JUIN = date(2026, 6, 1)
+
+
+def jour(n):
+    return JUIN + timedelta(days=n)
+
+
+class IntervalIndexTests(TestCase):
+
+    def test_chevauchement_bornes_incluses(self):
+        intervals = _VehicleIntervals([(jour(10), jour(14), 1), (jour(1), jour(3), 2), (jour(20), jour(20), 3)])
+        self.assertTrue(intervals.overlaps(jour(14), jour(16)))   # fin le jour du début demandé
+        self.assertTrue(intervals.overlaps(jour(5), jour(10)))    # début le jour de la fin demandée
+        self.assertTrue(intervals.overlaps(jour(11), jour(12)))   # contenu
+        self.assertTrue(intervals.overlaps(jour(0), jour(30)))    # englobant
+        self.assertTrue(intervals.overlaps(jour(20), jour(20)))   # location d'un jour
+        self.assertFalse(intervals.overlaps(jour(4), jour(9)))
+        self.assertFalse(intervals.overlaps(jour(15), jour(19)))
+        self.assertFalse(intervals.overlaps(jour(21), jour(40)))
+        self.assertEqual(intervals.conflicts(jour(0), jour(30)), [1, 2, 3])
+        self.assertEqual(intervals.conflicts(jour(2), jour(12), exclude=1), [2])
+
+    def test_longue_location_masquee_par_les_suivantes(self):
+        # Une location longue commencée tôt doit être vue après des locations courtes plus récentes
+        intervals = _VehicleIntervals([(jour(0), jour(60), 1), (jour(5), jour(6), 2), (jour(10), jour(11), 3)])
+        self.assertTrue(intervals.overlaps(jour(40), jour(41)))
+        self.assertEqual(intervals.conflicts(jour(40), jour(41)), [1])
+
+    def test_filtres(self):
+        index = AvailabilityIndex(
+            vehicles={
+                1: ('parc', 10, 20, 30, 100),
+                2: ('parc', 11, 20, 30, 100),
+                3: ('vendu', 10, 20, 30, 100),
+                4: ('parc', 10, 21, 31, 101),
+            },
+            bookings={4: _VehicleIntervals([(jour(0), jour(5), 9)])},
+        )
+        self.assertEqual(index.available(jour(6), jour(8)), [1, 2, 4])
+        self.assertEqual(index.available(jour(5), jour(8)), [1, 2])
+        self.assertEqual(index.available(jour(6), jour(8), type_vehicule=10), [1, 4])
+        self.assertEqual(index.available(jour(6), jour(8), type_carburant=21, type_transmission=31), [4])
+        self.assertEqual(index.available(jour(6), jour(8), proprietaire=100), [1, 2])
+        self.assertEqual(index.available(jour(6), jour(8), statuts=('vendu',)), [3])
+
+    def test_performance_en_memoire(self):
+        # 5 000 véhicules, 50 000 réservations : une recherche sur un mois en quelques millisecondes
+        vehicles = {pk: ('parc', pk % 4, pk % 3, pk % 2, None) for pk in range(5000)}
+        bookings = {
+            pk: _VehicleIntervals([(jour(k * 20 + pk % 7), jour(k * 20 + pk % 7 + 10), pk * 10 + k) for k in range(10)])
+            for pk in range(5000)
+        }
+        index = AvailabilityIndex(vehicles, bookings)
+        start = time.perf_counter()
+        for _ in range(10):
+            libres = index.available(jour(112), jour(116), type_vehicule=1)
+        elapsed = (time.perf_counter() - start) / 10
+        self.assertTrue(libres)
+        self.assertLess(elapsed, 0.1)
+
+
+class AvailabilityServiceTests(TestCase):
+
+    def setUp(self):
+        availability.invalidate()
+        # Aujourd'hui = début de la location en cours (les retours en retard bloquent jusqu'à aujourd'hui)
+        self.aujourdhui = jour(0)
+        patcher = mock.patch('flotte.availability.timezone.localdate', lambda: self.aujourdhui)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        marque = Marque.objects.create(nom='Peugeot')
+        modele = Modele.objects.create(marque=marque, nom='3008')
+        self.diesel = TypeCarburant.objects.create(libelle='Diesel')
+        self.v1 = Vehicule.objects.create(numero_chassis='CH-DISPO-1', marque=marque, modele=modele,
+                                          type_carburant=self.diesel)
+        self.v2 = Vehicule.objects.create(numero_chassis='CH-DISPO-2', marque=marque, modele=modele)
+        self.location = self._location(self.v1, 0, 9, 'en_cours')
+
+    def _location(self, vehicule, debut, fin, statut='a_venir'):
+        return Location.objects.create(
+            vehicule=vehicule, locataire='Client', type_location='LLD',
+            date_debut=jour(debut), date_fin=jour(fin), statut=statut,
+        )
+
+    def test_index_invalide_par_les_ecritures(self):
+        self.assertEqual(available_vehicles(jour(12), jour(14)), [self.v1.pk, self.v2.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self._location(self.v2, 14, 20)
+        self.assertEqual(available_vehicles(jour(12), jour(14)), [self.v1.pk])
+        # Location terminée : le véhicule est libéré
+        self.location.statut = 'termine'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.save()
+        self.assertEqual(available_vehicles(jour(0), jour(5)), [self.v1.pk, self.v2.pk])
+        self.assertEqual(available_vehicles(jour(0), jour(5), type_carburant=self.diesel.pk), [self.v1.pk])
+
+    def test_retour_en_retard_bloque_jusqu_a_aujourd_hui(self):
+        self.assertEqual(available_vehicles(jour(12), jour(12)), [self.v1.pk, self.v2.pk])
+        # Lendemain de la date de fin, véhicule non rendu : index reconstruit, location toujours bloquante
+        self.aujourdhui = jour(12)
+        self.assertEqual(available_vehicles(jour(12), jour(12)), [self.v2.pk])
+        self.assertEqual(booking_conflicts(self.v1.pk, jour(11), jour(15)), [self.location.pk])
+        self.assertEqual(available_vehicles(jour(13), jour(15)), [self.v1.pk, self.v2.pk])
+
+    def test_index_reutilise_sans_requete(self):
+        available_vehicles(jour(0), jour(1))
+        with self.assertNumQueries(0):
+            self.assertEqual(booking_conflicts(self.v1.pk, jour(9), jour(12)), [self.location.pk])
+
+    def _form_data(self, **overrides):
+        data = {
+            'vehicule': self.v1.pk, 'locataire': 'Autre client', 'type_location': 'LLD',
+            'date_debut': jour(5).isoformat(), 'date_fin': jour(12).isoformat(), 'statut': 'a_venir',
+        }
+        data.update(overrides)
+        return data
+
+    def test_formulaire_refuse_un_chevauchement(self):
+        form = LocationForm(data=self._form_data())
+        self.assertFalse(form.is_valid())
+        self.assertIn('déjà réservé', form.errors['vehicule'][0])
+        self.assertTrue(LocationForm(data=self._form_data(date_debut=jour(10).isoformat())).is_valid())
+        self.assertTrue(LocationForm(data=self._form_data(statut='termine')).is_valid())
+        # Modification de la location elle-même : pas de conflit avec soi-même
+        self.assertTrue(LocationForm(data=self._form_data(statut='en_cours'), instance=self.location).is_valid())
+        form = LocationForm(data=self._form_data(date_debut=jour(20).isoformat()))
+        self.assertIn('date_fin', form.errors)
+
+    def test_api_disponibilites(self):
+        user = User.objects.create_user('dispo', 'dispo@flotte.test', 'x')
+        ProfilUtilisateur.objects.update_or_create(user=user, defaults={'role': 'manager'})
+        self.client.force_login(user)
+        url = reverse('flotte:api_disponibilites')
+        data = self.client.get(url, {'debut': jour(3).isoformat(), 'fin': jour(4).isoformat()}).json()
+        self.assertEqual(data['nb'], 1)
+        self.assertEqual(data['vehicules'][0]['numero_chassis'], 'CH-DISPO-2')
+        data = self.client.get(url, {'debut': jour(10).isoformat(), 'fin': jour(10).isoformat(),
+                                     'type_carburant': self.diesel.pk}).json()
+        self.assertEqual([v['id'] for v in data['vehicules']], [self.v1.pk])
+        self.assertEqual(self.client.get(url, {'debut': 'demain'}).status_code, 400)
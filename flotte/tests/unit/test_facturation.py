@@ -0,0 +1,114 @@
+"""
+Tests unitaires FLOTTE — facturation mensuelle des locations : loyer au prorata, km supplémentaires,
+contraventions refacturées une seule fois, numéros réservés en bloc, reprise après interruption.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from flotte import facturation
+from flotte.facturation import calculer_ligne, facturer_mois, km_parcourus, prochain_numero
+from flotte.models import Contravention, Facture, Location, Marque, Modele, ReleveCarburant, Vehicule
+
+SEPTEMBRE = date(2026, 9, 1)
+
+
+class CalculTests(TestCase):
+
+    def test_prorata_et_km_supplementaires(self):
+        location = Location(
+            date_debut=date(2026, 9, 15), date_fin=date(2027, 9, 14), loyer_mensuel=Decimal('300000'),
+            km_inclus_mois=1500, prix_km_supplementaire=Decimal('150'),
+        )
+        releves = ([date(2026, 9, 10), date(2026, 9, 20), date(2026, 10, 2)], [10000, 10400, 12000])
+        detail = calculer_ligne(location, SEPTEMBRE, releves)
+        self.assertEqual((detail['jours'], detail['jours_mois']), (16, 30))
+        self.assertEqual(detail['loyer'], '160000')
+        # Départ : relevé du 10/09 (dernier avant le 15) ; fin : relevé du 20/09 ; 800 km inclus au prorata
+        self.assertEqual((detail['km_parcourus'], detail['km_inclus'], detail['km_supplementaires']), (400, 800, 0))
+        detail = calculer_ligne(location, date(2026, 10, 1), releves)
+        self.assertEqual((detail['km_parcourus'], detail['km_supplementaires'], detail['montant_km']), (1600, 100, '15000'))
+        self.assertIsNone(calculer_ligne(location, date(2026, 8, 1), releves))
+
+    def test_km_sans_releves_ou_illimites(self):
+        self.assertEqual(km_parcourus(None, SEPTEMBRE, date(2026, 9, 30)), 0)
+        self.assertEqual(km_parcourus(([date(2026, 10, 5)], [5000]), SEPTEMBRE, date(2026, 9, 30)), 0)
+        location = Location(date_debut=SEPTEMBRE, date_fin=date(2026, 12, 31), loyer_mensuel=Decimal('100000'),
+                            km_inclus_mois=None, prix_km_supplementaire=Decimal('150'))
+        detail = calculer_ligne(location, SEPTEMBRE, ([SEPTEMBRE, date(2026, 9, 30)], [0, 9000]))
+        self.assertEqual((detail['km_supplementaires'], detail['total']), (0, '100000'))
+
+
+class FacturationTests(TestCase):
+
+    def setUp(self):
+        marque = Marque.objects.create(nom='Toyota')
+        modele = Modele.objects.create(marque=marque, nom='Hilux')
+        self.locations = []
+        for i in range(3):
+            vehicule = Vehicule.objects.create(numero_chassis=f'CH-FACT-{i}', marque=marque, modele=modele)
+            self.locations.append(Location.objects.create(
+                vehicule=vehicule, locataire=f'Client {i}', type_location='LLD',
+                date_debut=date(2026, 1, 1), date_fin=date(2026, 12, 31), loyer_mensuel=Decimal('250000'),
+                km_inclus_mois=2000, prix_km_supplementaire=Decimal('100'),
+            ))
+        ReleveCarburant.objects.create(vehicule=vehicule, date_releve=date(2026, 8, 31), kilometrage=20000)
+        ReleveCarburant.objects.create(vehicule=vehicule, date_releve=date(2026, 9, 30), kilometrage=22500)
+        self.amende = Contravention.objects.create(
+            location=self.locations[0], date_contravention=date(2026, 9, 12), montant=Decimal('25000'),
+        )
+        Contravention.objects.create(location=self.locations[0], date_contravention=date(2026, 10, 3),
+                                     montant=Decimal('10000'))
+        # Facture saisie à la main : la numérotation reprend au-delà
+        Facture.objects.create(vehicule=vehicule, numero='FAC-2026-00007', montant=Decimal('1000'))
+
+    def test_apercu_puis_facturation(self):
+        apercu = facturer_mois(SEPTEMBRE, apercu=True)
+        self.assertEqual((apercu['factures'], apercu['total']), (3, Decimal('825000')))
+        self.assertEqual(Facture.objects.filter(location__isnull=False).count(), 0)
+
+        stats = facturer_mois(SEPTEMBRE, batch_size=2)
+        self.assertEqual((stats['factures'], stats['total']), (3, Decimal('825000')))
+        factures = list(Facture.objects.filter(periode=SEPTEMBRE).order_by('numero'))
+        self.assertEqual([f.numero for f in factures], ['FAC-2026-00008', 'FAC-2026-00009', 'FAC-2026-00010'])
+        self.assertEqual([f.montant for f in factures], [Decimal('275000'), Decimal('250000'), Decimal('300000')])
+        self.assertEqual(factures[2].detail['km_supplementaires'], 500)
+        self.amende.refresh_from_db()
+        self.assertEqual(self.amende.facture, factures[0])
+        self.assertEqual(prochain_numero('FAC-2026-'), 'FAC-2026-00011')
+
+        # Relance : rien de nouveau ; mois suivant : la contravention de septembre n'est pas refacturée
+        self.assertEqual(facturer_mois(SEPTEMBRE)['factures'], 0)
+        octobre = facturer_mois(date(2026, 10, 1))
+        self.assertEqual(octobre['total'], Decimal('760000'))
+
+    def test_reprise_apres_interruption(self):
+        enregistrer = facturation._enregistrer_lot
+        appels = []
+
+        def interrompu(lignes, mois):
+            appels.append(len(lignes))
+            if len(appels) == 2:
+                raise RuntimeError('coupure')
+            return enregistrer(lignes, mois)
+
+        with mock.patch.object(facturation, '_enregistrer_lot', interrompu), self.assertRaises(RuntimeError):
+            facturer_mois(SEPTEMBRE, batch_size=1)
+        self.assertEqual(Facture.objects.filter(periode=SEPTEMBRE).count(), 1)
+
+        out = StringIO()
+        call_command('run_billing', '2026-09', stdout=out)
+        self.assertIn('2 facture(s) créée(s)', out.getvalue())
+        numeros = sorted(Facture.objects.filter(periode=SEPTEMBRE).values_list('numero', flat=True))
+        self.assertEqual(numeros, ['FAC-2026-00008', 'FAC-2026-00009', 'FAC-2026-00010'])
+
+    def test_commande_apercu(self):
+        out = StringIO()
+        call_command('run_billing', '2026-09', '--dry-run', stdout=out)
+        self.assertIn('Client 0', out.getvalue())
+        self.assertIn('3 facture(s) à créer', out.getvalue())
+        self.assertFalse(Facture.objects.filter(periode__isnull=False).exists())
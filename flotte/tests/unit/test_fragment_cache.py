@@ -0,0 +1,111 @@
+"""
+Tests unitaires FLOTTE — cache de fragments de gabarits (versions par type, invalidation, périmètre).
+"""
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from flotte.fragment_cache import fragment_version
+from flotte.models import Conducteur, Marque, ProfilUtilisateur, Vehicule
+
+User = get_user_model()
+
+
+class FragmentVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_suit_les_modeles_du_type(self):
+        tuiles, permis = fragment_version('tuiles'), fragment_version('alertes')
+        with self.captureOnCommitCallbacks(execute=True):
+            Conducteur.objects.create(nom='Koné', prenom='Awa')
+        self.assertEqual(fragment_version('tuiles'), tuiles)
+        self.assertNotEqual(fragment_version('alertes'), permis)
+
+    def test_tuiles_renouvelees_chaque_jour(self):
+        # « Véhicules disponibles » dépend de la date du jour
+        with mock.patch('flotte.fragment_cache.timezone.localdate', return_value=date(2026, 6, 1)):
+            veille = fragment_version('tuiles')
+        with mock.patch('flotte.fragment_cache.timezone.localdate', return_value=date(2026, 6, 2)):
+            self.assertNotEqual(fragment_version('tuiles'), veille)
+
+    def test_type_inconnu(self):
+        with self.assertRaises(KeyError):
+            fragment_version('inconnu')
+        with self.assertRaises(TemplateSyntaxError):
+            Template('{% load flotte_fragments %}{% fragment_cache inconnu %}{% endfragment_cache %}')
+
+    def test_balise_sert_le_cache_jusqu_a_la_modification(self):
+        template = Template('{% load flotte_fragments %}{% fragment_cache tuiles scope %}{{ valeur }}{% endfragment_cache %}')
+        self.assertEqual(template.render(Context({'scope': 'admin', 'valeur': 1})), '1')
+        self.assertEqual(template.render(Context({'scope': 'admin', 'valeur': 2})), '1')
+        self.assertEqual(template.render(Context({'scope': 'manager', 'valeur': 3})), '3')
+        with self.captureOnCommitCallbacks(execute=True):
+            Marque.objects.create(nom='Fragment')
+        self.assertEqual(template.render(Context({'scope': 'admin', 'valeur': 4})), '4')
+
+    @override_settings(FLOTTE_FRAGMENT_CACHE_TIMEOUT=0)
+    def test_desactive(self):
+        template = Template('{% load flotte_fragments %}{% fragment_cache sidebar %}{{ valeur }}{% endfragment_cache %}')
+        template.render(Context({'valeur': 1}))
+        self.assertEqual(template.render(Context({'valeur': 2})), '2')
+
+    @override_settings(FLOTTE_FRAGMENT_CACHE_ROWS=False)
+    def test_fragments_par_ligne_desactives(self):
+        lignes = Template('{% load flotte_fragments %}{% fragment_cache vehicule_ligne pk %}{{ valeur }}{% endfragment_cache %}')
+        lignes.render(Context({'pk': 1, 'valeur': 1}))
+        self.assertEqual(lignes.render(Context({'pk': 1, 'valeur': 2})), '2')
+        page = Template('{% load flotte_fragments %}{% fragment_cache sidebar %}{{ valeur }}{% endfragment_cache %}')
+        page.render(Context({'valeur': 1}))
+        self.assertEqual(page.render(Context({'valeur': 2})), '1')
+
+
+class FragmentCacheVuesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('frag_admin', 'f@flotte.local', 'testpass123')
+        self.marque = Marque.objects.create(nom='Toyota')
+        Vehicule.objects.create(numero_chassis='FRAG-001', marque=self.marque, statut='parc')
+
+    def test_dashboard_en_cache_sans_requetes_de_tuiles(self):
+        self.client.force_login(self.admin)
+        url = reverse('flotte:dashboard')
+        with CaptureQueriesContext(connection) as froid:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as chaud:
+            response = self.client.get(url)
+        self.assertLess(len(chaud), len(froid))
+        self.assertContains(response, 'Toyota')
+        # Nouveau véhicule : tuiles recalculées
+        with self.captureOnCommitCallbacks(execute=True):
+            Vehicule.objects.create(numero_chassis='FRAG-002', marque=self.marque, statut='import')
+        response = self.client.get(url)
+        self.assertContains(response, '2 véhicules')
+
+    def test_ligne_du_parc_invalidee_par_la_modification(self):
+        self.client.force_login(self.admin)
+        url = reverse('flotte:parc')
+        self.assertContains(self.client.get(url), 'FRAG-001')
+        Vehicule.objects.filter(numero_chassis='FRAG-001').update(numero_chassis='FRAG-XXX')
+        with self.captureOnCommitCallbacks(execute=True):
+            Vehicule.objects.get(numero_chassis='FRAG-XXX').save()
+        self.assertContains(self.client.get(url), 'FRAG-XXX')
+
+    def test_perimetre_par_role(self):
+        simple = User.objects.create_user('frag_user', 'u@flotte.local', 'testpass123')
+        ProfilUtilisateur.objects.update_or_create(user=simple, defaults={'role': 'user'})
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(reverse('flotte:parc')), 'Nouveau véhicule')
+        self.client.force_login(simple)
+        response = self.client.get(reverse('flotte:parc'))
+        self.assertNotContains(response, 'Nouveau véhicule')
+        self.assertNotContains(response, 'FRAG-001')
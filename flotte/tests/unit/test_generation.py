@@ -0,0 +1,50 @@
+"""
+Tests unitaires FLOTTE — génération de données volumineuses (generate_fleet), déterminisme et cohérence.
+"""
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from flotte.generation import generer_lot
+from flotte.models import Location, ReleveCarburant, Vehicule, Vente, VenteRollup
+
+REFS = {
+    'modeles': [(1, 10), (2, 20)], 'carburants': [1], 'transmissions': [1], 'types_vehicule': [1],
+    'types_document': [(5, 'Carte grise')], 'conducteurs': [7, 8],
+}
+
+
+class GenerationTests(TestCase):
+
+    def test_lot_deterministe(self):
+        a = generer_lot(42, 3, 3000, 50, REFS, date(2025, 6, 30), 3)
+        b = generer_lot(42, 3, 3000, 50, REFS, date(2025, 6, 30), 3)
+        c = generer_lot(43, 3, 3000, 50, REFS, date(2025, 6, 30), 3)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_commande_coherente(self):
+        call_command('generate_fleet', vehicles=40, years=2, seed=9, date='2025-06-30', batch_size=15, stdout=StringIO())
+        self.assertEqual(Vehicule.objects.filter(numero_chassis__startswith='GEN9-').count(), 40)
+        # Locations uniquement sur véhicules au parc
+        self.assertFalse(Location.objects.exclude(vehicule__statut='parc').exists())
+        # Compteur croissant d'un relevé à l'autre
+        precedent = {}
+        for vehicule_id, km in ReleveCarburant.objects.order_by('vehicule_id', 'date_releve').values_list('vehicule_id', 'kilometrage'):
+            self.assertGreater(km, precedent.get(vehicule_id, -1))
+            precedent[vehicule_id] = km
+        # Ventes uniquement pour les véhicules vendus, agrégats reconstruits
+        self.assertFalse(Vente.objects.exclude(vehicule__statut='vendu').exists())
+        self.assertEqual(
+            Vente.objects.aggregate(t=Sum('prix_vente'))['t'],
+            VenteRollup.objects.aggregate(t=Sum('total_ca'))['t'],
+        )
+
+        total = Vente.objects.aggregate(t=Sum('prix_vente'))['t']
+        call_command('generate_fleet', vehicles=40, years=2, seed=9, date='2025-06-30', batch_size=15,
+                     reset=True, stdout=StringIO())
+        self.assertEqual(Vehicule.objects.count(), 40)
+        self.assertEqual(Vente.objects.aggregate(t=Sum('prix_vente'))['t'], total)
@@ -0,0 +1,104 @@
+"""
+Tests unitaires FLOTTE — métriques Prometheus (registre, format texte, agrégation multi-processus, accès).
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from flotte import metrics
+from flotte.models import Marque
+
+User = get_user_model()
+
+
+class MetricsRegistryTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_compteur_et_histogramme_format_texte(self):
+        metrics.EXPORT_ROWS.inc(3, export='locations')
+        metrics.EXPORT_DURATION.observe(0.3, export='locations')
+        metrics.EXPORT_DURATION.observe(100, export='locations')
+        text = metrics.render()
+        self.assertIn('# TYPE flotte_export_rows_total counter', text)
+        self.assertIn('flotte_export_rows_total{export="locations"} 3', text)
+        self.assertIn('flotte_export_duration_seconds_bucket{export="locations",le="0.25"} 0', text)
+        self.assertIn('flotte_export_duration_seconds_bucket{export="locations",le="0.5"} 1', text)
+        self.assertIn('flotte_export_duration_seconds_bucket{export="locations",le="+Inf"} 2', text)
+        self.assertIn('flotte_export_duration_seconds_count{export="locations"} 2', text)
+        self.assertIn('flotte_export_duration_seconds_sum{export="locations"} 100.3', text)
+        self.assertIn('# TYPE flotte_active_sessions gauge', text)
+
+    def test_echappement_des_etiquettes(self):
+        metrics.AUDIT_WRITES.inc(action='a"b\\c')
+        self.assertIn('flotte_audit_writes_total{action="a\\"b\\\\c"} 1', metrics.render())
+
+    def test_agregation_dossier_partage(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(FLOTTE_METRICS_DIR=directory):
+            # Instantané d'un autre worker
+            Path(directory, 'flotte-999999.json').write_text(json.dumps({
+                'counters': [['flotte_export_rows_total', ['locations'], 5]],
+                'histograms': [],
+            }), encoding='utf-8')
+            metrics.EXPORT_ROWS.inc(2, export='locations')
+            text = metrics.render()
+            self.assertTrue(Path(directory, f'flotte-{os.getpid()}.json').exists())
+        self.assertIn('flotte_export_rows_total{export="locations"} 7', text)
+
+
+class MetricsInstrumentationTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.admin = User.objects.create_superuser('metrics_admin', 'm@flotte.local', 'testpass123')
+        self.client.force_login(self.admin)
+
+    def test_middleware_par_nom_d_url(self):
+        self.client.get(reverse('flotte:dashboard'))
+        counters, histograms = metrics.collect()
+        self.assertEqual(counters[('flotte_http_requests_total', ('flotte:dashboard', 'GET', '200'))], 1)
+        self.assertEqual(sum(histograms[('flotte_http_request_duration_seconds', ('flotte:dashboard',))][:-1]), 1)
+        self.assertIn(('flotte_db_queries_per_request', ('flotte:dashboard',)), histograms)
+
+    def test_export_et_revalidation_cache_http(self):
+        self.client.get(reverse('flotte:export_locations'))
+        url = reverse('flotte:api_marques_list')
+        etag = self.client.get(url)['ETag']
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        counters, histograms = metrics.collect()
+        self.assertIn(('flotte_export_duration_seconds', ('locations',)), histograms)
+        self.assertEqual(counters[('flotte_http_cache_requests_total', ('flotte:api_marques_list', 'miss'))], 1)
+        self.assertEqual(counters[('flotte_http_cache_requests_total', ('flotte:api_marques_list', 'hit'))], 1)
+
+    def test_ecritures_audit(self):
+        metrics.reset()  # création de l'utilisateur déjà journalisée
+        Marque.objects.create(nom='Métriques')
+        counters, _ = metrics.collect()
+        self.assertEqual(counters[('flotte_audit_writes_total', ('create',))], 1)
+
+
+@override_settings(FLOTTE_METRICS_ALLOWED_NETWORKS='10.0.0.0/8')
+class MetricsEndpointTests(TestCase):
+
+    def test_anonyme_hors_reseau_refuse(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_reseau_interne_autorise(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'flotte_http_requests_total', response.content)
+
+    @override_settings(FLOTTE_METRICS_ALLOWED_NETWORKS='')
+    def test_aucun_reseau_par_defaut(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    def test_admin_connecte_autorise(self):
+        self.client.force_login(User.objects.create_superuser('m_admin', 'a@flotte.local', 'testpass123'))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
@@ -0,0 +1,86 @@
+"""
+Tests unitaires FLOTTE — récapitulatif nocturne des échéances : regroupement par destinataire,
+un email par destinataire, reprise idempotente.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from flotte.models import (
+    Conducteur, EmailOutbox, Marque, Modele, NotificationEcheance, ProfilUtilisateur, Vehicule,
+)
+from flotte.notifications import collect_alerts, send_expiry_digests
+
+User = get_user_model()
+
+
+class ExpiryDigestTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.manager = User.objects.create_user('chef', email='chef@flotte.test', password='x')
+        ProfilUtilisateur.objects.update_or_create(user=self.manager, defaults={'role': 'manager'})
+        self.owner = User.objects.create_user('proprio', email='proprio@flotte.test', password='x')
+        self.other = User.objects.create_user('autre', email='autre@flotte.test', password='x')
+        marque = Marque.objects.create(nom='Toyota')
+        modele = Modele.objects.create(marque=marque, nom='Hilux')
+        self.vehicule = Vehicule.objects.create(
+            numero_chassis='CH-DIGEST-1', marque=marque, modele=modele, statut='parc',
+            proprietaire=self.owner, date_expiration_ct=self.today + timedelta(days=10),
+        )
+        Vehicule.objects.create(
+            numero_chassis='CH-DIGEST-2', marque=marque, modele=modele, statut='parc',
+            date_expiration_assurance=self.today + timedelta(days=5),
+        )
+        # Hors horizon : pas d'alerte
+        Vehicule.objects.create(
+            numero_chassis='CH-DIGEST-3', marque=marque, modele=modele, statut='parc',
+            proprietaire=self.owner, date_expiration_ct=self.today + timedelta(days=200),
+        )
+        Conducteur.objects.create(
+            nom='Diallo', prenom='Awa', email='awa@flotte.test', permis_numero='P-1',
+            permis_date_expiration=self.today + timedelta(days=20),
+        )
+        EmailOutbox.objects.all().delete()  # emails de bienvenue
+
+    def _digests(self):
+        return {item.destinataires[0]: item for item in EmailOutbox.objects.all()}
+
+    def test_alertes_du_parc(self):
+        cles = [a['cle'] for a in collect_alerts(today=self.today, days=30)]
+        self.assertEqual(len(cles), 3)
+        self.assertTrue(any(c.startswith(f'ct:vehicule:{self.vehicule.pk}:') for c in cles))
+
+    def test_un_recapitulatif_par_destinataire(self):
+        stats = send_expiry_digests(today=self.today, days=30)
+        self.assertEqual(stats['emails'], 3)
+        digests = self._digests()
+        self.assertEqual(set(digests), {'chef@flotte.test', 'proprio@flotte.test', 'awa@flotte.test'})
+        # Gestionnaire : tout ; propriétaire : son véhicule ; conducteur : son permis
+        self.assertIn('3 échéances', digests['chef@flotte.test'].sujet)
+        self.assertIn('CH-DIGEST-1', digests['proprio@flotte.test'].corps_texte)
+        self.assertNotIn('Assurance', digests['proprio@flotte.test'].corps_texte)
+        self.assertIn('Permis de conduire', digests['awa@flotte.test'].corps_texte)
+        self.assertIn('Voir toutes les échéances', digests['chef@flotte.test'].corps_html)
+        self.assertEqual(NotificationEcheance.objects.count(), 5)
+
+    def test_reprise_idempotente(self):
+        send_expiry_digests(today=self.today, days=30)
+        stats = send_expiry_digests(today=self.today, days=30)
+        self.assertEqual((stats['emails'], stats['deja_notifiees']), (0, 5))
+        self.assertEqual(EmailOutbox.objects.count(), 3)
+
+        # Échéance renouvelée : nouvelle alerte pour le propriétaire et les gestionnaires seulement
+        self.vehicule.date_expiration_ct = self.today + timedelta(days=15)
+        self.vehicule.save()
+        stats = send_expiry_digests(today=self.today, days=30)
+        self.assertEqual(stats['emails'], 2)
+
+    def test_commande_envoi_sur_une_connexion(self):
+        call_command('send_expiry_digest', '--days', '30', '--send', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(EmailOutbox.objects.exclude(statut=EmailOutbox.STATUT_ENVOYE).exists())
@@ -0,0 +1,131 @@
+"""
+Tests unitaires FLOTTE — occupation de la flotte : calcul vectorisé par jour (chevauchements,
+présence au parc, types de location), rafraîchissement incrémental d'OccupationRollup, page et API.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from flotte.models import (
+    Location, Marque, Modele, OccupationInvalidation, OccupationRollup, ProfilUtilisateur, Vehicule, Vente,
+)
+from flotte.occupation import calculer_occupation, rafraichir_occupation
+
+User = get_user_model()
+
+JANVIER = date(2026, 1, 1)
+
+
+def jour(n):
+    return JANVIER + timedelta(days=n)
+
+
+class CalculOccupationTests(TestCase):
+
+    def test_chevauchements_parc_et_types(self):
+        vehicules = [
+            (1, 5, jour(-30), None),
+            (2, 5, jour(2), jour(7)),      # entré le 3, vendu le 8 : au parc du 3 au 7
+            (3, None, jour(0), None),
+        ]
+        locations = [
+            (1, 'LLD', jour(1), jour(3)),
+            (1, 'LOA', jour(2), jour(4)),   # chevauche la précédente : jours comptés une fois
+            (2, 'LLD', jour(-30), jour(19)),  # limitée à la présence au parc
+            (99, 'LLD', jour(0), jour(1)),  # véhicule inconnu : ignorée
+        ]
+        lignes = {(j, m, t): (p, n) for j, m, t, p, n in calculer_occupation(jour(0), jour(9), vehicules, locations)}
+        self.assertEqual(lignes[(jour(0), 5, '')], (1, 0))
+        self.assertEqual(lignes[(jour(2), 5, '')], (2, 2))
+        self.assertEqual(lignes[(jour(2), 5, 'LLD')], (2, 2))
+        self.assertEqual(lignes[(jour(2), 5, 'LOA')], (2, 1))
+        self.assertEqual(lignes[(jour(4), 5, 'LLD')], (2, 1))
+        self.assertEqual(lignes[(jour(7), 5, '')], (1, 0))
+        self.assertEqual(lignes[(jour(9), None, '')], (1, 0))
+        self.assertNotIn((jour(7), 5, 'LLD'), lignes)
+
+    def test_identique_au_calcul_jour_par_jour(self):
+        rng = random.Random(7)
+        vehicules = []
+        for pk in range(1, 41):
+            entree = jour(rng.randint(-20, 40))
+            sortie = entree + timedelta(days=rng.randint(1, 60)) if rng.random() < 0.3 else None
+            vehicules.append((pk, rng.choice([1, 2, None]), entree, sortie))
+        locations = []
+        for _ in range(150):
+            debut = jour(rng.randint(-30, 70))
+            locations.append((rng.randint(1, 40), rng.choice(['LLD', 'LOA']), debut, debut + timedelta(days=rng.randint(0, 20))))
+
+        attendu = {}
+        for i in range(60):
+            d = jour(i)
+            au_parc = {pk: m for pk, m, e, s in vehicules if e <= d and (s is None or d < s)}
+            for m in set(au_parc.values()):
+                parc = sum(1 for v in au_parc.values() if v == m)
+                for t in ('', 'LLD', 'LOA'):
+                    loues = {v for v, ty, db, fn in locations
+                             if db <= d <= fn and au_parc.get(v, 'absent') == m and t in ('', ty)}
+                    if t == '' or loues:
+                        attendu[(d, m, t)] = (parc, len(loues))
+        obtenu = {(j, m, t): (p, n) for j, m, t, p, n in calculer_occupation(jour(0), jour(59), vehicules, locations)}
+        self.assertEqual(obtenu, attendu)
+
+
+class RafraichissementTests(TestCase):
+
+    def setUp(self):
+        self.marque = Marque.objects.create(nom='Renault')
+        modele = Modele.objects.create(marque=self.marque, nom='Clio')
+        self.v1 = Vehicule.objects.create(numero_chassis='CH-OCC-1', marque=self.marque, modele=modele,
+                                          date_entree_parc=jour(0))
+        self.v2 = Vehicule.objects.create(numero_chassis='CH-OCC-2', marque=self.marque, modele=modele,
+                                          date_entree_parc=jour(0))
+        self.location = Location.objects.create(
+            vehicule=self.v1, locataire='Client', type_location='LLD', date_debut=jour(0), date_fin=jour(9),
+        )
+        self.today = jour(29)
+
+    def _taux(self, d):
+        row = OccupationRollup.objects.get(jour=d, type_location='')
+        return row.nb_loues, row.nb_parc
+
+    def test_incremental(self):
+        rafraichir_occupation(today=self.today)
+        self.assertFalse(OccupationInvalidation.objects.exists())
+        self.assertEqual(self._taux(jour(5)), (1, 2))
+        self.assertEqual(self._taux(jour(15)), (0, 2))
+        self.assertEqual(OccupationRollup.objects.get(jour=jour(5), type_location='LLD').nb_loues, 1)
+        self.assertEqual(rafraichir_occupation(today=self.today), '0 jour(s) recalculé(s), 0 ligne(s)')
+
+        # Location déplacée : anciens et nouveaux jours recalculés ; vente : le véhicule sort du parc
+        self.location.date_debut, self.location.date_fin = jour(12), jour(20)
+        self.location.save()
+        Vente.objects.create(vehicule=self.v2, date_vente=jour(25))
+        resume = rafraichir_occupation(today=jour(30))
+        self.assertTrue(resume.startswith('31 jour(s)'))
+        self.assertEqual(self._taux(jour(5)), (0, 2))
+        self.assertEqual(self._taux(jour(15)), (1, 2))
+        self.assertEqual(self._taux(jour(26)), (0, 1))
+        self.assertFalse(OccupationRollup.objects.filter(jour=jour(5), type_location='LLD').exists())
+        self.assertFalse(OccupationInvalidation.objects.exists())
+
+    def test_page_et_api(self):
+        rafraichir_occupation(today=self.today)
+        user = User.objects.create_user('occupation', 'occupation@flotte.test', 'x')
+        ProfilUtilisateur.objects.update_or_create(user=user, defaults={'role': 'manager'})
+        self.client.force_login(user)
+        response = self.client.get(reverse('flotte:occupation'), {'annee': 2026})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], {'jours_parc': 60, 'jours_loues': 10, 'taux': 16.7})
+        self.assertContains(response, 'Renault')
+
+        data = self.client.get(reverse('flotte:api_occupation'), {
+            'debut': jour(0).isoformat(), 'fin': jour(9).isoformat(), 'granularite': 'jour',
+        }).json()
+        self.assertEqual(len(data['serie']), 10)
+        self.assertEqual(data['serie'][0], {'periode': '2026-01-01', 'jours_parc': 2, 'jours_loues': 1, 'taux': 50.0})
+        self.assertEqual(data['par_marque'][0]['marque'], 'Renault')
+        self.assertEqual(data['par_type'], [{'type_location': 'LLD', 'jours_loues': 10, 'jours_parc': 20, 'taux': 50.0}])
@@ -0,0 +1,110 @@
+"""
+Tests unitaires FLOTTE — file d'emails : mise en file transactionnelle, envoi par lots sur une
+connexion, nouveaux essais avec délai croissant (backend locmem de Django).
+"""
+from datetime import timedelta
+from smtplib import SMTPRecipientsRefused
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from flotte.models import EmailOutbox
+from flotte.outbox import deliver_all, deliver_outbox, queue_mail_html, requeue
+
+User = get_user_model()
+
+
+class CountingBackend(EmailBackend):
+    """Backend locmem qui compte les ouvertures de connexion et refuse les adresses @refus.test."""
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(to.endswith('@refus.test') for to in message.to):
+                raise SMTPRecipientsRefused({message.to[0]: (550, b'Utilisateur inconnu')})
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='flotte.tests.unit.test_outbox.CountingBackend',
+    FLOTTE_OUTBOX_MAX_ATTEMPTS=3,
+    FLOTTE_OUTBOX_BACKOFF_SECONDS=60,
+)
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        CountingBackend.opened = 0
+
+    def test_bienvenue_mise_en_file_dans_la_transaction(self):
+        User.objects.create_user('nouveau', email='nouveau@flotte.test', password='x')
+        self.assertEqual(len(mail.outbox), 0)
+        item = EmailOutbox.objects.get()
+        self.assertEqual(item.destinataires, ['nouveau@flotte.test'])
+        self.assertEqual(item.statut, EmailOutbox.STATUT_ATTENTE)
+
+        # Création annulée : aucun email en file
+        try:
+            with transaction.atomic():
+                User.objects.create_user('annule', email='annule@flotte.test', password='x')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_lot_envoye_sur_une_connexion(self):
+        for i in range(5):
+            queue_mail_html(f'Sujet {i}', f'<p>{i}</p>', f'd{i}@flotte.test', body_text=str(i))
+        stats = deliver_outbox(batch_size=10)
+        self.assertEqual(stats, {'envoyes': 5, 'reportes': 0, 'echecs': 0})
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertFalse(EmailOutbox.objects.exclude(statut=EmailOutbox.STATUT_ENVOYE).exists())
+        # Rien de dû : aucune connexion ouverte
+        self.assertEqual(deliver_all(), {'envoyes': 0, 'reportes': 0, 'echecs': 0})
+        self.assertEqual(CountingBackend.opened, 1)
+
+    def test_echec_reessais_avec_delai_croissant(self):
+        ok = queue_mail_html('OK', '<p>ok</p>', 'ok@flotte.test')
+        refus = queue_mail_html('Refus', '<p>refus</p>', 'x@refus.test')
+        now = timezone.now()
+        self.assertEqual(deliver_outbox(now=now), {'envoyes': 1, 'reportes': 1, 'echecs': 0})
+        refus.refresh_from_db()
+        self.assertEqual(refus.statut, EmailOutbox.STATUT_ATTENTE)
+        self.assertEqual(refus.tentatives, 1)
+        self.assertIn('SMTPRecipientsRefused', refus.derniere_erreur)
+        self.assertEqual(refus.prochain_essai, now + timedelta(seconds=60))
+        ok.refresh_from_db()
+        self.assertEqual(ok.statut, EmailOutbox.STATUT_ENVOYE)
+
+        # Pas encore dû
+        self.assertEqual(deliver_outbox(now=now + timedelta(seconds=30))['reportes'], 0)
+        now += timedelta(seconds=60)
+        deliver_outbox(now=now)
+        refus.refresh_from_db()
+        self.assertEqual(refus.prochain_essai, now + timedelta(seconds=120))
+        self.assertEqual(deliver_outbox(now=now + timedelta(seconds=120))['echecs'], 1)
+        refus.refresh_from_db()
+        self.assertEqual((refus.statut, refus.tentatives), (EmailOutbox.STATUT_ECHEC, 3))
+
+        self.assertEqual(requeue(EmailOutbox.objects.all()), 1)
+        refus.refresh_from_db()
+        self.assertEqual((refus.statut, refus.tentatives), (EmailOutbox.STATUT_ATTENTE, 0))
+
+    def test_lot_abandonne_repris_apres_le_bail(self):
+        item = queue_mail_html('Bail', '<p>bail</p>', 'bail@flotte.test')
+        now = timezone.now()
+        EmailOutbox.objects.filter(pk=item.pk).update(
+            statut=EmailOutbox.STATUT_EN_COURS, jeton='ancien', prochain_essai=now + timedelta(seconds=600),
+        )
+        self.assertEqual(deliver_outbox(now=now)['envoyes'], 0)
+        self.assertEqual(deliver_outbox(now=now + timedelta(seconds=601))['envoyes'], 1)
+        self.assertEqual(len(mail.outbox), 1)
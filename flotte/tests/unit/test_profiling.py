@@ -0,0 +1,68 @@
+"""
+Tests unitaires FLOTTE — middleware de profilage (échantillonnage, détection N+1, agrégation ProfilVue).
+"""
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from flotte import profiling
+from flotte.models import Marque, ProfilVue
+
+
+def _vue_n_plus_un(request):
+    for i in range(6):
+        Marque.objects.filter(pk=i).exists()
+    Marque.objects.count()
+    Marque.objects.count()
+    return HttpResponse('ok')
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        profiling.reset()
+        self.request = RequestFactory().get('/dashboard/')
+        self.request.resolver_match = resolve(reverse('flotte:dashboard'))
+
+    def test_fingerprint_normalise_les_litteraux(self):
+        a = profiling.fingerprint("SELECT * FROM t WHERE id = 12 AND nom = 'x' AND k IN (1, 2, 3)")
+        b = profiling.fingerprint("SELECT * FROM t WHERE id = 7 AND nom = 'yy' AND k IN (4, 5)")
+        self.assertEqual(a, b)
+
+    def test_percentile_histogramme(self):
+        histogram = [0] * (len(profiling.HISTOGRAM_BOUNDS) + 1)
+        histogram[0] = 90  # ≤ 5 ms
+        histogram[4] = 10  # ≤ 100 ms
+        self.assertEqual(profiling.percentile_from_histogram(histogram), 100.0)
+        self.assertEqual(profiling.percentile_from_histogram([]), 0.0)
+
+    @override_settings(FLOTTE_PROFILING_SAMPLE_RATE=0)
+    def test_desactive_sans_echantillonnage(self):
+        profiling.ProfilingMiddleware(_vue_n_plus_un)(self.request)
+        self.assertEqual(profiling.recent_profiles(), [])
+
+    @override_settings(FLOTTE_PROFILING_SAMPLE_RATE=1, FLOTTE_PROFILING_FLUSH_INTERVAL=0,
+                       FLOTTE_PROFILING_NPLUSONE_THRESHOLD=5)
+    def test_detection_et_agregation(self):
+        profiling.ProfilingMiddleware(_vue_n_plus_un)(self.request)
+        profile = profiling.recent_profiles('flotte:dashboard')[0]
+        self.assertEqual(profile['nb_sql'], 8)
+        types = {d['type'] for d in profile['detections']}
+        self.assertEqual(types, {'n+1', 'doublon'})
+        self.assertTrue(all('test_profiling.py' in d['callsite'] for d in profile['detections']))
+
+        row = ProfilVue.objects.get(vue='flotte:dashboard')
+        self.assertEqual((row.nb_echantillons, row.nb_sql, row.nb_detections), (1, 8, 2))
+        self.assertGreater(row.p95_ms, 0)
+
+    def test_page_admin(self):
+        from django.contrib.auth import get_user_model
+        admin_user = get_user_model().objects.create_superuser('profadmin', 'p@example.com', 'testpass123')
+        self.client.force_login(admin_user)
+        row = ProfilVue.objects.create(vue='flotte:parc', nb_echantillons=2, temps_total_ms=40, p95_ms=25,
+                                       dernieres_detections=[{'type': 'n+1', 'count': 6, 'sql': 'SELECT ?',
+                                                              'callsite': 'flotte/views.py:1 (x)'}])
+        response = self.client.get(reverse('admin:flotte_profilvue_changelist'))
+        self.assertContains(response, 'flotte:parc')
+        response = self.client.get(reverse('admin:flotte_profilvue_change', args=[row.pk]))
+        self.assertContains(response, 'flotte/views.py:1')
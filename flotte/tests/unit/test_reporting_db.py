@@ -0,0 +1,93 @@
+"""
+Tests unitaires FLOTTE — base de lecture des rapports : routage @use_reporting_db, lecture de ses
+propres écritures, instantané SQLite par l'API de sauvegarde.
+"""
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from flotte.models import Marque
+from flotte.reporting_db import (
+    ReportingStickinessMiddleware, refresh_snapshot, use_reporting_db,
+)
+
+REPORTING = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+
+
+@use_reporting_db
+def vue_rapport(request):
+    """Vue de test : alias de lecture retenu par le routeur pour Marque et pour User."""
+    return router.db_for_read(Marque), router.db_for_read(User)
+
+
+class ReportingRouterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('lecteur', password='x')
+        self.request = RequestFactory().get('/rapport/')
+        self.request.user = self.user
+
+    def test_sans_alias_reporting_base_principale(self):
+        self.assertEqual(vue_rapport(self.request), ('default', 'default'))
+        self.assertEqual(router.db_for_read(Marque), 'default')
+
+    def test_lectures_flotte_vers_reporting(self):
+        with mock.patch.dict(settings.DATABASES, {'reporting': REPORTING}):
+            self.assertEqual(vue_rapport(self.request), ('reporting', 'default'))
+        # Hors de la vue décorée : base principale
+        self.assertEqual(router.db_for_read(Marque), 'default')
+        self.assertEqual(router.db_for_write(Marque), 'default')
+
+    def test_lecture_de_ses_ecritures(self):
+        with mock.patch.dict(settings.DATABASES, {'reporting': REPORTING}):
+            middleware = ReportingStickinessMiddleware(lambda request: HttpResponse(status=302))
+            post = RequestFactory().post('/marques/ajouter/')
+            post.user = self.user
+            middleware(post)
+            self.assertEqual(vue_rapport(self.request), ('default', 'default'))
+            # Les autres utilisateurs lisent toujours la base des rapports
+            autre = RequestFactory().get('/rapport/')
+            autre.user = User.objects.create_user('autre', password='x')
+            self.assertEqual(vue_rapport(autre)[0], 'reporting')
+
+    def test_instantane_absent_base_principale(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(settings.DATABASES, {'reporting': REPORTING}), \
+                self.settings(FLOTTE_REPORTING_SNAPSHOT_PATH=str(Path(directory) / 'absent.sqlite3')):
+            self.assertEqual(vue_rapport(self.request)[0], 'default')
+
+
+class ReportingSnapshotTests(TestCase):
+
+    def test_instantane_par_api_de_sauvegarde(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source_path = Path(directory) / 'source.sqlite3'
+            source = sqlite3.connect(source_path)
+            source.execute('PRAGMA journal_mode = WAL')
+            source.execute('CREATE TABLE t (x INTEGER)')
+            source.executemany('INSERT INTO t VALUES (?)', [(i,) for i in range(100)])
+            source.commit()
+            snapshot_path = Path(directory) / 'rapports.sqlite3'
+            with mock.patch.dict(settings.DATABASES, {'source': {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': source_path,
+            }}):
+                path, size, _ = refresh_snapshot(snapshot_path, source_alias='source')
+            source.close()
+            self.assertEqual(path, snapshot_path)
+            self.assertGreater(size, 0)
+            snapshot = sqlite3.connect(f'file:{snapshot_path}?mode=ro&immutable=1', uri=True)
+            try:
+                self.assertEqual(snapshot.execute('SELECT COUNT(*) FROM t').fetchone()[0], 100)
+                self.assertEqual(snapshot.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            finally:
+                snapshot.close()
+            self.assertEqual(sorted(p.name for p in Path(directory).glob('rapports*')), ['rapports.sqlite3'])
@@ -0,0 +1,106 @@
+"""
+Tests unitaires FLOTTE — agrégats journaliers de ventes (VenteRollup) maintenus par signaux.
+"""
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from flotte.models import Marque, Modele, Vehicule, Vente, VenteRollup
+from flotte.rollups import evolution_ca, recalculer_compartiments, reconstruire_rollup, synthese_ca
+
+
+class VenteRollupTests(TestCase):
+    """Le rollup reste identique à un recalcul complet après chaque écriture."""
+
+    def setUp(self):
+        self.marque = Marque.objects.create(nom='Toyota')
+        self.modele = Modele.objects.create(marque=self.marque, nom='Corolla')
+        self.autre_marque = Marque.objects.create(nom='Nissan')
+        self.v1 = Vehicule.objects.create(
+            numero_chassis='ROLL001', marque=self.marque, modele=self.modele, statut='vendu'
+        )
+        self.v2 = Vehicule.objects.create(numero_chassis='ROLL002', marque=self.marque, statut='vendu')
+
+    def _etat(self):
+        return list(VenteRollup.objects.order_by('jour', 'marque_id', 'modele_id').values_list(
+            'jour', 'marque_id', 'modele_id', 'nb_ventes', 'nb_ventes_ca', 'total_ca', 'prix_min', 'prix_max'
+        ))
+
+    def assertRollupCoherent(self):
+        incremental = self._etat()
+        reconstruire_rollup()
+        self.assertEqual(incremental, self._etat())
+
+    def test_creation_modification_suppression(self):
+        jour = date(2025, 3, 10)
+        v_a = Vente.objects.create(vehicule=self.v1, date_vente=jour, prix_vente=Decimal('1000'))
+        Vente.objects.create(vehicule=self.v1, date_vente=jour, prix_vente=Decimal('3000'))
+        Vente.objects.create(vehicule=self.v2, date_vente=jour, prix_vente=None)
+        row = VenteRollup.objects.get(jour=jour, modele=self.modele)
+        self.assertEqual((row.nb_ventes, row.total_ca, row.prix_min, row.prix_max), (2, 4000, 1000, 3000))
+        self.assertRollupCoherent()
+
+        # Changement de jour : les deux compartiments sont recalculés
+        v_a.date_vente = date(2025, 4, 1)
+        v_a.save()
+        self.assertEqual(VenteRollup.objects.get(jour=jour, modele=self.modele).total_ca, 3000)
+        self.assertRollupCoherent()
+
+        v_a.delete()
+        self.assertFalse(VenteRollup.objects.filter(jour=date(2025, 4, 1)).exists())
+        self.assertRollupCoherent()
+
+    def test_changement_marque_vehicule(self):
+        Vente.objects.create(vehicule=self.v2, date_vente=date(2025, 5, 2), prix_vente=Decimal('500'))
+        self.v2.marque = self.autre_marque
+        self.v2.save()
+        self.assertTrue(VenteRollup.objects.filter(marque=self.autre_marque).exists())
+        self.assertFalse(VenteRollup.objects.filter(marque=self.marque).exists())
+        self.assertRollupCoherent()
+
+    def test_suppression_vehicule_en_cascade(self):
+        Vente.objects.create(vehicule=self.v1, date_vente=date(2025, 6, 1), prix_vente=Decimal('700'))
+        self.v1.delete()
+        self.assertFalse(VenteRollup.objects.exists())
+
+    def test_compartiment_unique_modele_absent(self):
+        jour = date(2025, 7, 1)
+        Vente.objects.create(vehicule=self.v2, date_vente=jour, prix_vente=Decimal('800'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            VenteRollup.objects.create(jour=jour, marque=self.marque, modele=None, nb_ventes=1)
+
+    def test_compartiment_cree_en_concurrence(self):
+        jour = date(2025, 7, 2)
+        Vente.objects.create(vehicule=self.v2, date_vente=jour, prix_vente=Decimal('800'))
+        VenteRollup.objects.all().delete()
+        first = QuerySet.first
+
+        def concurrent(qs):
+            ligne = first(qs)
+            if qs.model is VenteRollup and not VenteRollup.objects.exists():
+                # Une autre transaction insère le compartiment entre la lecture et l'insertion
+                VenteRollup.objects.create(jour=jour, marque=self.marque, nb_ventes=1)
+            return ligne
+
+        with mock.patch.object(QuerySet, 'first', concurrent):
+            recalculer_compartiments({(jour, self.marque.pk, None)})
+        self.assertEqual(VenteRollup.objects.filter(jour=jour).count(), 1)
+        self.assertRollupCoherent()
+
+    def test_lecture_synthese_et_evolution(self):
+        Vente.objects.create(vehicule=self.v1, date_vente=date(2024, 12, 31), prix_vente=Decimal('100'))
+        Vente.objects.create(vehicule=self.v2, date_vente=date(2025, 1, 15), prix_vente=Decimal('300'))
+        Vente.objects.create(vehicule=self.v2, date_vente=date(2025, 1, 16), prix_vente=Decimal('0'))
+        synthese = synthese_ca()
+        self.assertEqual(synthese['total_ca'], 400)
+        self.assertEqual(synthese['nb_ventes'], 2)
+        self.assertEqual(synthese['nb_ventes_total'], 3)
+        self.assertEqual(synthese['moyenne_vente'], 200)
+        mois = list(evolution_ca('mois', 2025))
+        self.assertEqual(len(mois), 1)
+        self.assertEqual((mois[0]['periode'], mois[0]['total'], mois[0]['nb']), (date(2025, 1, 1), 300, 1))
+        self.assertEqual(len(list(evolution_ca('annee', None))), 2)
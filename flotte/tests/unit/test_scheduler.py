@@ -0,0 +1,143 @@
+"""
+Tests unitaires FLOTTE — planificateur : expressions cron, verrou par créneau, historique des
+exécutions, transitions de statut des locations en masse.
+"""
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from flotte.jobs import update_location_statuts
+from flotte.models import ExecutionTache, Location, Marque, Modele, TachePlanifiee, Vehicule
+from flotte.scheduler import CronSchedule, Job, get_jobs, pending_jobs, run_due_jobs, run_job, run_pending_jobs
+
+User = get_user_model()
+
+JOBS = {
+    'statuts': {'cron': '*/15 * * * *', 'callable': 'flotte.jobs.update_location_statuts'},
+    'echec': {'cron': '0 3 * * *', 'callable': 'flotte.tests.unit.test_scheduler.tache_en_echec'},
+}
+
+
+def tache_en_echec():
+    raise RuntimeError('panne simulée')
+
+
+class CronScheduleTests(TestCase):
+
+    def test_correspondance_et_prochaine_execution(self):
+        cron = CronSchedule('*/15 8-18 * * 1-5')
+        lundi = datetime(2026, 3, 2, 8, 30)
+        self.assertTrue(cron.matches(lundi))
+        self.assertFalse(cron.matches(lundi.replace(minute=31)))
+        self.assertFalse(cron.matches(datetime(2026, 3, 1, 8, 30)))  # dimanche
+        self.assertEqual(cron.next_after(datetime(2026, 3, 6, 18, 45)), datetime(2026, 3, 9, 8, 0))
+        self.assertEqual(CronSchedule('@monthly').next_after(datetime(2026, 12, 15, 10, 0)), datetime(2027, 1, 1, 0, 0))
+        # Dimanche : 0 ou 7
+        self.assertTrue(CronSchedule('0 0 * * 7').matches(datetime(2026, 3, 1, 0, 0)))
+
+    def test_expressions_invalides(self):
+        for expression in ('* * * *', '60 * * * *', '*/0 * * * *', 'a * * * *', '5-1 * * * *'):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                CronSchedule(expression)
+        with self.assertRaises(ValueError):
+            Job('double', '* * * * *', callable='x.y', command='z')
+
+
+@override_settings(FLOTTE_SCHEDULER_JOBS=JOBS)
+class SchedulerTests(TestCase):
+
+    def test_un_seul_detenteur_par_creneau(self):
+        job = get_jobs()['statuts']
+        slot = timezone.now().replace(second=0, microsecond=0)
+        self.assertIsNotNone(run_job(job, slot=slot, holder='hote-a:1'))
+        self.assertIsNone(run_job(job, slot=slot, holder='hote-b:2'))
+        self.assertEqual(ExecutionTache.objects.filter(tache='statuts').count(), 1)
+        tache = TachePlanifiee.objects.get(nom='statuts')
+        self.assertEqual((tache.detenteur, tache.verrouille_jusqua), ('', None))
+        # Créneau suivant : de nouveau exécutable
+        self.assertIsNotNone(run_job(job, slot=slot + timedelta(minutes=15), holder='hote-b:2'))
+
+    def test_verrou_expire_libere(self):
+        job = get_jobs()['statuts']
+        now = timezone.now()
+        TachePlanifiee.objects.create(nom='statuts', detenteur='bloque:1', verrouille_jusqua=now + timedelta(hours=1))
+        self.assertIsNone(run_job(job, slot=now))
+        TachePlanifiee.objects.filter(nom='statuts').update(verrouille_jusqua=now - timedelta(seconds=1))
+        self.assertIsNotNone(run_job(job, slot=now))
+
+    def test_historique_succes_et_erreur(self):
+        jobs = get_jobs()
+        at_3h = timezone.make_aware(datetime(2026, 3, 2, 3, 0))
+        executions = run_due_jobs(jobs, now=at_3h)
+        self.assertEqual(sorted(e.tache for e in executions), ['echec', 'statuts'])
+        echec = ExecutionTache.objects.get(tache='echec')
+        self.assertEqual(echec.statut, ExecutionTache.STATUT_ERREUR)
+        self.assertIn('panne simulée', echec.resultat)
+        self.assertIsNotNone(echec.duree_ms)
+        succes = ExecutionTache.objects.get(tache='statuts')
+        self.assertEqual(succes.statut, ExecutionTache.STATUT_SUCCES)
+        self.assertIn('démarrée', succes.resultat)
+        # 3 h 05 : aucune tâche due
+        self.assertEqual(run_due_jobs(jobs, now=at_3h + timedelta(minutes=5)), [])
+
+    def test_rattrapage_des_minutes_ecoulees(self):
+        jobs = get_jobs()
+        # Tâche longue de 2 h 58 à 3 h 32 : 3 h 00 (quotidienne) et 3 h 30 (dernier quart d'heure) rattrapés
+        avant = timezone.make_aware(datetime(2026, 3, 2, 2, 58))
+        apres = timezone.make_aware(datetime(2026, 3, 2, 3, 32))
+        self.assertEqual(
+            [(timezone.localtime(slot).strftime('%H:%M'), job.name) for slot, job in pending_jobs(jobs, avant, apres)],
+            [('03:00', 'echec'), ('03:30', 'statuts')],
+        )
+        executions = run_pending_jobs(jobs, since=avant, now=apres)
+        self.assertEqual(sorted(e.tache for e in executions), ['echec', 'statuts'])
+        self.assertEqual(run_pending_jobs(jobs, since=apres, now=apres + timedelta(minutes=1)), [])
+
+    def test_commande_et_page_admin(self):
+        out = StringIO()
+        call_command('run_scheduler', '--run', 'statuts', stdout=out)
+        self.assertIn('statuts : succès', out.getvalue())
+        call_command('run_scheduler', '--list', stdout=out)
+        self.assertIn('*/15 * * * *', out.getvalue())
+
+        admin = User.objects.create_superuser('planif', 'planif@flotte.test', 'x')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:flotte_tacheplanifiee_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Succès')
+
+
+class LocationStatutsTests(TestCase):
+
+    def setUp(self):
+        marque = Marque.objects.create(nom='Kia')
+        modele = Modele.objects.create(marque=marque, nom='Sportage')
+        self.vehicule = Vehicule.objects.create(numero_chassis='CH-STATUT', marque=marque, modele=modele)
+        self.today = date(2026, 3, 10)
+
+    def _location(self, statut, debut, fin):
+        return Location.objects.create(
+            vehicule=self.vehicule, locataire='Client', type_location='LLD',
+            date_debut=self.today + timedelta(days=debut), date_fin=self.today + timedelta(days=fin), statut=statut,
+        )
+
+    def test_transitions_en_masse(self):
+        demarre = self._location('a_venir', -1, 30)
+        futur = self._location('a_venir', 5, 30)
+        fini = self._location('en_cours', -60, -1)
+        rate = self._location('a_venir', -60, -10)
+        en_cours = self._location('en_cours', -5, 5)
+        with self.assertNumQueries(4):  # 2 UPDATE (+ SAVEPOINT / RELEASE du TestCase)
+            resume = update_location_statuts(today=self.today)
+        self.assertEqual(resume, '1 location(s) démarrée(s), 2 terminée(s)')
+        statuts = dict(Location.objects.values_list('pk', 'statut'))
+        self.assertEqual(statuts[demarre.pk], 'en_cours')
+        self.assertEqual(statuts[futur.pk], 'a_venir')
+        self.assertEqual(statuts[fini.pk], 'termine')
+        self.assertEqual(statuts[rate.pk], 'termine')
+        self.assertEqual(statuts[en_cours.pk], 'en_cours')
@@ -0,0 +1,64 @@
+"""
+Tests unitaires FLOTTE — sessions à expiration glissante et purge des sessions expirées.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from flotte.sessions import SESSION_REFRESH_KEY, purge_expired_sessions, session_needs_refresh
+
+User = get_user_model()
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.db',
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_COOKIE_AGE=3600,
+    FLOTTE_SESSION_REFRESH_INTERVAL=600,
+)
+class SlidingSessionTests(TestCase):
+    """La session n'est réécrite qu'une fois par intervalle."""
+
+    def setUp(self):
+        User.objects.create_user(username='sess', password='testpass123')
+        self.client.login(username='sess', password='testpass123')
+
+    def test_needs_refresh_threshold(self):
+        now = time.time()
+        self.assertTrue(session_needs_refresh({}, now))
+        self.assertFalse(session_needs_refresh({SESSION_REFRESH_KEY: now - 60}, now))
+        self.assertTrue(session_needs_refresh({SESSION_REFRESH_KEY: now - 601}, now))
+
+    def test_no_write_within_interval(self):
+        self.client.get(reverse('flotte:dashboard'))
+        first = Session.objects.get().expire_date
+        response = self.client.get(reverse('flotte:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # Pas de nouveau cookie de session : rien n'a été réécrit
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertEqual(Session.objects.get().expire_date, first)
+
+    def test_write_after_interval(self):
+        session = self.client.session
+        session[SESSION_REFRESH_KEY] = int(time.time()) - 3000
+        session.save()
+        response = self.client.get(reverse('flotte:dashboard'))
+        self.assertIn('sessionid', response.cookies)
+        self.assertGreater(self.client.session[SESSION_REFRESH_KEY], int(time.time()) - 60)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class PurgeSessionsTests(TestCase):
+    def test_purge_by_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        future = timezone.now() + timedelta(days=1)
+        for i in range(5):
+            Session.objects.create(session_key=f'expired{i:032d}', session_data='', expire_date=past)
+        Session.objects.create(session_key='alive' + '0' * 35, session_data='', expire_date=future)
+        self.assertEqual(purge_expired_sessions(batch_size=2), 5)
+        self.assertEqual(Session.objects.count(), 1)
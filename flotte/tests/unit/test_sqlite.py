@@ -0,0 +1,54 @@
+"""
+Tests unitaires FLOTTE — SQLite : pragmas appliqués à chaque connexion, commande sqlite_maintenance.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from flotte.sqlite import apply_sqlite_pragmas, pragma_statements
+
+
+def _pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+class SqlitePragmasTests(TestCase):
+
+    def test_pragmas_appliques_a_la_connexion(self):
+        self.assertEqual(_pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(_pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(_pragma('busy_timeout'), 5000)
+        self.assertEqual(_pragma('cache_size'), -20000)
+
+    @override_settings(FLOTTE_SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': None})
+    def test_pragmas_configurables(self):
+        apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(_pragma('busy_timeout'), 1234)
+
+    def test_noms_et_valeurs_valides(self):
+        self.assertEqual(pragma_statements({'journal_mode': 'wal'}), ['PRAGMA journal_mode = wal'])
+        with self.assertRaises(ValueError):
+            pragma_statements({'locking_mode': 'exclusive'})
+        with self.assertRaises(ValueError):
+            pragma_statements({'cache_size': '1; DROP TABLE flotte_vehicule'})
+
+
+class SqliteMaintenanceCommandTests(TestCase):
+
+    def test_toutes_les_etapes(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        output = out.getvalue()
+        for step in ('checkpoint', 'analyze', 'optimize', 'vacuum'):
+            self.assertIn(step, output)
+        self.assertIn('Maintenance SQLite terminée', output)
+
+    def test_etapes_choisies(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', only=['analyze'], stdout=out)
+        self.assertIn('analyze', out.getvalue())
+        self.assertNotIn('checkpoint', out.getvalue())
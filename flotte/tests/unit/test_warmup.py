@@ -0,0 +1,86 @@
+"""
+Tests unitaires FLOTTE — profil production : préchauffage (gabarits, données de référence) et journaux compressés.
+"""
+import gzip
+import logging
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from flotte.log_handlers import CompressedRotatingFileHandler
+from flotte.models import Marque
+from flotte.warmup import warm_up
+
+
+class WarmupTests(TestCase):
+
+    def test_tous_les_gabarits_compilent(self):
+        Marque.objects.create(nom='Toyota')
+        report = warm_up()
+        compiled, errors = report['gabarits'][1]
+        self.assertGreater(compiled, 0)
+        self.assertEqual(errors, [])
+        rows, error = report['donnees_reference'][1:]
+        self.assertIsNone(error)
+        self.assertGreaterEqual(rows, 1)
+
+    def test_connexions_fermees_apres_prechauffage(self):
+        # Sous gunicorn --preload, les workers forkés ne doivent pas hériter de la connexion du maître
+        conn = mock.Mock(in_atomic_block=False)
+        with mock.patch('flotte.warmup.connections') as connections:
+            connections.all.return_value = [conn]
+            warm_up()
+        connections.all.assert_called_with(initialized_only=True)
+        conn.close.assert_called_once_with()
+
+    def test_commande(self):
+        out = StringIO()
+        call_command('warmup', stdout=out)
+        self.assertIn('gabarits compilés', out.getvalue())
+
+
+class CompressedRotatingFileHandlerTests(TestCase):
+
+    def test_archives_compressees(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'flotte.log'
+            handler = CompressedRotatingFileHandler(path, maxBytes=200, backupCount=2, encoding='utf-8')
+            log = logging.getLogger('flotte.tests.rotation')
+            log.addHandler(handler)
+            log.propagate = False
+            try:
+                for i in range(10):
+                    log.warning('ligne %d %s', i, 'x' * 50)
+            finally:
+                log.removeHandler(handler)
+                handler.close()
+            archive = Path(directory) / 'flotte.log.1.gz'
+            self.assertTrue(archive.exists())
+            self.assertFalse((Path(directory) / 'flotte.log.3.gz').exists())
+            self.assertIn('ligne', gzip.decompress(archive.read_bytes()).decode('utf-8'))
+
+    def test_un_fichier_par_processus(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = CompressedRotatingFileHandler(
+                Path(directory) / 'flotte.{pid}.log', maxBytes=10000, backupCount=2, encoding='utf-8'
+            )
+            log = logging.getLogger('flotte.tests.pid')
+            log.addHandler(handler)
+            log.propagate = False
+            try:
+                log.warning('maître')
+                # Worker forké : même handler, autre pid
+                with mock.patch('flotte.log_handlers.os.getpid', return_value=424242):
+                    log.warning('worker')
+            finally:
+                log.removeHandler(handler)
+                handler.close()
+            master = Path(directory) / f'flotte.{os.getpid()}.log'
+            worker = Path(directory) / 'flotte.424242.log'
+            self.assertEqual(master.read_text(encoding='utf-8').strip(), 'maître')
+            self.assertEqual(worker.read_text(encoding='utf-8').strip(), 'worker')
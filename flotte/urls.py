@@ -77,6 +77,7 @@ urlpatterns = [
     path('ventes/', views.ventes_list, name='ventes_list'),
     path('ca/', views.ca_view, name='ca'),
     path('tco/', views.tco_view, name='tco'),
+    path('occupation/', views.occupation_view, name='occupation'),
     path('export-reglementaire/', views.export_reglementaire, name='export_reglementaire'),
     path('export-charges-import/', views.export_charges_import, name='export_charges_import'),
     path('export-locations/', views.export_locations, name='export_locations'),
@@ -129,6 +130,8 @@ urlpatterns = [
     path('api/dashboard/kpis/', api_views.api_dashboard_kpis, name='api_dashboard_kpis'),
     path('api/conducteurs/', api_views.api_conducteurs_list, name='api_conducteurs_list'),
     path('api/locations/', api_views.api_locations_list, name='api_locations_list'),
+    path('api/disponibilites/', api_views.api_disponibilites, name='api_disponibilites'),
+    path('api/occupation/', api_views.api_occupation, name='api_occupation'),
     # API REST Framework (api/v1/) — browsable API, pagination, filtres
     path('api/v1/', include(router.urls)),
 ]
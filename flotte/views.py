@@ -18,9 +18,9 @@ from django.views.generic import (
 )
 from django.urls import reverse_lazy, reverse
 from django.views.decorators.http import require_GET
-from django.db.models import Avg, Case, Count, IntegerField, Prefetch, Q, Sum, Value, When
-from django.db.models.functions import TruncDate, TruncMonth, TruncYear
+from django.db.models import Case, Count, IntegerField, Max, Min, Prefetch, Q, Sum, Value, When
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from decimal import Decimal
 from django.utils.decorators import method_decorator
 from django.db import DatabaseError, IntegrityError
@@ -31,7 +31,7 @@ from .models import (
     Reparation, Vente, ProfilUtilisateur, Facture,
     RapportJournalier, Maintenance, ReleveCarburant, Conducteur,
     ChargeImport, PartieImportee, Contravention, TypeDocument,
-    AuditLog, PhotoVehicule, PenaliteFacture,
+    AuditLog, PhotoVehicule, PenaliteFacture, VenteRollup, OccupationRollup,
 )
 from .forms import (
     LoginForm, UserCreateForm, UserUpdateForm, MarqueForm, ModeleForm,
@@ -42,9 +42,18 @@ from .forms import (
     ChargeImportForm, PartieImporteeForm, ContraventionForm, TypeDocumentForm,
     PhotoVehiculeForm, PenaliteFactureForm, CAAmountCodeForm,
 )
+from .availability import available_vehicles
+from .facturation import prefixe_facture, prochain_numero
+from .fragment_cache import fragment_scope
+from .http_cache import conditional_json
+from .metrics import EXPORT_DURATION, EXPORT_ROWS
+from .occupation import avec_taux, occupation_par_marque, occupation_par_periode, occupation_par_type
+from .query_budget import query_budget
+from .reporting_db import use_reporting_db
+from .rollups import FILTRE_CA, evolution_ca, synthese_ca
 from .mixins import (
     AdminRequiredMixin, ManagerRequiredMixin,
-    user_role, is_admin, is_manager_or_admin,
+    user_role, is_admin, is_manager_or_admin, ais_manager_or_admin,
     manager_or_admin_required,
 )
 from django.contrib.auth import get_user_model
@@ -55,15 +64,18 @@ logger = logging.getLogger(__name__)
 
 def get_sidebar_context(request):
     """Contexte commun : rôle, is_admin, is_manager_or_admin pour la sidebar et les boutons.
-    Utilisé par toutes les vues pour l'affichage du menu latéral."""
+    Utilisé par toutes les vues pour l'affichage du menu latéral ; fragment_scope sert de clé
+    au cache de fragments ({% fragment_cache %})."""
     return {
         'user_role': user_role(request) if request.user.is_authenticated else None,
         'is_admin': is_admin(request),
         'is_manager_or_admin': is_manager_or_admin(request),
+        'fragment_scope': fragment_scope(request),
     }
 
 
 # ——— Auth ———
+@query_budget(10)
 class FlotteLoginView(LoginView):
     """Connexion FLOTTE avec thème beige."""
     template_name = 'flotte/login.html'
@@ -85,6 +97,7 @@ class FlotteLoginView(LoginView):
         return reverse_lazy('flotte:dashboard')
 
 
+@query_budget(9)
 class FlotteLogoutView(LogoutView):
     """Déconnexion. Accepte GET et POST pour éviter HTTP 405 (lien direct ou actualisation)."""
     next_page = 'flotte:login'
@@ -98,6 +111,7 @@ class FlotteLogoutView(LogoutView):
 
 
 # ——— Mot de passe oublié ———
+@query_budget(9)
 class FlottePasswordResetView(PasswordResetView):
     """Demande de réinitialisation du mot de passe (email)."""
     template_name = 'flotte/password_reset_form.html'
@@ -108,11 +122,13 @@ class FlottePasswordResetView(PasswordResetView):
     from_email = None  # utilise DEFAULT_FROM_EMAIL
 
 
+@query_budget(6)
 class FlottePasswordResetDoneView(PasswordResetDoneView):
     """Confirmation : email envoyé."""
     template_name = 'flotte/password_reset_done.html'
 
 
+@query_budget(6)
 class FlottePasswordResetConfirmView(PasswordResetConfirmView):
     """Formulaire nouveau mot de passe (lien reçu par email)."""
     template_name = 'flotte/password_reset_confirm.html'
@@ -120,6 +136,7 @@ class FlottePasswordResetConfirmView(PasswordResetConfirmView):
     title = 'Nouveau mot de passe'
 
 
+@query_budget(6)
 class FlottePasswordResetCompleteView(PasswordResetCompleteView):
     """Mot de passe réinitialisé, lien vers connexion."""
     template_name = 'flotte/password_reset_complete.html'
@@ -127,6 +144,7 @@ class FlottePasswordResetCompleteView(PasswordResetCompleteView):
 
 # ——— API légère (formulaire dynamique) ———
 @login_required
+@query_budget(7)
 def api_modeles_par_marque(request):
     """Retourne les modèles pour une marque (JSON) — pour mise à jour dynamique du formulaire véhicule."""
     marque_id = request.GET.get('marque_id')
@@ -143,21 +161,20 @@ def api_modeles_par_marque(request):
 
 
 # ——— Dashboard ———
-@login_required
-def dashboard(request):
-    """Tableau de bord avec KPIs, alertes (CT, assurance), véhicules en import."""
-    from django.utils import timezone
-    from datetime import timedelta
-    qs = Vehicule.objects.all()
-    if not is_manager_or_admin(request):
-        qs = qs.filter(proprietaire=request.user)
-    parc = qs.filter(statut='parc').count()
-    import_ = qs.filter(statut='import').count()
-    vendus = qs.filter(statut='vendu').count()
-    total = qs.count()
-    by_marque = list(
-        qs.values('marque__nom').annotate(n=Count('id')).order_by('-n')
-    )
+def compteurs_parc(qs):
+    """Compteurs du parc (tuiles KPI) et répartition par marque pour le queryset de véhicules visible."""
+    return {
+        'parc': qs.filter(statut='parc').count(),
+        'import': qs.filter(statut='import').count(),
+        'vendus': qs.filter(statut='vendu').count(),
+        'total': qs.count(),
+        'by_marque': list(qs.values('marque__nom').annotate(n=Count('id')).order_by('-n')),
+    }
+
+
+def _dashboard_tuiles(request, qs):
+    """Tuiles du tableau de bord : compteurs du parc et occupation de la flotte."""
+    tuiles = compteurs_parc(qs)
     # Occupation de la flotte (véhicules en location vs total)
     vehicules_en_location_qs = Vehicule.objects.filter(
         locations__statut='en_cours'
@@ -166,14 +183,26 @@ def dashboard(request):
         vehicules_en_location_qs = vehicules_en_location_qs.filter(proprietaire=request.user)
     vehicules_en_location_qs = vehicules_en_location_qs.distinct()
     nb_vehicules_en_location = vehicules_en_location_qs.count()
-    # Disponibles : véhicules au parc sans location en cours
-    vehicules_disponibles_qs = qs.filter(statut='parc').exclude(
-        locations__statut='en_cours'
-    ).distinct()
-    nb_vehicules_disponibles = vehicules_disponibles_qs.count()
+    # Disponibles : véhicules au parc sans location à venir / en cours couvrant aujourd'hui, retours en
+    # retard compris (index en mémoire) ; fragment « tuiles » renouvelé chaque jour
+    today = timezone.localdate()
+    nb_vehicules_disponibles = len(available_vehicles(
+        today, today, proprietaire=None if is_manager_or_admin(request) else request.user.pk,
+    ))
     taux_occupation = 0
-    if total:
-        taux_occupation = round((nb_vehicules_en_location / total) * 100)
+    if tuiles['total']:
+        taux_occupation = round((nb_vehicules_en_location / tuiles['total']) * 100)
+    tuiles.update({
+        'vehicules_en_location': nb_vehicules_en_location,
+        'vehicules_disponibles': nb_vehicules_disponibles,
+        'taux_occupation': taux_occupation,
+    })
+    return tuiles
+
+
+def _dashboard_alertes(request, qs):
+    """Panneaux d'alertes à 30 jours (CT, assurance, permis, documents) et véhicules en import."""
+    from datetime import timedelta
     # Alertes : locations dont CT ou assurance expire dans les 30 jours
     now = timezone.now().date()
     fin_alerte = now + timedelta(days=30)
@@ -182,7 +211,7 @@ def dashboard(request):
         date_expiration_ct__gte=now,
         date_expiration_ct__lte=fin_alerte,
         statut='en_cours',
-    ).select_related('vehicule')
+    ).select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         base_loc_alertes = base_loc_alertes.filter(vehicule__proprietaire=request.user)
     alertes_ct = list(base_loc_alertes.order_by('date_expiration_ct')[:10])
@@ -192,7 +221,7 @@ def dashboard(request):
             date_expiration_assurance__gte=now,
             date_expiration_assurance__lte=fin_alerte,
             statut='en_cours',
-        ).select_related('vehicule')
+        ).select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         base_loc_assurance = base_loc_assurance.filter(vehicule__proprietaire=request.user)
     alertes_assurance = list(base_loc_assurance.order_by('date_expiration_assurance')[:10])
@@ -212,7 +241,7 @@ def dashboard(request):
             date_echeance__isnull=False,
             date_echeance__gte=now,
             date_echeance__lte=fin_alerte,
-        ).select_related('vehicule')
+        ).select_related('vehicule__marque', 'vehicule__modele', 'type_document_fk')
     if not is_manager_or_admin(request):
         docs_qs = docs_qs.filter(vehicule__proprietaire=request.user)
     alertes_documents = list(docs_qs.order_by('date_echeance')[:10])
@@ -239,15 +268,7 @@ def dashboard(request):
     if not is_manager_or_admin(request):
         vehicules_import_qs = vehicules_import_qs.filter(proprietaire=request.user)
     vehicules_import = list(vehicules_import_qs.order_by('-date_entree_parc')[:5])
-    context = {
-        'parc': parc,
-        'import': import_,
-        'vendus': vendus,
-        'total': total,
-        'by_marque': by_marque,
-        'vehicules_en_location': nb_vehicules_en_location,
-        'vehicules_disponibles': nb_vehicules_disponibles,
-        'taux_occupation': taux_occupation,
+    return {
         'alertes_ct': alertes_ct,
         'alertes_assurance': alertes_assurance,
         'alertes_permis': alertes_permis,
@@ -255,6 +276,20 @@ def dashboard(request):
         'alertes_ct_vehicule': alertes_ct_vehicule,
         'alertes_assurance_vehicule': alertes_assurance_vehicule,
         'vehicules_import': vehicules_import,
+    }
+
+
+@login_required
+@query_budget(21)
+def dashboard(request):
+    """Tableau de bord avec KPIs, alertes (CT, assurance), véhicules en import.
+    Tuiles et alertes sont calculées à la demande : rien n'est exécuté pour un fragment en cache."""
+    qs = Vehicule.objects.all()
+    if not is_manager_or_admin(request):
+        qs = qs.filter(proprietaire=request.user)
+    context = {
+        'tuiles': SimpleLazyObject(lambda: _dashboard_tuiles(request, qs)),
+        'alertes': SimpleLazyObject(lambda: _dashboard_alertes(request, qs)),
         **get_sidebar_context(request),
     }
     return render(request, 'flotte/dashboard.html', context)
@@ -262,6 +297,8 @@ def dashboard(request):
 
 # ——— Échéances (conformité flotte) ———
 @login_required
+@use_reporting_db
+@query_budget(16)
 def echeances(request):
     """Page consolidée des échéances : CT, assurance, documents, permis conducteurs, maintenance à faire."""
     from datetime import timedelta
@@ -273,7 +310,7 @@ def echeances(request):
             date_expiration_ct__gte=now,
             date_expiration_ct__lte=horizon,
             statut='en_cours',
-        ).select_related('vehicule')
+        ).select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         loc_ct_qs = loc_ct_qs.filter(vehicule__proprietaire=request.user)
     echeances_ct = list(loc_ct_qs.order_by('date_expiration_ct'))
@@ -284,7 +321,7 @@ def echeances(request):
             date_expiration_assurance__gte=now,
             date_expiration_assurance__lte=horizon,
             statut='en_cours',
-        ).select_related('vehicule')
+        ).select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         loc_ass_qs = loc_ass_qs.filter(vehicule__proprietaire=request.user)
     echeances_assurance = list(loc_ass_qs.order_by('date_expiration_assurance'))
@@ -314,7 +351,7 @@ def echeances(request):
             date_echeance__isnull=False,
             date_echeance__gte=now,
             date_echeance__lte=horizon,
-        ).select_related('vehicule')
+        ).select_related('vehicule__marque', 'vehicule__modele', 'type_document_fk')
     if not is_manager_or_admin(request):
         docs_qs = docs_qs.filter(vehicule__proprietaire=request.user)
     echeances_documents = list(docs_qs.order_by('date_echeance'))
@@ -333,7 +370,7 @@ def echeances(request):
     echeances_maintenance = list(
         Maintenance.objects.filter(statut='a_faire').filter(
             Q(date_prevue__isnull=True) | Q(date_prevue__lte=horizon)
-        ).select_related('vehicule').order_by('date_prevue')[:50]
+        ).select_related('vehicule__marque', 'vehicule__modele').order_by('date_prevue')[:50]
     )
     # Vidange — km atteint ou dépassé (véhicule ou location)
     from django.db.models import F
@@ -349,7 +386,7 @@ def echeances(request):
     locations_km_qs = Location.objects.filter(
         statut='en_cours',
         km_prochaine_vidange__isnull=False,
-    ).select_related('vehicule')
+    ).select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         locations_km_qs = locations_km_qs.filter(vehicule__proprietaire=request.user)
     locations_km = list(locations_km_qs)
@@ -377,6 +414,8 @@ def echeances(request):
 # ——— TCO (coût total de possession) ———
 @login_required
 @manager_or_admin_required
+@use_reporting_db
+@query_budget(13)
 def tco_view(request):
     """Rapport TCO par véhicule : acquisition + dépenses + carburant + maintenance − vente."""
     qs = Vehicule.objects.select_related('marque', 'modele').prefetch_related(
@@ -409,37 +448,75 @@ def tco_view(request):
     return render(request, 'flotte/tco.html', context)
 
 
+@manager_or_admin_required
+@use_reporting_db
+@query_budget(15)
+def occupation_view(request):
+    """Occupation de la flotte (OccupationRollup) : taux mensuels, par marque et par type de location."""
+    from datetime import date
+    bornes = OccupationRollup.objects.aggregate(premier=Min('jour'), dernier=Max('jour'))
+    dernier_jour = bornes['dernier']
+    annee_defaut = dernier_jour.year if dernier_jour else timezone.localdate().year
+    try:
+        annee = int(request.GET.get('annee', annee_defaut))
+    except (TypeError, ValueError):
+        annee = annee_defaut
+    annees = list(range(bornes['premier'].year, dernier_jour.year + 1)) if dernier_jour else [annee_defaut]
+    debut, fin = date(annee, 1, 1), date(annee, 12, 31)
+    mensuel = [avec_taux(row) for row in occupation_par_periode(debut, fin)]
+    total = avec_taux({
+        'jours_parc': sum(row['jours_parc'] for row in mensuel),
+        'jours_loues': sum(row['jours_loues'] for row in mensuel),
+    })
+    context = {
+        'annee': annee,
+        'annees': annees if annee in annees else sorted(set(annees) | {annee}),
+        'dernier_jour': dernier_jour,
+        'total': total,
+        'mensuel': mensuel,
+        'par_marque': [avec_taux(row) for row in occupation_par_marque(debut, fin)],
+        'par_type': occupation_par_type(debut, fin),
+        **get_sidebar_context(request),
+    }
+    return render(request, 'flotte/occupation.html', context)
+
+
 # ——— Export réglementaire (CSV) ———
 @login_required
 @manager_or_admin_required
+@use_reporting_db
+@query_budget(9)
 def export_reglementaire(request):
     """Export CSV : véhicules avec immat, CT, assurance, locataire (pour contrôle)."""
     import csv
     from io import StringIO
-    qs = Vehicule.objects.select_related('marque', 'modele').prefetch_related(
-        'locations'
-    ).filter(statut__in=['parc', 'import']).order_by('numero_chassis')
-    buffer = StringIO()
-    writer = csv.writer(buffer, delimiter=';')
-    writer.writerow([
-        'Châssis', 'Immat', 'Marque', 'Modèle', 'Km', 'CT (véhicule)', 'Assurance (véhicule)',
-        'Location en cours', 'Locataire', 'CT (location)', 'Assurance (location)',
-    ])
-    for v in qs:
-        loc_en_cours = v.locations.filter(statut='en_cours').first()
+    with EXPORT_DURATION.time(export='reglementaire'):
+        # Locations en cours préchargées en une requête (plus de .first() par véhicule)
+        qs = Vehicule.objects.select_related('marque', 'modele').prefetch_related(
+            Prefetch('locations', queryset=Location.objects.filter(statut='en_cours'), to_attr='locations_en_cours')
+        ).filter(statut__in=['parc', 'import']).order_by('numero_chassis')
+        buffer = StringIO()
+        writer = csv.writer(buffer, delimiter=';')
         writer.writerow([
-            v.numero_chassis,
-            v.numero_immatriculation or '',
-            v.marque.nom if v.marque else '',
-            v.modele.nom if v.modele else '',
-            v.kilometrage_actuel or '',
-            str(v.date_expiration_ct) if getattr(v, 'date_expiration_ct', None) else '',
-            str(v.date_expiration_assurance) if getattr(v, 'date_expiration_assurance', None) else '',
-            'Oui' if loc_en_cours else 'Non',
-            loc_en_cours.locataire if loc_en_cours else '',
-            str(loc_en_cours.date_expiration_ct) if loc_en_cours and loc_en_cours.date_expiration_ct else '',
-            str(loc_en_cours.date_expiration_assurance) if loc_en_cours and loc_en_cours.date_expiration_assurance else '',
+            'Châssis', 'Immat', 'Marque', 'Modèle', 'Km', 'CT (véhicule)', 'Assurance (véhicule)',
+            'Location en cours', 'Locataire', 'CT (location)', 'Assurance (location)',
         ])
+        for v in qs:
+            loc_en_cours = v.locations_en_cours[0] if v.locations_en_cours else None
+            writer.writerow([
+                v.numero_chassis,
+                v.numero_immatriculation or '',
+                v.marque.nom if v.marque else '',
+                v.modele.nom if v.modele else '',
+                v.kilometrage_actuel or '',
+                str(v.date_expiration_ct) if getattr(v, 'date_expiration_ct', None) else '',
+                str(v.date_expiration_assurance) if getattr(v, 'date_expiration_assurance', None) else '',
+                'Oui' if loc_en_cours else 'Non',
+                loc_en_cours.locataire if loc_en_cours else '',
+                str(loc_en_cours.date_expiration_ct) if loc_en_cours and loc_en_cours.date_expiration_ct else '',
+                str(loc_en_cours.date_expiration_assurance) if loc_en_cours and loc_en_cours.date_expiration_assurance else '',
+            ])
+        EXPORT_ROWS.inc(len(qs), export='reglementaire')
     content = '\ufeff' + buffer.getvalue()  # BOM UTF-8 pour Excel
     response = HttpResponse(content, content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = 'attachment; filename="flotte_export_reglementaire.csv"'
@@ -448,26 +525,30 @@ def export_reglementaire(request):
 
 @login_required
 @manager_or_admin_required
+@use_reporting_db
+@query_budget(8)
 def export_charges_import(request):
     """Export CSV : charges d'importation (fret, dédouanement, transitaire, coût total) par véhicule."""
     import csv
     from io import StringIO
-    qs = ChargeImport.objects.select_related('vehicule').order_by('vehicule__numero_chassis', '-id')
-    buffer = StringIO()
-    writer = csv.writer(buffer, delimiter=';')
-    writer.writerow([
-        'Châssis', 'Fret (FCFA)', 'Dédouanement (FCFA)', 'Transitaire (FCFA)',
-        'Coût total (FCFA)', 'Remarque',
-    ])
-    for c in qs:
+    with EXPORT_DURATION.time(export='charges_import'):
+        qs = ChargeImport.objects.select_related('vehicule').order_by('vehicule__numero_chassis', '-id')
+        buffer = StringIO()
+        writer = csv.writer(buffer, delimiter=';')
         writer.writerow([
-            c.vehicule.numero_chassis if c.vehicule else '',
-            c.fret or '',
-            c.frais_dedouanement or '',
-            c.frais_transitaire or '',
-            c.cout_total or '',
-            (c.remarque or '')[:200],
+            'Châssis', 'Fret (FCFA)', 'Dédouanement (FCFA)', 'Transitaire (FCFA)',
+            'Coût total (FCFA)', 'Remarque',
         ])
+        for c in qs:
+            writer.writerow([
+                c.vehicule.numero_chassis if c.vehicule else '',
+                c.fret or '',
+                c.frais_dedouanement or '',
+                c.frais_transitaire or '',
+                c.cout_total or '',
+                (c.remarque or '')[:200],
+            ])
+        EXPORT_ROWS.inc(len(qs), export='charges_import')
     content = '\ufeff' + buffer.getvalue()
     response = HttpResponse(content, content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = 'attachment; filename="flotte_charges_import.csv"'
@@ -476,33 +557,37 @@ def export_charges_import(request):
 
 @login_required
 @manager_or_admin_required
+@use_reporting_db
+@query_budget(9)
 def export_locations(request):
     """Export CSV : locations avec coût total (loyer + frais annexes + contraventions)."""
     import csv
     from io import StringIO
-    qs = Location.objects.select_related('vehicule__marque', 'vehicule__modele').prefetch_related(
-        'contraventions'
-    ).order_by('-date_debut')
-    buffer = StringIO()
-    writer = csv.writer(buffer, delimiter=';')
-    writer.writerow([
-        'Véhicule', 'Châssis', 'Locataire', 'Type', 'Date début', 'Date fin',
-        'Loyer (FCFA)', 'Frais annexes (FCFA)', 'Coût total (FCFA)', 'Statut',
-    ])
-    for loc in qs:
-        total = loc.cout_total_location
+    with EXPORT_DURATION.time(export='locations'):
+        qs = Location.objects.select_related('vehicule__marque', 'vehicule__modele').prefetch_related(
+            'contraventions'
+        ).order_by('-date_debut')
+        buffer = StringIO()
+        writer = csv.writer(buffer, delimiter=';')
         writer.writerow([
-            loc.vehicule.libelle_court if loc.vehicule else '',
-            loc.vehicule.numero_chassis if loc.vehicule else '',
-            loc.locataire or '',
-            loc.type_location or '',
-            str(loc.date_debut) if loc.date_debut else '',
-            str(loc.date_fin) if loc.date_fin else '',
-            loc.loyer_mensuel or '',
-            loc.frais_annexes or '',
-            total if total is not None else '',
-            loc.get_statut_display() if loc.statut else loc.statut or '',
+            'Véhicule', 'Châssis', 'Locataire', 'Type', 'Date début', 'Date fin',
+            'Loyer (FCFA)', 'Frais annexes (FCFA)', 'Coût total (FCFA)', 'Statut',
         ])
+        for loc in qs:
+            total = loc.cout_total_location
+            writer.writerow([
+                loc.vehicule.libelle_court if loc.vehicule else '',
+                loc.vehicule.numero_chassis if loc.vehicule else '',
+                loc.locataire or '',
+                loc.type_location or '',
+                str(loc.date_debut) if loc.date_debut else '',
+                str(loc.date_fin) if loc.date_fin else '',
+                loc.loyer_mensuel or '',
+                loc.frais_annexes or '',
+                total if total is not None else '',
+                loc.get_statut_display() if loc.statut else loc.statut or '',
+            ])
+        EXPORT_ROWS.inc(len(qs), export='locations')
     content = '\ufeff' + buffer.getvalue()
     response = HttpResponse(content, content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = 'attachment; filename="flotte_locations.csv"'
@@ -511,6 +596,7 @@ def export_locations(request):
 
 # ——— Recherche globale ———
 @login_required
+@query_budget(7)
 def recherche(request):
     """Recherche globale : véhicules, locations, ventes, conducteurs, factures (selon ce qu'on tape)."""
     q = (request.GET.get('q') or '').strip()
@@ -581,12 +667,18 @@ def recherche(request):
 
 @login_required
 @require_GET
-def recherche_api(request):
-    """API JSON pour la recherche en direct : renvoie véhicules, locations, ventes, conducteurs, factures (labels + URLs)."""
+@query_budget(7)
+async def recherche_api(request):
+    """
+    API JSON pour la recherche en direct : renvoie véhicules, locations, ventes, conducteurs, factures (labels + URLs).
+    Vue async (appelée à chaque frappe) : ORM async, pas de thread par requête sous ASGI.
+    """
     q = (request.GET.get('q') or '').strip()
     out = {'vehicules': [], 'locations': [], 'ventes': [], 'conducteurs': [], 'factures': []}
     if not q:
         return JsonResponse(out)
+    user = await request.auser()
+    manager = await ais_manager_or_admin(request)
 
     # Véhicules
     vehicules_qs = Vehicule.objects.filter(
@@ -596,23 +688,23 @@ def recherche_api(request):
         Q(modele__nom__icontains=q) |
         Q(origine_pays__icontains=q)
     ).select_related('marque', 'modele')
-    if not is_manager_or_admin(request):
-        vehicules_qs = vehicules_qs.filter(proprietaire=request.user)
-    for v in vehicules_qs.order_by('-date_entree_parc')[:15]:
+    if not manager:
+        vehicules_qs = vehicules_qs.filter(proprietaire=user)
+    async for v in vehicules_qs.order_by('-date_entree_parc')[:15].aiterator():
         out['vehicules'].append({
             'id': v.pk,
             'label': '{} — {}'.format(v.libelle_court, v.numero_chassis) + (' · ' + v.numero_immatriculation if v.numero_immatriculation else ''),
             'url': reverse('flotte:vehicule_detail', args=[v.pk]),
         })
 
-    if is_manager_or_admin(request):
-        for loc in Location.objects.filter(
+    if manager:
+        async for loc in Location.objects.filter(
             Q(locataire__icontains=q) |
             Q(type_location__icontains=q) |
             Q(vehicule__numero_chassis__icontains=q) |
             Q(vehicule__marque__nom__icontains=q) |
             Q(vehicule__modele__nom__icontains=q)
-        ).select_related('vehicule__marque', 'vehicule__modele').order_by('-date_debut')[:15]:
+        ).select_related('vehicule__marque', 'vehicule__modele').order_by('-date_debut')[:15].aiterator():
             out['locations'].append({
                 'id': loc.pk,
                 'label': '{} — {} · {}'.format(loc.locataire, loc.vehicule.libelle_court if loc.vehicule else loc.vehicule_id, loc.type_location),
@@ -620,14 +712,14 @@ def recherche_api(request):
             })
 
     ventes_qs = Vente.objects.select_related('vehicule__marque', 'vehicule__modele').order_by('-date_vente')
-    if not is_manager_or_admin(request):
-        ventes_qs = ventes_qs.filter(acquereur_compte=request.user)
-    for v in ventes_qs.filter(
+    if not manager:
+        ventes_qs = ventes_qs.filter(acquereur_compte=user)
+    async for v in ventes_qs.filter(
         Q(acquereur__icontains=q) |
         Q(vehicule__numero_chassis__icontains=q) |
         Q(vehicule__marque__nom__icontains=q) |
         Q(vehicule__modele__nom__icontains=q)
-    )[:15]:
+    )[:15].aiterator():
         out['ventes'].append({
             'id': v.pk,
             'label': '{} — {} · {}'.format(v.vehicule.libelle_court if v.vehicule else '', v.acquereur or '—', v.date_vente),
@@ -637,23 +729,23 @@ def recherche_api(request):
     cond_search_qs = Conducteur.objects.filter(
         Q(nom__icontains=q) | Q(prenom__icontains=q) | Q(email__icontains=q) | Q(telephone__icontains=q)
     )
-    if not is_manager_or_admin(request):
-        cond_search_qs = cond_search_qs.filter(user=request.user)
-    for c in cond_search_qs.order_by('nom', 'prenom')[:15]:
+    if not manager:
+        cond_search_qs = cond_search_qs.filter(user=user)
+    async for c in cond_search_qs.order_by('nom', 'prenom')[:15].aiterator():
         out['conducteurs'].append({
             'id': c.pk,
             'label': '{} {}'.format(c.nom, c.prenom) + (' · ' + (c.email or c.telephone or '') if (c.email or c.telephone) else ''),
             'url': reverse('flotte:conducteur_update', args=[c.pk]),
         })
 
-    if is_manager_or_admin(request):
-        for f in Facture.objects.filter(
+    if manager:
+        async for f in Facture.objects.filter(
             Q(numero__icontains=q) |
             Q(fournisseur__icontains=q) |
             Q(vehicule__numero_chassis__icontains=q) |
             Q(vehicule__marque__nom__icontains=q) |
             Q(vehicule__modele__nom__icontains=q)
-        ).select_related('vehicule__marque', 'vehicule__modele').order_by('-date_facture')[:15]:
+        ).select_related('vehicule__marque', 'vehicule__modele').order_by('-date_facture')[:15].aiterator():
             out['factures'].append({
                 'id': f.pk,
                 'label': '{} — {} · {}'.format(f.vehicule.libelle_court if f.vehicule else '', f.numero, f.fournisseur or ''),
@@ -665,6 +757,7 @@ def recherche_api(request):
 
 # ——— Parc / Véhicules ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(14)
 class ParcListView(ListView):
     """Liste des véhicules (châssis = identifiant principal)."""
     model = Vehicule
@@ -698,18 +791,14 @@ class ParcListView(ListView):
         qs = Vehicule.objects.all()
         if not is_manager_or_admin(self.request):
             qs = qs.filter(proprietaire=self.request.user)
-        context['total'] = qs.count()
-        context['parc_count'] = qs.filter(statut='parc').count()
-        context['import_count'] = qs.filter(statut='import').count()
-        context['vendu_count'] = qs.filter(statut='vendu').count()
-        context['by_marque'] = list(
-            qs.values('marque__nom').annotate(n=Count('id')).order_by('-n')
-        )
+        # Tuiles calculées à la demande (fragment en cache : aucune requête)
+        context['tuiles'] = SimpleLazyObject(lambda: compteurs_parc(qs))
         context.update(get_sidebar_context(self.request))
         return context
 
 
 @login_required
+@query_budget(25)
 def vehicule_detail(request, pk):
     """Fiche véhicule (détail) — démarches, dépenses, documents, réparations, locations, vente, coûts."""
     qs = Vehicule.objects.select_related(
@@ -747,6 +836,7 @@ def vehicule_detail(request, pk):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(31)
 class VehiculeCreateView(ManagerRequiredMixin, CreateView):
     """Nouveau véhicule — châssis obligatoire."""
     model = Vehicule
@@ -766,6 +856,7 @@ class VehiculeCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(16)
 class VehiculeUpdateView(ManagerRequiredMixin, UpdateView):
     """Modifier un véhicule."""
     model = Vehicule
@@ -787,6 +878,7 @@ class VehiculeUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Location ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class LocationListView(ManagerRequiredMixin, ListView):
     """Liste des locations (avec CT, assurance, km vidange)."""
     model = Location
@@ -814,6 +906,7 @@ class LocationListView(ManagerRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class LocationCreateView(ManagerRequiredMixin, CreateView):
     """Nouvelle location."""
     model = Location
@@ -833,6 +926,7 @@ class LocationCreateView(ManagerRequiredMixin, CreateView):
 
 
 @manager_or_admin_required
+@query_budget(11)
 def location_detail(request, pk):
     """Fiche location (avec contraventions et coût total)."""
     loc = get_object_or_404(
@@ -849,6 +943,7 @@ def location_detail(request, pk):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class LocationUpdateView(ManagerRequiredMixin, UpdateView):
     """Modifier une location."""
     model = Location
@@ -870,6 +965,7 @@ class LocationUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Documents véhicule (CRUD depuis l'app) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(13)
 class DocumentVehiculeCreateView(ManagerRequiredMixin, CreateView):
     model = DocumentVehicule
     form_class = DocumentVehiculeForm
@@ -896,6 +992,7 @@ class DocumentVehiculeCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(13)
 class DocumentVehiculeUpdateView(ManagerRequiredMixin, UpdateView):
     model = DocumentVehicule
     form_class = DocumentVehiculeForm
@@ -919,6 +1016,7 @@ class DocumentVehiculeUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Photos véhicule (CRUD) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class PhotoVehiculeCreateView(ManagerRequiredMixin, CreateView):
     """Ajouter une photo à un véhicule."""
     model = PhotoVehicule
@@ -949,6 +1047,7 @@ class PhotoVehiculeCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class PhotoVehiculeUpdateView(ManagerRequiredMixin, UpdateView):
     """Modifier une photo de véhicule."""
     model = PhotoVehicule
@@ -975,6 +1074,7 @@ class PhotoVehiculeUpdateView(ManagerRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class PhotoVehiculeDeleteView(ManagerRequiredMixin, DeleteView):
     """Supprimer une photo de véhicule."""
     model = PhotoVehicule
@@ -997,6 +1097,7 @@ class PhotoVehiculeDeleteView(ManagerRequiredMixin, DeleteView):
 
 # ——— Réparations (CRUD depuis l'app) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class ReparationCreateView(ManagerRequiredMixin, CreateView):
     model = Reparation
     form_class = ReparationForm
@@ -1020,6 +1121,7 @@ class ReparationCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class ReparationUpdateView(ManagerRequiredMixin, UpdateView):
     model = Reparation
     form_class = ReparationForm
@@ -1043,6 +1145,7 @@ class ReparationUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Dépenses (CRUD depuis l'app) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class DepenseCreateView(ManagerRequiredMixin, CreateView):
     model = Depense
     form_class = DepenseForm
@@ -1066,6 +1169,7 @@ class DepenseCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class DepenseUpdateView(ManagerRequiredMixin, UpdateView):
     model = Depense
     form_class = DepenseForm
@@ -1089,16 +1193,15 @@ class DepenseUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Factures (CRUD depuis l'app) ———
 def get_next_numero_facture():
-    """Génère le prochain numéro de facture au format FAC-AAAA-NNNNN (ex. FAC-2026-00001)."""
-    year = timezone.now().year
-    prefix = f'FAC-{year}-'
-    # Nombre de factures existantes avec ce préfixe (numéro auto ou manuel commençant par FAC-AAAA-)
-    count = Facture.objects.filter(numero__startswith=prefix).count()
-    next_n = count + 1
-    return f'{prefix}{next_n:05d}'
+    """
+    Génère le prochain numéro de facture au format FAC-AAAA-NNNNN (ex. FAC-2026-00001) : au-delà du
+    plus grand numéro existant et des blocs réservés par la facturation des locations.
+    """
+    return prochain_numero(prefixe_facture(timezone.localdate()))
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(19)
 class FactureCreateView(ManagerRequiredMixin, CreateView):
     model = Facture
     form_class = FactureForm
@@ -1137,6 +1240,7 @@ class FactureCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class FactureUpdateView(ManagerRequiredMixin, UpdateView):
     model = Facture
     form_class = FactureForm
@@ -1160,6 +1264,7 @@ class FactureUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Pénalités facture (CRUD) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class PenaliteFactureCreateView(ManagerRequiredMixin, CreateView):
     """Ajouter une pénalité à une facture."""
     model = PenaliteFacture
@@ -1186,6 +1291,7 @@ class PenaliteFactureCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class PenaliteFactureUpdateView(ManagerRequiredMixin, UpdateView):
     """Modifier une pénalité de facture."""
     model = PenaliteFacture
@@ -1210,6 +1316,7 @@ class PenaliteFactureUpdateView(ManagerRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class PenaliteFactureDeleteView(ManagerRequiredMixin, DeleteView):
     """Supprimer une pénalité de facture."""
     model = PenaliteFacture
@@ -1233,6 +1340,7 @@ class PenaliteFactureDeleteView(ManagerRequiredMixin, DeleteView):
 
 # ——— Démarches import (CRUD depuis l'app) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class ImportDemarcheCreateView(ManagerRequiredMixin, CreateView):
     model = ImportDemarche
     form_class = ImportDemarcheForm
@@ -1256,6 +1364,7 @@ class ImportDemarcheCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class ImportDemarcheUpdateView(ManagerRequiredMixin, UpdateView):
     model = ImportDemarche
     form_class = ImportDemarcheForm
@@ -1279,6 +1388,7 @@ class ImportDemarcheUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Charges d'importation (par véhicule) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class ChargeImportCreateView(ManagerRequiredMixin, CreateView):
     model = ChargeImport
     form_class = ChargeImportForm
@@ -1302,6 +1412,7 @@ class ChargeImportCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class ChargeImportUpdateView(ManagerRequiredMixin, UpdateView):
     model = ChargeImport
     form_class = ChargeImportForm
@@ -1325,6 +1436,7 @@ class ChargeImportUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Pièces importées ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class PartieImporteeListView(ManagerRequiredMixin, ListView):
     model = PartieImportee
     template_name = 'flotte/parties_importees_list.html'
@@ -1332,7 +1444,7 @@ class PartieImporteeListView(ManagerRequiredMixin, ListView):
     paginate_by = 30
 
     def get_queryset(self):
-        qs = PartieImportee.objects.select_related('vehicule').order_by('-id')
+        qs = PartieImportee.objects.select_related('vehicule__marque', 'vehicule__modele').order_by('-id')
         vehicule_id = self.request.GET.get('vehicule')
         if vehicule_id:
             qs = qs.filter(vehicule_id=vehicule_id)
@@ -1340,12 +1452,13 @@ class PartieImporteeListView(ManagerRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['vehicules'] = Vehicule.objects.all().order_by('marque__nom', 'modele__nom')[:200]
+        context['vehicules'] = Vehicule.objects.select_related('marque', 'modele').order_by('marque__nom', 'modele__nom')[:200]
         context.update(get_sidebar_context(self.request))
         return context
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class PartieImporteeCreateView(ManagerRequiredMixin, CreateView):
     model = PartieImportee
     form_class = PartieImporteeForm
@@ -1378,6 +1491,7 @@ class PartieImporteeCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class PartieImporteeUpdateView(ManagerRequiredMixin, UpdateView):
     model = PartieImportee
     form_class = PartieImporteeForm
@@ -1404,6 +1518,7 @@ class PartieImporteeUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Contraventions (par location) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class ContraventionCreateView(ManagerRequiredMixin, CreateView):
     model = Contravention
     form_class = ContraventionForm
@@ -1427,6 +1542,7 @@ class ContraventionCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class ContraventionUpdateView(ManagerRequiredMixin, UpdateView):
     model = Contravention
     form_class = ContraventionForm
@@ -1450,6 +1566,7 @@ class ContraventionUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Ventes (CRUD depuis l'app) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class VenteCreateView(ManagerRequiredMixin, CreateView):
     model = Vente
     form_class = VenteForm
@@ -1485,6 +1602,7 @@ class VenteCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(12)
 class VenteUpdateView(ManagerRequiredMixin, UpdateView):
     model = Vente
     form_class = VenteForm
@@ -1517,6 +1635,7 @@ class VenteUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Import (réservé manager / admin) ———
 @manager_or_admin_required
+@query_budget(9)
 def import_list(request):
     """Véhicules en import & démarches."""
     vehicules = Vehicule.objects.filter(statut='import').select_related(
@@ -1531,9 +1650,10 @@ def import_list(request):
 
 # ——— Réparations, Documents, Ventes, CA, Maintenance, Carburant, Conducteurs, Contraventions ———
 @login_required
+@query_budget(8)
 def reparations_list(request):
     """Liste des réparations."""
-    reps_qs = Reparation.objects.select_related('vehicule')
+    reps_qs = Reparation.objects.select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         reps_qs = reps_qs.filter(vehicule__proprietaire=request.user)
     reps = reps_qs.order_by('-date_reparation', '-id')[:200]
@@ -1542,6 +1662,7 @@ def reparations_list(request):
 
 
 @manager_or_admin_required
+@query_budget(8)
 def contraventions_list(request):
     """Liste de toutes les contraventions (véhicules loués)."""
     contraventions = Contravention.objects.select_related(
@@ -1557,9 +1678,12 @@ def contraventions_list(request):
 
 
 @login_required
+@query_budget(9)
 def documents_list(request):
     """Documents par véhicule."""
-    vehicules_qs = Vehicule.objects.prefetch_related('documents')
+    vehicules_qs = Vehicule.objects.select_related('marque', 'modele').prefetch_related(
+        Prefetch('documents', queryset=DocumentVehicule.objects.select_related('type_document_fk'))
+    )
     if not is_manager_or_admin(request):
         vehicules_qs = vehicules_qs.filter(proprietaire=request.user)
     vehicules = vehicules_qs.order_by('marque__nom', 'modele__nom')[:100]
@@ -1568,12 +1692,15 @@ def documents_list(request):
 
 
 @login_required
+@query_budget(8)
 def ventes_list(request):
     """Liste des ventes. Manager/Admin : toutes. Utilisateur (client) : uniquement ses ventes (acquereur_compte)."""
     from .mixins import is_manager_or_admin
     context_base = get_sidebar_context(request)
     try:
-        qs = Vente.objects.select_related('vehicule', 'acquereur_compte').order_by('-date_vente')
+        qs = Vente.objects.select_related(
+            'vehicule__marque', 'vehicule__modele', 'acquereur_compte'
+        ).order_by('-date_vente')
         if not is_manager_or_admin(request):
             qs = qs.filter(acquereur_compte=request.user)
         ventes = list(qs[:100])
@@ -1590,28 +1717,13 @@ def ventes_list(request):
 
 def _ca_evolution_queryset(granularite, annee, mois=None):
     """Retourne les valeurs annotées (date/mois/année, total) pour l'évolution du CA.
-    Utilisé par l'API ca_api_evolution pour les graphiques."""
-    qs = Vente.objects.exclude(prix_vente__isnull=True).exclude(prix_vente=0)
-    if annee:
-        qs = qs.filter(date_vente__year=annee)
-    if mois is not None:
-        qs = qs.filter(date_vente__month=mois)
-    if granularite == 'jour':
-        qs = qs.annotate(periode=TruncDate('date_vente')).values('periode').annotate(
-            total=Sum('prix_vente'), nb=Count('id')
-        ).order_by('periode')
-    elif granularite == 'mois':
-        qs = qs.annotate(periode=TruncMonth('date_vente')).values('periode').annotate(
-            total=Sum('prix_vente'), nb=Count('id')
-        ).order_by('periode')
-    else:  # annee
-        qs = qs.annotate(periode=TruncYear('date_vente')).values('periode').annotate(
-            total=Sum('prix_vente'), nb=Count('id')
-        ).order_by('periode')
-    return qs
+    Utilisé par l'API ca_api_evolution pour les graphiques (lu depuis les agrégats VenteRollup)."""
+    return evolution_ca(granularite, annee, mois)
 
 
 @login_required
+@conditional_json(VenteRollup)
+@query_budget(8)
 def ca_api_evolution(request):
     """API JSON : évolution du CA par jour / mois / année pour les graphiques.
     Accessible à tout utilisateur connecté (cohérent avec la page CA)."""
@@ -1645,42 +1757,34 @@ def ca_api_evolution(request):
 
 
 @manager_or_admin_required
+@use_reporting_db
+@query_budget(11)
 def ca_view(request):
     """Chiffre d'affaires : KPIs sur toutes les ventes avec prix (cohérent avec graphiques)."""
     now = timezone.now()
-    # Même base que les graphiques : ventes avec prix renseigné et > 0
-    qs_ventes_ca = Vente.objects.exclude(prix_vente__isnull=True).exclude(prix_vente=0)
-    agg = qs_ventes_ca.aggregate(
-        total_ca=Sum('prix_vente'),
-        nb_ventes=Count('id'),
-        moyenne_vente=Avg('prix_vente'),
-    )
+    # Même base que les graphiques : ventes avec prix renseigné et > 0 (agrégats VenteRollup)
+    agg = synthese_ca()
     annees = list(range(now.year - 2, now.year + 3))
     # Année par défaut : dernière année ayant au moins une vente, sinon année courante
-    derniere_annee_avec_vente = (
-        Vente.objects.exclude(date_vente__isnull=True)
-        .values_list('date_vente__year', flat=True)
-        .order_by('-date_vente__year')
-        .first()
-    )
-    annee_defaut = derniere_annee_avec_vente if derniere_annee_avec_vente else now.year
+    dernier_jour = VenteRollup.objects.aggregate(dernier=Max('jour'))['dernier']
+    annee_defaut = dernier_jour.year if dernier_jour else now.year
     if annee_defaut not in annees:
         annees = sorted(set(annees) | {annee_defaut})
 
     # CA par année (année par défaut vs année précédente) pour indicateur de tendance
-    from decimal import Decimal as _Decimal
-    ca_annee = qs_ventes_ca.filter(date_vente__year=annee_defaut).aggregate(
-        total=Sum('prix_vente')
-    )['total'] or _Decimal('0')
-    ca_annee_prec = qs_ventes_ca.filter(date_vente__year=annee_defaut - 1).aggregate(
-        total=Sum('prix_vente')
-    )['total'] or _Decimal('0')
+    ca_par_annee = VenteRollup.objects.aggregate(
+        ca_annee=Sum('total_ca', filter=Q(jour__year=annee_defaut)),
+        ca_annee_prec=Sum('total_ca', filter=Q(jour__year=annee_defaut - 1)),
+    )
+    ca_annee = ca_par_annee['ca_annee'] or Decimal('0')
+    ca_annee_prec = ca_par_annee['ca_annee_prec'] or Decimal('0')
     diff_abs = ca_annee - ca_annee_prec
-    diff_pct = _Decimal('0')
+    diff_pct = Decimal('0')
     if ca_annee_prec:
-        diff_pct = (diff_abs / ca_annee_prec) * _Decimal('100')
+        diff_pct = (diff_abs / ca_annee_prec) * Decimal('100')
 
-    # Top 5 véhicules par CA (toutes périodes)
+    # Top 5 véhicules par CA (toutes périodes) : granularité véhicule, lue sur Vente
+    qs_ventes_ca = Vente.objects.filter(FILTRE_CA)
     top_vehicules = list(
         qs_ventes_ca.values(
             'vehicule_id',
@@ -1694,7 +1798,7 @@ def ca_view(request):
 
     context = {
         'total_ca': agg['total_ca'] or Decimal('0'),
-        'nb_ventes': agg['nb_ventes'] or 0,
+        'nb_ventes': agg['nb_ventes'],
         'moyenne_vente': agg['moyenne_vente'] or Decimal('0'),
         'annee_courante': annee_defaut,
         'mois_courant': now.month,
@@ -1710,6 +1814,7 @@ def ca_view(request):
 
 
 @login_required
+@query_budget(7)
 def ca_check_code(request):
     """API JSON : vérifie le code d'affichage des montants de CA pour l'utilisateur courant."""
     if request.method != 'POST':
@@ -1733,6 +1838,7 @@ def ca_check_code(request):
 
 
 @manager_or_admin_required
+@query_budget(8)
 def parametrage_ca_code(request):
     """Page de réglage du code d'affichage des montants CA pour l'utilisateur courant."""
     profil = getattr(request.user, 'profil_flotte', None)
@@ -1762,6 +1868,7 @@ def parametrage_ca_code(request):
 
 
 @manager_or_admin_required
+@query_budget(8)
 def rapport_download(request, pk):
     """Téléchargement d'un rapport journalier (PDF)."""
     rapport = get_object_or_404(RapportJournalier, pk=pk)
@@ -1778,9 +1885,10 @@ def rapport_download(request, pk):
 
 
 @login_required
+@query_budget(8)
 def maintenance_list(request):
     """Liste des maintenances préventives (à faire / en cours en haut, effectuées en bas)."""
-    qs = Maintenance.objects.select_related('vehicule').annotate(
+    qs = Maintenance.objects.select_related('vehicule__marque', 'vehicule__modele').annotate(
         statut_order=Case(
             When(statut='a_faire', then=Value(0)),
             When(statut='en_cours', then=Value(1)),
@@ -1801,9 +1909,10 @@ def maintenance_list(request):
 
 
 @login_required
+@query_budget(8)
 def carburant_list(request):
     """Liste des relevés carburant."""
-    releves_qs = ReleveCarburant.objects.select_related('vehicule')
+    releves_qs = ReleveCarburant.objects.select_related('vehicule__marque', 'vehicule__modele')
     if not is_manager_or_admin(request):
         releves_qs = releves_qs.filter(vehicule__proprietaire=request.user)
     releves = releves_qs.order_by('-date_releve', '-id')[:200]
@@ -1815,6 +1924,7 @@ def carburant_list(request):
 
 
 @login_required
+@query_budget(8)
 def conducteurs_list(request):
     """Liste des conducteurs."""
     conducteurs_qs = Conducteur.objects.all()
@@ -1830,6 +1940,7 @@ def conducteurs_list(request):
 
 # ——— Maintenance (CRUD) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class MaintenanceCreateView(ManagerRequiredMixin, CreateView):
     model = Maintenance
     form_class = MaintenanceForm
@@ -1846,6 +1957,7 @@ class MaintenanceCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(11)
 class MaintenanceUpdateView(ManagerRequiredMixin, UpdateView):
     model = Maintenance
     form_class = MaintenanceForm
@@ -1864,6 +1976,7 @@ class MaintenanceUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Relevés carburant (CRUD) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class ReleveCarburantCreateView(ManagerRequiredMixin, CreateView):
     model = ReleveCarburant
     form_class = ReleveCarburantForm
@@ -1880,6 +1993,7 @@ class ReleveCarburantCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class ReleveCarburantUpdateView(ManagerRequiredMixin, UpdateView):
     model = ReleveCarburant
     form_class = ReleveCarburantForm
@@ -1898,6 +2012,7 @@ class ReleveCarburantUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Conducteurs (CRUD) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class ConducteurCreateView(ManagerRequiredMixin, CreateView):
     model = Conducteur
     form_class = ConducteurForm
@@ -1914,6 +2029,7 @@ class ConducteurCreateView(ManagerRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ConducteurUpdateView(ManagerRequiredMixin, UpdateView):
     model = Conducteur
     form_class = ConducteurForm
@@ -1932,6 +2048,7 @@ class ConducteurUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Rapports journaliers (modifier / supprimer) ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class RapportJournalierUpdateView(ManagerRequiredMixin, UpdateView):
     model = RapportJournalier
     form_class = RapportJournalierForm
@@ -1950,6 +2067,7 @@ class RapportJournalierUpdateView(ManagerRequiredMixin, UpdateView):
 
 # ——— Paramétrage (Admin) ———
 @login_required
+@query_budget(7)
 def parametrage_index(request):
     """Page d'accueil Paramétrage : 5 volets (véhicules, caractéristiques, marques/modèles, utilisateurs, financier)."""
     if not is_admin(request):
@@ -1960,6 +2078,8 @@ def parametrage_index(request):
 
 
 @login_required
+@use_reporting_db
+@query_budget(8)
 def audit_list(request):
     """Consultation et export du journal d'audit (réservé admin). Filtres : date, utilisateur, modèle."""
     if not is_admin(request):
@@ -2011,6 +2131,7 @@ def audit_list(request):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class ParametrageMarqueListView(AdminRequiredMixin, ListView):
     model = Marque
     template_name = 'flotte/parametrage_marques.html'
@@ -2027,6 +2148,7 @@ class ParametrageMarqueListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class MarqueCreateView(AdminRequiredMixin, CreateView):
     model = Marque
     form_class = MarqueForm
@@ -2042,6 +2164,7 @@ class MarqueCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class MarqueUpdateView(AdminRequiredMixin, UpdateView):
     model = Marque
     form_class = MarqueForm
@@ -2058,6 +2181,7 @@ class MarqueUpdateView(AdminRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(10)
 class ParametrageModeleListView(AdminRequiredMixin, ListView):
     model = Modele
     template_name = 'flotte/parametrage_modeles.html'
@@ -2082,6 +2206,7 @@ class ParametrageModeleListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ModeleCreateView(AdminRequiredMixin, CreateView):
     model = Modele
     form_class = ModeleForm
@@ -2097,6 +2222,7 @@ class ModeleCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class ModeleUpdateView(AdminRequiredMixin, UpdateView):
     model = Modele
     form_class = ModeleForm
@@ -2113,6 +2239,7 @@ class ModeleUpdateView(AdminRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ParametrageCarburantListView(AdminRequiredMixin, ListView):
     model = TypeCarburant
     template_name = 'flotte/parametrage_carburant.html'
@@ -2125,6 +2252,7 @@ class ParametrageCarburantListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class TypeCarburantCreateView(AdminRequiredMixin, CreateView):
     model = TypeCarburant
     form_class = TypeCarburantForm
@@ -2140,6 +2268,7 @@ class TypeCarburantCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class TypeCarburantUpdateView(AdminRequiredMixin, UpdateView):
     model = TypeCarburant
     form_class = TypeCarburantForm
@@ -2156,6 +2285,7 @@ class TypeCarburantUpdateView(AdminRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ParametrageTransmissionListView(AdminRequiredMixin, ListView):
     model = TypeTransmission
     template_name = 'flotte/parametrage_transmission.html'
@@ -2168,6 +2298,7 @@ class ParametrageTransmissionListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class TypeTransmissionCreateView(AdminRequiredMixin, CreateView):
     model = TypeTransmission
     form_class = TypeTransmissionForm
@@ -2183,6 +2314,7 @@ class TypeTransmissionCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class TypeTransmissionUpdateView(AdminRequiredMixin, UpdateView):
     model = TypeTransmission
     form_class = TypeTransmissionForm
@@ -2199,6 +2331,7 @@ class TypeTransmissionUpdateView(AdminRequiredMixin, UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ParametrageTypeVehiculeListView(AdminRequiredMixin, ListView):
     model = TypeVehicule
     template_name = 'flotte/parametrage_type_vehicule.html'
@@ -2211,6 +2344,7 @@ class ParametrageTypeVehiculeListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class TypeVehiculeCreateView(AdminRequiredMixin, CreateView):
     model = TypeVehicule
     form_class = TypeVehiculeForm
@@ -2226,6 +2360,7 @@ class TypeVehiculeCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class TypeVehiculeUpdateView(AdminRequiredMixin, UpdateView):
     model = TypeVehicule
     form_class = TypeVehiculeForm
@@ -2243,6 +2378,7 @@ class TypeVehiculeUpdateView(AdminRequiredMixin, UpdateView):
 
 # ——— Paramétrage Types de document ———
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class ParametrageTypeDocumentListView(AdminRequiredMixin, ListView):
     model = TypeDocument
     template_name = 'flotte/parametrage_type_document.html'
@@ -2255,6 +2391,7 @@ class ParametrageTypeDocumentListView(AdminRequiredMixin, ListView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class TypeDocumentCreateView(AdminRequiredMixin, CreateView):
     model = TypeDocument
     form_class = TypeDocumentForm
@@ -2270,6 +2407,7 @@ class TypeDocumentCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(8)
 class TypeDocumentUpdateView(AdminRequiredMixin, UpdateView):
     model = TypeDocument
     form_class = TypeDocumentForm
@@ -2286,6 +2424,7 @@ class TypeDocumentUpdateView(AdminRequiredMixin, UpdateView):
 
 
 @login_required
+@query_budget(9)
 def parametrage_utilisateurs(request):
     """Liste des utilisateurs (admin)."""
     if not is_admin(request):
@@ -2302,6 +2441,7 @@ def parametrage_utilisateurs(request):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(7)
 class UserCreateView(AdminRequiredMixin, CreateView):
     model = User
     form_class = UserCreateForm
@@ -2317,6 +2457,7 @@ class UserCreateView(AdminRequiredMixin, CreateView):
 
 
 @method_decorator(login_required, name='dispatch')
+@query_budget(9)
 class UserUpdateView(AdminRequiredMixin, UpdateView):
     model = User
     form_class = UserUpdateForm
@@ -5,10 +5,10 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Case, Count, IntegerField, Sum, Avg, Value, When
+from django.db.models import Case, IntegerField, Value, When
 from django.utils import timezone
 
-from .models import Marque, Modele, Vehicule, Vente, Location, Conducteur
+from .models import Marque, Modele, Vehicule, Vente, VenteRollup, Location, Conducteur
 from .serializers import (
     MarqueSerializer, ModeleSerializer,
     VehiculeListSerializer, VehiculeDetailSerializer,
@@ -16,22 +16,28 @@ from .serializers import (
     LocationListSerializer, LocationSerializer,
     ConducteurSerializer,
 )
+from .http_cache import ConditionalResponseMixin
 from .permissions import IsManagerOrAdmin
+from .query_budget import query_budget
+from .rollups import synthese_ca
 from .views import _ca_evolution_queryset
 
 
+@query_budget(9)
 class MarqueViewSet(viewsets.ReadOnlyModelViewSet):
     """Marques — liste et détail (lecture seule)."""
     queryset = Marque.objects.all().order_by('nom')
     serializer_class = MarqueSerializer
 
 
+@query_budget(9)
 class ModeleViewSet(viewsets.ReadOnlyModelViewSet):
     """Modèles — liste et détail (lecture seule)."""
     queryset = Modele.objects.select_related('marque').all().order_by('marque__nom', 'nom')
     serializer_class = ModeleSerializer
 
 
+@query_budget(9)
 class VehiculeViewSet(viewsets.ReadOnlyModelViewSet):
     """Véhicules — liste et détail (lecture seule). Query: ?q=, ?statut=parc|import|vendu."""
     queryset = Vehicule.objects.select_related(
@@ -60,10 +66,11 @@ class VehiculeViewSet(viewsets.ReadOnlyModelViewSet):
         return qs
 
 
+@query_budget(9)
 class VenteViewSet(viewsets.ReadOnlyModelViewSet):
     """Ventes — liste et détail (manager/admin, lecture seule)."""
     permission_classes = [IsAuthenticated, IsManagerOrAdmin]
-    queryset = Vente.objects.select_related('vehicule').order_by('-date_vente')
+    queryset = Vente.objects.select_related('vehicule__marque', 'vehicule__modele').order_by('-date_vente')
     serializer_class = VenteListSerializer
 
     def get_serializer_class(self):
@@ -72,10 +79,11 @@ class VenteViewSet(viewsets.ReadOnlyModelViewSet):
         return VenteListSerializer
 
 
+@query_budget(9)
 class LocationViewSet(viewsets.ReadOnlyModelViewSet):
     """Locations — liste et détail (lecture seule). En cours / à venir en haut, terminées en bas."""
     queryset = (
-        Location.objects.select_related('vehicule')
+        Location.objects.select_related('vehicule__marque', 'vehicule__modele')
         .annotate(
             statut_order=Case(
                 When(statut='en_cours', then=Value(0)),
@@ -95,27 +103,26 @@ class LocationViewSet(viewsets.ReadOnlyModelViewSet):
         return LocationListSerializer
 
 
+@query_budget(9)
 class ConducteurViewSet(viewsets.ReadOnlyModelViewSet):
     """Conducteurs — liste et détail (lecture seule)."""
     queryset = Conducteur.objects.all().order_by('nom', 'prenom')
     serializer_class = ConducteurSerializer
 
 
-class CAViewSet(viewsets.ViewSet):
+@query_budget(8)
+class CAViewSet(ConditionalResponseMixin, viewsets.ViewSet):
     """Chiffre d'affaires — synthèse et évolution (manager/admin)."""
     permission_classes = [IsAuthenticated, IsManagerOrAdmin]
+    etag_models = (VenteRollup,)
 
     def list(self, request):
         """GET /api/v1/ca/ — Synthèse CA (total, nb_ventes, moyenne)."""
-        agg = Vente.objects.aggregate(
-            total_ca=Sum('prix_vente'),
-            nb_ventes=Count('id'),
-            moyenne_vente=Avg('prix_vente'),
-        )
+        agg = synthese_ca()
         return Response({
             'total_ca': float(agg['total_ca'] or 0),
-            'nb_ventes': agg['nb_ventes'] or 0,
-            'moyenne_vente': float(agg['moyenne_vente'] or 0),
+            'nb_ventes': agg['nb_ventes_total'],
+            'moyenne_vente': float(agg['moyenne_prix']),
         })
 
     @action(detail=False, methods=['get'], url_path='evolution')
@@ -150,8 +157,10 @@ class CAViewSet(viewsets.ViewSet):
         return Response({'labels': labels, 'data': data, 'nb_ventes': nb_ventes})
 
 
-class DashboardViewSet(viewsets.ViewSet):
+@query_budget(11)
+class DashboardViewSet(ConditionalResponseMixin, viewsets.ViewSet):
     """Tableau de bord — KPIs (lecture seule)."""
+    etag_models = (Vehicule,)
 
     def list(self, request):
         """GET /api/v1/dashboard/ — KPIs (parc, import, vendus, total)."""
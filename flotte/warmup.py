@@ -0,0 +1,111 @@
+"""
+Préchauffage d'un processus FLOTTE au démarrage (profil production, FLOTTE_WARMUP).
+
+Appelé par wsgi.py / asgi.py dans chaque worker, après django.setup(), et par la commande
+`python manage.py warmup` (vérification, mesure des temps). Étapes :
+- gabarits : compilation de tous les gabarits du projet et des applications FLOTTE (remplit le
+  chargeur en cache du processus ; parents {% extends %} et {% include %} compris) ;
+- URL : construction du résolveur ;
+- données de référence : marques, modèles, types (pages SQLite chaudes), types de contenu
+  (cache ContentType) et générations de données dans le cache partagé ;
+- base : connexions fermées en fin de préchauffage. Sous `gunicorn --preload`, wsgi.py est importé
+  par le maître avant le fork : les workers n'héritent ainsi d'aucun socket partagé et ouvrent
+  chacun leur connexion à la première requête.
+
+Un échec n'empêche jamais le démarrage : il est journalisé.
+"""
+import logging
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Applications dont les gabarits (dossier templates/) sont compilés en plus de TEMPLATES['DIRS']
+WARMUP_APPS = ('flotte', 'admin_custom')
+REFERENCE_MODELS = ('Marque', 'Modele', 'TypeCarburant', 'TypeTransmission', 'TypeVehicule', 'TypeDocument')
+
+
+def _template_names():
+    directories = []
+    for engine in settings.TEMPLATES:
+        directories.extend(Path(d) for d in engine.get('DIRS', []))
+    for label in WARMUP_APPS:
+        directories.append(Path(apps.get_app_config(label).path) / 'templates')
+    names = set()
+    for directory in directories:
+        if directory.is_dir():
+            names.update(p.relative_to(directory).as_posix() for p in directory.rglob('*.html'))
+    return sorted(names)
+
+
+def warm_templates():
+    """Compile les gabarits ; retourne (nombre compilé, noms en erreur)."""
+    compiled, errors = 0, []
+    for name in _template_names():
+        try:
+            get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as e:
+            errors.append(name)
+            logger.warning('Préchauffage : gabarit %s non compilé (%s)', name, e)
+        else:
+            compiled += 1
+    return compiled, errors
+
+
+def warm_reference_data():
+    """Charge les données de référence ; retourne le nombre de lignes lues."""
+    from django.contrib.contenttypes.models import ContentType
+    from django.db import connection
+
+    from .http_cache import get_data_version
+
+    connection.ensure_connection()
+    rows = 0
+    for name in REFERENCE_MODELS:
+        rows += len(apps.get_model('flotte', name).objects.all())
+    flotte_models = list(apps.get_app_config('flotte').get_models())
+    ContentType.objects.get_for_models(*flotte_models)
+    get_data_version(*flotte_models)
+    return rows
+
+
+def close_connections():
+    """Ferme les connexions ouvertes par le préchauffage (hors transaction en cours)."""
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+def warm_up():
+    """Exécute toutes les étapes ; retourne {étape: (durée ms, résultat, erreur ou None)}."""
+    report = {}
+    steps = (
+        ('gabarits', warm_templates),
+        ('urls', lambda: len(get_resolver().reverse_dict)),
+        ('donnees_reference', warm_reference_data),
+    )
+    for step, func in steps:
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = func()
+        except Exception as e:  # le préchauffage ne doit jamais bloquer le démarrage
+            logger.exception('Préchauffage : étape %s en échec', step)
+            error = str(e)
+        report[step] = (round((time.perf_counter() - start) * 1000, 1), result, error)
+    close_connections()
+    logger.info('Préchauffage terminé : %s', ', '.join(f'{k} {v[0]} ms' for k, v in report.items()))
+    return report
+
+
+def warm_up_if_enabled():
+    """Point d'entrée wsgi.py / asgi.py : préchauffage si FLOTTE_WARMUP."""
+    if getattr(settings, 'FLOTTE_WARMUP', False):
+        warm_up()
@@ -1,6 +1,21 @@
-"""ASGI config for flotte_project."""
+"""
+ASGI config for flotte_project.
+
+Service recommandé pour l'API JSON (endpoints async) : les middlewares FLOTTE sont compatibles
+async, une requête API n'occupe donc pas de thread pendant ses accès à la base.
+    uvicorn flotte_project.asgi:application --workers 4
+    daphne flotte_project.asgi:application
+Sous ASGI, les connexions persistantes sont désactivées (FLOTTE_ASGI=1 -> CONN_MAX_AGE=0) : les
+connexions ouvertes dans les threads sync_to_async ne sont pas fermées en fin de requête.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flotte_project.settings')
+os.environ['FLOTTE_ASGI'] = '1'
 application = get_asgi_application()
+
+# Profil production : gabarits compilés, connexion ouverte, données de référence chargées (FLOTTE_WARMUP)
+from flotte.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -1,6 +1,9 @@
 """
 Django settings for FLOTTE — Gestion import & parc véhicules.
 Variables d'environnement : DJANGO_SECRET_KEY, DJANGO_DEBUG, ALLOWED_HOSTS.
+Profil : FLOTTE_SETTINGS_PROFILE=development (défaut) ou production (DEBUG désactivé, gabarits
+compilés en cache, connexions persistantes, cache fichier partagé, statiques hachés, journaux
+compressés, préchauffage au démarrage — voir la section « Profil production »).
 Les variables peuvent être définies dans un fichier .env à la racine du projet (chargé automatiquement).
 """
 import os
@@ -17,18 +20,27 @@ if _env_path.exists():
     except ImportError:
         pass
 
+SETTINGS_PROFILE = os.environ.get('FLOTTE_SETTINGS_PROFILE', 'development')
+if SETTINGS_PROFILE not in ('development', 'production'):
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f'FLOTTE_SETTINGS_PROFILE inconnu : {SETTINGS_PROFILE!r} (development | production)')
+PRODUCTION = SETTINGS_PROFILE == 'production'
+
 SECRET_KEY = os.environ.get(
     'DJANGO_SECRET_KEY',
     'django-insecure-flotte-dev-change-in-production'
 )
+if PRODUCTION and SECRET_KEY.startswith('django-insecure-'):
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured('Profil production : définir DJANGO_SECRET_KEY.')
 
-DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
+DEBUG = os.environ.get('DJANGO_DEBUG', '0' if PRODUCTION else '1') == '1'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 INSTALLED_APPS = [
     'admin_custom',  # Admin Django personnalisé (doit être avant django.contrib.admin)
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig',  # admin.py chargés par admin_custom, au premier accès
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -76,6 +88,9 @@ CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',') if
 CORS_ALLOW_CREDENTIALS = True
 
 MIDDLEWARE = [
+    'flotte.profiling.ProfilingMiddleware',  # En tête : mesure aussi les autres middlewares
+    'flotte.query_budget.QueryBudgetMiddleware',  # Budgets @query_budget : compte toute la requête
+    'flotte.metrics.MetricsMiddleware',  # Métriques Prometheus : latence et requêtes SQL par nom d'URL
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS juste après Session
@@ -84,6 +99,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'flotte.signals.AuditMiddleware',
+    'flotte.sessions.SlidingSessionMiddleware',
+    'flotte.reporting_db.ReportingStickinessMiddleware',  # Lecture de ses écritures (vues @use_reporting_db)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -107,14 +124,60 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'flotte_project.wsgi.application'
+# Service ASGI (uvicorn, daphne) : endpoints API async, middlewares FLOTTE sans thread par requête
+ASGI_APPLICATION = 'flotte_project.asgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # BEGIN IMMEDIATE : une transaction qui lit puis écrit attend le verrou (busy_timeout)
+            # au lieu d'échouer en « database is locked » lors de la montée en écriture
+            'transaction_mode': os.environ.get('FLOTTE_SQLITE_TRANSACTION_MODE', 'IMMEDIATE') or None,
+        },
     }
 }
 
+# Pragmas appliqués à chaque connexion SQLite (flotte.sqlite, connection_created) ; None = défaut SQLite.
+# Maintenance : python manage.py sqlite_maintenance (à planifier)
+FLOTTE_SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('FLOTTE_SQLITE_JOURNAL_MODE', 'wal'),
+    'synchronous': os.environ.get('FLOTTE_SQLITE_SYNCHRONOUS', 'normal'),
+    'busy_timeout': int(os.environ.get('FLOTTE_SQLITE_BUSY_TIMEOUT', '5000')),  # ms
+    'mmap_size': int(os.environ.get('FLOTTE_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),  # octets
+    'cache_size': int(os.environ.get('FLOTTE_SQLITE_CACHE_SIZE', '-20000')),  # négatif = Kio
+    'temp_store': 'memory',
+}
+
+# ——— Base de lecture des rapports (flotte.reporting_db, @use_reporting_db) ———
+# Alias 'reporting' : réplica (FLOTTE_REPORTING_DB_HOST) ou instantané SQLite (FLOTTE_REPORTING_SNAPSHOT_PATH,
+# rafraîchi par python manage.py refresh_reporting_snapshot) ; sinon les rapports lisent la base principale.
+FLOTTE_REPORTING_SNAPSHOT_PATH = os.environ.get('FLOTTE_REPORTING_SNAPSHOT_PATH', '')
+if os.environ.get('FLOTTE_REPORTING_DB_HOST'):
+    DATABASES['reporting'] = {
+        'ENGINE': os.environ.get('FLOTTE_REPORTING_DB_ENGINE', 'django.db.backends.postgresql'),
+        'HOST': os.environ['FLOTTE_REPORTING_DB_HOST'],
+        'PORT': os.environ.get('FLOTTE_REPORTING_DB_PORT', ''),
+        'NAME': os.environ.get('FLOTTE_REPORTING_DB_NAME', 'flotte'),
+        'USER': os.environ.get('FLOTTE_REPORTING_DB_USER', ''),
+        'PASSWORD': os.environ.get('FLOTTE_REPORTING_DB_PASSWORD', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif FLOTTE_REPORTING_SNAPSHOT_PATH:
+    DATABASES['reporting'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        # Lecture seule, sans verrou : le fichier n'est jamais modifié, seulement remplacé
+        'NAME': f'file:{FLOTTE_REPORTING_SNAPSHOT_PATH}?mode=ro&immutable=1',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['flotte.reporting_db.ReportingRouter']
+FLOTTE_REPORTING_APPS = ('flotte',)
+# Après une écriture, l'utilisateur lit la base principale pendant ce délai (secondes) : couvrir le
+# retard du réplica ou l'intervalle de rafraîchissement de l'instantané
+FLOTTE_REPORTING_STICKY_SECONDS = int(os.environ.get('FLOTTE_REPORTING_STICKY_SECONDS', '300'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -141,16 +204,53 @@ LOGIN_REDIRECT_URL = 'flotte:dashboard'
 LOGOUT_REDIRECT_URL = 'flotte:login'
 
 # ——— Sessions (normes sécurité) ———
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# cached_db : lecture depuis le cache, écriture en base seulement si la session change.
+# Alternative sans stockage serveur : django.contrib.sessions.backends.signed_cookies
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
 SESSION_COOKIE_HTTPONLY = True
-SESSION_SAVE_EVERY_REQUEST = True
+# Expiration glissante gérée par flotte.sessions.SlidingSessionMiddleware (pas d'écriture à chaque requête)
+SESSION_SAVE_EVERY_REQUEST = False
 SESSION_COOKIE_AGE = 60 * 60 * 12  # 12 h
+# Au plus une écriture de session toutes les N secondes (prolongation de l'expiration)
+FLOTTE_SESSION_REFRESH_INTERVAL = int(os.environ.get('FLOTTE_SESSION_REFRESH_INTERVAL', str(15 * 60)))
+# Purge des sessions expirées : python manage.py purge_sessions (à planifier)
 if not DEBUG:
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
     SECURE_SSL_REDIRECT = os.environ.get('SECURE_SSL_REDIRECT', '0') == '1'
     SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# ——— Cache HTTP des API JSON (ETag / 304, flotte.http_cache) ———
+# max-age du Cache-Control private ; 0 = revalidation à chaque appel (304 si données inchangées)
+FLOTTE_HTTP_CACHE_MAX_AGE = int(os.environ.get('FLOTTE_HTTP_CACHE_MAX_AGE', '0'))
+
+# ——— Cache de fragments de gabarits (flotte.fragment_cache, {% fragment_cache %}) ———
+# Durée de vie (secondes) des fragments versionnés : sidebar, tuiles, alertes, lignes du parc ; 0 = désactivé
+FLOTTE_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FLOTTE_FRAGMENT_CACHE_TIMEOUT', '3600'))
+
+# ——— Profilage des requêtes (flotte.profiling, admin « Profils de vues ») ———
+# Fraction des requêtes profilées : 1 % en production, désactivé en développement par défaut
+FLOTTE_PROFILING_SAMPLE_RATE = float(os.environ.get('FLOTTE_PROFILING_SAMPLE_RATE', '0' if DEBUG else '0.01'))
+# Requêtes similaires répétées au moins N fois dans une même requête HTTP → détection N+1
+FLOTTE_PROFILING_NPLUSONE_THRESHOLD = int(os.environ.get('FLOTTE_PROFILING_NPLUSONE_THRESHOLD', '5'))
+# Agrégation en base (table ProfilVue) au plus toutes les N secondes ; tampon de profils récents par processus
+FLOTTE_PROFILING_FLUSH_INTERVAL = int(os.environ.get('FLOTTE_PROFILING_FLUSH_INTERVAL', '30'))
+FLOTTE_PROFILING_BUFFER_SIZE = int(os.environ.get('FLOTTE_PROFILING_BUFFER_SIZE', '200'))
+
+# ——— Budgets de requêtes SQL par vue (flotte.query_budget, @query_budget(n)) ———
+# off = pas de comptage ; log = avertissement si dépassement ; raise = exception (développement)
+FLOTTE_QUERY_BUDGET_MODE = os.environ.get('FLOTTE_QUERY_BUDGET_MODE', 'raise' if DEBUG else 'log')
+
+# ——— Métriques Prometheus (flotte.metrics, GET /metrics) ———
+FLOTTE_METRICS_ENABLED = os.environ.get('FLOTTE_METRICS_ENABLED', '1') == '1'
+# Dossier partagé par les workers (gunicorn, uWSGI…) : un instantané JSON par processus, additionnés
+# à la lecture. À vider au redémarrage du service. Vide = métriques du seul processus qui répond.
+FLOTTE_METRICS_DIR = os.environ.get('FLOTTE_METRICS_DIR', '')
+FLOTTE_METRICS_FLUSH_INTERVAL = float(os.environ.get('FLOTTE_METRICS_FLUSH_INTERVAL', '5'))
+# Réseaux autorisés sans connexion (scraper Prometheus) ; les administrateurs connectés ont toujours accès.
+# Vide par défaut : derrière un reverse proxy local (nginx → 127.0.0.1), REMOTE_ADDR est celle du proxy
+FLOTTE_METRICS_ALLOWED_NETWORKS = os.environ.get('FLOTTE_METRICS_ALLOWED_NETWORKS', '')
+
 # ——— Logging (erreurs et audit) ———
 LOGGING = {
     'version': 1,
@@ -170,6 +270,86 @@ LOGGING = {
     },
 }
 
+# ——— Admin personnalisé (admin_custom) ———
+# Résultat de la découverte des ModelAdmin (clé = empreinte des admin.py et des modèles) ; vide = désactivé
+ADMIN_CUSTOM_MANIFEST_PATH = os.environ.get(
+    'ADMIN_CUSTOM_MANIFEST_PATH', str(BASE_DIR / 'var' / 'admin_custom_manifest.json')
+)
+# Statistiques du tableau de bord (ModelStat) : tables de journalisation / technique non suivies
+ADMIN_CUSTOM_STATS_EXCLUDE = [
+    'flotte.auditlog', 'flotte.profilvue', 'flotte.emailoutbox', 'flotte.notificationecheance',
+    'flotte.tacheplanifiee', 'flotte.executiontache', 'flotte.venterollup', 'flotte.occupationrollup',
+    'flotte.occupationinvalidation', 'flotte.sequencenumero',
+]
+
+# ——— Profil production (FLOTTE_SETTINGS_PROFILE=production) ———
+# Cache partagé par les workers : générations de données (ETag, fragments), sessions cached_db,
+# fragments de gabarits. Redis (FLOTTE_REDIS_URL) est le cache de production recommandé. À défaut,
+# cache fichier (un seul hôte) : chaque écriture y parcourt le répertoire (_cull), il reste donc
+# petit et les fragments par ligne du parc y sont désactivés (FLOTTE_FRAGMENT_CACHE_ROWS) ; une
+# génération évincée est simplement renouvelée. En développement, cache mémoire du processus.
+FLOTTE_CACHE_DIR = os.environ.get('FLOTTE_CACHE_DIR', str(BASE_DIR / 'var' / 'cache'))
+if os.environ.get('FLOTTE_REDIS_URL'):
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['FLOTTE_REDIS_URL'],
+    }}
+elif PRODUCTION:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': FLOTTE_CACHE_DIR,
+        # Générations, sessions et fragments de page (pas de fragments par ligne)
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('FLOTTE_CACHE_MAX_ENTRIES', '2000'))},
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Fragments par ligne du parc (vehicule_ligne) : une entrée par véhicule, réservés à Redis en production
+FLOTTE_FRAGMENT_CACHE_ROWS = os.environ.get(
+    'FLOTTE_FRAGMENT_CACHE_ROWS', '0' if PRODUCTION and not os.environ.get('FLOTTE_REDIS_URL') else '1'
+) == '1'
+
+# Préchauffage au démarrage des workers (flotte.warmup, wsgi.py / asgi.py ; commande warmup)
+FLOTTE_WARMUP = os.environ.get('FLOTTE_WARMUP', '1' if PRODUCTION else '0') == '1'
+
+# Journaux fichier en production : flotte.<pid>.log par processus, rotation par taille, archives
+# compressées (.gz) ; les fichiers des workers arrêtés restent à purger (logrotate, tmpfiles)
+FLOTTE_LOG_DIR = os.environ.get('FLOTTE_LOG_DIR', str(BASE_DIR / 'var' / 'log'))
+FLOTTE_LOG_MAX_BYTES = int(os.environ.get('FLOTTE_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+FLOTTE_LOG_BACKUP_COUNT = int(os.environ.get('FLOTTE_LOG_BACKUP_COUNT', '10'))
+
+if PRODUCTION:
+    # Gabarits compilés une fois par processus (pas de rechargement automatique)
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    # Connexions persistantes, vérifiées avant réutilisation ; désactivées sous ASGI (asgi.py définit
+    # FLOTTE_ASGI=1) : les connexions des threads sync_to_async ne sont pas fermées en fin de requête
+    if os.environ.get('FLOTTE_ASGI') == '1':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DJANGO_CONN_MAX_AGE', '600'))
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    # Statiques hachés (cache navigateur longue durée) : python manage.py collectstatic
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    }
+    Path(FLOTTE_LOG_DIR).mkdir(parents=True, exist_ok=True)
+    LOGGING['handlers']['file'] = {
+        'class': 'flotte.log_handlers.CompressedRotatingFileHandler',
+        # Un fichier par processus : les workers ne se disputent pas la rotation d'un même fichier
+        'filename': str(Path(FLOTTE_LOG_DIR) / 'flotte.{pid}.log'),
+        'maxBytes': FLOTTE_LOG_MAX_BYTES,
+        'backupCount': FLOTTE_LOG_BACKUP_COUNT,
+        'formatter': 'simple',
+        'encoding': 'utf-8',
+    }
+    LOGGING['root']['handlers'] = ['console', 'file']
+
 # ——— Email (mot de passe oublié, bienvenue, notifications) ———
 # Par défaut : console (emails affichés dans le terminal)
 EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
@@ -189,6 +369,39 @@ if os.environ.get('EMAIL_HOST'):
     EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
     DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or DEFAULT_FROM_EMAIL)
 
+# File d'emails (flotte.outbox, worker `python manage.py send_outbox --loop`) : messages par connexion
+# SMTP, tentatives avant échec définitif, délai de base des nouveaux essais (doublé à chaque échec), bail d'un lot
+FLOTTE_OUTBOX_BATCH_SIZE = int(os.environ.get('FLOTTE_OUTBOX_BATCH_SIZE', '50'))
+FLOTTE_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('FLOTTE_OUTBOX_MAX_ATTEMPTS', '5'))
+FLOTTE_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('FLOTTE_OUTBOX_BACKOFF_SECONDS', '60'))
+FLOTTE_OUTBOX_LEASE_SECONDS = int(os.environ.get('FLOTTE_OUTBOX_LEASE_SECONDS', '600'))
+
+# Récapitulatif nocturne des échéances (`python manage.py send_expiry_digest`) : horizon en jours
+FLOTTE_ECHEANCES_NOTIFY_DAYS = int(os.environ.get('FLOTTE_ECHEANCES_NOTIFY_DAYS', '30'))
+
+# ——— Planificateur de tâches (python manage.py run_scheduler) ———
+# Expressions cron en heure locale (TIME_ZONE). 'callable' : fonction ; 'command' : commande de gestion.
+FLOTTE_SCHEDULER_JOBS = {
+    'statuts_locations': {'cron': '5 * * * *', 'callable': 'flotte.jobs.update_location_statuts'},
+    'envoi_emails': {'cron': '* * * * *', 'command': 'send_outbox'},
+    'recapitulatif_echeances': {'cron': '0 6 * * *', 'command': 'send_expiry_digest'},
+    'purge_sessions': {'cron': '15 * * * *', 'command': 'purge_sessions'},
+    'agregats_ventes': {'cron': '30 2 * * *', 'command': 'rebuild_vente_rollup'},
+    'occupation_flotte': {'cron': '*/15 * * * *', 'command': 'refresh_occupation'},
+    'stats_admin': {'cron': '*/30 * * * *', 'command': 'refresh_admin_stats'},
+    'graphiques_dashboard': {'cron': '*/5 * * * *', 'command': 'refresh_dashboard_charts'},
+    'maintenance_sqlite': {'cron': '0 3 * * *', 'command': 'sqlite_maintenance'},
+    'purge_historique_taches': {'cron': '45 3 * * *', 'callable': 'flotte.scheduler.purge_history'},
+}
+if FLOTTE_REPORTING_SNAPSHOT_PATH:
+    FLOTTE_SCHEDULER_JOBS['instantane_rapports'] = {'cron': '*/5 * * * *', 'command': 'refresh_reporting_snapshot'}
+# Durée (secondes) après laquelle le verrou d'une exécution interrompue est libéré ; rétention de l'historique (jours)
+FLOTTE_SCHEDULER_LOCK_SECONDS = int(os.environ.get('FLOTTE_SCHEDULER_LOCK_SECONDS', '3600'))
+FLOTTE_SCHEDULER_HISTORY_DAYS = int(os.environ.get('FLOTTE_SCHEDULER_HISTORY_DAYS', '30'))
+
+# Facturation mensuelle des locations (python manage.py run_billing) : locations par lot / transaction
+FLOTTE_FACTURATION_BATCH_SIZE = int(os.environ.get('FLOTTE_FACTURATION_BATCH_SIZE', '500'))
+
 # ——— Connexion Google (OAuth2) ———
 # Créer des identifiants dans Google Cloud Console : APIs & Services > Identifiants > Créer > ID client OAuth 2.0 (Application Web).
 # URI de redirection autorisés : https://ton-domaine.com/accounts/google/login/callback/ et en dev http://127.0.0.1:8000/accounts/google/login/callback/
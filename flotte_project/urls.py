@@ -6,10 +6,15 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.views.static import serve
 
+from flotte.metrics import metrics_view
+
 # Servir /static/ et /media/ en PREMIER quand DEBUG=True OU pendant les tests (LiveServerTestCase)
 # (Django met DEBUG=False pendant les tests, donc on détecte aussi 'test' dans sys.argv)
 _serve_static = settings.DEBUG or 'test' in sys.argv
-_accounts = [path('accounts/', include('allauth.urls'))]
+_accounts = [
+    path('accounts/', include('allauth.urls')),
+    path('metrics', metrics_view, name='metrics'),  # Prometheus (admins ou réseau interne)
+]
 if _serve_static:
     urlpatterns = [
         re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATICFILES_DIRS[0]}),
@@ -4,3 +4,8 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flotte_project.settings')
 application = get_wsgi_application()
+
+# Profil production : gabarits compilés, connexion ouverte, données de référence chargées (FLOTTE_WARMUP)
+from flotte.warmup import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()